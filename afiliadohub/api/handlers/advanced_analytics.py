@@ -1,3 +1,5 @@
+import os
+import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -5,132 +7,204 @@ from typing import Dict, List, Optional
 import plotly.graph_objects as go
 import plotly.express as px
 
+from ..utils.data_versions import data_versions
+from ..utils.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Cache de relatórios: chave = (relatório, parâmetros, versões dos dados).
+# Sem stale-while-revalidate: um relatório servido tem no máximo TTL segundos
+# (escritas de outros processos só aparecem quando o TTL vence).
+ANALYTICS_REPORT_CACHE_TTL = float(os.getenv("ANALYTICS_REPORT_CACHE_TTL", "300"))
+ANALYTICS_REPORT_CACHE_SIZE = int(os.getenv("ANALYTICS_REPORT_CACHE_SIZE", "256"))
+
+# Tabelas (data_versions) de que cada relatório depende. "stats" fica de
+# fora: o StatsBuffer grava a cada STATS_FLUSH_INTERVAL sob tráfego e
+# invalidaria o cache o tempo todo; para contadores o TTL limita o atraso.
+REPORT_DEPENDENCIES = {
+    "sales_funnel": ("products", "commissions"),
+    "performance_report": ("products", "commissions"),
+    "daily_trends": ("products", "commissions"),
+}
+
+report_cache = ResponseCache("analytics_reports", max_entries=ANALYTICS_REPORT_CACHE_SIZE)
+
+REPORT_TOP_LIMIT = 10
+
+FUNNEL_STORE_FIELDS = ("added", "viewed", "clicked", "sold", "sales_amount")
+
+STATS_COLUMNS = ["product_id", "view_count", "click_count", "telegram_send_count"]
+
+
+def _bucket_period(start_date: str, end_date: str, seconds: float):
+    """
+    Início arredondado para baixo e fim para cima em múltiplos de ``seconds``
+    (o período só cresce). Datas que não são ISO passam sem mudança.
+    """
+    if seconds <= 0:
+        return start_date, end_date
+    try:
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return start_date, end_date
+
+    def floor(moment: datetime) -> datetime:
+        epoch = moment.timestamp()
+        return moment - timedelta(seconds=epoch % seconds)
+
+    bucketed_end = floor(end)
+    if bucketed_end < end:
+        bucketed_end += timedelta(seconds=seconds)
+    return floor(start).isoformat(), bucketed_end.isoformat()
+
 
 class AdvancedAnalytics:
     def __init__(self):
-        self.cache = {}
+        # Compartilhado: cada request cria o seu AdvancedAnalytics
+        self.cache = report_cache
+
+    async def _cached(self, report: str, params: tuple, compute):
+        """
+        Serve ``report`` do cache. Importações, flush de stats e novas
+        comissões mudam as versões na chave, forçando o recálculo.
+        """
+        key = (report, params, data_versions.current(*REPORT_DEPENDENCIES[report]))
+        return await self.cache.get_or_fetch(
+            key, compute, ttl=ANALYTICS_REPORT_CACHE_TTL, stale_ttl=0
+        )
 
     async def get_sales_funnel_analysis(self, days: int = 30) -> Dict:
         """Analisa funil de vendas/vendas"""
         try:
-            from api.utils.supabase_client import get_supabase_manager
+            return await self._cached(
+                "sales_funnel", (days,), lambda: self._sales_funnel(days)
+            )
+        except Exception as e:
+            return {"error": str(e)}
 
-            supabase = get_supabase_manager()
+    async def _sales_funnel(self, days: int) -> Dict:
+        from api.utils.supabase_client import get_supabase_manager
 
-            start_date = (datetime.now() - timedelta(days=days)).isoformat()
+        supabase = get_supabase_manager()
 
-            # Busca dados
-            products_response = (
-                supabase.client.table("products")
-                .select("id, name, store, created_at")
-                .gte("created_at", start_date)
-                .execute()
-            )
+        start_date = (datetime.now() - timedelta(days=days)).isoformat()
 
-            stats_response = (
-                supabase.client.table("product_stats")
-                .select("product_id, view_count, click_count")
-                .execute()
+        # Contagens por loja agregadas no banco (migration v4, PART 7)
+        try:
+            response = supabase.client.rpc(
+                "analytics_sales_funnel", {"p_start": start_date}
+            ).execute()
+            store_rows = response.data or []
+        except Exception as e:
+            logger.warning(
+                f"[Analytics] analytics_sales_funnel indisponível, agregando em Python: {e}"
             )
+            store_rows = self._funnel_rows_in_python(supabase, start_date)
 
-            commissions_response = (
-                supabase.client.table("commissions")
-                .select("product_id, sale_amount")
-                .gte("calculated_at", start_date)
-                .execute()
-            )
+        by_store = {
+            row["store"]: {field: row[field] for field in FUNNEL_STORE_FIELDS}
+            for row in store_rows
+        }
+        funnel = self._funnel_totals(by_store)
 
-            products = products_response.data if products_response.data else []
-            stats = stats_response.data if stats_response.data else []
-            commissions = commissions_response.data if commissions_response.data else []
-
-            # Processa dados
-            stats_dict = {s["product_id"]: s for s in stats}
-            commissions_dict = {}
-
-            for c in commissions:
-                product_id = c["product_id"]
-                if product_id not in commissions_dict:
-                    commissions_dict[product_id] = []
-                commissions_dict[product_id].append(c["sale_amount"])
-
-            # Calcula métricas do funil
-            funnel = {
-                "products_added": len(products),
-                "products_viewed": 0,
-                "products_clicked": 0,
-                "products_sold": 0,
-                "total_sales": 0,
-                "conversion_rates": {},
-            }
+        return {
+            "period_days": days,
+            "funnel": funnel,
+            "by_store": by_store,
+            "summary": self._generate_funnel_summary(funnel),
+        }
 
-            for product in products:
-                product_id = product["id"]
-                product_stats = stats_dict.get(product_id, {})
+    def _funnel_rows_in_python(self, supabase, start_date: str) -> List[Dict]:
+        """Fallback sem a RPC: baixa produtos, stats e comissões e agrega aqui"""
+        products_response = (
+            supabase.client.table("products")
+            .select("id, name, store, created_at")
+            .gte("created_at", start_date)
+            .execute()
+        )
 
-                if product_stats.get("view_count", 0) > 0:
-                    funnel["products_viewed"] += 1
+        stats_response = (
+            supabase.client.table("product_stats")
+            .select("product_id, view_count, click_count")
+            .execute()
+        )
 
-                if product_stats.get("click_count", 0) > 0:
-                    funnel["products_clicked"] += 1
+        commissions_response = (
+            supabase.client.table("commissions")
+            .select("product_id, sale_amount")
+            .gte("calculated_at", start_date)
+            .execute()
+        )
 
-                if product_id in commissions_dict:
-                    funnel["products_sold"] += 1
-                    funnel["total_sales"] += sum(commissions_dict[product_id])
+        products = products_response.data if products_response.data else []
+        stats = stats_response.data if stats_response.data else []
+        commissions = commissions_response.data if commissions_response.data else []
+
+        stats_dict = {s["product_id"]: s for s in stats}
+        commissions_dict = {}
+
+        for c in commissions:
+            commissions_dict.setdefault(c["product_id"], []).append(c["sale_amount"])
+
+        by_store = {}
+        for product in products:
+            store = product.get("store") or "unknown"
+            if store not in by_store:
+                by_store[store] = {
+                    "store": store,
+                    "added": 0,
+                    "viewed": 0,
+                    "clicked": 0,
+                    "sold": 0,
+                    "sales_amount": 0,
+                }
 
-            # Calcula taxas de conversão
-            if funnel["products_added"] > 0:
-                funnel["conversion_rates"]["view_to_add"] = (
-                    funnel["products_viewed"] / funnel["products_added"]
-                ) * 100
-                funnel["conversion_rates"]["click_to_view"] = (
-                    (funnel["products_clicked"] / funnel["products_viewed"]) * 100
-                    if funnel["products_viewed"] > 0
-                    else 0
-                )
-                funnel["conversion_rates"]["sale_to_click"] = (
-                    (funnel["products_sold"] / funnel["products_clicked"]) * 100
-                    if funnel["products_clicked"] > 0
-                    else 0
-                )
+            by_store[store]["added"] += 1
 
-            # Análise por loja
-            by_store = {}
-            for product in products:
-                store = product["store"]
-                if store not in by_store:
-                    by_store[store] = {
-                        "added": 0,
-                        "viewed": 0,
-                        "clicked": 0,
-                        "sold": 0,
-                        "sales_amount": 0,
-                    }
+            product_id = product["id"]
+            product_stats = stats_dict.get(product_id, {})
 
-                by_store[store]["added"] += 1
+            if (product_stats.get("view_count") or 0) > 0:
+                by_store[store]["viewed"] += 1
 
-                product_id = product["id"]
-                product_stats = stats_dict.get(product_id, {})
+            if (product_stats.get("click_count") or 0) > 0:
+                by_store[store]["clicked"] += 1
 
-                if product_stats.get("view_count", 0) > 0:
-                    by_store[store]["viewed"] += 1
+            if product_id in commissions_dict:
+                by_store[store]["sold"] += 1
+                by_store[store]["sales_amount"] += sum(commissions_dict[product_id])
 
-                if product_stats.get("click_count", 0) > 0:
-                    by_store[store]["clicked"] += 1
+        return list(by_store.values())
 
-                if product_id in commissions_dict:
-                    by_store[store]["sold"] += 1
-                    by_store[store]["sales_amount"] += sum(commissions_dict[product_id])
+    def _funnel_totals(self, by_store: Dict) -> Dict:
+        """Funil geral (somando as lojas) e taxas de conversão"""
+        funnel = {
+            "products_added": sum(s["added"] for s in by_store.values()),
+            "products_viewed": sum(s["viewed"] for s in by_store.values()),
+            "products_clicked": sum(s["clicked"] for s in by_store.values()),
+            "products_sold": sum(s["sold"] for s in by_store.values()),
+            "total_sales": sum(s["sales_amount"] for s in by_store.values()),
+            "conversion_rates": {},
+        }
 
-            return {
-                "period_days": days,
-                "funnel": funnel,
-                "by_store": by_store,
-                "summary": self._generate_funnel_summary(funnel),
-            }
+        # Calcula taxas de conversão
+        if funnel["products_added"] > 0:
+            funnel["conversion_rates"]["view_to_add"] = (
+                funnel["products_viewed"] / funnel["products_added"]
+            ) * 100
+            funnel["conversion_rates"]["click_to_view"] = (
+                (funnel["products_clicked"] / funnel["products_viewed"]) * 100
+                if funnel["products_viewed"] > 0
+                else 0
+            )
+            funnel["conversion_rates"]["sale_to_click"] = (
+                (funnel["products_sold"] / funnel["products_clicked"]) * 100
+                if funnel["products_clicked"] > 0
+                else 0
+            )
 
-        except Exception as e:
-            return {"error": str(e)}
+        return funnel
 
     def _generate_funnel_summary(self, funnel: Dict) -> Dict:
         """Gera resumo das análises do funil"""
@@ -172,121 +246,139 @@ class AdvancedAnalytics:
     async def generate_performance_report(self, start_date: str, end_date: str) -> Dict:
         """Gera relatório completo de performance"""
         try:
-            from api.utils.supabase_client import get_supabase_manager
+            # Quem chama passa datetime.now(): o período vai para a borda da
+            # janela de TTL para a chave se repetir entre requests seguidos
+            start_date, end_date = _bucket_period(
+                start_date, end_date, ANALYTICS_REPORT_CACHE_TTL
+            )
+            return await self._cached(
+                "performance_report",
+                (start_date, end_date),
+                lambda: self._performance_report(start_date, end_date),
+            )
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _performance_report(self, start_date: str, end_date: str) -> Dict:
+        from api.utils.supabase_client import get_supabase_manager
 
-            supabase = get_supabase_manager()
+        supabase = get_supabase_manager()
 
-            # Busca todos os dados
-            products = (
-                supabase.client.table("products")
-                .select("*")
-                .gte("created_at", start_date)
-                .lte("created_at", end_date)
-                .execute()
+        # Resumo, rankings e agrupamentos calculados no banco (migration v4, PART 7)
+        try:
+            response = supabase.client.rpc(
+                "analytics_performance_report",
+                {
+                    "p_start": start_date,
+                    "p_end": end_date,
+                    "p_top": REPORT_TOP_LIMIT,
+                },
+            ).execute()
+            sections = response.data
+        except Exception as e:
+            logger.warning(
+                f"[Analytics] analytics_performance_report indisponível, agregando em Python: {e}"
             )
+            sections = self._report_sections_in_python(supabase, start_date, end_date)
 
-            stats = supabase.client.table("product_stats").select("*").execute()
+        if not sections or not sections["summary"].get("total_products"):
+            return {"message": "Sem dados para o período"}
 
-            commissions = (
-                supabase.client.table("commissions")
-                .select("*")
-                .gte("calculated_at", start_date)
-                .lte("calculated_at", end_date)
-                .execute()
-            )
+        daily_trends = await self._generate_daily_trends(start_date, end_date)
 
-            telegram_logs = (
-                supabase.client.table("product_stats")
-                .select("product_id, telegram_send_count, last_sent")
-                .gte("last_sent", start_date)
-                .lte("last_sent", end_date)
-                .execute()
-            )
+        return {
+            "period": f"{start_date[:10]} a {end_date[:10]}",
+            "summary": self._add_summary_rates(dict(sections["summary"])),
+            "top_performers": sections["top_performers"],
+            "worst_performers": sections["worst_performers"],
+            "store_analysis": sections["store_analysis"],
+            "category_analysis": sections["category_analysis"],
+            "charts": {
+                "daily_trends": daily_trends,
+                "store_performance": self._store_chart(sections["store_analysis"]),
+            },
+        }
 
-            products_data = products.data if products.data else []
-            stats_data = stats.data if stats.data else []
-            commissions_data = commissions.data if commissions.data else []
-            telegram_data = telegram_logs.data if telegram_logs.data else []
-
-            # Processa para DataFrame
-            df_products = pd.DataFrame(products_data)
-            df_stats = pd.DataFrame(stats_data)
-            df_commissions = pd.DataFrame(commissions_data)
-            df_telegram = pd.DataFrame(telegram_data)
-
-            # Merge data
-            if not df_products.empty:
-                # Produtos com estatísticas
-                df_merged = pd.merge(
-                    df_products,
-                    df_stats,
-                    left_on="id",
-                    right_on="product_id",
-                    how="left",
-                    suffixes=("", "_stats"),
-                )
+    def _report_sections_in_python(
+        self, supabase, start_date: str, end_date: str
+    ) -> Optional[Dict]:
+        """Fallback sem a RPC: baixa as tabelas do período e agrega com pandas"""
+        products = (
+            supabase.client.table("products")
+            .select("*")
+            .gte("created_at", start_date)
+            .lte("created_at", end_date)
+            .execute()
+        )
 
-                # Adiciona comissões
-                if not df_commissions.empty:
-                    commissions_by_product = (
-                        df_commissions.groupby("product_id")
-                        .agg(
-                            {
-                                "sale_amount": "sum",
-                                "commission_amount": "sum",
-                                "id": "count",
-                            }
-                        )
-                        .rename(columns={"id": "sales_count"})
-                    )
-
-                    df_merged = pd.merge(
-                        df_merged,
-                        commissions_by_product,
-                        left_on="id",
-                        right_index=True,
-                        how="left",
-                    )
-
-                # Adiciona envios telegram
-                if not df_telegram.empty:
-                    telegram_by_product = df_telegram.groupby("product_id").agg(
-                        {"telegram_send_count": "sum"}
-                    )
-
-                    df_merged = pd.merge(
-                        df_merged,
-                        telegram_by_product,
-                        left_on="id",
-                        right_index=True,
-                        how="left",
-                        suffixes=("", "_telegram"),
-                    )
-
-                # Calcula métricas
-                report = {
-                    "period": f"{start_date[:10]} a {end_date[:10]}",
-                    "summary": self._calculate_summary_metrics(df_merged),
-                    "top_performers": self._get_top_performers(df_merged),
-                    "worst_performers": self._get_worst_performers(df_merged),
-                    "store_analysis": self._analyze_by_store(df_merged),
-                    "category_analysis": self._analyze_by_category(df_merged),
-                    "charts": {
-                        "daily_trends": await self._generate_daily_trends(
-                            start_date, end_date
-                        ),
-                        "store_performance": await self._generate_store_chart(
-                            df_merged
-                        ),
-                    },
-                }
+        stats = (
+            supabase.client.table("product_stats")
+            .select(", ".join(STATS_COLUMNS))
+            .execute()
+        )
 
-                return report
+        commissions = (
+            supabase.client.table("commissions")
+            .select("*")
+            .gte("calculated_at", start_date)
+            .lte("calculated_at", end_date)
+            .execute()
+        )
 
-            return {"message": "Sem dados para o período"}
+        products_data = products.data if products.data else []
+        stats_data = stats.data if stats.data else []
+        commissions_data = commissions.data if commissions.data else []
+
+        df_products = pd.DataFrame(products_data)
+        if df_products.empty:
+            return None
+
+        # Produtos com estatísticas
+        df_merged = pd.merge(
+            df_products,
+            pd.DataFrame(stats_data, columns=STATS_COLUMNS),
+            left_on="id",
+            right_on="product_id",
+            how="left",
+            suffixes=("", "_stats"),
+        )
 
-        except Exception as e:
-            return {"error": str(e)}
+        # Adiciona comissões
+        df_commissions = pd.DataFrame(commissions_data)
+        if not df_commissions.empty:
+            commissions_by_product = (
+                df_commissions.groupby("product_id")
+                .agg(
+                    {
+                        "sale_amount": "sum",
+                        "commission_amount": "sum",
+                        "id": "count",
+                    }
+                )
+                .rename(columns={"id": "sales_count"})
+            )
+
+            df_merged = pd.merge(
+                df_merged,
+                commissions_by_product,
+                left_on="id",
+                right_index=True,
+                how="left",
+            )
+        else:
+            df_merged["sale_amount"] = 0
+            df_merged["commission_amount"] = 0
+            df_merged["sales_count"] = 0
+
+        df_merged["store"] = df_merged["store"].fillna("unknown")
+
+        return {
+            "summary": self._calculate_summary_metrics(df_merged),
+            "top_performers": self._get_top_performers(df_merged, REPORT_TOP_LIMIT),
+            "worst_performers": self._get_worst_performers(df_merged, REPORT_TOP_LIMIT),
+            "store_analysis": self._analyze_by_store(df_merged),
+            "category_analysis": self._analyze_by_category(df_merged),
+        }
 
     def _calculate_summary_metrics(self, df: pd.DataFrame) -> Dict:
         """Calcula métricas resumidas"""
@@ -325,7 +417,10 @@ class AdvancedAnalytics:
             ),
         }
 
-        # Taxas
+        return self._add_summary_rates(metrics)
+
+    def _add_summary_rates(self, metrics: Dict) -> Dict:
+        """Taxas derivadas dos totais (CTR, conversão, ticket médio)"""
         if metrics["total_views"] > 0:
             metrics["click_through_rate"] = (
                 metrics["total_clicks"] / metrics["total_views"]
@@ -459,45 +554,51 @@ class AdvancedAnalytics:
     async def _generate_daily_trends(self, start_date: str, end_date: str) -> Dict:
         """Gera dados para gráfico de tendências diárias"""
         try:
-            from api.utils.supabase_client import get_supabase_manager
+            # Série diária: o dashboard passa datetime.now(), então a chave
+            # usa só as datas para refreshes seguidos caírem no cache
+            return await self._cached(
+                "daily_trends",
+                (start_date[:10], end_date[:10]),
+                lambda: self._daily_trends(start_date, end_date),
+            )
+        except Exception as e:
+            return {"error": str(e)}
 
-            supabase = get_supabase_manager()
+    async def _daily_trends(self, start_date: str, end_date: str) -> List[Dict]:
+        from api.utils.supabase_client import get_supabase_manager
 
-            # Busca dados diários
-            response = supabase.client.rpc(
-                "get_daily_trends", {"p_start_date": start_date, "p_end_date": end_date}
-            ).execute()
+        supabase = get_supabase_manager()
 
-            if response.data:
-                return response.data
-            else:
-                # Fallback: gera dados mock
-                dates = pd.date_range(start_date, end_date, freq="D")
-
-                trends = []
-                for date in dates:
-                    trends.append(
-                        {
-                            "date": date.strftime("%Y-%m-%d"),
-                            "products_added": np.random.randint(0, 50),
-                            "products_sold": np.random.randint(0, 20),
-                            "total_sales": np.random.randint(0, 1000),
-                            "telegram_sends": np.random.randint(0, 100),
-                        }
-                    )
-
-                return trends
+        # Busca dados diários
+        response = supabase.client.rpc(
+            "get_daily_trends", {"p_start_date": start_date, "p_end_date": end_date}
+        ).execute()
 
-        except Exception as e:
-            return {"error": str(e)}
+        if response.data:
+            return response.data
+
+        # Fallback: gera dados mock
+        dates = pd.date_range(start_date, end_date, freq="D")
 
-    async def _generate_store_chart(self, df: pd.DataFrame) -> Dict:
+        trends = []
+        for date in dates:
+            trends.append(
+                {
+                    "date": date.strftime("%Y-%m-%d"),
+                    "products_added": np.random.randint(0, 50),
+                    "products_sold": np.random.randint(0, 20),
+                    "total_sales": np.random.randint(0, 1000),
+                    "telegram_sends": np.random.randint(0, 100),
+                }
+            )
+
+        return trends
+
+    def _store_chart(self, store_data: Dict) -> Dict:
         """Gera dados para gráfico de performance por loja"""
-        if df.empty:
+        if not store_data:
             return {}
 
-        store_data = self._analyze_by_store(df)
-
         stores = list(store_data.keys())
         revenues = [store_data[store]["total_revenue"] for store in stores]
         products = [store_data[store]["product_count"] for store in stores]
@@ -136,15 +136,21 @@ async def export_report(
         supabase = get_supabase_manager()
 
         if report_type == "products":
-            response = (
-                supabase.client.table("products")
-                .select("*")
+            from api.utils.field_sets import product_select
+
+            # Keyset em páginas de 1000: um select único parava no limite
+            # de linhas do PostgREST
+            columns = product_select("export")
+            products = []
+            async for page in supabase.iter_pages(
+                lambda: supabase.client.table("products")
+                .select(columns)
                 .gte("created_at", start_date)
                 .lte("created_at", end_date)
-                .execute()
-            )
+            ):
+                products.extend(page)
 
-            data = {"products": response.data} if response.data else {}
+            data = {"products": products} if products else {}
 
         elif report_type == "sales":
             response = (
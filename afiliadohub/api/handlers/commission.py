@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from decimal import Decimal
 
+from ..utils.data_versions import data_versions
 from ..utils.supabase_client import get_supabase_manager
 
 
@@ -56,6 +57,7 @@ class CommissionSystem:
             self.supabase.client.table("commissions").insert(
                 commission_record
             ).execute()
+            data_versions.bump("commissions")
 
             return {
                 "success": True,
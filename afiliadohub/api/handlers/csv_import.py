@@ -2,15 +2,225 @@ import csv
 import io
 import logging
 import asyncio
+import functools
+import itertools
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 from ..utils.supabase_client import get_supabase_manager
+from ..utils.import_pipeline import ImportPipeline
+from ..utils.feed_stream import open_feed_stream
 from ..utils.link_processor import normalize_link, detect_store, extract_product_info
 
 logger = logging.getLogger(__name__)
 
+# Aliases de coluna (lowercase) por campo, em ordem de prioridade
+CSV_COLUMN_ALIASES: Dict[str, List[str]] = {
+    "name": [
+        "product name",
+        "product_name",
+        "nome do produto",
+        "name",
+        "titulo",
+        "title",
+    ],
+    "store": ["merchant name", "merchant_name", "loja", "store", "advertiser"],
+    "price": [
+        "search_price",
+        "store price",
+        "price",
+        "preço",
+        "preco",
+        "current_price",
+    ],
+    "link": [
+        "awin_deep_link",
+        "awin_link",
+        "url",
+        "link",
+        "link do produto",
+        "product_url",
+        "affiliate_link",
+    ],
+    "image": [
+        "image_url",
+        "image url",
+        "url da imagem",
+        "imagem",
+        "image",
+        "merchant_image_url",
+    ],
+    "category": ["merchant_category", "merchant category", "categoria", "category"],
+    "discount": ["discount", "desconto", "discount_percentage", "savings_percent"],
+}
+
+
+# Linhas parseadas por vez (vetorizado) e produtos por upsert no banco
+CSV_PARSE_CHUNK_SIZE = 10_000
+CSV_DB_BATCH_SIZE = 500
+
+_KNOWN_CSV_COLUMNS = {alias for aliases in CSV_COLUMN_ALIASES.values() for alias in aliases}
+
+
+def _is_known_column(column) -> bool:
+    """usecols do read_csv: descarta colunas que nenhum campo usa (descrições etc.)"""
+    return str(column).lower().strip() in _KNOWN_CSV_COLUMNS
+
+
+def resolve_csv_columns(columns) -> Dict[str, List[str]]:
+    """Resolve, a partir do header, quais colunas reais atendem cada campo"""
+    by_alias: Dict[str, Any] = {}
+    for col in columns:
+        # Se dois headers colidirem em lowercase, vale o último (como no dict antigo)
+        by_alias[str(col).lower().strip()] = col
+    return {
+        field: [by_alias[a] for a in aliases if a in by_alias]
+        for field, aliases in CSV_COLUMN_ALIASES.items()
+    }
+
+
+def _is_present(values: pd.Series) -> pd.Series:
+    """Equivalente vetorizado de ``if value`` (nem NaN nem string vazia)"""
+    return values.notna() & (values != "")
+
+
+def _coalesce(df: pd.DataFrame, candidates: List[str], parse=None):
+    """
+    Primeiro valor não-nulo entre as colunas candidatas, linha a linha.
+
+    Se ``parse`` for dado, converte a coluna escolhida (valor não convertível vira NaN).
+    Retorna (valores, máscara de linhas em que alguma coluna tinha valor).
+    """
+    size = len(df)
+    result = np.full(size, np.nan, dtype=float if parse else object)
+    taken = np.zeros(size, dtype=bool)
+    for col in candidates:
+        column = df[col]
+        available = column.notna().to_numpy() & ~taken
+        if not available.any():
+            continue
+        values = column[available] if not available.all() else column
+        if parse:
+            result[available] = parse(values).to_numpy(dtype=float, na_value=np.nan)
+        else:
+            result[available] = values.to_numpy(dtype=object)
+        taken |= available
+    return pd.Series(result, index=df.index), pd.Series(taken, index=df.index)
+
+
+def _string_mask(values: pd.Series) -> pd.Series:
+    """Quais valores são texto (colunas lidas do CSV costumam ser 100% texto)"""
+    if pd.api.types.is_string_dtype(values):
+        return pd.Series(True, index=values.index)
+    return values.map(type) == str
+
+
+def _parse_br_price(values: pd.Series) -> pd.Series:
+    """"R$ 1.000,00" -> 1000.0 (strings); números passam direto"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    is_str = _string_mask(values)
+    text = (
+        values[is_str]
+        .astype(str)
+        # Padrão brasileiro 1.000,00 -> 1000.00
+        .str.replace(r"R\$| |\.", "", regex=True)
+        .str.replace(",", ".", regex=False)
+    )
+    parsed = pd.to_numeric(values.where(~is_str), errors="coerce").astype(float)
+    parsed[is_str] = pd.to_numeric(text, errors="coerce")
+    return parsed
+
+
+def _parse_discount(values: pd.Series) -> pd.Series:
+    """"15%" -> 15, 15.9 -> 15 (trunca como int())"""
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.astype(float)
+    else:
+        is_str = _string_mask(values)
+        numbers = pd.to_numeric(values.where(~is_str), errors="coerce").astype(float)
+        numbers[is_str] = pd.to_numeric(
+            values[is_str].astype(str).str.replace("%", "", regex=False).str.strip(),
+            errors="coerce",
+        )
+    numbers = numbers.where(np.isfinite(numbers))
+    return np.trunc(numbers)
+
+
+def content_hashes(columns: Dict[str, Any]) -> np.ndarray:
+    """Hash estável (int64) por linha dos campos importados de um chunk"""
+    combined = None
+    for values in columns.values():
+        column_hash = pd.util.hash_array(np.asarray(values), categorize=False)
+        combined = (
+            column_hash
+            if combined is None
+            else (combined * np.uint64(1_000_003)) ^ column_hash
+        )
+    return combined.view(np.int64)
+
+
+def parse_products_chunk(
+    df: pd.DataFrame,
+    default_store: str,
+    columns: Optional[Dict[str, List[str]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Mapeia um chunk inteiro do CSV para registros da tabela products.
+
+    Os aliases de coluna são resolvidos uma vez (``columns``) e preço/desconto
+    são convertidos com operações vetorizadas do pandas, sem iterrows().
+    Função de módulo (picklable) para poder rodar em um processo separado.
+    """
+    if columns is None:
+        columns = resolve_csv_columns(df.columns)
+
+    name, _ = _coalesce(df, columns["name"])
+    link, _ = _coalesce(df, columns["link"])
+
+    # Produto sem nome ou sem link não é salvo
+    valid = _is_present(name) & _is_present(link)
+    if not valid.any():
+        return []
+    df = df[valid]
+    name, link = name[valid], link[valid]
+
+    merchant, has_merchant = _coalesce(df, columns["store"])
+    store = (
+        merchant.where(has_merchant, default_store).astype(str).str.lower().str.strip()
+    )
+
+    price, _ = _coalesce(df, columns["price"], parse=_parse_br_price)
+    discount, _ = _coalesce(df, columns["discount"], parse=_parse_discount)
+    image_url, has_image = _coalesce(df, columns["image"])
+    category, has_category = _coalesce(df, columns["category"])
+
+    image_ok = (has_image & _is_present(image_url)).to_numpy()
+    image_values = image_url.astype(str).to_numpy(dtype=object)
+    image_values[~image_ok] = None
+
+    columns_out = {
+        "name": name.astype(str).str[:255],
+        "store": store,
+        "current_price": price.fillna(0.0),
+        "affiliate_link": link.astype(str),
+        "image_url": image_values,
+        "category": category.where(has_category, "Geral").astype(str).str[:100],
+        "discount_percentage": discount.fillna(0).astype("int64"),
+    }
+    # Fingerprint do conteúdo da linha: refresh incremental só regrava o que mudou
+    columns_out["content_hash"] = content_hashes(columns_out)
+
+    # Listas nativas (tolist) + zip: bem mais rápido que DataFrame.to_dict
+    columns_out = {key: values.tolist() for key, values in columns_out.items()}
+    keys = list(columns_out) + ["is_active"]
+    return [
+        dict(zip(keys, values + (True,)))
+        for values in zip(*columns_out.values())
+    ]
+
 
 class CSVImporter:
     def __init__(self, token: Optional[str] = None):
@@ -24,6 +234,7 @@ class CSVImporter:
             "updated": 0,
             "skipped": 0,
             "errors": 0,
+            "parse_errors": 0,
         }
         # Cache de stores para lookup rápido
         self.store_cache = self._load_stores()
@@ -45,174 +256,21 @@ class CSVImporter:
     def _parse_csv_row(self, row, default_store: str) -> Optional[Dict[str, Any]]:
         """Mapeia uma linha do CSV (Pandas Series) para as colunas da tabela products"""
         try:
-            # Converte a linha inteira para dicionário lowercase-keys para facilitar a busca
-            row_dict = {str(k).lower().strip(): v for k, v in row.to_dict().items()}
-
-            # --- PRODUCT NAME ---
-            name_keys = [
-                "product name",
-                "product_name",
-                "nome do produto",
-                "name",
-                "titulo",
-                "title",
-            ]
-            name = next(
-                (
-                    row_dict[k]
-                    for k in name_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                None,
-            )
-            if not name:
-                return None  # Produto sem nome não é salvo
-
-            # --- STORE / MERCHANT ---
-            merchant_keys = [
-                "merchant name",
-                "merchant_name",
-                "loja",
-                "store",
-                "advertiser",
-            ]
-            merchant_name = next(
-                (
-                    row_dict[k]
-                    for k in merchant_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                default_store,
-            )
-
-            # Usa o lower case name da store real, se aplicável
-            store = merchant_name.lower().strip()
-
-            # --- PRICE ---
-            price_keys = [
-                "search_price",
-                "store price",
-                "price",
-                "preço",
-                "preco",
-                "current_price",
-            ]
-            price_raw = next(
-                (
-                    row_dict[k]
-                    for k in price_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                0,
-            )
-            try:
-                # Trata "R$ 10,00" -> 10.00
-                if isinstance(price_raw, str):
-                    p_str = price_raw.replace("R$", "").replace(" ", "")
-                    # Padrão brasileiro 1.000,00 -> 1000.00
-                    p_str = p_str.replace(".", "").replace(",", ".")
-                    price = float(p_str)
-                else:
-                    price = float(price_raw)
-            except:
-                price = 0.0
-
-            # --- AFFILIATE LINK ---
-            link_keys = [
-                "awin_deep_link",
-                "awin_link",
-                "url",
-                "link",
-                "link do produto",
-                "product_url",
-                "affiliate_link",
-            ]
-            affiliate_link = next(
-                (
-                    row_dict[k]
-                    for k in link_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                None,
-            )
-            if not affiliate_link:
-                return None
-
-            # --- IMAGE URL ---
-            img_keys = [
-                "image_url",
-                "image url",
-                "url da imagem",
-                "imagem",
-                "image",
-                "merchant_image_url",
-            ]
-            image_url = next(
-                (
-                    row_dict[k]
-                    for k in img_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                None,
-            )
-            if pd.isna(image_url):
-                image_url = None
-
-            # --- CATEGORY ---
-            cat_keys = [
-                "merchant_category",
-                "merchant category",
-                "categoria",
-                "category",
-            ]
-            category = next(
-                (
-                    row_dict[k]
-                    for k in cat_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                "Geral",
-            )
-
-            # --- DISCOUNT ---
-            disc_keys = [
-                "discount",
-                "desconto",
-                "discount_percentage",
-                "savings_percent",
-            ]
-            discount_raw = next(
-                (
-                    row_dict[k]
-                    for k in disc_keys
-                    if k in row_dict and pd.notna(row_dict[k])
-                ),
-                0,
-            )
-            try:
-                if isinstance(discount_raw, str):
-                    d_str = discount_raw.replace("%", "").strip()
-                    discount = int(float(d_str))
-                else:
-                    discount = int(discount_raw)
-            except:
-                discount = 0
-
-            return {
-                "name": str(name)[:255],
-                "store": store,
-                "current_price": price,
-                "affiliate_link": str(affiliate_link),
-                "image_url": str(image_url) if image_url else None,
-                "category": str(category)[:100],
-                "discount_percentage": discount,
-                "is_active": True,
-            }
-
+            products = self._parse_chunk(row.to_frame().T, default_store)
+            return products[0] if products else None
         except Exception as e:
             logger.error(f"Erro ao fazer parse da linha CSV: {e}")
             return None
 
+    def _parse_chunk(
+        self,
+        df: pd.DataFrame,
+        default_store: str,
+        columns: Optional[Dict[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Mapeia um chunk do CSV para registros da tabela products"""
+        return parse_products_chunk(df, default_store, columns)
+
     async def process_csv_upload(
         self,
         file_content: Any,  # Permite str (path) ou io.BytesIO
@@ -220,12 +278,23 @@ class CSVImporter:
         replace_existing: bool = False,
         send_to_telegram: bool = False,
         compression: str = "infer",
+        chunk_size: int = CSV_PARSE_CHUNK_SIZE,
+        batch_size: int = CSV_DB_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        parse_in_process: Optional[bool] = None,
+        incremental: bool = False,
     ):
-        """Processa upload de CSV em chunks para evitar estouro de memória"""
+        """
+        Processa upload de CSV em chunks para evitar estouro de memória.
+
+        Leitura/parse vetorizado de ``chunk_size`` linhas alimenta uma fila
+        limitada (``queue_size`` lotes) drenada por ``concurrency`` workers que
+        gravam upserts de ``batch_size`` produtos (ver ImportPipeline).
+        Com ``incremental=True`` só são gravadas linhas cujo ``content_hash``
+        mudou desde a última importação.
+        """
         try:
-            chunk_size = 500  # Processa 500 produtos por vez
-            total_processed = 0
-
             # Inicializa Telegram se necessário
             tg_helper = None
             chat_id = None
@@ -243,66 +312,76 @@ class CSVImporter:
                     await tg_helper.initialize()
                     chat_id = telegram_settings.get_group_chat_id()
 
-            # Lê o CSV em chunks (iterador)
-            # Use encoding='utf-8' ou 'latin-1' dependendo do arquivo, mas pandas geralmente detecta bem
-            chunks = pd.read_csv(
-                file_content, chunksize=chunk_size, compression=compression
+            async def write_batch(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+                if incremental:
+                    return await self.supabase.upsert_changed_products(
+                        batch, token=self.token
+                    )
+                return await self.supabase.bulk_insert_products(
+                    batch, batch_size=len(batch), token=self.token
+                )
+
+            async def after_batch(result: Dict[str, Any], batch: List[Dict[str, Any]]):
+                # Envia para Telegram se solicitado e configurado
+                if tg_helper and chat_id and result.get("inserted", 0) > 0:
+                    # Limita a 5 produtos por lote para não spamar demais
+                    # (o ritmo do grupo fica a cargo da fila de envio)
+                    for prod in result.get("data", [])[:5]:
+                        await tg_helper.send_product_to_channel(chat_id, prod)
+
+            pipeline = ImportPipeline(
+                write_batch,
+                batch_size=batch_size,
+                concurrency=concurrency,
+                queue_size=queue_size,
+                parse_in_process=parse_in_process,
+                on_batch=after_batch,
             )
 
+            # Lê o CSV em chunks (iterador). Criado em thread: com streams
+            # de rede (open_feed_stream) o header já é lido do socket aqui.
+            loop = asyncio.get_running_loop()
+            chunks = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    pd.read_csv,
+                    file_content,
+                    chunksize=chunk_size,
+                    compression=compression,
+                    usecols=_is_known_column,
+                ),
+            )
+
+            # Aliases resolvidos uma única vez por arquivo (header)
+            first = await loop.run_in_executor(None, next, chunks, None)
+            if first is None:
+                logger.warning("⚠️ CSV vazio.")
+                return self.import_stats
+            columns = resolve_csv_columns(first.columns)
+
             logger.info(
-                f"📥 Iniciando importação em stream (chunk_size={chunk_size}), loja: {store}, compression={compression}"
+                f"📥 Iniciando importação em pipeline (chunk_size={chunk_size}, "
+                f"batch_size={batch_size}, workers={pipeline.concurrency}, "
+                f"fila={pipeline.queue_size}, processo={pipeline.parse_in_process}), "
+                f"loja: {store}, compression={compression}"
             )
 
-            for chunk_idx, df in enumerate(chunks):
-                chunk_products = []
-
-                # Processa linhas do chunk
-                for _, row in df.iterrows():
-                    try:
-                        product = self._parse_csv_row(row, store)
-                        if product:
-                            chunk_products.append(product)
-                    except Exception as e:
-                        # logger.warning(f"Erro ao processar linha: {e}")
-                        self.error_count += 1
-
-                # Insere chunk no banco
-                if chunk_products:
-                    try:
-                        result = await self.supabase.bulk_insert_products(
-                            chunk_products, token=self.token
-                        )
-
-                        inserted = result.get("inserted", 0)
-                        # errors = result.get('errors', 0)
-
-                        self.import_stats["total"] += len(chunk_products)
-                        self.import_stats["imported"] += inserted
-                        # self.import_stats['errors'] += errors
-
-                        total_processed += len(chunk_products)
-
-                        # Envia para Telegram se solicitado e configurado
-                        if tg_helper and chat_id and inserted > 0:
-                            inserted_products = result.get("data", [])
-                            # Limita a 5 produtos por chunk para não spamar demais
-                            for prod in inserted_products[:5]:
-                                await tg_helper.send_product_to_channel(chat_id, prod)
-                                await asyncio.sleep(2)  # Pausa respeitosa
-
-                        # Log de progresso
-                        logger.info(
-                            f"[OK] Chunk {chunk_idx+1} processado. Total: {self.import_stats['imported']}"
-                        )
-
-                    except Exception as e:
-                        logger.error(f"[ERRO] Erro ao inserir chunk {chunk_idx+1}: {e}")
-                        self.import_stats["errors"] += len(chunk_products)
-                else:
-                    logger.warning(f"⚠️ Chunk {chunk_idx+1} vazio.")
+            stats = await pipeline.run(
+                itertools.chain([first], chunks), parse_products_chunk, store, columns
+            )
+
+            self.import_stats["total"] += stats["total"]
+            self.import_stats["imported"] += stats["imported"]
+            self.import_stats["errors"] += stats["errors"]
+            self.import_stats["skipped"] += stats["skipped"]
+            self.import_stats["parse_errors"] += stats["parse_errors"]
+            self.error_count += stats["parse_errors"]
+            self.import_stats["peak_rss_mb"] = stats["peak_rss_mb"]
 
             logger.info(
-                f"🏁 Importação finalizada. Total: {self.import_stats['imported']}"
+                f"🏁 Importação finalizada. Total: {self.import_stats['imported']} "
+                f"(inalterados: {stats['skipped']}, {stats['chunks']} chunks em {stats['elapsed_seconds']}s, "
+                f"pico RSS {stats['peak_rss_mb']} MB)"
             )
             if send_to_telegram and tg_helper:
                 logger.info(f"📤 Envio para Telegram finalizado.")
@@ -349,23 +428,18 @@ async def process_csv_upload(
 
 # Função para importação da Shopee diária
 async def import_shopee_daily_csv(url: str, token: Optional[str] = None):
-    """Importa CSV diário da Shopee"""
-    import requests
-
+    """Importa CSV diário da Shopee (stream direto para o parser)"""
     try:
         logger.info(f"🔄 Baixando CSV diário da Shopee: {url}")
 
-        # Baixa o CSV
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        # Processa o CSV
-        file_content = io.BytesIO(response.content)
         importer = CSVImporter(token=token)
-
-        stats = await importer.process_csv_upload(
-            file_content, store="shopee", replace_existing=False
-        )
+        async with open_feed_stream(url) as (file_content, compression, _):
+            stats = await importer.process_csv_upload(
+                file_content,
+                store="shopee",
+                replace_existing=False,
+                compression=compression,
+            )
 
         logger.info(f"[OK] CSV Shopee importado: {stats}")
         return stats
@@ -378,59 +452,30 @@ async def import_shopee_daily_csv(url: str, token: Optional[str] = None):
 # Função para importação do Datafeed Awin
 async def import_awin_feed(url: str, token: Optional[str] = None):
     """
-    Importa CSV gigante da AWIN fazendo stream para o disco primeiro e usando pandas em chunks,
+    Importa CSV gigante da AWIN em stream direto para o parser (gzip é
+    descomprimido em memória sob demanda; zip é gravado em disco antes),
     para prevenir Out of Memory.
     """
-    import requests
-    import os
-    import tempfile
-
     try:
         logger.info(f"🔄 Baixando Feed Awin: {url}")
 
-        # Determina a compressão da URL
-        comp_type = "infer"
-        if "compression/zip" in url.lower():
-            comp_type = "zip"
-            suffix = ".zip"
-        elif "compression/gzip" in url.lower():
-            comp_type = "gzip"
-            suffix = ".gz"
-        else:
-            suffix = ".csv"
-
-        # Cria arquivo temporário para não saturar memória
-        fd, temp_path = tempfile.mkstemp(suffix=suffix)
-
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, stream=True, timeout=120)
-        response.raise_for_status()
-
-        # Escreve no disco em chunks
-        with os.fdopen(fd, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-
-        logger.info(f"✅ Feed Awin baixado para arquivo local: {temp_path}")
-
-        # Processa passando o caminho da string direto, assim o pandas usa o comp_type
         importer = CSVImporter(token=token)
-        stats = await importer.process_csv_upload(
-            temp_path,
-            store="awin",  # _parse_csv_row pegará "merchant_name" se existir
-            replace_existing=False,
-            compression=comp_type,
-        )
+        headers = {"User-Agent": "Mozilla/5.0"}
+        async with open_feed_stream(url, headers=headers) as (
+            file_content,
+            compression,
+            _,
+        ):
+            stats = await importer.process_csv_upload(
+                file_content,
+                store="awin",  # _parse_csv_row pegará "merchant_name" se existir
+                replace_existing=False,
+                compression=compression,
+                # Feeds Awin têm milhões de linhas: parse em processo separado
+                parse_in_process=True,
+            )
 
         logger.info(f"[OK] Feed Awin importado: {stats}")
-
-        # Remove arquivo temporário
-        try:
-            os.remove(temp_path)
-        except Exception as cleanup_err:
-            logger.warning(f"Erro ao limpar arquivo temporário do Awin: {cleanup_err}")
-
         return stats
 
     except Exception as e:
@@ -10,6 +10,10 @@ from datetime import datetime
 import psutil
 
 from .auth import get_current_admin
+from ..utils.http_clients import http_clients
+from ..utils.product_snapshot import product_snapshot
+from ..utils.telegram_sender import get_telegram_sender
+from ..utils.update_dispatcher import update_dispatcher
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -44,12 +48,17 @@ async def health_check_detailed():
         disk = psutil.disk_usage("/")
 
         db_status = "ok"
+        db_pool = {}
         try:
             from ..utils.supabase_client import get_supabase_manager
 
             supabase = get_supabase_manager()
-            result = supabase.client.table("stores").select("id").limit(1).execute()
+            result = await supabase.execute(
+                supabase.client.table("stores").select("id").limit(1)
+            )
             db_status = "ok" if result.data is not None else "error"
+            db_pool = supabase.pool_stats()
+            db_pool["stats_buffer"] = supabase.stats_buffer.stats()
         except Exception as e:
             logger.error(f"[Health] DB check falhou: {e}")
             db_status = "error"  # Não expõe detalhes ao cliente
@@ -66,6 +75,11 @@ async def health_check_detailed():
                 "disk_free_gb": disk.free // (1024**3),
             },
             "services": {"database": db_status, "api": "ok"},
+            "database_pool": db_pool,
+            "http_pool": http_clients.stats(),
+            "telegram_sender": get_telegram_sender().stats(),
+            "telegram_updates": update_dispatcher.stats(),
+            "product_snapshot": product_snapshot.stats(),
             "environment": os.getenv("ENVIRONMENT", "production"),
         }
     except Exception as e:
@@ -8,6 +8,7 @@ import time
 import html as html_module
 
 from .auth import get_current_user, get_current_admin
+from ..utils.http_clients import borrow_httpx_client
 
 router = APIRouter(prefix="/mercadolivre", tags=["mercadolivre"])
 logger = logging.getLogger(__name__)
@@ -48,9 +49,10 @@ async def _get_ml_app_token() -> Optional[str]:
         return None
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with borrow_httpx_client() as client:
             response = await client.post(
                 f"{ML_BASE_URL}/oauth/token",
+                timeout=15,
                 data={
                     "grant_type": "client_credentials",
                     "client_id": ML_APP_ID,
@@ -145,8 +147,10 @@ async def fetch_ml_item(item_id: str) -> Optional[Dict[str, Any]]:
         except Exception as auth_e:
             logger.warning(f"[ML Items API] Falha pegando token offline, usando sem token: {auth_e}")
 
-        async with httpx.AsyncClient(timeout=15.0, headers=headers) as client:
-            resp = await client.get(f"{ML_BASE_URL}/items/MLB{item_id}")
+        async with borrow_httpx_client() as client:
+            resp = await client.get(
+                f"{ML_BASE_URL}/items/MLB{item_id}", headers=headers, timeout=15.0
+            )
             if resp.status_code == 200:
                 item_data = resp.json()
                 return build_product_dict(item_data)
@@ -213,14 +217,23 @@ async def search_products(
         else:
             logger.warning("[ML API] Sem app token — buscando sem autenticação")
 
-        async with httpx.AsyncClient(timeout=30.0, headers=request_headers, follow_redirects=True) as client:
-            response = await client.get(f"{ML_BASE_URL}/sites/MLB/search", params=params)
+        async with borrow_httpx_client() as client:
+            request_options = {
+                "headers": request_headers,
+                "timeout": 30.0,
+                "follow_redirects": True,
+            }
+            response = await client.get(
+                f"{ML_BASE_URL}/sites/MLB/search", params=params, **request_options
+            )
 
             # Se 403 com condition, tenta sem
             if response.status_code == 403 and "condition" in params:
                 logger.warning("[ML API] 403 com condition, tentando sem...")
                 params.pop("condition")
-                response = await client.get(f"{ML_BASE_URL}/sites/MLB/search", params=params)
+                response = await client.get(
+                    f"{ML_BASE_URL}/sites/MLB/search", params=params, **request_options
+                )
 
             if not response.is_success:
                 body = response.text[:300]
@@ -274,8 +287,10 @@ async def get_trending(
         if category_id:
             params["category"] = category_id
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{ML_BASE_URL}/sites/MLB/search", params=params)
+        async with borrow_httpx_client() as client:
+            response = await client.get(
+                f"{ML_BASE_URL}/sites/MLB/search", params=params, timeout=30.0
+            )
             response.raise_for_status()
             data = response.json()
 
@@ -6,6 +6,8 @@ import httpx
 import re
 import logging
 from ..utils.supabase_client import get_supabase_manager
+from ..utils.field_sets import product_select
+from ..utils.keyset import apply_keyset, decode_cursor, keyset_columns, paginate
 from .auth import get_current_user
 
 # Get supabase instance
@@ -69,10 +71,29 @@ async def get_products(
     is_active: Optional[bool] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
+    fields: Optional[str] = Query(
+        None, description="card, detail, export, admin or comma-separated columns"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page (keyset pagination)"
+    ),
 ):
-    """List products with optional filters"""
+    """
+    List products with optional filters.
+
+    Pages are ordered by (created_at, id) DESC. Pass the returned
+    ``next_cursor`` as ``cursor`` for the next page; ``offset`` still works
+    but gets slower on deep pages.
+    """
+    try:
+        columns = keyset_columns(product_select(fields, default="admin"))
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        query = supabase.table("products").select("*")
+        query = supabase.table("products").select(columns)
 
         if store:
             query = query.eq("store", store)
@@ -83,20 +104,36 @@ async def get_products(
         if is_active is not None:
             query = query.eq("is_active", is_active)
 
-        query = query.range(offset, offset + limit - 1).order("created_at", desc=True)
+        # Uma linha a mais indica se existe próxima página
+        query = apply_keyset(query, cursor)
+        if cursor:
+            query = query.limit(limit + 1)
+        else:
+            query = query.range(offset, offset + limit)
 
         result = query.execute()
+        data, next_cursor = paginate(result.data, limit)
 
-        return {"data": result.data, "count": len(result.data)}
+        return {"data": data, "count": len(data), "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/products/{product_id}")
-async def get_product(product_id: int):
+async def get_product(
+    product_id: int,
+    fields: Optional[str] = Query(
+        None, description="card, detail, export, admin or comma-separated columns"
+    ),
+):
     """Get single product by ID"""
     try:
-        result = supabase.table("products").select("*").eq("id", product_id).execute()
+        columns = product_select(fields, default="admin")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = supabase.table("products").select(columns).eq("id", product_id).execute()
 
         if not result.data:
             raise HTTPException(status_code=404, detail="Product not found")
@@ -348,7 +385,9 @@ async def add_product(product_data: dict):
 async def search_products(filters: dict):
     """Legacy wrapper for specific filter format"""
     try:
-        query = supabase.table("products").select("*")
+        query = supabase.table("products").select(
+            product_select(filters.get("fields"), default="admin")
+        )
 
         if filters.get("store"):
             query = query.eq("store", filters["store"])
@@ -365,22 +404,8 @@ async def search_products(filters: dict):
         return []
 
 
-async def get_random_product(min_discount: int = 0):
-    """Legacy wrapper for random product fetch"""
-    try:
-        query = supabase.table("products").select("*").eq("is_active", True)
-
-        if min_discount > 0:
-            query = query.gte("discount_percentage", min_discount)
-
-        # Get random product using random() function if db supports it or fetch sample
-        # Since Supabase via REST doesn't support random() easily in select, we fetch a batch and pick one
-        result = query.limit(20).execute()
-
-        if result.data:
-            import random
-
-            return random.choice(result.data)
-        return None
-    except Exception as e:
-        return None
+async def get_random_product(min_discount: int = 0, store: Optional[str] = None):
+    """Legacy wrapper for random product fetch (sampled in the database)"""
+    return await get_supabase_manager().get_random_product(
+        store=store, min_discount=min_discount
+    )
@@ -3,7 +3,7 @@ Product Handler (Refactored with Clean Architecture)
 ITIL Activity: Engage (API Interface)
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
 import logging
 
@@ -11,6 +11,8 @@ from ..services.product_service import ProductService
 from ..repositories.product_repository import ProductRepository
 from ..models.domain import Product, ProductCreate, ProductUpdate, ProductFilter
 from ..utils.supabase_client import get_supabase_manager
+from ..utils.field_sets import product_select
+from ..utils.keyset import decode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,7 @@ def get_product_service(
 # API Endpoints
 @router.get("/products", response_model=List[dict])
 async def list_products(
+    response: Response,
     store: Optional[str] = Query(None, description="Filter by store"),
     category: Optional[str] = Query(None, description="Filter by category"),
     min_price: Optional[float] = Query(None, gt=0, description="Minimum price"),
@@ -43,13 +46,29 @@ async def list_products(
     ),
     active: Optional[bool] = Query(True, description="Active products only"),
     limit: int = Query(100, ge=1, le=500, description="Max results"),
+    fields: Optional[str] = Query(
+        None, description="card, detail, export, admin or comma-separated columns"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor from the previous page"
+    ),
     service: ProductService = Depends(get_product_service),
 ):
     """
     List products with optional filters.
 
+    Keyset-paginated by (created_at, id) DESC: the next page cursor is
+    returned in the ``X-Next-Cursor`` header (absent on the last page).
+
     ITIL: Engage activity - User interaction
     """
+    try:
+        columns = product_select(fields, default="admin")
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Build filters
         filters = ProductFilter(
@@ -62,7 +81,11 @@ async def list_products(
         )
 
         # Get products via service
-        products = service.get_products(filters, limit)
+        products, next_cursor = service.get_products_page(
+            filters, limit, cursor, columns=columns
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return products
     except Exception as e:
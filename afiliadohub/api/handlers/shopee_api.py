@@ -7,8 +7,9 @@ from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from fastapi import APIRouter, Depends, HTTPException, Query
 
-from ..utils.shopee_client import create_shopee_client
-from ..utils.shopee_extensions import add_rate_limiting
+from ..utils.shopee_client import create_shopee_client, products_cache
+from ..utils.short_link_store import get_short_link_store
+from ..utils.shopee_extensions import get_rate_limiter
 from ..utils.supabase_client import get_supabase_manager
 from ..utils.shopee_public_api import ShopeePublicAPI
 from .auth import get_current_user, get_current_admin
@@ -127,8 +128,7 @@ async def get_products(
         sort_type = sort_map.get(sort_by, 5)
 
         # Fetch from Shopee API with pagination
-        client = create_shopee_client()
-        add_rate_limiting(client)
+        client = create_shopee_client()  # já com rate limiting compartilhado
 
         async with client:
             result = await client.get_products(
@@ -240,8 +240,7 @@ async def search_products(
     Busca produtos por keyword
     """
     try:
-        client = create_shopee_client()
-        add_rate_limiting(client)
+        client = create_shopee_client()  # já com rate limiting compartilhado
 
         async with client:
             result = await client.get_products(
@@ -307,8 +306,7 @@ async def generate_short_link(
     Adiciona user_id aos sub_ids para tracking
     """
     try:
-        client = create_shopee_client()
-        add_rate_limiting(client)
+        client = create_shopee_client()  # já com rate limiting compartilhado
 
         # Add user tracking
         sub_ids = request.subIds or []
@@ -343,8 +341,7 @@ async def get_offers(
 ):
     """Lista ofertas gerais Shopee"""
     try:
-        client = create_shopee_client()
-        add_rate_limiting(client)
+        client = create_shopee_client()  # já com rate limiting compartilhado
 
         async with client:
             result = await client.get_shopee_offers(
@@ -565,11 +562,11 @@ async def get_rate_limit_status(current_admin: Dict = Depends(get_current_admin)
     Status do rate limiting - ADMIN ONLY
     """
     try:
-        client = create_shopee_client()
-        add_rate_limiting(client)
-
-        status = client.get_rate_limit_status()
-
+        # Estado do bucket compartilhado (API + bot + scripts)
+        status = await get_rate_limiter().get_status()
+        # Hit rate do cache de productOfferV2 (buscas que não gastaram cota)
+        status["products_cache"] = products_cache.stats()
+        status["short_links"] = get_short_link_store().stats()
         return status
 
     except Exception as e:
@@ -109,13 +109,16 @@ async def shopee_buscar_command(
                     message += f"⭐ Rating: {rating}/5\n"
                     message += f"\n🔗 [Ver Produto]({offer_link})"
 
-                await update.message.reply_text(
-                    message, parse_mode="Markdown", disable_web_page_preview=False
-                )
-
-                import asyncio
+                # Ritmo por chat/global fica a cargo da fila de envio
+                from ..utils.telegram_sender import get_telegram_sender
 
-                await asyncio.sleep(0.7)
+                await get_telegram_sender().send_message(
+                    update.get_bot(),
+                    update.effective_chat.id,
+                    text=message,
+                    parse_mode="Markdown",
+                    disable_web_page_preview=False,
+                )
 
             # Mensagem final diferente
             if is_private:
@@ -17,6 +17,7 @@ from telegram.ext import (
 from ..utils.supabase_client import get_supabase_manager
 from ..utils.link_processor import normalize_link, detect_store
 from ..utils.telegram_settings_manager import telegram_settings
+from ..utils.telegram_sender import get_telegram_sender
 from ..utils.awin_client import AwinAffiliateClient, AwinAPIError
 from ..services.commission_radar_service import CommissionRadarService
 
@@ -329,9 +330,6 @@ Aqui estão os principais comandos para você economizar muito:
                         )
                     except Exception as stats_err:
                         logger.warning(f"Erro ao incrementar status: {stats_err}")
-
-                    import asyncio
-                    await asyncio.sleep(0.5)
             else:
                 emoji = STORE_EMOJIS.get(store, "🏪")
                 await update.message.reply_text(
@@ -420,7 +418,6 @@ Aqui estão os principais comandos para você economizar muito:
                         message = self._format_product_message(product)
                         # allow_mirror=False — resultado fica apenas no privado do usuário
                         await self._send_formatted_product_reply(update, product, message, allow_mirror=False)
-                        await asyncio.sleep(0.5)
 
                     # Botões de refinamento APÓS os resultados
                     keyword_encoded = search_term.replace(" ", "+")
@@ -476,13 +473,11 @@ Aqui estão os principais comandos para você economizar muito:
                     parse_mode="Markdown"
                 )
 
-                import asyncio
                 for node in nodes:
                     product = self._map_shopee_node_to_product(node)
                     message = self._format_product_message(product)
                     # allow_mirror=False — /hoje fica apenas no chat do usuário
                     await self._send_formatted_product_reply(update, product, message, allow_mirror=False)
-                    await asyncio.sleep(0.5)
             else:
                 await update.message.reply_text(
                     "📭 A API não retornou tendências de vendas no momento. Tente /top!"
@@ -755,8 +750,8 @@ Ex: /buscar eletrônicos
         """Handler para /promo — garimpador anti-manopla: exige desconto real, vendas reais e lojas confiáveis."""
         await self._apply_reaction(update, "🤩")
         try:
-            import math
             from ..handlers.shopee_api import create_shopee_client
+            from ..utils.quality_score import rank_by_real_score
 
             client = create_shopee_client()
             msg = await update.message.reply_text("🔎 Garimpando promoção real... isso pode levar alguns segundos.")
@@ -797,13 +792,7 @@ Ex: /buscar eletrônicos
             if valid_nodes:
                 # Score anti-manopla: balança desconto real × volume real
                 # log(sales) penaliza produtos com 1-2 vendas que inflacionaram desconto
-                def real_score(n):
-                    d = float(n.get("priceDiscountRate", 0))
-                    s = int(n.get("sales") or 0)
-                    return d * math.log(s + 1)
-
-                valid_nodes.sort(key=real_score, reverse=True)
-                best = valid_nodes[0]
+                best = rank_by_real_score(valid_nodes, limit=1)[0]
                 product = self._map_shopee_node_to_product(best)
 
                 discount = float(best.get("priceDiscountRate", 0))
@@ -906,11 +895,6 @@ Ex: /buscar eletrônicos
                     await self.supabase.increment_product_stats(
                         product["id"], "telegram_send_count"
                     )
-
-                    # Pequena pausa
-                    import asyncio
-
-                    await asyncio.sleep(0.5)
             else:
                 emoji = STORE_EMOJIS.get(store["name"], "🏪")
                 await update.message.reply_text(
@@ -952,13 +936,11 @@ Ex: /buscar eletrônicos
                     parse_mode="Markdown",
                 )
 
-                import asyncio
                 for idx, node in enumerate(top_nodes, 1):
                     product = self._map_shopee_node_to_product(node)
                     message = f"*#{idx}* - " + self._format_product_message(product)
                     # allow_mirror=False — /top fica apenas no chat do usuário
                     await self._send_formatted_product_reply(update, product, message, allow_mirror=False)
-                    await asyncio.sleep(0.8)
             else:
                 await update.message.reply_text(
                     "😕 O radar da Shopee não retornou ofertas super especiais desta vez."
@@ -1064,9 +1046,6 @@ Configure suas preferências para receber recomendações personalizadas!
                     message = self._format_product_message(product)
                     await self._send_formatted_product_reply(update, product, message)
 
-                    import asyncio
-                    await asyncio.sleep(0.5)
-
                 await update.message.reply_text(
                     "💡 *Dica:* Use /preferencias para ajustar seus interesses e refinar a busca!",
                     parse_mode="Markdown",
@@ -1211,11 +1190,6 @@ Configure suas preferências para receber recomendações personalizadas!
                         product["id"], "telegram_send_count"
                     )
 
-                    # Pequena pausa
-                    import asyncio
-
-                    await asyncio.sleep(0.5)
-
                 await update.message.reply_text(
                     "✨ *Dica:* Use /shopee_sync para atualizar produtos!",
                     parse_mode="Markdown",
@@ -1498,7 +1472,6 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
                         product = self._map_shopee_node_to_product(node)
                         message = self._format_product_message(product)
                         await self._send_formatted_product_reply(update, product, message, allow_mirror=False)
-                        await asyncio.sleep(0.5)
                 else:
                     await msg.edit_text("😕 Nenhum resultado encontrado com este filtro.")
             except Exception as e:
@@ -1535,16 +1508,18 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
         async def send_msg(chat_id, repl_markup=markup):
             try:
                 if image_url:
-                    return await self.application.bot.send_photo(
-                        chat_id=chat_id,
+                    return await get_telegram_sender().send_photo(
+                        self.application.bot,
+                        chat_id,
                         photo=image_url,
                         caption=message,
                         parse_mode="HTML",
                         reply_markup=repl_markup
                     )
                 else:
-                    return await self.application.bot.send_message(
-                        chat_id=chat_id,
+                    return await get_telegram_sender().send_message(
+                        self.application.bot,
+                        chat_id,
                         text=message,
                         parse_mode="HTML",
                         disable_web_page_preview=False,
@@ -1576,16 +1551,18 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
                 async def send_mirror(chat_id, repl_markup=markup):
                     try:
                         if image_url:
-                            return await self.application.bot.send_photo(
-                                chat_id=chat_id,
+                            return await get_telegram_sender().send_photo(
+                                self.application.bot,
+                                chat_id,
                                 photo=image_url,
                                 caption=mirror_message,
                                 parse_mode="HTML",
                                 reply_markup=repl_markup,
                             )
                         else:
-                            return await self.application.bot.send_message(
-                                chat_id=chat_id,
+                            return await get_telegram_sender().send_message(
+                                self.application.bot,
+                                chat_id,
                                 text=mirror_message,
                                 parse_mode="HTML",
                                 disable_web_page_preview=False,
@@ -1679,10 +1656,11 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
             await update.message.reply_text("⛔ Apenas admins podem usar /66.")
             return
 
-        import math
         import html as _html
+        from ..utils.quality_score import rank_by_real_score
         from ..utils.topic_router import get_thread_id
         from ..utils.shopee_client import create_shopee_client  # import correto
+        from ..utils.shopee_extensions import prefetch_in_order
 
         SLOTS_CFG = {
             "midnight":     {"keywords": ["kit desconto", "oferta do dia"],           "topic": "cupons",    "label": "🎆 Meia-noite"},
@@ -1721,43 +1699,52 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
             parse_mode="HTML",
         )
 
-        sent = 0
-        errors = []
-
-        for keyword in slot["keywords"]:
-            try:
-                client = create_shopee_client()
-                async with client:
-                    result = await client.get_products(
-                        keyword=keyword, is_key_seller=True, sort_type=2, limit=20
-                    )
-                    nodes = result.get("nodes", []) if result else []
+        async def _fetch_top2(keyword: str) -> list:
+            """Busca + filtros + short links de uma keyword"""
+            client = create_shopee_client()
+            async with client:
+                result = await client.get_products(
+                    keyword=keyword, is_key_seller=True, sort_type=2, limit=20
+                )
+                nodes = result.get("nodes", []) if result else []
 
-                    # Cascata de filtros
-                    filtered = [n for n in nodes if float(n.get("priceDiscountRate") or 0) >= 15 and float(n.get("ratingStar") or 0) >= 4.3]
-                    if not filtered:
-                        filtered = [n for n in nodes if float(n.get("ratingStar") or 0) >= 4.0]
-                    if not filtered:
-                        filtered = nodes[:3]
+                # Cascata de filtros
+                filtered = [n for n in nodes if float(n.get("priceDiscountRate") or 0) >= 15 and float(n.get("ratingStar") or 0) >= 4.3]
+                if not filtered:
+                    filtered = [n for n in nodes if float(n.get("ratingStar") or 0) >= 4.0]
+                if not filtered:
+                    filtered = nodes[:3]
 
-                    # Fallback keyword genérica
-                    if not filtered:
-                        GENERIC = {"roupas": "vestido feminino", "bijuterias": "brinco feminino",
-                                   "beleza": "kit skincare", "namorados": "presente romantico", "cupons": "kit oferta"}
-                        fb_result = await client.get_products(keyword=GENERIC.get(slot["topic"], "oferta shopee"), sort_type=2, limit=10)
-                        filtered = (fb_result.get("nodes", []) if fb_result else [])[:3]
+                # Fallback keyword genérica
+                if not filtered:
+                    GENERIC = {"roupas": "vestido feminino", "bijuterias": "brinco feminino",
+                               "beleza": "kit skincare", "namorados": "presente romantico", "cupons": "kit oferta"}
+                    fb_result = await client.get_products(keyword=GENERIC.get(slot["topic"], "oferta shopee"), sort_type=2, limit=10)
+                    filtered = (fb_result.get("nodes", []) if fb_result else [])[:3]
 
-                    top2 = sorted(filtered, key=lambda n: float(n.get("priceDiscountRate") or 0) * math.log(max(int(n.get("sales") or 0), 1)), reverse=True)[:2]
+                top2 = rank_by_real_score(filtered, limit=2)
 
+                try:
+                    links = await client.generate_short_links(
+                        [node.get("offerLink") or node.get("productLink", "") for node in top2],
+                        sub_ids=[f"sale66{slot_name}", "admin"],
+                    )
                     for node in top2:
-                        offer_url = node.get("offerLink") or node.get("productLink", "")
-                        if offer_url:
-                            try:
-                                short = await client.generate_short_link(offer_url, sub_ids=[f"sale66{slot_name}", "admin"])
-                                if short:
-                                    node["shortLink"] = short
-                            except Exception:
-                                pass  # link original funciona
+                        short = links.get(node.get("offerLink") or node.get("productLink", ""))
+                        if short:
+                            node["shortLink"] = short
+                except Exception:
+                    pass  # link original funciona
+            return top2
+
+        sent = 0
+        errors = []
+
+        # Keywords buscadas em paralelo; envio na ordem, com pausa entre posts
+        async for keyword, top2, fetch_error in prefetch_in_order(slot["keywords"], _fetch_top2):
+            try:
+                if fetch_error:
+                    raise fetch_error
 
                 for node in top2:
                     name = _html.escape(node.get("productName", "Produto")[:60])
@@ -1783,13 +1770,11 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
                     ]])
 
                     send_kw = dict(
-                        chat_id=channel_id,
                         parse_mode="HTML",
                         reply_markup=keyboard,
                         **( {"message_thread_id": thread_id} if thread_id else {} ),
                     )
                     send_kw_no_thread = dict(
-                        chat_id=channel_id,
                         parse_mode="HTML",
                         reply_markup=keyboard,
                     )
@@ -1798,13 +1783,14 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
 
                     async def _send(kw: dict) -> bool:
                         """Tenta enviar foto, fallback texto. Retorna True se ok."""
+                        sender = get_telegram_sender()
                         if image_url:
                             try:
-                                await bot.send_photo(photo=image_url, caption=caption, **kw)
+                                await sender.send_photo(bot, channel_id, photo=image_url, caption=caption, **kw)
                                 return True
                             except Exception:
                                 pass
-                        await bot.send_message(text=caption, **kw)
+                        await sender.send_message(bot, channel_id, text=caption, **kw)
                         return True
 
                     try:
@@ -1818,7 +1804,6 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
                             raise
 
                     sent += 1
-                    await asyncio.sleep(3)
 
             except Exception as e:
                 err_msg = f"keyword '{keyword}': {type(e).__name__}: {e}"
@@ -1946,28 +1931,34 @@ Clique no link abaixo e veja os <b>ACHADINHOS DE HOJE</b>:
             image_url = product.get("image_url")
 
             send_kwargs = dict(
-                chat_id=chat_id,
                 parse_mode="HTML",
                 reply_markup=markup,
                 **({"message_thread_id": message_thread_id} if message_thread_id else {}),
             )
+            sender = get_telegram_sender()
 
             if image_url:
                 try:
-                    await bot.send_photo(
+                    await sender.send_photo(
+                        bot,
+                        chat_id,
                         photo=image_url,
                         caption=message,
                         **send_kwargs,
                     )
                 except Exception as e:
                     logger.warning(f"[TELEGRAM] Erro no send_photo, fallback texto: {e}")
-                    await bot.send_message(
+                    await sender.send_message(
+                        bot,
+                        chat_id,
                         text=message,
                         disable_web_page_preview=False,
                         **send_kwargs,
                     )
             else:
-                await bot.send_message(
+                await sender.send_message(
+                    bot,
+                    chat_id,
                     text=message,
                     disable_web_page_preview=False,
                     **send_kwargs,
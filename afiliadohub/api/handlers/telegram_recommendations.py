@@ -219,9 +219,12 @@ class TelegramRecommendationEngine:
 
             reply_markup = InlineKeyboardMarkup(keyboard)
 
-            # Envia mensagem
-            await bot.send_message(
-                chat_id=user_id,
+            # Envia mensagem (ritmo por chat/global da fila de envio)
+            from ..utils.telegram_sender import get_telegram_sender
+
+            await get_telegram_sender().send_message(
+                bot,
+                user_id,
                 text=message,
                 parse_mode="HTML",
                 reply_markup=reply_markup,
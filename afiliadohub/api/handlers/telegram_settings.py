@@ -11,6 +11,7 @@ from telegram import Bot
 
 from .auth import get_current_admin
 from ..utils.telegram_settings_manager import telegram_settings
+from ..utils.telegram_sender import get_telegram_sender
 
 router = APIRouter(prefix="/telegram/settings", tags=["telegram-settings"])
 logger = logging.getLogger(__name__)
@@ -154,8 +155,8 @@ async def test_telegram_connection(
             f"Data: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC"
         )
 
-        sent_message = await bot.send_message(
-            chat_id=request.group_chat_id, text=test_message
+        sent_message = await get_telegram_sender().send_message(
+            bot, request.group_chat_id, text=test_message
         )
 
         logger.info(
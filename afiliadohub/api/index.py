@@ -39,9 +39,12 @@ from .handlers.health import router as health_router
 from .handlers.analytics_api import router as analytics_router  # NEW: Analytics API
 from .handlers.awin_api import router as awin_router  # Awin Affiliate LinkBuilder
 from .handlers.cj_api import router as cj_router  # CJ Affiliate API
-from .utils.supabase_client import get_supabase_manager
+from .utils.supabase_client import get_supabase_manager, close_supabase_manager
 from .utils.logger import setup_logger
 from .utils.scheduler import scheduler
+from .utils.http_clients import http_clients
+from .utils.telegram_sender import get_telegram_sender
+from .utils.update_dispatcher import update_dispatcher
 
 # Configuração de logging
 logger = setup_logger()
@@ -65,6 +68,9 @@ async def lifespan(app: FastAPI):
     # 1. Startup
     logger.info("[STARTUP] Iniciando AfiliadoHub API...")
 
+    # Pool HTTP compartilhado pelos clientes de afiliados (Awin, CJ, Shopee, ML)
+    await http_clients.start()
+
     # Inicia Scheduler (apenas se não estiver em ambiente serverless como Vercel)
     if os.getenv("RUN_SCHEDULER", "False").lower() == "true":
         await scheduler.start()
@@ -81,6 +87,9 @@ async def lifespan(app: FastAPI):
         if telegram_app:
             logger.info("[TELEGRAM] Bot inicializado com sucesso via banco de dados")
 
+            # Workers que processam os updates enfileirados pelo webhook
+            await update_dispatcher.start(telegram_app.process_update)
+
             # Configura webhook para produção (Render)
             render_url = os.getenv("RENDER_EXTERNAL_URL")
             if render_url:
@@ -104,7 +113,15 @@ async def lifespan(app: FastAPI):
 
     # 2. Shutdown
     logger.info("[SHUTDOWN] Encerrando servicos...")
+    await update_dispatcher.stop()
     await scheduler.stop()
+    await http_clients.close()
+    # Contadores ainda no buffer (envios/cliques desde o último flush)
+    try:
+        await get_supabase_manager().flush_product_stats()
+    except Exception as e:
+        logger.error(f"[SHUTDOWN] Erro ao gravar estatísticas pendentes: {e}")
+    close_supabase_manager()
 
 
 # Inicialização do FastAPI
@@ -301,7 +318,13 @@ async def telegram_webhook(request: Request):
 
         # Usar o bot do telegram_app
         update = Update.de_json(update_data, telegram_app.bot)
-        await telegram_app.process_update(update)
+
+        # Enfileira e responde na hora; os workers processam em background
+        if not await update_dispatcher.submit(update):
+            logger.warning("[TELEGRAM WEBHOOK] Fila cheia, Telegram vai reenviar")
+            return JSONResponse(
+                status_code=503, content={"ok": False, "error": "Update queue full"}
+            )
 
         return {"ok": True}
     except Exception as e:
@@ -503,8 +526,8 @@ async def send_cron_message(payload: TelegramMessage):
                     return {"status": "skipped", "reason": "bot_not_configured"}
                 bot_instance = app_instance.bot
 
-            await bot_instance.send_message(
-                chat_id=payload.chat_id, text=payload.message
+            await get_telegram_sender().send_message(
+                bot_instance, payload.chat_id, text=payload.message
             )
             return {"status": "sent", "type": "text"}
 
@@ -531,6 +554,32 @@ async def stats_dashboard_endpoint():
     return await get_system_statistics()
 
 
+@app.post("/api/maintenance/analytics_rollups", dependencies=[Depends(verify_cron_token)])
+async def refresh_analytics_rollups_endpoint():
+    """Atualiza os rollups de /api/analytics (lojas sujas + top-N)"""
+    from .repositories.analytics_repository import AnalyticsRepository
+
+    try:
+        repository = AnalyticsRepository(get_supabase_manager().client)
+        return await repository.refresh_rollups()
+    except Exception as e:
+        logger.error(f"[ANALYTICS] Erro ao atualizar rollups: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/maintenance/product_snapshot", dependencies=[Depends(verify_cron_token)])
+async def refresh_product_snapshot_endpoint():
+    """Reconstrói o snapshot em memória de produtos (ex.: logo após uma importação grande)"""
+    from .utils.product_snapshot import product_snapshot
+
+    try:
+        await product_snapshot.refresh()
+        return product_snapshot.stats()
+    except Exception as e:
+        logger.error(f"[ANALYTICS] Erro ao atualizar snapshot de produtos: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/commission/calculate", dependencies=[Depends(verify_admin_token)])
 async def commission_calc(data: dict):
     commission_system = CommissionSystem()
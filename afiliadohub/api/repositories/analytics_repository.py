@@ -5,19 +5,77 @@ Queries otimizadas para métricas de performance e analytics
 
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from supabase import Client
 
+from ..utils.product_snapshot import ProductSnapshot, ProductSnapshotStore, product_snapshot
+
+# Tamanho do ranking guardado em analytics_top_products (migration v4 PART 6)
+TOP_PRODUCTS_ROLLUP_SIZE = 100
+
+TOP_RANK_COLUMNS = {
+    "clicks": "clicks_rank",
+    "telegram_sends": "telegram_sends_rank",
+    "quality_score": "quality_score_rank",
+}
+
+# Métrica de get_top_products -> coluna de products/product_stats
+TOP_ORDER_COLUMNS = {
+    "clicks": "click_count",
+    "telegram_sends": "telegram_send_count",
+    "quality_score": "quality_score",
+}
+
+# Colunas de cada produto do ranking vindo do snapshot
+TOP_PRODUCT_COLUMNS = (
+    "id",
+    "name",
+    "store",
+    "image_url",
+    "affiliate_link",
+    "current_price",
+    "discount_percentage",
+    "quality_score",
+    "click_count",
+    "telegram_send_count",
+)
+
+
+def _store_metrics(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha do rollup por loja -> formato de get_performance_by_store"""
+    product_count = row.get("product_count", 0)
+    total_clicks = row.get("total_clicks", 0)
+    total_sends = row.get("total_telegram_sends", 0)
+    return {
+        "store": row.get("store", "unknown"),
+        "product_count": product_count,
+        "total_clicks": total_clicks,
+        "total_telegram_sends": total_sends,
+        "avg_clicks_per_product": (
+            round(total_clicks / product_count, 2) if product_count else 0
+        ),
+        # CTR = clicks / telegram_sends (estimativa)
+        "ctr": round(total_clicks / total_sends * 100, 2) if total_sends else 0,
+    }
+
 
 class AnalyticsRepository:
     """Repository para queries de analytics e performance"""
 
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, snapshots: Optional[ProductSnapshotStore] = None):
         self.client = client
+        # Snapshot colunar em memória: quando fresco, responde sem ir ao Supabase
+        self.snapshots = snapshots or product_snapshot
 
     async def get_total_clicks(
         self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
     ) -> int:
         """Retorna total de cliques no período"""
+        snapshot = self.snapshots.current()
+        if snapshot is not None:
+            mask = snapshot.window("stats_updated_at", date_from, date_to)
+            return int(snapshot.columns["click_count"][mask].sum())
+
         try:
             query = self.client.table("product_stats").select(
                 "click_count", count="exact"
@@ -51,17 +109,32 @@ class AnalyticsRepository:
         """
         Retorna top N produtos ordenados por métrica
         order_by: 'clicks', 'telegram_sends', 'quality_score'
-        """
-        try:
-            # Mapeia order_by para campo correto
-            order_field_map = {
-                "clicks": "click_count",
-                "telegram_sends": "telegram_send_count",
-                "quality_score": "quality_score",
-            }
 
-            order_field = order_field_map.get(order_by, "click_count")
+        Com o snapshot fresco, ordena em memória. Senão, sem ``date_from``
+        lê a view analytics_top_products (top 100 por métrica, ranking já
+        calculado); com filtro de data ou sem a view, usa a consulta antiga.
+        """
+        snapshot = self.snapshots.current()
+        if snapshot is not None:
+            column = TOP_ORDER_COLUMNS.get(order_by, "click_count")
+            mask = snapshot.mask(active=True, created_from=date_from)
+            return snapshot.rows(snapshot.top(column, limit, mask), TOP_PRODUCT_COLUMNS)
+
+        if date_from is None and limit <= TOP_PRODUCTS_ROLLUP_SIZE:
+            try:
+                rank_column = TOP_RANK_COLUMNS.get(order_by, "clicks_rank")
+                response = (
+                    self.client.table("analytics_top_products")
+                    .select("*")
+                    .lte(rank_column, limit)
+                    .order(rank_column)
+                    .execute()
+                )
+                return response.data or []
+            except Exception as e:
+                print(f"[AVISO] analytics_top_products indisponível, agregando em Python: {e}")
 
+        try:
             # Query produtos com stats usando JOIN
             query = (
                 self.client.table("products")
@@ -105,7 +178,50 @@ class AnalyticsRepository:
             return []
 
     async def get_performance_by_store(self) -> List[Dict[str, Any]]:
-        """Retorna performance agregada por loja"""
+        """Retorna performance agregada por loja (snapshot ou rollup analytics_store_rollup)"""
+        snapshot = self.snapshots.current()
+        if snapshot is not None:
+            return self._store_performance_from_snapshot(snapshot)
+
+        try:
+            response = (
+                self.client.table("analytics_store_rollup")
+                .select(
+                    "store, product_count, total_clicks, total_telegram_sends, "
+                    "quality_score_sum, quality_scored_count"
+                )
+                .order("total_clicks", desc=True)
+                .execute()
+            )
+        except Exception as e:
+            print(f"[AVISO] analytics_store_rollup indisponível, agregando em Python: {e}")
+            return await self._aggregate_performance_by_store()
+
+        return [_store_metrics(row) for row in response.data or []]
+
+    def _store_performance_from_snapshot(
+        self, snapshot: ProductSnapshot
+    ) -> List[Dict[str, Any]]:
+        """Produtos ativos agrupados por loja, direto dos arrays"""
+        groups = snapshot.group_by(
+            "store", ("click_count", "telegram_send_count"), snapshot.mask(active=True)
+        )
+        result = [
+            _store_metrics(
+                {
+                    "store": store,
+                    "product_count": group["count"],
+                    "total_clicks": group["click_count"],
+                    "total_telegram_sends": group["telegram_send_count"],
+                }
+            )
+            for store, group in groups.items()
+        ]
+        result.sort(key=lambda x: x["total_clicks"], reverse=True)
+        return result
+
+    async def _aggregate_performance_by_store(self) -> List[Dict[str, Any]]:
+        """Agregação antiga (todos os produtos ativos + stats, em Python)"""
         try:
             # Busca todos os produtos ativos com stats
             response = (
@@ -175,10 +291,32 @@ class AnalyticsRepository:
 
     async def get_daily_clicks(self, days: int = 30) -> List[Dict[str, Any]]:
         """
-        Retorna série temporal de cliques diários
-        Nota: Requer log de cliques por dia (pode não existir ainda)
-        Fallback: agrupa por updated_at
+        Retorna série temporal de cliques diários (rollup analytics_daily_rollup,
+        1 linha por dia). Sem o rollup, agrupa product_stats por updated_at.
         """
+        date_from = datetime.now() - timedelta(days=days)
+        try:
+            response = (
+                self.client.table("analytics_daily_rollup")
+                .select("day, clicks, telegram_sends")
+                .gte("day", date_from.date().isoformat())
+                .order("day")
+                .execute()
+            )
+            return [
+                {
+                    "date": row["day"],
+                    "clicks": row.get("clicks", 0),
+                    "telegram_sends": row.get("telegram_sends", 0),
+                }
+                for row in response.data or []
+            ]
+        except Exception as e:
+            print(f"[AVISO] analytics_daily_rollup indisponível, agregando em Python: {e}")
+            return await self._aggregate_daily_clicks(days)
+
+    async def _aggregate_daily_clicks(self, days: int) -> List[Dict[str, Any]]:
+        """Agregação antiga por updated_at de product_stats"""
         try:
             date_from = datetime.now() - timedelta(days=days)
 
@@ -219,7 +357,107 @@ class AnalyticsRepository:
             return []
 
     async def get_overview_stats(self, days: int = 30) -> Dict[str, Any]:
-        """Retorna estatísticas gerais para overview do dashboard"""
+        """
+        Retorna estatísticas gerais para overview do dashboard.
+
+        Com o snapshot fresco, tudo sai da memória. Senão, dos rollups (uma
+        linha por loja + uma por dia); sem eles, cai na agregação antiga
+        sobre as tabelas completas.
+        """
+        snapshot = self.snapshots.current()
+        if snapshot is not None:
+            return self._overview_from_snapshot(snapshot, days)
+
+        try:
+            store_rows = (
+                self.client.table("analytics_store_rollup")
+                .select("*")
+                .order("total_clicks", desc=True)
+                .execute()
+            ).data or []
+            daily = await self.get_daily_clicks(days=days)
+            date_from = datetime.now() - timedelta(days=days)
+            if await self._daily_rollup_covers(date_from):
+                total_clicks = sum(day.get("clicks", 0) for day in daily)
+            else:
+                # Rollup mais novo que o período: soma os contadores acumulados
+                total_clicks = await self.get_total_clicks(date_from=date_from)
+        except Exception as e:
+            print(f"[AVISO] Rollups indisponíveis, agregando em Python: {e}")
+            return await self._aggregate_overview_stats(days)
+
+        total_sends = sum(row.get("total_telegram_sends", 0) for row in store_rows)
+        total_all_clicks = sum(row.get("total_clicks", 0) for row in store_rows)
+        quality_sum = sum(row.get("quality_score_sum", 0) for row in store_rows)
+        quality_count = sum(row.get("quality_scored_count", 0) for row in store_rows)
+
+        return {
+            "total_products": sum(row.get("product_count", 0) for row in store_rows),
+            "total_clicks": total_clicks,
+            "avg_ctr": round(
+                total_all_clicks / total_sends * 100 if total_sends > 0 else 0, 2
+            ),
+            "avg_quality_score": round(
+                quality_sum / quality_count if quality_count else 0, 1
+            ),
+            "best_store": store_rows[0]["store"] if store_rows else "N/A",
+            "period_days": days,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    async def _daily_rollup_covers(self, date_from: datetime) -> bool:
+        """
+        analytics_daily_rollup só acumula a partir da migration (o primeiro
+        dia é semeado por ela); períodos que começam antes disso não cabem nele.
+        """
+        response = (
+            self.client.table("analytics_daily_rollup")
+            .select("day")
+            .order("day")
+            .limit(1)
+            .execute()
+        )
+        rows = response.data or []
+        return bool(rows) and str(rows[0]["day"]) <= date_from.date().isoformat()
+
+    def _overview_from_snapshot(self, snapshot: ProductSnapshot, days: int) -> Dict[str, Any]:
+        """Mesmas métricas da agregação antiga, calculadas sobre os arrays"""
+        active = snapshot.mask(active=True)
+        stores = self._store_performance_from_snapshot(snapshot)
+
+        clicks = snapshot.columns["click_count"]
+        date_from = datetime.now() - timedelta(days=days)
+        total_clicks = int(clicks[snapshot.window("stats_updated_at", date_from)].sum())
+
+        total_sends = int(snapshot.columns["telegram_send_count"].sum())
+        avg_ctr = clicks.sum() / total_sends * 100 if total_sends > 0 else 0
+
+        quality = snapshot.columns["quality_score"][active]
+        quality = quality[~np.isnan(quality)]
+        avg_quality = float(quality.mean()) if len(quality) else 0
+
+        return {
+            "total_products": int(active.sum()),
+            "total_clicks": total_clicks,
+            "avg_ctr": round(float(avg_ctr), 2),
+            "avg_quality_score": round(avg_quality, 1),
+            "best_store": stores[0]["store"] if stores else "N/A",
+            "period_days": days,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    async def refresh_rollups(self, refresh_top: bool = True) -> Dict[str, Any]:
+        """
+        Recalcula os rollups das lojas marcadas como sujas pelos triggers
+        (RPC refresh_analytics_rollups) e, se pedido, a view de top-N
+        """
+        response = self.client.rpc(
+            "refresh_analytics_rollups", {"p_refresh_top": refresh_top}
+        ).execute()
+        return response.data or {}
+
+    async def _aggregate_overview_stats(self, days: int) -> Dict[str, Any]:
+        """Overview antigo (varre products e product_stats inteiros)"""
         try:
             date_from = datetime.now() - timedelta(days=days)
 
@@ -237,7 +475,7 @@ class AnalyticsRepository:
             total_clicks = await self.get_total_clicks(date_from=date_from)
 
             # Loja com melhor performance
-            stores = await self.get_performance_by_store()
+            stores = await self._aggregate_performance_by_store()
             best_store = stores[0] if stores else None
 
             # Qualidade média dos produtos
@@ -45,7 +45,10 @@ class BaseRepository(ABC, Generic[T]):
         return result.data[0] if result.data else None
 
     def get_all(
-        self, filters: Optional[Dict[str, Any]] = None, limit: int = 100
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        columns: str = "*",
     ) -> List[T]:
         """
         Get all entities with optional filters.
@@ -53,11 +56,12 @@ class BaseRepository(ABC, Generic[T]):
         Args:
             filters: Dict of column: value filters
             limit: Max results
+            columns: PostgREST select list (projection)
 
         Returns:
             List of entities
         """
-        query = self.client.table(self.table_name).select("*")
+        query = self.client.table(self.table_name).select(columns)
 
         if filters:
             for key, value in filters.items():
@@ -5,7 +5,8 @@ ITIL Activity: Obtain/Build (Product Data Access)
 
 from typing import List, Optional, Dict, Any
 from .base_repository import BaseRepository
-from ..models.domain import Product
+from ..models.domain import Product, ProductFilter
+from ..utils.keyset import apply_keyset, keyset_columns
 
 
 class ProductRepository(BaseRepository[Product]):
@@ -28,17 +29,20 @@ class ProductRepository(BaseRepository[Product]):
         """
         return self.get_all(filters={"store": store}, limit=limit)
 
-    def get_active_products(self, limit: int = 100) -> List[Product]:
+    def get_active_products(
+        self, limit: int = 100, columns: str = "*"
+    ) -> List[Product]:
         """
         Get active products only.
 
         Args:
             limit: Max results
+            columns: PostgREST select list (projection)
 
         Returns:
             List of active products
         """
-        return self.get_all(filters={"active": True}, limit=limit)
+        return self.get_all(filters={"active": True}, limit=limit, columns=columns)
 
     def search_by_name(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -66,6 +70,7 @@ class ProductRepository(BaseRepository[Product]):
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
         limit: int = 100,
+        columns: str = "*",
     ) -> List[Dict[str, Any]]:
         """
         Get products within price range.
@@ -74,11 +79,12 @@ class ProductRepository(BaseRepository[Product]):
             min_price: Minimum price
             max_price: Maximum price
             limit: Max results
+            columns: PostgREST select list (projection)
 
         Returns:
             List of products
         """
-        query = self.client.table(self.table_name).select("*")
+        query = self.client.table(self.table_name).select(columns)
 
         if min_price is not None:
             query = query.gte("current_price", min_price)
@@ -90,7 +96,7 @@ class ProductRepository(BaseRepository[Product]):
         return result.data if result.data else []
 
     def get_by_commission_range(
-        self, min_commission: float, limit: int = 100
+        self, min_commission: float, limit: int = 100, columns: str = "*"
     ) -> List[Dict[str, Any]]:
         """
         Get products with minimum commission rate.
@@ -98,16 +104,58 @@ class ProductRepository(BaseRepository[Product]):
         Args:
             min_commission: Minimum commission %
             limit: Max results
+            columns: PostgREST select list (projection)
 
         Returns:
             List of products
         """
         result = (
             self.client.table(self.table_name)
-            .select("*")
+            .select(columns)
             .gte("commission_rate", min_commission)
             .limit(limit)
             .execute()
         )
 
         return result.data if result.data else []
+
+    def get_page(
+        self,
+        filters: Optional[ProductFilter] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: str = "*",
+    ) -> List[Dict[str, Any]]:
+        """
+        Get one keyset page ordered by (created_at, id) DESC.
+
+        Fetches ``limit + 1`` rows so the caller can tell whether there is a
+        next page (see utils.keyset.paginate).
+
+        Args:
+            filters: Product filters
+            limit: Page size
+            cursor: Opaque cursor from the previous page
+            columns: PostgREST select list (projection)
+
+        Returns:
+            Up to ``limit + 1`` products
+        """
+        query = self.client.table(self.table_name).select(keyset_columns(columns))
+
+        if filters:
+            if filters.store:
+                query = query.eq("store", filters.store)
+            if filters.category:
+                query = query.eq("category", filters.category)
+            if filters.active is not None:
+                query = query.eq("is_active", filters.active)
+            if filters.min_price is not None:
+                query = query.gte("current_price", filters.min_price)
+            if filters.max_price is not None:
+                query = query.lte("current_price", filters.max_price)
+            if filters.min_commission:
+                query = query.gte("commission_rate", filters.min_commission)
+
+        result = apply_keyset(query, cursor).limit(limit + 1).execute()
+        return result.data if result.data else []
@@ -5,7 +5,11 @@ Lógica de negócio para analytics e performance metrics
 
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+
+import numpy as np
+
 from afiliadohub.api.repositories.analytics_repository import AnalyticsRepository
+from afiliadohub.api.utils.quality_score import score_products
 from afiliadohub.api.utils.supabase_client import get_supabase_manager
 
 
@@ -146,59 +150,13 @@ class AnalyticsService:
         """
         Calcula score de qualidade de um produto (0-100)
 
-        Critérios:
+        Critérios (ver utils.quality_score):
         - Rating (0-30 pts)
         - Sales volume (0-30 pts)
         - Commission rate (0-25 pts)
         - Price stability/discount (0-15 pts)
         """
-        score = 0
-
-        # Rating (0-30 pontos)
-        rating = product.get("ratingStar", product.get("rating", 0))
-        if rating > 0:
-            score += int((rating / 5.0) * 30)
-
-        # Sales volume (0-30 pontos)
-        sales = product.get("sales", product.get("sold", 0))
-        if sales >= 1000:
-            score += 30
-        elif sales >= 500:
-            score += 20
-        elif sales >= 100:
-            score += 10
-        elif sales >= 50:
-            score += 5
-
-        # Commission (0-25 pontos)
-        # Assume commissionRate em decimal (0.30 = 30%)
-        commission = product.get("commissionRate", 0)
-        if isinstance(commission, str):
-            # Tenta parsear se vier como string
-            try:
-                commission = float(commission.strip("%")) / 100
-            except:
-                commission = 0
-
-        commission_pct = commission * 100
-        if commission_pct >= 50:
-            score += 25
-        elif commission_pct >= 40:
-            score += 20
-        elif commission_pct >= 30:
-            score += 15
-        elif commission_pct >= 20:
-            score += 10
-
-        # Price stability (0-15 pontos)
-        # Descontos moderados são melhores (mais confiáveis)
-        discount = product.get("discount_percentage", 0)
-        if 10 <= discount <= 50:
-            score += 15
-        elif discount > 50:
-            score += 5  # Desconto muito alto pode ser suspeito
-
-        return min(score, 100)
+        return int(score_products([product])[0])
 
     def should_import_product(
         self, product: Dict[str, Any], min_quality: int = 60
@@ -218,6 +176,21 @@ class AnalyticsService:
 
         return (should_import, quality_score)
 
+    def filter_importable_products(
+        self, products: List[Dict[str, Any]], min_quality: int = 60
+    ) -> List[tuple[Dict[str, Any], int]]:
+        """
+        Versão em lote de should_import_product: pontua a lista de uma vez
+
+        Returns:
+            [(produto, quality_score)] só dos produtos com score >= min_quality
+        """
+        scores = score_products(products)
+        return [
+            (products[i], int(scores[i]))
+            for i in np.flatnonzero(scores >= min_quality).tolist()
+        ]
+
 
 # Singleton instance
 _analytics_service = None
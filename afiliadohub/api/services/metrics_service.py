@@ -7,7 +7,9 @@ from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from ..services.base_service import BaseService
 from ..repositories.product_repository import ProductRepository
+from ..utils.product_snapshot import product_snapshot
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -27,18 +29,29 @@ class MetricsService(BaseService):
             Business metrics including product counts, commission stats
         """
         try:
-            # Product metrics
-            total_products = self.product_repo.count()
-            active_products = self.product_repo.count(filters={"active": True})
-
-            # By store
-            shopee_count = self.product_repo.count(filters={"store": "shopee"})
-            ml_count = self.product_repo.count(filters={"store": "mercado_livre"})
-
-            # High commission products
-            high_commission = self.product_repo.count(
-                filters={"commission_rate__gte": 10.0}
-            )
+            snapshot = product_snapshot.current()
+            if snapshot is not None:
+                # In-memory columnar snapshot: no count queries
+                total_products = len(snapshot)
+                active_products = int(snapshot.columns["is_active"].sum())
+                shopee_count = int(snapshot.mask(store="shopee").sum())
+                ml_count = int(snapshot.mask(store="mercado_livre").sum())
+                high_commission = int(
+                    (np.nan_to_num(snapshot.columns["commission_rate"]) >= 10.0).sum()
+                )
+            else:
+                # Product metrics
+                total_products = self.product_repo.count()
+                active_products = self.product_repo.count(filters={"active": True})
+
+                # By store
+                shopee_count = self.product_repo.count(filters={"store": "shopee"})
+                ml_count = self.product_repo.count(filters={"store": "mercado_livre"})
+
+                # High commission products
+                high_commission = self.product_repo.count(
+                    filters={"commission_rate__gte": 10.0}
+                )
 
             return {
                 "timestamp": datetime.utcnow().isoformat(),
@@ -3,12 +3,13 @@ Product Service
 ITIL Activity: Deliver & Support (Product Business Logic)
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from .base_service import BaseService
 from ..models.domain import Product, ProductCreate, ProductUpdate, ProductFilter
 from ..repositories.product_repository import ProductRepository
 from ..repositories.price_history_repository import PriceHistoryRepository
 from ..services.affiliate_service import AffiliateService
+from ..utils.keyset import decode_cursor, paginate
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,7 +51,10 @@ class ProductService(BaseService[Product]):
             raise
 
     def get_products(
-        self, filters: Optional[ProductFilter] = None, limit: int = 100
+        self,
+        filters: Optional[ProductFilter] = None,
+        limit: int = 100,
+        columns: str = "*",
     ) -> List[Dict[str, Any]]:
         """
         Get products with filters and business logic.
@@ -58,21 +62,54 @@ class ProductService(BaseService[Product]):
         Args:
             filters: Product filters
             limit: Max results
+            columns: PostgREST select list (see utils.field_sets)
 
         Returns:
             List of products
         """
         try:
             if filters:
-                products = self._apply_filters(filters, limit)
+                products = self._apply_filters(filters, limit, columns)
             else:
-                products = self.repository.get_active_products(limit)
+                products = self.repository.get_active_products(limit, columns=columns)
 
             return [self._enrich_product(p) for p in products]
         except Exception as e:
             logger.error(f"Error getting products: {e}")
             raise
 
+    def get_products_page(
+        self,
+        filters: Optional[ProductFilter] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: str = "*",
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of products using keyset pagination.
+
+        Args:
+            filters: Product filters
+            limit: Page size
+            cursor: Opaque cursor from the previous page
+            columns: PostgREST select list (see utils.field_sets)
+
+        Returns:
+            (products, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        if cursor:
+            decode_cursor(cursor)
+        try:
+            rows = self.repository.get_page(filters, limit, cursor, columns)
+            products, next_cursor = paginate(rows, limit)
+            return [self._enrich_product(p) for p in products], next_cursor
+        except Exception as e:
+            logger.error(f"Error getting products page: {e}")
+            raise
+
     def create_product(self, product_data: ProductCreate) -> Dict[str, Any]:
         """
         Create new product with validation.
@@ -166,7 +203,9 @@ class ProductService(BaseService[Product]):
             logger.error(f"Error searching products: {e}")
             raise
 
-    def _apply_filters(self, filters: ProductFilter, limit: int) -> List:
+    def _apply_filters(
+        self, filters: ProductFilter, limit: int, columns: str = "*"
+    ) -> List:
         """Apply filters to product query"""
         filter_dict = {}
 
@@ -182,16 +221,16 @@ class ProductService(BaseService[Product]):
         # Price range filter
         if filters.min_price or filters.max_price:
             return self.repository.get_by_price_range(
-                filters.min_price, filters.max_price, limit
+                filters.min_price, filters.max_price, limit, columns=columns
             )
 
         # Commission filter
         if filters.min_commission:
             return self.repository.get_by_commission_range(
-                filters.min_commission, limit
+                filters.min_commission, limit, columns=columns
             )
 
-        return self.repository.get_all(filter_dict, limit)
+        return self.repository.get_all(filter_dict, limit, columns=columns)
 
     def _validate_product_data(self, data: dict) -> bool:
         """Validate product data"""
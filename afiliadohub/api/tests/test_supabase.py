@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
+from postgrest.exceptions import APIError
 from afiliadohub.api.utils.supabase_client import SupabaseManager
 
 @pytest.fixture
@@ -47,3 +48,209 @@ async def test_get_system_summary_optimized(mock_supabase_env):
         assert summary["products_with_discount"] == 50
         assert summary["telegram_sends"] == 500
         assert summary["stores"]["shopee"] == 10
+
+@pytest.mark.asyncio
+async def test_execute_runs_off_event_loop(mock_supabase_env):
+    import threading
+
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        loop_thread = threading.get_ident()
+        query = MagicMock()
+        query.execute.side_effect = lambda: threading.get_ident()
+
+        worker_thread = await manager.execute(query)
+
+        assert worker_thread != loop_thread
+        query.execute.assert_called_once()
+
+
+def _fake_jwt(exp):
+    import base64
+    import json
+
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode()
+    return f"header.{payload.rstrip('=')}.signature"
+
+
+def test_authenticated_client_is_cached_per_token(mock_supabase_env):
+    import time
+
+    with patch("afiliadohub.api.utils.supabase_client.create_client") as mock_create:
+        mock_create.side_effect = lambda *args, **kwargs: MagicMock()
+        manager = SupabaseManager()
+        manager._auth_clients.clear()
+        before = manager.pool_stats()["auth_clients"]
+
+        token_a = _fake_jwt(time.time() + 3600)
+        token_b = _fake_jwt(time.time() + 7200)
+
+        client_a = manager.get_authenticated_client(token_a)
+        assert manager.get_authenticated_client(token_a) is client_a
+        assert manager.get_authenticated_client(token_b) is not client_a
+        client_a.postgrest.auth.assert_called_once_with(token_a)
+
+        after = manager.pool_stats()["auth_clients"]
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 2
+        assert after["size"] == 2
+
+
+def test_authenticated_client_expires_with_jwt(mock_supabase_env):
+    import time
+
+    with patch("afiliadohub.api.utils.supabase_client.create_client") as mock_create:
+        mock_create.side_effect = lambda *args, **kwargs: MagicMock()
+        manager = SupabaseManager()
+        expired_token = _fake_jwt(time.time() - 10)
+
+        first = manager.get_authenticated_client(expired_token)
+        assert manager.get_authenticated_client(expired_token) is not first
+
+
+@pytest.mark.parametrize("token", [None, ""])
+def test_authenticated_client_requires_token(mock_supabase_env, token):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        with pytest.raises(ValueError):
+            manager.get_authenticated_client(token)
+
+
+@pytest.mark.asyncio
+async def test_products_for_telegram_selected_server_side(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        mock_client = MagicMock()
+        rows = [{"id": 1, "last_sent": None, "send_count": 0}]
+        mock_client.rpc.return_value.execute.return_value = MagicMock(data=rows)
+
+        with patch.object(manager, "_client", mock_client):
+            selected = await manager.get_products_for_telegram(limit=1, min_discount=10)
+
+        assert selected == rows
+        mock_client.rpc.assert_called_once_with(
+            "get_products_for_telegram", {"p_limit": 1, "p_min_discount": 10}
+        )
+        mock_client.table.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_products_for_telegram_falls_back_without_rpc(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute.side_effect = APIError(
+            {"code": "PGRST202", "message": "Could not find the function"}
+        )
+        candidates = [
+            {"id": 1, "discount_percentage": 10, "product_stats": [{"last_sent": "2024-01-01T00:00:00Z"}]},
+            {"id": 2, "discount_percentage": 5, "product_stats": []},
+        ]
+        query = mock_client.table.return_value.select.return_value.eq.return_value.not_.is_.return_value
+        query.limit.return_value.execute.return_value = MagicMock(data=candidates)
+
+        with patch.object(manager, "_client", mock_client):
+            selected = await manager.get_products_for_telegram(limit=1)
+
+        assert [p["id"] for p in selected] == [2]
+
+
+@pytest.mark.asyncio
+async def test_products_for_telegram_rpc_error_does_not_fall_back(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute.side_effect = APIError(
+            {"code": "57014", "message": "canceling statement due to statement timeout"}
+        )
+
+        with patch.object(manager, "_client", mock_client):
+            selected = await manager.get_products_for_telegram(limit=1)
+
+        assert selected == []
+        mock_client.table.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_random_product_uses_indexed_rpc(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute.return_value = MagicMock(data=[{"id": 7}])
+
+        with patch.object(manager, "_client", mock_client):
+            product = await manager.get_random_product(store="shopee", min_discount=20)
+
+        assert product == {"id": 7}
+        mock_client.rpc.assert_called_once_with(
+            "get_random_product_fast", {"p_store": "shopee", "p_min_discount": 20}
+        )
+
+
+@pytest.mark.asyncio
+async def test_random_product_falls_back_to_random_offset(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute.side_effect = Exception("function not found")
+        query = mock_client.table.return_value.select.return_value.eq.return_value
+        query.limit.return_value.execute.return_value = MagicMock(data=[], count=50)
+        query.range.return_value.execute.return_value = MagicMock(data=[{"id": 3}])
+
+        with patch.object(manager, "_client", mock_client), patch(
+            "random.randrange", return_value=42
+        ):
+            product = await manager.get_random_product()
+
+        assert product == {"id": 3}
+        query.range.assert_called_once_with(42, 42)
+
+
+@pytest.mark.parametrize("h2_installed", [True, False])
+def test_pool_stats_reports_http2_availability(mock_supabase_env, h2_installed):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        manager.close()
+        spec = MagicMock() if h2_installed else None
+        with patch("importlib.util.find_spec", return_value=spec), patch("httpx.Client"):
+            options = manager._build_client_options()
+        try:
+            if options is None:
+                pytest.skip("supabase sem SyncClientOptions(httpx_client)")
+            assert manager.pool_stats()["http2_available"] is h2_installed
+        finally:
+            manager.close()
+
+
+@pytest.mark.asyncio
+async def test_upsert_changed_products_falls_back_only_without_rpc(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        client = MagicMock()
+        client.rpc.return_value.execute.side_effect = APIError(
+            {"code": "PGRST202", "message": "Could not find the function"}
+        )
+        client.table.return_value.upsert.return_value.execute.return_value = MagicMock(
+            data=[{"id": 1}]
+        )
+        with patch.object(manager, "_client", client):
+            result = await manager.upsert_changed_products(
+                [{"name": "x", "affiliate_link": "l", "content_hash": "abc"}]
+            )
+
+        assert result["inserted"] == 1
+        (rows,), _ = client.table.return_value.upsert.call_args
+        assert "content_hash" not in rows[0]
+
+
+@pytest.mark.asyncio
+async def test_upsert_changed_products_reraises_other_errors(mock_supabase_env):
+    with patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        client = MagicMock()
+        client.rpc.return_value.execute.side_effect = TimeoutError("statement timeout")
+        with patch.object(manager, "_client", client):
+            with pytest.raises(TimeoutError):
+                await manager.upsert_changed_products([{"name": "x", "content_hash": "abc"}])
+
+        client.table.return_value.upsert.assert_not_called()
@@ -0,0 +1,240 @@
+"""
+Unit tests for AnalyticsRepository rollup reads
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: store/daily/top-N rollups, overview from rollups, answers from a
+fresh product snapshot and fallbacks to the legacy Python aggregation.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from afiliadohub.api.repositories.analytics_repository import AnalyticsRepository
+from afiliadohub.api.utils.product_snapshot import ProductSnapshot, ProductSnapshotStore, _flatten
+
+STORE_ROWS = [
+    {
+        "store": "shopee",
+        "product_count": 4,
+        "total_clicks": 30,
+        "total_telegram_sends": 60,
+        "quality_score_sum": 280,
+        "quality_scored_count": 4,
+    },
+    {
+        "store": "amazon",
+        "product_count": 2,
+        "total_clicks": 10,
+        "total_telegram_sends": 0,
+        "quality_score_sum": 100,
+        "quality_scored_count": 2,
+    },
+]
+
+
+def _client_with_tables(tables):
+    """Client falso: cada tabela devolve ``tables[name]`` (ou levanta)"""
+    client = MagicMock()
+
+    def table(name):
+        query = MagicMock()
+        for method in ("select", "order", "gte", "lte", "eq", "limit"):
+            getattr(query, method).return_value = query
+        result = tables[name]
+        if isinstance(result, Exception):
+            query.execute.side_effect = result
+        else:
+            query.execute.return_value = MagicMock(data=result)
+        return query
+
+    client.table.side_effect = table
+    return client
+
+
+class TestAnalyticsRollups:
+    """Test suite for AnalyticsRepository rollups"""
+
+    @pytest.mark.asyncio
+    async def test_store_performance_from_rollup(self):
+        repository = AnalyticsRepository(
+            _client_with_tables({"analytics_store_rollup": STORE_ROWS})
+        )
+
+        stores = await repository.get_performance_by_store()
+
+        assert stores[0] == {
+            "store": "shopee",
+            "product_count": 4,
+            "total_clicks": 30,
+            "total_telegram_sends": 60,
+            "avg_clicks_per_product": 7.5,
+            "ctr": 50.0,
+        }
+        assert stores[1]["ctr"] == 0
+
+    @pytest.mark.asyncio
+    async def test_store_performance_falls_back_without_rollup(self):
+        repository = AnalyticsRepository(
+            _client_with_tables(
+                {
+                    "analytics_store_rollup": Exception("relation does not exist"),
+                    "products": [
+                        {"store": "shopee", "product_stats": [{"click_count": 3, "telegram_send_count": 6}]},
+                        {"store": "shopee", "product_stats": []},
+                    ],
+                }
+            )
+        )
+
+        stores = await repository.get_performance_by_store()
+
+        assert stores[0]["product_count"] == 2
+        assert stores[0]["total_clicks"] == 3
+
+    @pytest.mark.asyncio
+    async def test_daily_clicks_from_rollup(self):
+        repository = AnalyticsRepository(
+            _client_with_tables(
+                {"analytics_daily_rollup": [{"day": "2024-05-01", "clicks": 7, "telegram_sends": 2}]}
+            )
+        )
+
+        assert await repository.get_daily_clicks(days=7) == [
+            {"date": "2024-05-01", "clicks": 7, "telegram_sends": 2}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_top_products_reads_ranked_view(self):
+        client = _client_with_tables({"analytics_top_products": [{"id": 1, "clicks_rank": 1}]})
+        repository = AnalyticsRepository(client)
+
+        products = await repository.get_top_products(limit=5, order_by="telegram_sends")
+
+        assert products == [{"id": 1, "clicks_rank": 1}]
+        client.table.assert_called_once_with("analytics_top_products")
+
+    @pytest.mark.asyncio
+    async def test_overview_from_rollups(self):
+        repository = AnalyticsRepository(
+            _client_with_tables(
+                {
+                    "analytics_store_rollup": STORE_ROWS,
+                    "analytics_daily_rollup": [
+                        {"day": "2024-05-01", "clicks": 5, "telegram_sends": 1},
+                        {"day": "2024-05-02", "clicks": 4, "telegram_sends": 1},
+                    ],
+                }
+            )
+        )
+
+        overview = await repository.get_overview_stats(days=30)
+
+        assert overview["total_products"] == 6
+        assert overview["total_clicks"] == 9
+        assert overview["avg_ctr"] == round(40 / 60 * 100, 2)
+        assert overview["avg_quality_score"] == 63.3
+        assert overview["best_store"] == "shopee"
+
+    @pytest.mark.asyncio
+    async def test_overview_before_rollup_covers_period_uses_product_stats(self):
+        """Right after deploy the daily rollup is younger than the period"""
+        today = datetime.now().date().isoformat()
+        repository = AnalyticsRepository(
+            _client_with_tables(
+                {
+                    "analytics_store_rollup": STORE_ROWS,
+                    "analytics_daily_rollup": [
+                        {"day": today, "clicks": 1, "telegram_sends": 0},
+                    ],
+                    "product_stats": [{"click_count": 25}, {"click_count": 15}],
+                }
+            )
+        )
+
+        overview = await repository.get_overview_stats(days=30)
+
+        assert overview["total_clicks"] == 40
+
+    @pytest.mark.asyncio
+    async def test_refresh_rollups_calls_rpc(self):
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value = MagicMock(data={"stores": 2})
+
+        result = await AnalyticsRepository(client).refresh_rollups()
+
+        assert result == {"stores": 2}
+        client.rpc.assert_called_once_with(
+            "refresh_analytics_rollups", {"p_refresh_top": True}
+        )
+
+
+class TestAnalyticsSnapshot:
+    """Test suite for AnalyticsRepository answers from the product snapshot"""
+
+    @pytest.fixture
+    def repository(self):
+        rows = [
+            {"id": 1, "name": "A", "store": "shopee", "quality_score": 80, "is_active": True,
+             "created_at": "2024-05-01T00:00:00Z",
+             "product_stats": {"click_count": 30, "telegram_send_count": 60,
+                               "updated_at": datetime.now().isoformat()}},
+            {"id": 2, "name": "B", "store": "amazon", "quality_score": None, "is_active": True,
+             "created_at": "2024-01-01T00:00:00Z",
+             "product_stats": {"click_count": 10, "telegram_send_count": 0,
+                               "updated_at": "2020-01-01T00:00:00Z"}},
+            {"id": 3, "name": "C", "store": "shopee", "quality_score": 90, "is_active": False,
+             "created_at": "2024-05-02T00:00:00Z", "product_stats": None},
+        ]
+        snapshots = ProductSnapshotStore(max_age=60)
+        snapshots._snapshot = ProductSnapshot.from_rows(_flatten(row) for row in rows)
+        client = MagicMock()
+        return AnalyticsRepository(client, snapshots=snapshots), client
+
+    @pytest.mark.asyncio
+    async def test_store_performance_without_queries(self, repository):
+        repository, client = repository
+
+        stores = await repository.get_performance_by_store()
+
+        assert [s["store"] for s in stores] == ["shopee", "amazon"]
+        assert stores[0]["product_count"] == 1 and stores[0]["ctr"] == 50.0
+        client.table.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_top_products_from_snapshot(self, repository):
+        repository, client = repository
+
+        top = await repository.get_top_products(limit=5, order_by="clicks")
+        recent = await repository.get_top_products(
+            limit=5, order_by="clicks", date_from=datetime(2024, 4, 1)
+        )
+
+        assert [p["id"] for p in top] == [1, 2]
+        assert top[0]["click_count"] == 30 and top[0]["store"] == "shopee"
+        assert [p["id"] for p in recent] == [1]
+        client.table.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_overview_from_snapshot(self, repository):
+        repository, client = repository
+
+        overview = await repository.get_overview_stats(days=30)
+
+        assert overview["total_products"] == 2
+        assert overview["total_clicks"] == 30
+        assert overview["avg_ctr"] == round(40 / 60 * 100, 2)
+        assert overview["avg_quality_score"] == 80.0
+        assert overview["best_store"] == "shopee"
+        client.table.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_falls_back_to_rollups(self, repository):
+        repository, _ = repository
+        repository.snapshots._snapshot.built_at -= 120
+        repository.client = _client_with_tables({"analytics_store_rollup": STORE_ROWS})
+
+        stores = await repository.get_performance_by_store()
+
+        assert stores[0]["total_clicks"] == 30
+        repository.client.table.assert_called_once_with("analytics_store_rollup")
@@ -0,0 +1,90 @@
+"""
+Unit tests for CSVImporter vectorized parsing
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: resolve_csv_columns, _parse_chunk (BR prices, discounts, aliases, skips,
+content hashes)
+"""
+
+import io
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+# handlers/products.py resolve o client do Supabase no import do pacote
+with patch("afiliadohub.api.utils.supabase_client.SupabaseManager"):
+    from afiliadohub.api.handlers.csv_import import CSVImporter, resolve_csv_columns
+
+
+CSV = """Product Name,merchant_name,search_price,Price,url,image_url,merchant_category,discount
+Foo,Loja A,"R$ 1.234,56",10,http://a,http://img,Cat,15%
+Bar,,,"12,5",http://b,,,7.9
+,Loja C,1,1,http://c,,,
+Baz,LOJA D,abc,3,,,X,
+Qux,E,,4,http://e,,,abc%
+"""
+
+
+@pytest.fixture
+def importer():
+    # Sem __init__: não toca no banco
+    return CSVImporter.__new__(CSVImporter)
+
+
+@pytest.fixture
+def chunk():
+    return pd.read_csv(io.StringIO(CSV))
+
+
+class TestCSVImporterParsing:
+    """Test suite for the chunk parser"""
+
+    def test_resolve_columns_keeps_alias_priority(self, chunk):
+        """search_price must win over Price when both exist"""
+        columns = resolve_csv_columns(chunk.columns)
+        assert columns["price"] == ["search_price", "Price"]
+        assert columns["name"] == ["Product Name"]
+        assert columns["discount"] == ["discount"]
+
+    def test_parse_chunk_maps_rows(self, importer, chunk):
+        """Rows without name or link are skipped, the rest are mapped"""
+        products = importer._parse_chunk(chunk, "shopee")
+
+        assert [p["name"] for p in products] == ["Foo", "Bar", "Qux"]
+        assert isinstance(products[0].pop("content_hash"), int)
+        assert products[0] == {
+            "name": "Foo",
+            "store": "loja a",
+            "current_price": 1234.56,
+            "affiliate_link": "http://a",
+            "image_url": "http://img",
+            "category": "Cat",
+            "discount_percentage": 15,
+            "is_active": True,
+        }
+
+    def test_parse_chunk_fallbacks(self, importer, chunk):
+        """Missing store/category/image fall back; next price alias is used"""
+        bar = importer._parse_chunk(chunk, "shopee")[1]
+        assert bar["store"] == "shopee"
+        assert bar["current_price"] == 12.5
+        assert bar["discount_percentage"] == 7
+        assert bar["category"] == "Geral"
+        assert bar["image_url"] is None
+
+    def test_unparseable_values_become_zero(self, importer, chunk):
+        """Invalid discount strings become 0 instead of dropping the row"""
+        qux = importer._parse_chunk(chunk, "shopee")[2]
+        assert qux["current_price"] == 4.0
+        assert qux["discount_percentage"] == 0
+
+    def test_content_hash_tracks_row_changes(self, importer, chunk):
+        """Same row -> same hash across runs; a price change alters only that row"""
+        before = [p["content_hash"] for p in importer._parse_chunk(chunk, "shopee")]
+        assert before == [p["content_hash"] for p in importer._parse_chunk(chunk, "shopee")]
+
+        changed = chunk.copy()
+        changed.loc[1, "Price"] = "13,5"
+        after = [p["content_hash"] for p in importer._parse_chunk(changed, "shopee")]
+        assert [a == b for a, b in zip(before, after)] == [True, False, True]
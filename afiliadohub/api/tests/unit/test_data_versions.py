@@ -0,0 +1,102 @@
+"""
+Unit tests for the data version counters behind the report cache
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: bump/current, invalid domains, cache keys changing after a bump and
+the SupabaseManager writes (product upsert, stats flush) that bump them.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from afiliadohub.api.utils.data_versions import DataVersions, data_versions
+from afiliadohub.api.utils.response_cache import ResponseCache
+from afiliadohub.api.utils.supabase_client import SupabaseManager
+
+
+@pytest.fixture
+def manager():
+    with patch.dict(
+        "os.environ", {"SUPABASE_URL": "http://test.url", "SUPABASE_KEY": "test-key"}
+    ), patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        client = MagicMock()
+        with patch.object(manager, "_client", client):
+            yield manager, client
+
+
+class TestDataVersions:
+    """Test suite for DataVersions"""
+
+    def test_bump_only_touches_given_domains(self):
+        versions = DataVersions()
+        versions.bump("stats")
+        versions.bump("stats", "commissions")
+        assert versions.current("products", "stats", "commissions") == (0, 2, 1)
+        assert versions.stats() == {"products": 0, "stats": 2, "commissions": 1}
+
+    def test_current_without_domains_returns_all(self):
+        versions = DataVersions()
+        versions.bump("products")
+        assert versions.current() == (1, 0, 0)
+
+    def test_unknown_domain_is_rejected(self):
+        with pytest.raises(ValueError):
+            DataVersions().bump("orders")
+
+    async def test_bump_changes_the_cache_key(self):
+        """A write between two reads makes the second one recompute"""
+        versions = DataVersions()
+        cache = ResponseCache("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        def read():
+            key = ("sales_funnel", (30,), versions.current("products", "stats"))
+            return cache.get_or_fetch(key, fetch, ttl=60)
+
+        assert await read() == 1
+        assert await read() == 1
+        versions.bump("stats")
+        assert await read() == 2
+        assert len(calls) == 2
+
+
+class TestSupabaseManagerBumps:
+    """Test suite for version bumps on SupabaseManager writes"""
+
+    async def test_stats_flush_bumps_stats(self, manager):
+        manager, client = manager
+        client.rpc.return_value.execute.return_value = MagicMock(data=3)
+        before = data_versions.current("products", "stats")
+
+        written = await manager.bulk_increment_product_stats(
+            [{"product_id": 1, "view_count": 1, "click_count": 0, "telegram_send_count": 0}]
+        )
+
+        assert written == 3
+        products, stats = data_versions.current("products", "stats")
+        assert (products, stats) == (before[0], before[1] + 1)
+
+    async def test_upsert_without_changes_keeps_version(self, manager):
+        manager, client = manager
+        client.rpc.return_value.execute.return_value = MagicMock(data=0)
+        before = data_versions.current("products")
+
+        result = await manager.upsert_changed_products([{"name": "x"}])
+
+        assert result["skipped"] == 1
+        assert data_versions.current("products") == before
+
+    async def test_upsert_with_changes_bumps_products(self, manager):
+        manager, client = manager
+        client.rpc.return_value.execute.return_value = MagicMock(data=2)
+        before = data_versions.current("products")
+
+        await manager.upsert_changed_products([{"name": "x"}, {"name": "y"}])
+
+        assert data_versions.current("products") == (before[0] + 1,)
@@ -0,0 +1,90 @@
+"""
+Unit tests for FeedManager conditional refresh bookkeeping
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: HTTP validators saved only after a complete import, None validators
+skipped, missing etag/last_modified columns tolerated
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from postgrest.exceptions import APIError
+
+with patch("afiliadohub.api.utils.supabase_client.SupabaseManager"):
+    from afiliadohub.api.utils import feed_manager as feed_manager_module
+    from afiliadohub.api.utils.feed_manager import FeedManager
+
+FEED = {"id": 7, "name": "Awin", "url": "http://feed", "store_id": None}
+COMPLETE = {"errors": 0, "parse_errors": 0}
+
+
+def _manager(update_side_effect=None):
+    manager = FeedManager.__new__(FeedManager)
+    manager.supabase = MagicMock()
+    table = manager.supabase.client.table.return_value
+    if update_side_effect is not None:
+        table.update.return_value.eq.return_value.execute.side_effect = update_side_effect
+    return manager, table
+
+
+async def _run(manager, stats, validators):
+    @asynccontextmanager
+    async def fake_stream(url, **kwargs):
+        yield b"", None, validators
+
+    importer = MagicMock()
+
+    async def process_csv_upload(**kwargs):
+        return stats
+
+    importer.process_csv_upload = process_csv_upload
+    with patch.object(feed_manager_module, "open_feed_stream", fake_stream), patch.object(
+        feed_manager_module, "CSVImporter", return_value=importer
+    ):
+        await manager._process_single_feed(FEED)
+
+
+def _final_update(table):
+    return table.update.call_args_list[-1].args[0]
+
+
+class TestFeedValidators:
+    """Test suite for FeedManager._process_single_feed validators"""
+
+    async def test_complete_import_saves_non_null_validators(self):
+        manager, table = _manager()
+        await _run(manager, COMPLETE, {"etag": '"abc"', "last_modified": None})
+
+        final = _final_update(table)
+        assert final["status"] == "success"
+        assert final["etag"] == '"abc"'
+        assert "last_modified" not in final
+
+    @pytest.mark.parametrize(
+        "stats", [{"errors": 2, "parse_errors": 0}, {"errors": 0, "parse_errors": 500}]
+    )
+    async def test_partial_import_keeps_old_validators(self, stats):
+        manager, table = _manager()
+        await _run(manager, stats, {"etag": '"abc"', "last_modified": "Mon"})
+
+        final = _final_update(table)
+        assert final["status"] == "success"
+        assert "etag" not in final and "last_modified" not in final
+
+    async def test_missing_columns_do_not_fail_the_feed(self):
+        missing = APIError({"code": "PGRST204", "message": "Could not find the 'etag' column"})
+        manager, table = _manager([None, missing, None])
+        await _run(manager, COMPLETE, {"etag": '"abc"', "last_modified": None})
+
+        final = _final_update(table)
+        assert final["status"] == "success"
+        assert "etag" not in final
+
+    async def test_other_update_errors_mark_the_feed_failed(self):
+        timeout = APIError({"code": "57014", "message": "canceling statement due to timeout"})
+        manager, table = _manager([None, timeout, None])
+        await _run(manager, COMPLETE, {"etag": '"abc"', "last_modified": None})
+
+        assert _final_update(table)["status"].startswith("failed")
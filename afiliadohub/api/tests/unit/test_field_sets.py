@@ -0,0 +1,64 @@
+"""
+Unit tests for product field sets (column projections)
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: named sets, ad-hoc column lists, validation and repository wiring.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from afiliadohub.api.utils.field_sets import (
+    CARD_FIELDS,
+    PRODUCT_FIELD_SETS,
+    product_select,
+)
+from afiliadohub.api.repositories.product_repository import ProductRepository
+
+
+class TestProductSelect:
+    """Test suite for product_select"""
+
+    def test_named_sets(self):
+        assert product_select("card") == ",".join(CARD_FIELDS)
+        assert product_select("admin") == "*"
+        assert "description" in product_select("detail").split(",")
+        assert "description" not in product_select("card").split(",")
+
+    def test_default_when_empty(self):
+        assert product_select(None) == product_select("card")
+        assert product_select("", default="admin") == "*"
+
+    def test_card_has_what_bot_formatter_reads(self):
+        for column in ("id", "name", "store", "current_price", "affiliate_link", "image_url"):
+            assert column in CARD_FIELDS
+
+    def test_column_list_always_includes_id(self):
+        assert product_select("name, current_price") == "id,name,current_price"
+        assert product_select("id,name,name") == "id,name"
+
+    @pytest.mark.parametrize("fields", ["secret_column", "name,password", ",", "card;drop"])
+    def test_rejects_unknown(self, fields):
+        with pytest.raises(ValueError):
+            product_select(fields)
+
+    def test_every_set_is_selectable(self):
+        for name in PRODUCT_FIELD_SETS:
+            assert product_select(name)
+
+
+class TestRepositoryProjection:
+    """Test suite for column projection in repositories"""
+
+    def test_get_all_passes_columns_to_select(self):
+        client = MagicMock()
+        client.table.return_value.select.return_value.limit.return_value.execute.return_value.data = []
+
+        ProductRepository(client).get_all(limit=10, columns=product_select("card"))
+
+        client.table.return_value.select.assert_called_once_with(",".join(CARD_FIELDS))
+
+    def test_get_all_defaults_to_all_columns(self):
+        client = MagicMock()
+        ProductRepository(client).get_all(limit=10)
+        client.table.return_value.select.assert_called_once_with("*")
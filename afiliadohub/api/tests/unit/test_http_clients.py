@@ -0,0 +1,69 @@
+"""
+Unit tests for the shared HTTP client registry
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: connection reuse stats (aiohttp + httpx), borrow helpers, close
+"""
+
+import pytest
+from aiohttp import web
+
+from afiliadohub.api.utils.http_clients import (
+    HTTPClientRegistry,
+    borrow_http_session,
+    http_clients,
+)
+
+
+@pytest.fixture
+async def server():
+    async def handler(request):
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/"
+    await runner.cleanup()
+
+
+class TestHTTPClientRegistry:
+    """Test suite for HTTPClientRegistry"""
+
+    async def test_aiohttp_connections_are_reused(self, server):
+        """Sequential requests share one keep-alive connection"""
+        registry = HTTPClientRegistry()
+        await registry.start()
+        for _ in range(4):
+            async with registry.session.get(server) as resp:
+                await resp.text()
+
+        host = registry.stats()["hosts"]["127.0.0.1"]
+        assert host["requests"] == 4
+        assert host["new_connections"] == 1
+        assert host["reuse_ratio"] == 0.75
+        assert host["open_connections"] == 1
+        await registry.close()
+
+    async def test_httpx_connections_are_reused(self, server):
+        """The httpx client reports reuse through the network stream"""
+        registry = HTTPClientRegistry()
+        for _ in range(3):
+            await registry.httpx_client.get(server)
+
+        stats = registry.stats()
+        assert stats["hosts"]["127.0.0.1"]["new_connections"] == 1
+        assert stats["reuse_ratio"] == pytest.approx(0.667)
+        await registry.close()
+
+    async def test_borrowed_session_survives_context(self, server):
+        """borrow_http_session never closes the shared session"""
+        async with borrow_http_session() as session:
+            async with session.get(server) as resp:
+                assert resp.status == 200
+        assert not http_clients.session.closed
+        await http_clients.close()
@@ -0,0 +1,91 @@
+"""
+Unit tests for ImportPipeline (producer/consumer CSV import)
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: batching, concurrent writers, backpressure, write/parse errors, parse in a
+separate (non-fork) process
+"""
+
+import asyncio
+
+import pytest
+
+from afiliadohub.api.utils.import_pipeline import ImportPipeline, _process_context
+
+
+def _parse(chunk, prefix):
+    if chunk == "bad":
+        raise ValueError("chunk inválido")
+    return [{"name": f"{prefix}{i}"} for i in chunk]
+
+
+@pytest.mark.asyncio
+class TestImportPipeline:
+    """Test suite for the import pipeline"""
+
+    async def test_splits_chunks_into_batches(self):
+        """Every parsed record is written exactly once, in batch_size lots"""
+        written = []
+
+        async def write(batch):
+            written.append(len(batch))
+            return {"inserted": len(batch), "errors": 0}
+
+        pipeline = ImportPipeline(write, batch_size=2, concurrency=3)
+        stats = await pipeline.run([range(5), range(3)], _parse, "p")
+
+        assert sorted(written) == [1, 1, 2, 2, 2]
+        assert stats["total"] == 8
+        assert stats["imported"] == 8
+        assert stats["chunks"] == 2
+
+    async def test_writers_run_concurrently_with_bounded_queue(self):
+        """N workers overlap writes while the queue never exceeds queue_size"""
+        in_flight = 0
+        peak = 0
+
+        async def write(batch):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"inserted": len(batch)}
+
+        pipeline = ImportPipeline(write, batch_size=1, concurrency=4, queue_size=2)
+        stats = await pipeline.run([range(20)], _parse, "p")
+
+        assert peak == 4
+        assert stats["queue_high_water"] <= 2
+        assert stats["imported"] == 20
+
+    async def test_errors_are_counted_not_raised(self):
+        """A failing parse or write does not stop the remaining batches"""
+        calls = 0
+
+        async def write(batch):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("timeout")
+            return {"inserted": len(batch)}
+
+        pipeline = ImportPipeline(write, batch_size=2, concurrency=1)
+        stats = await pipeline.run([range(2), "bad", range(2)], _parse, "p")
+
+        assert stats["errors"] == 2
+        assert stats["parse_errors"] == 3
+        assert stats["imported"] == 2
+
+    async def test_parse_in_process_does_not_fork(self):
+        """Chunks parsed in the worker process are written; the pool never forks"""
+        assert _process_context().get_start_method() in ("forkserver", "spawn")
+
+        async def write(batch):
+            return {"inserted": len(batch), "errors": 0}
+
+        pipeline = ImportPipeline(write, batch_size=10, parse_in_process=True)
+        stats = await pipeline.run([[{"id": 1}, {"id": 2}], [{"id": 3}]], list)
+
+        assert stats["imported"] == 3
+        assert stats["parse_errors"] == 0
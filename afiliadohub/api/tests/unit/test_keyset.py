@@ -0,0 +1,110 @@
+"""
+Unit tests for keyset (cursor) pagination
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: cursor round-trip and validation, PostgREST filter, page slicing,
+repository/service wiring.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from afiliadohub.api.utils.keyset import (
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_columns,
+    keyset_filter,
+    paginate,
+)
+from afiliadohub.api.repositories.product_repository import ProductRepository
+from afiliadohub.api.services.product_service import ProductService
+
+ROW = {"created_at": "2024-05-01T10:00:00.123456+00:00", "id": 42}
+
+
+class TestCursor:
+    """Test suite for cursor encoding"""
+
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor(ROW)) == (ROW["created_at"], 42)
+
+    def test_uuid_ids(self):
+        row = {"created_at": "2024-05-01T10:00:00Z", "id": "0b5e1c3a-7f1e-4d7a-9a57-0a3c1c1f2b10"}
+        assert decode_cursor(encode_cursor(row))[1] == row["id"]
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "not-base64!",
+            encode_cursor({"created_at": "ontem", "id": 1}),
+            encode_cursor({"created_at": "2024-05-01T10:00:00", "id": '1",id.gt."0'}),
+        ],
+    )
+    def test_rejects_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_filter_expression(self):
+        assert keyset_filter(encode_cursor(ROW)) == (
+            'created_at.lt."2024-05-01T10:00:00.123456+00:00",'
+            'and(created_at.eq."2024-05-01T10:00:00.123456+00:00",id.lt."42")'
+        )
+
+
+class TestPaginate:
+    """Test suite for page slicing and query wiring"""
+
+    def test_extra_row_means_next_page(self):
+        rows = [{"created_at": f"2024-05-0{i}T00:00:00", "id": i} for i in (3, 2, 1)]
+        page, cursor = paginate(rows, 2)
+        assert page == rows[:2]
+        assert decode_cursor(cursor) == ("2024-05-02T00:00:00", 2)
+
+    def test_last_page_has_no_cursor(self):
+        assert paginate([ROW], 2) == ([ROW], None)
+        assert paginate(None, 2) == ([], None)
+
+    def test_apply_keyset_orders_and_filters(self):
+        query = MagicMock()
+        apply_keyset(query, encode_cursor(ROW))
+        query.or_.assert_called_once()
+        query.or_.return_value.order.assert_called_once_with("created_at", desc=True)
+        query.or_.return_value.order.return_value.order.assert_called_once_with("id", desc=True)
+
+    def test_keyset_columns(self):
+        assert keyset_columns("*") == "*"
+        assert keyset_columns("id,name") == "id,name,created_at"
+
+
+class TestProductPages:
+    """Test suite for ProductService.get_products_page"""
+
+    def test_service_returns_next_cursor(self):
+        rows = [{"created_at": f"2024-05-0{i}T00:00:00", "id": i} for i in (3, 2, 1)]
+        repository = MagicMock(spec=ProductRepository)
+        repository.get_page.return_value = rows
+        service = ProductService.__new__(ProductService)
+        service.repository = repository
+        service._enrich_product = lambda p: p
+
+        products, cursor = service.get_products_page(limit=2)
+
+        assert [p["id"] for p in products] == [3, 2]
+        assert cursor == encode_cursor(rows[1])
+        repository.get_page.assert_called_once_with(None, 2, None, "*")
+
+    def test_service_rejects_bad_cursor(self):
+        service = ProductService.__new__(ProductService)
+        service.repository = MagicMock()
+        with pytest.raises(ValueError):
+            service.get_products_page(cursor="garbage")
+        service.repository.get_page.assert_not_called()
+
+    def test_repository_fetches_one_extra_row(self):
+        client = MagicMock()
+        ProductRepository(client).get_page(limit=50, columns="id,name")
+
+        client.table.return_value.select.assert_called_once_with("id,name,created_at")
+        ordered = client.table.return_value.select.return_value.order.return_value.order
+        ordered.return_value.limit.assert_called_once_with(51)
@@ -0,0 +1,208 @@
+"""
+Unit tests for the columnar product snapshot
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: building from embedded product_stats rows, dictionary encoding,
+filters, date windows, top-N, group-by, row decoding, freshness and the
+keyset refresh of ProductSnapshotStore.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from afiliadohub.api.utils.product_snapshot import (
+    ProductSnapshot,
+    ProductSnapshotStore,
+    SNAPSHOT_SELECT,
+    _flatten,
+)
+
+ROWS = [
+    {
+        "id": 1,
+        "name": "Fone",
+        "store": "shopee",
+        "category": "Eletrônicos",
+        "current_price": "99.90",
+        "discount_percentage": 40,
+        "commission_rate": 12,
+        "quality_score": 80,
+        "is_active": True,
+        "created_at": "2024-05-01T10:00:00+00:00",
+        "product_stats": [
+            {"view_count": 10, "click_count": 5, "telegram_send_count": 2,
+             "last_sent": "2024-05-02T00:00:00Z", "updated_at": "2024-05-03T00:00:00Z"}
+        ],
+    },
+    {
+        "id": 2,
+        "name": "Camiseta",
+        "store": "amazon",
+        "category": None,
+        "current_price": 49.0,
+        "discount_percentage": None,
+        "commission_rate": 4,
+        "quality_score": None,
+        "is_active": True,
+        "created_at": "2024-04-01T10:00:00+00:00",
+        "product_stats": {"view_count": 3, "click_count": 9, "telegram_send_count": 0,
+                          "last_sent": None, "updated_at": "2024-04-02T00:00:00Z"},
+    },
+    {
+        "id": 3,
+        "name": "Caneca",
+        "store": None,
+        "category": "Casa",
+        "current_price": 20,
+        "discount_percentage": 10,
+        "commission_rate": None,
+        "quality_score": 95,
+        "is_active": False,
+        "created_at": "2024-05-05T10:00:00+00:00",
+        "product_stats": [],
+    },
+    {
+        "id": 4,
+        "name": "Teclado",
+        "store": "shopee",
+        "category": "Eletrônicos",
+        "current_price": 150,
+        "discount_percentage": 60,
+        "commission_rate": 10,
+        "quality_score": 60,
+        "is_active": True,
+        "created_at": "2024-05-06T10:00:00+00:00",
+        "product_stats": [
+            {"view_count": 1, "click_count": 5, "telegram_send_count": 4,
+             "last_sent": None, "updated_at": "2024-05-07T00:00:00Z"}
+        ],
+    },
+]
+
+
+@pytest.fixture
+def snapshot():
+    return ProductSnapshot.from_rows(_flatten(row) for row in ROWS)
+
+
+class TestProductSnapshot:
+    """Test suite for ProductSnapshot"""
+
+    def test_columns_and_dictionary_encoding(self, snapshot):
+        assert len(snapshot) == 4
+        assert snapshot.columns["id"].dtype == np.int64
+        assert snapshot.columns["current_price"][0] == pytest.approx(99.9)
+        assert np.isnan(snapshot.columns["quality_score"][1])
+        assert list(snapshot.columns["click_count"]) == [5, 9, 0, 5]
+        assert list(snapshot.dictionaries["store"]) == ["shopee", "amazon", "unknown"]
+        assert list(snapshot.columns["store"]) == [0, 1, 2, 0]
+        assert snapshot.columns["category"][1] == -1
+
+    def test_arrays_are_read_only(self, snapshot):
+        with pytest.raises(ValueError):
+            snapshot.columns["click_count"][0] = 100
+
+    def test_mask_filters(self, snapshot):
+        assert list(snapshot.mask(active=True)) == [True, True, False, True]
+        assert snapshot.mask(store="shopee", min_discount=50).sum() == 1
+        assert snapshot.mask(category="Casa").sum() == 1
+        # Rótulo desconhecido não casa com categoria NULL
+        assert snapshot.mask(category="Jardim").sum() == 0
+        assert snapshot.mask(created_from=datetime(2024, 5, 1)).sum() == 3
+
+    def test_window_excludes_missing_dates(self, snapshot):
+        mask = snapshot.window("stats_updated_at", datetime(2024, 5, 1))
+        assert list(mask) == [True, False, False, True]
+
+    def test_top_orders_desc_with_nan_last(self, snapshot):
+        assert list(snapshot.top("click_count", 3)) == [1, 0, 3]
+        assert list(snapshot.top("quality_score", 4)) == [2, 0, 3, 1]
+        active = snapshot.mask(active=True)
+        assert list(snapshot.top("quality_score", 2, active)) == [0, 3]
+
+    def test_group_by_counts_and_sums(self, snapshot):
+        groups = snapshot.group_by(
+            "store", ("click_count", "telegram_send_count"), snapshot.mask(active=True)
+        )
+        assert groups == {
+            "shopee": {"count": 2, "click_count": 10, "telegram_send_count": 6},
+            "amazon": {"count": 1, "click_count": 9, "telegram_send_count": 0},
+        }
+        # Sem categoria fica de fora
+        assert set(snapshot.group_by("category")) == {"Eletrônicos", "Casa"}
+
+    def test_rows_decode_values(self, snapshot):
+        assert snapshot.rows([1], ["id", "store", "category", "quality_score", "last_sent"]) == [
+            {"id": 2, "store": "amazon", "category": None, "quality_score": None, "last_sent": None}
+        ]
+        assert snapshot.rows([0], ["created_at"]) == [{"created_at": "2024-05-01T10:00:00"}]
+
+    def test_mixed_fractional_seconds_parse(self):
+        rows = [
+            {"id": 1, "created_at": "2024-05-01T10:00:00+00:00"},
+            {"id": 2, "created_at": "2024-05-01T10:00:00.123456+00:00"},
+            {"id": 3, "created_at": "2024-05-01T10:00:00.12Z"},
+        ]
+        snapshot = ProductSnapshot.from_rows(rows)
+        assert not np.isnat(snapshot.columns["created_at"]).any()
+        assert snapshot.rows([1], ["created_at"]) == [{"created_at": "2024-05-01T10:00:00.123456"}]
+
+    def test_freshness(self, snapshot):
+        assert snapshot.is_fresh(60)
+        snapshot.built_at = time.time() - 120
+        assert not snapshot.is_fresh(60)
+
+
+class FakeManager:
+    """iter_pages/run_sync do SupabaseManager sobre páginas fixas"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.client = None
+        self.selects = []
+
+    async def iter_pages(self, build_query, page_size=1000):
+        self.client = self
+        build_query()
+        for page in self.pages:
+            yield page
+
+    def table(self, name):
+        assert name == "products"
+        return self
+
+    def select(self, columns):
+        self.selects.append(columns)
+        return self
+
+    async def run_sync(self, func, *args):
+        return func(*args)
+
+
+class TestProductSnapshotStore:
+    """Test suite for ProductSnapshotStore"""
+
+    def test_current_is_none_before_first_refresh(self):
+        assert ProductSnapshotStore().current() is None
+
+    async def test_refresh_builds_from_pages(self):
+        store = ProductSnapshotStore(max_age=60)
+        manager = FakeManager([ROWS[:2], ROWS[2:]])
+
+        snapshot = await store.refresh(manager)
+
+        assert len(snapshot) == 4
+        assert store.current() is snapshot
+        assert manager.selects == [SNAPSHOT_SELECT]
+        assert store.stats()["refreshes"] == 1
+
+    async def test_stale_snapshot_is_not_served(self):
+        store = ProductSnapshotStore(max_age=60)
+        snapshot = await store.refresh(FakeManager([ROWS]))
+        snapshot.built_at = time.time() - 61
+
+        assert store.current() is None
+        assert store.stats()["fresh"] is False
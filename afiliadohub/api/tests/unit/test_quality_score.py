@@ -0,0 +1,111 @@
+"""
+Unit tests for the batched product scores
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: quality score tiers and caps, missing values, DataFrame columns,
+extraction from Shopee API nodes, commission parsing and the anti-manopla
+real_score ranking.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from afiliadohub.api.utils.quality_score import (
+    commission_percent,
+    product_columns,
+    quality_scores,
+    rank_by_real_score,
+    real_scores,
+    score_products,
+)
+
+
+class TestQualityScores:
+    """Test suite for quality_scores"""
+
+    def test_tier_boundaries(self):
+        scores = quality_scores(
+            rating=[0, 4.8, 5, 2.5],
+            sales=[49, 50, 1000, 999],
+            commission_pct=[19.9, 20, 50, 45],
+            discount_pct=[9, 10, 50, 51],
+        )
+        # rating: 0, int(28.8)=28, 30, 15 | vendas: 0, 5, 30, 20
+        # comissão: 0, 10, 25, 20 | desconto: 0, 15, 15, 5
+        assert list(scores) == [0, 58, 100, 60]
+        assert scores.dtype == np.int64
+
+    def test_missing_values_score_zero(self):
+        scores = quality_scores([None, np.nan], [None, "x"], [np.nan, None], [None, None])
+        assert list(scores) == [0, 0]
+
+    def test_accepts_dataframe_columns(self):
+        df = pd.DataFrame(
+            {
+                "rating": [4.0, 3.0],
+                "sales_count": [600, 10],
+                "commission_rate": [40.0, 5.0],
+                "discount_percentage": [20, 80],
+            }
+        )
+        scores = quality_scores(
+            df["rating"], df["sales_count"], df["commission_rate"], df["discount_percentage"]
+        )
+        assert list(scores) == [24 + 20 + 20 + 15, 18 + 0 + 0 + 5]
+
+    def test_commission_percent_formats(self):
+        assert list(commission_percent(["0.3", "25%", 0.5, None, "abc"])) == [30, 25, 50, 0, 0]
+        assert list(commission_percent(np.array([0.1, 0.45]))) == [10, 45]
+
+
+class TestProductColumns:
+    """Test suite for product_columns/score_products"""
+
+    def test_shopee_node_fields(self):
+        node = {
+            "ratingStar": "4.9",
+            "sales": 2000,
+            "commissionRate": "0.5",
+            "priceDiscountRate": 30,
+            "priceMin": "10",
+            "priceMax": "100",
+        }
+        columns = product_columns([node])
+        assert columns["rating"][0] == 4.9
+        assert columns["commission_pct"][0] == 50
+        # priceDiscountRate vence a faixa priceMin/priceMax
+        assert columns["discount_pct"][0] == 30
+        assert list(score_products([node])) == [29 + 30 + 25 + 15]
+
+    def test_fallback_fields(self):
+        mapped = {"rating": 4.0, "sold": 120, "commissionRate": "20%", "discount_percentage": 60}
+        ranged = {"priceMin": "80", "priceMax": "100"}
+        columns = product_columns([mapped, ranged])
+        assert columns["sales"][0] == 120 and np.isnan(columns["sales"][1])
+        assert list(columns["discount_pct"]) == [60, 20]
+        assert list(score_products([mapped, ranged])) == [24 + 10 + 10 + 5, 15]
+
+    def test_empty_batch(self):
+        assert len(score_products([])) == 0
+
+
+class TestRealScore:
+    """Test suite for the anti-manopla ranking"""
+
+    def test_real_scores_match_formula(self):
+        scores = real_scores([40, "20", None], [99, 0, 10])
+        assert scores[0] == 40 * math.log(100)
+        assert list(scores[1:]) == [0, 0]
+
+    def test_rank_is_descending_and_stable(self):
+        nodes = [
+            {"id": 1, "priceDiscountRate": 50, "sales": 1},
+            {"id": 2, "priceDiscountRate": 20, "sales": 500},
+            {"id": 3, "priceDiscountRate": 50, "sales": 1},
+            {"id": 4, "priceDiscountRate": None, "sales": None},
+        ]
+        assert [n["id"] for n in rank_by_real_score(nodes)] == [2, 1, 3, 4]
+        assert [n["id"] for n in rank_by_real_score(nodes, limit=2)] == [2, 1]
+        assert rank_by_real_score([]) == []
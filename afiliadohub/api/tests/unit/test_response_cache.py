@@ -0,0 +1,117 @@
+"""
+Unit tests for the response cache in front of Shopee productOfferV2
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: TTL hits, single-flight coalescing, stale-while-revalidate, errors not cached,
+cancelled leader
+"""
+
+import asyncio
+
+import pytest
+
+from afiliadohub.api.utils.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """Test suite for ResponseCache"""
+
+    async def test_hit_within_ttl(self):
+        """Second call within the TTL does not reach the origin"""
+        cache = ResponseCache("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return {"nodes": [1]}
+
+        assert await cache.get_or_fetch("k", fetch, ttl=60) == {"nodes": [1]}
+        assert await cache.get_or_fetch("k", fetch, ttl=60) == {"nodes": [1]}
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    async def test_concurrent_identical_queries_are_coalesced(self):
+        """Concurrent misses for the same key share one origin call"""
+        cache = ResponseCache("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        results = await asyncio.gather(
+            *[cache.get_or_fetch("k", fetch, ttl=60) for _ in range(5)]
+        )
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 4
+
+    async def test_stale_while_revalidate(self):
+        """Expired entry is served immediately and refreshed in background"""
+        cache = ResponseCache("test")
+        version = {"n": 0}
+
+        async def fetch():
+            version["n"] += 1
+            return version["n"]
+
+        assert await cache.get_or_fetch("k", fetch, ttl=0.01, stale_ttl=60) == 1
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_fetch("k", fetch, ttl=0.01, stale_ttl=60) == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get_or_fetch("k", fetch, ttl=60) == 2
+        assert cache.stats()["stale_hits"] == 1
+
+    async def test_errors_are_not_cached(self):
+        """A failing origin propagates the error and the next call retries"""
+        cache = ResponseCache("test")
+        attempts = []
+
+        async def fetch():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch("k", fetch, ttl=60)
+        assert await cache.get_or_fetch("k", fetch, ttl=60) == "ok"
+        assert cache.stats()["size"] == 1
+
+    async def test_cancelled_leader_releases_waiters(self):
+        """Cancelling the leading call resolves the coalesced waiters"""
+        cache = ResponseCache("test")
+        started = asyncio.Event()
+
+        async def slow_fetch():
+            started.set()
+            await asyncio.sleep(60)
+
+        leader = asyncio.create_task(cache.get_or_fetch("k", slow_fetch, ttl=60))
+        await started.wait()
+        follower = asyncio.create_task(cache.get_or_fetch("k", slow_fetch, ttl=60))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(follower, timeout=1)
+        assert "k" not in cache._inflight
+
+        async def fetch():
+            return "ok"
+
+        assert await cache.get_or_fetch("k", fetch, ttl=60) == "ok"
+
+    async def test_lru_eviction(self):
+        """Oldest keys are evicted past max_entries"""
+        cache = ResponseCache("test", max_entries=2)
+
+        for key in ("a", "b", "c"):
+            await cache.get_or_fetch(key, lambda k=key: asyncio.sleep(0, k), ttl=60)
+
+        assert cache.stats()["size"] == 2
+        assert cache.stats()["evictions"] == 1
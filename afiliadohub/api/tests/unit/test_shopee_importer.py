@@ -0,0 +1,118 @@
+"""
+Unit tests for ShopeeProductImporter (batched upsert mode)
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: _import_page round-trips, inserted vs updated counts, fallback path,
+batched quality_score
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from afiliadohub.api.utils.shopee_importer import ShopeeProductImporter
+
+
+def _response(data):
+    response = MagicMock()
+    response.data = data
+    return response
+
+
+def _shopee_product(product_id: int):
+    return {
+        "productId": product_id,
+        "productName": f"Produto {product_id}",
+        "affiliateLink": f"https://s.shopee.com.br/{product_id}",
+        "price": 50.0,
+        "originalPrice": 100.0,
+    }
+
+
+@pytest.fixture
+def supabase_manager():
+    manager = MagicMock()
+    manager.execute = AsyncMock()
+    manager.insert_product = AsyncMock()
+    return manager
+
+
+@pytest.fixture
+def importer(supabase_manager):
+    return ShopeeProductImporter(
+        shopee_client=MagicMock(), supabase_manager=supabase_manager
+    )
+
+
+class TestShopeeImporterBatched:
+    """Test suite for the set-based import path"""
+
+    @pytest.mark.asyncio
+    async def test_import_page_uses_three_round_trips(self, importer, supabase_manager):
+        """One page = existing-ids select + products upsert + product_stats insert"""
+        supabase_manager.execute.side_effect = [
+            _response([{"shopee_product_id": 1}]),
+            _response(
+                [
+                    {"id": "a", "shopee_product_id": 1},
+                    {"id": "b", "shopee_product_id": 2},
+                    {"id": "c", "shopee_product_id": 3},
+                ]
+            ),
+            _response([]),
+        ]
+
+        stats = await importer._import_page([_shopee_product(i) for i in (1, 2, 3)])
+
+        assert stats["imported"] == 2
+        assert stats["updated"] == 1
+        assert stats["errors"] == 0
+        assert supabase_manager.execute.await_count == 3
+        stats_rows = supabase_manager.client.table.return_value.upsert.call_args_list[-1]
+        assert [r["product_id"] for r in stats_rows.args[0]] == ["b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_import_page_deduplicates_product_ids(self, importer, supabase_manager):
+        """Repeated productIds in one page must not reach ON CONFLICT twice"""
+        supabase_manager.execute.side_effect = [
+            _response([]),
+            _response([{"id": "a", "shopee_product_id": 1}]),
+            _response([]),
+        ]
+
+        stats = await importer._import_page([_shopee_product(1), _shopee_product(1)])
+
+        upserted = supabase_manager.client.table.return_value.upsert.call_args_list[0]
+        assert len(upserted.args[0]) == 1
+        assert stats["imported"] == 1
+
+    @pytest.mark.asyncio
+    async def test_import_page_sets_quality_scores(self, importer, supabase_manager):
+        """Every upserted row carries the quality_score computed for the page"""
+        supabase_manager.execute.side_effect = [
+            _response([]),
+            _response([{"id": "a", "shopee_product_id": 1}, {"id": "b", "shopee_product_id": 2}]),
+            _response([]),
+        ]
+        popular = {**_shopee_product(2), "sales": 1500, "commissionRate": "0.3", "rating": 4.5}
+
+        await importer._import_page([_shopee_product(1), popular])
+
+        upserted = supabase_manager.client.table.return_value.upsert.call_args_list[0]
+        # 50% de desconto = 15; + 27 (rating) + 30 (vendas) + 15 (comissão)
+        assert [p["quality_score"] for p in upserted.args[0]] == [15, 87]
+
+    @pytest.mark.asyncio
+    async def test_import_page_falls_back_per_product(self, importer, supabase_manager):
+        """If the bulk upsert fails, the page is retried product by product"""
+        supabase_manager.execute.side_effect = [
+            _response([]),
+            Exception("duplicate key value violates unique constraint"),
+            _response([]),  # _find_existing_product (1)
+            _response([]),  # _find_existing_product (2)
+        ]
+        supabase_manager.insert_product.return_value = {"id": "x"}
+
+        stats = await importer._import_page([_shopee_product(1), _shopee_product(2)])
+
+        assert stats["imported"] == 2
+        assert supabase_manager.insert_product.await_count == 2
@@ -0,0 +1,120 @@
+"""
+Unit tests for the short-link memo store and batch generation
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: memo keys (per affiliate app_id), LRU + SQLite persistence, TTL, generate_short_links batching,
+products cache refresh after the client is closed
+"""
+
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from afiliadohub.api.utils import short_link_store
+from afiliadohub.api.utils.shopee_client import ShopeeAffiliateClient
+from afiliadohub.api.utils.short_link_store import ShortLinkStore, memo_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ShortLinkStore(path=str(tmp_path / "links.sqlite3"))
+
+
+class TestShortLinkStore:
+    """Test suite for ShortLinkStore"""
+
+    def test_memo_key_includes_sub_ids(self):
+        """Same URL with different sub IDs gets different keys"""
+        assert memo_key("app", "https://s/1") != memo_key("app", "https://s/1", ["a"])
+        assert memo_key("app", " https://s/1 ", ["a"]) == ("app", "https://s/1", "a")
+
+    async def test_links_are_not_shared_between_app_ids(self, store):
+        """A link generated for one affiliate account is not reused by another"""
+        await store.put(memo_key("app-a", "https://s/1"), "https://s.shp.ee/a")
+
+        assert await store.get(memo_key("app-b", "https://s/1")) is None
+        assert await store.get(memo_key("app-a", "https://s/1")) == "https://s.shp.ee/a"
+
+    def test_legacy_table_without_app_id_is_dropped(self, tmp_path):
+        """Rows from the old (origin_url, sub_ids) schema are discarded"""
+        path = str(tmp_path / "links.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE short_links (origin_url TEXT, sub_ids TEXT, "
+            "short_link TEXT, created_at REAL, PRIMARY KEY (origin_url, sub_ids))"
+        )
+        conn.execute("INSERT INTO short_links VALUES ('https://s/1', '', 'x', 0)")
+        conn.commit()
+        conn.close()
+
+        store = ShortLinkStore(path=path)
+        columns = [row[1] for row in store._conn.execute("PRAGMA table_info(short_links)")]
+        assert columns[0] == "app_id"
+        assert store._conn.execute("SELECT COUNT(*) FROM short_links").fetchone()[0] == 0
+
+    async def test_persists_across_instances(self, store, tmp_path):
+        """A new process (instance) reads links stored by another"""
+        await store.put(memo_key("app", "https://s/1"), "https://s.shp.ee/x")
+
+        other = ShortLinkStore(path=str(tmp_path / "links.sqlite3"))
+        assert await other.get(memo_key("app", "https://s/1")) == "https://s.shp.ee/x"
+        assert other.stats()["disk_hits"] == 1
+        assert await other.get(memo_key("app", "https://s/1")) == "https://s.shp.ee/x"
+        assert other.stats()["memory_hits"] == 1
+
+    async def test_expired_links_are_misses(self, tmp_path):
+        """Links older than the TTL are regenerated"""
+        store = ShortLinkStore(path=str(tmp_path / "links.sqlite3"), ttl_days=0)
+        await store.put(memo_key("app", "https://s/1"), "https://s.shp.ee/x")
+        assert await store.get(memo_key("app", "https://s/1")) is None
+
+
+class TestGenerateShortLinks:
+    """Test suite for the memoized client methods"""
+
+    async def test_batch_only_generates_unseen_urls(self, store):
+        """Known URLs come from the memo; the rest are generated once"""
+        client = ShopeeAffiliateClient("app", "secret")
+        await store.put(memo_key("app", "https://s/1", ["c"]), "https://s.shp.ee/1")
+        calls = []
+
+        async def fake_mutation(url, sub_ids=None):
+            calls.append(url)
+            return f"https://s.shp.ee/{url[-1]}"
+
+        with patch.object(short_link_store, "_short_link_store", store), patch.object(
+            client, "_mutate_short_link", side_effect=fake_mutation
+        ):
+            links = await client.generate_short_links(
+                ["https://s/1", "https://s/2", "https://s/2", None], sub_ids=["c"]
+            )
+            again = await client.generate_short_link("https://s/2", sub_ids=["c"])
+
+        assert links == {"https://s/1": "https://s.shp.ee/1", "https://s/2": "https://s.shp.ee/2"}
+        assert again == "https://s.shp.ee/2"
+        assert calls == ["https://s/2"]
+
+
+class TestProductsCacheRefresh:
+    """Test suite for get_products fetches after the caller closed its client"""
+
+    async def test_fetch_without_open_session_uses_own_session(self):
+        """A stale refresh after ``async with`` must not reopen (and leak) a session"""
+        client = ShopeeAffiliateClient("app", "secret")
+        used = []
+
+        async def fake_query(self, query, variables=None, operation_name=None):
+            used.append(self)
+            return {"data": {"productOfferV2": {"nodes": [{"itemId": 1}], "pageInfo": {}}}}
+
+        async with client:
+            pass
+
+        with patch.object(ShopeeAffiliateClient, "graphql_query", fake_query):
+            result = await client.get_products(keyword="fone", use_cache=False)
+
+        assert result["nodes"] == [{"itemId": 1}]
+        assert used[0] is not client
+        assert used[0].session.closed
+        assert client.session.closed
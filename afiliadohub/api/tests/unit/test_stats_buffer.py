@@ -0,0 +1,154 @@
+"""
+Unit tests for the buffered product stat counters
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: per-product aggregation, periodic flush, failed flush retention, shutdown flush,
+SupabaseManager bulk/per-row flush failures, per-batch flushes from workers
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from postgrest.exceptions import APIError
+
+from afiliadohub.api.utils.stats_buffer import StatsBuffer
+from afiliadohub.api.utils.supabase_client import SupabaseManager
+
+
+@pytest.fixture
+def manager():
+    with patch.dict(
+        "os.environ", {"SUPABASE_URL": "http://test.url", "SUPABASE_KEY": "test-key"}
+    ), patch("afiliadohub.api.utils.supabase_client.create_client"):
+        manager = SupabaseManager()
+        client = MagicMock()
+        with patch.object(manager, "_client", client):
+            yield manager, client
+
+
+class TestStatsBuffer:
+    """Test suite for StatsBuffer"""
+
+    async def test_hot_product_becomes_one_row(self):
+        """Many increments for one product are flushed as a single row"""
+        batches = []
+
+        async def flush(rows):
+            batches.append(rows)
+
+        buffer = StatsBuffer(flush, interval=60)
+        for _ in range(100):
+            buffer.add(7, "telegram_send_count")
+        buffer.add(7, "click_count", 3)
+        buffer.add(8, "view_count")
+
+        assert await buffer.stop() == 2
+        rows = {row["product_id"]: row for row in batches[0]}
+        assert rows[7]["telegram_send_count"] == 100
+        assert rows[7]["click_count"] == 3
+        assert rows[7]["last_sent"] is not None
+        assert rows[8] == {
+            "product_id": 8, "view_count": 1, "click_count": 0,
+            "telegram_send_count": 0, "last_sent": None,
+        }
+
+    async def test_periodic_flush(self):
+        """The background loop flushes after the interval"""
+        batches = []
+
+        async def flush(rows):
+            batches.append(rows)
+
+        buffer = StatsBuffer(flush, interval=0.01)
+        buffer.add(1, "click_count")
+        await asyncio.sleep(0.05)
+
+        assert len(batches) == 1
+        assert buffer.stats()["pending_products"] == 0
+
+    async def test_failed_flush_keeps_increments(self):
+        """Increments survive a failed flush and merge with new ones"""
+        calls = []
+
+        async def flush(rows):
+            calls.append([dict(row) for row in rows])
+            if len(calls) == 1:
+                raise RuntimeError("db down")
+
+        buffer = StatsBuffer(flush, interval=60)
+        buffer.add(1, "click_count", 2)
+        assert await buffer.flush() == 0
+        buffer.add(1, "click_count")
+        assert await buffer.stop() == 1
+
+        assert calls[1][0]["click_count"] == 3
+        assert buffer.stats()["flush_errors"] == 1
+
+    def test_unknown_stat_is_rejected(self):
+        """Only known counters are accepted"""
+
+        async def flush(rows):
+            pass
+
+        with pytest.raises(ValueError):
+            StatsBuffer(flush).add(1, "likes")
+
+
+class TestStatsBufferSupabaseFlush:
+    """Test suite for StatsBuffer flushing through SupabaseManager"""
+
+    async def test_bulk_rpc_failure_restores_rows(self, manager):
+        """A DB error (not a missing RPC) keeps every increment and skips increment_stat"""
+        manager, client = manager
+        client.rpc.return_value.execute.side_effect = TimeoutError("statement timeout")
+        buffer = StatsBuffer(manager.bulk_increment_product_stats, interval=60)
+        buffer.add(1, "click_count", 2)
+        buffer.add(2, "view_count")
+
+        assert await buffer.flush() == 0
+
+        assert buffer.stats()["pending_products"] == 2
+        assert buffer.stats()["flush_errors"] == 1
+        assert [c.args[0] for c in client.rpc.call_args_list] == ["increment_product_stats_bulk"]
+
+    async def test_per_row_fallback_restores_only_unwritten(self, manager):
+        """Without the bulk RPC, rows that failed go back to the buffer; written ones do not"""
+        manager, client = manager
+        missing = APIError({"code": "PGRST202", "message": "Could not find the function"})
+
+        def rpc(name, params):
+            query = MagicMock()
+            if name == "increment_product_stats_bulk":
+                query.execute.side_effect = missing
+            elif params["p_product_id"] == 2 and params["p_field"] == "click_count":
+                query.execute.side_effect = ConnectionError("db down")
+            return query
+
+        client.rpc.side_effect = rpc
+        buffer = StatsBuffer(manager.bulk_increment_product_stats, interval=60)
+        buffer.add(1, "click_count")
+        buffer.add(2, "view_count", 4)
+        buffer.add(2, "click_count", 3)
+
+        assert await buffer.flush() == 1
+
+        pending = buffer._pending
+        assert list(pending) == [2]
+        # view_count de 2 foi gravado antes do erro: só os cliques voltam
+        assert pending[2]["view_count"] == 0
+        assert pending[2]["click_count"] == 3
+
+    async def test_flush_per_batch_keeps_buffer_usable(self, manager):
+        """Workers flush after every send batch; later increments still get written"""
+        manager, client = manager
+        client.rpc.return_value.execute.return_value = MagicMock(data=1)
+        with patch.object(SupabaseManager, "_stats_buffer", None):
+            await manager.increment_product_stats(1, "telegram_send_count")
+            assert await manager.flush_product_stats() == 1
+            await manager.increment_product_stats(2, "telegram_send_count")
+            assert await manager.flush_product_stats() == 1
+
+        sent = [c.args[1]["p_stats"] for c in client.rpc.call_args_list]
+        assert [[row["product_id"] for row in rows] for rows in sent] == [[1], [2]]
+        assert all(rows[0]["last_sent"] for rows in sent)
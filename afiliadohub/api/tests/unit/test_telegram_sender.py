@@ -0,0 +1,151 @@
+"""
+Unit tests for the Telegram outbound send queue
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: per-chat pacing, RetryAfter handling, network retries, permanent errors,
+timeouts not retried, per-chat lock cleanup, photo file_id cache
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from afiliadohub.api.utils import telegram_sender
+from afiliadohub.api.utils.telegram_sender import FileIdCache, TelegramSender, _is_group
+from afiliadohub.api.utils.token_bucket import MemoryBucketStore
+
+
+@pytest.fixture
+def sender(monkeypatch, tmp_path):
+    # Sem jitter para os testes serem determinísticos
+    monkeypatch.setattr(telegram_sender.random, "uniform", lambda a, b: 0.0 if a == 0 else 0.01)
+    monkeypatch.setattr(telegram_sender, "TELEGRAM_PRIVATE_PER_SECOND", 1000)
+    return TelegramSender(
+        store=MemoryBucketStore(),
+        max_retries=2,
+        file_ids=FileIdCache(path=str(tmp_path / "file_ids.sqlite3")),
+    )
+
+
+def _photo_message(file_id):
+    return SimpleNamespace(photo=[SimpleNamespace(file_id="thumb"), SimpleNamespace(file_id=file_id)])
+
+
+class TestTelegramSender:
+    """Test suite for TelegramSender"""
+
+    def test_group_detection(self):
+        """Negative ids and @channels are groups; positive ids are private chats"""
+        assert _is_group(-1002499912192)
+        assert _is_group("@afiliadotop")
+        assert not _is_group(123456)
+
+    async def test_private_chat_is_paced(self, sender, monkeypatch):
+        """Two messages to the same private chat respect the per-chat rate"""
+        monkeypatch.setattr(telegram_sender, "TELEGRAM_PRIVATE_PER_SECOND", 10)
+        method = AsyncMock(return_value="ok")
+
+        started = time.monotonic()
+        await sender.call(42, method, text="a")
+        await sender.call(42, method, text="b")
+
+        assert time.monotonic() - started >= 0.09
+        assert [c.kwargs["text"] for c in method.await_args_list] == ["a", "b"]
+        assert sender.stats()["sent"] == 2
+
+    async def test_retry_after_is_honored(self, sender):
+        """A 429 waits the requested time and resends without using a retry"""
+        method = AsyncMock(side_effect=[RetryAfter(0), "ok"])
+
+        assert await sender.call(-100, method, text="x") == "ok"
+        assert sender.stats()["retry_after"] == 1
+        assert sender.stats()["retries"] == 0
+
+    async def test_network_errors_are_retried_then_raised(self, sender):
+        """Transient failures are retried up to max_retries"""
+        method = AsyncMock(side_effect=NetworkError("reset"))
+
+        with pytest.raises(NetworkError):
+            await sender.call(7, method, text="x")
+
+        assert method.await_count == 3
+        assert sender.stats()["failed"] == 1
+
+    async def test_bad_request_is_not_retried(self, sender):
+        """Permanent errors go straight back to the caller"""
+        method = AsyncMock(side_effect=BadRequest("chat not found"))
+
+        with pytest.raises(BadRequest):
+            await sender.call(-100, method, text="x")
+
+        assert method.await_count == 1
+
+    async def test_timeout_is_not_retried(self, sender):
+        """A read timeout may have delivered the message: resending would duplicate it"""
+        method = AsyncMock(side_effect=TimedOut())
+
+        with pytest.raises(TimedOut):
+            await sender.call(-100, method, text="x")
+
+        assert method.await_count == 1
+        assert sender.stats()["retries"] == 0
+
+    async def test_chat_locks_are_released(self, sender):
+        """Per-chat locks are dropped once no send is using or waiting on them"""
+        release = asyncio.Event()
+
+        async def slow(**kwargs):
+            await release.wait()
+            return "ok"
+
+        first = asyncio.create_task(sender.call(1, slow, text="a"))
+        second = asyncio.create_task(sender.call(1, slow, text="b"))
+        await asyncio.sleep(0.01)
+        assert list(sender._chat_locks) == ["1"]
+
+        release.set()
+        assert await asyncio.gather(first, second) == ["ok", "ok"]
+        for chat in range(2, 50):
+            await sender.call(chat, AsyncMock(return_value="ok"), text="x")
+
+        assert sender._chat_locks == {} and sender._chat_users == {}
+
+
+class TestFileIdCache:
+    """Test suite for reusing uploaded photos by file_id"""
+
+    async def test_second_send_reuses_file_id(self, sender):
+        """First send uploads by URL; later sends (any chat) use the file_id"""
+        bot = SimpleNamespace(token="123:abc", send_photo=AsyncMock(return_value=_photo_message("FID")))
+
+        await sender.send_photo(bot, 1, photo="https://cdn/img.jpg", caption="a")
+        await sender.send_photo(bot, -100, photo="https://cdn/img.jpg", caption="b")
+
+        photos = [c.kwargs["photo"] for c in bot.send_photo.await_args_list]
+        assert photos == ["https://cdn/img.jpg", "FID"]
+        assert sender.stats()["file_id_hits"] == 1
+
+    async def test_file_id_persists_across_instances(self, sender, tmp_path):
+        """A new process reads file_ids stored by another"""
+        await sender.file_ids.put(("123", "https://cdn/img.jpg"), "FID")
+
+        other = FileIdCache(path=str(tmp_path / "file_ids.sqlite3"))
+        assert await other.get(("123", "https://cdn/img.jpg")) == "FID"
+        assert await other.get(("999", "https://cdn/img.jpg")) is None
+
+    async def test_rejected_file_id_falls_back_to_url(self, sender):
+        """A stale file_id is forgotten and the URL is sent instead"""
+        await sender.file_ids.put(("123", "https://cdn/img.jpg"), "OLD")
+        bot = SimpleNamespace(
+            token="123:abc",
+            send_photo=AsyncMock(side_effect=[BadRequest("wrong file identifier"), _photo_message("NEW")]),
+        )
+
+        await sender.send_photo(bot, 1, photo="https://cdn/img.jpg")
+
+        assert [c.kwargs["photo"] for c in bot.send_photo.await_args_list] == ["OLD", "https://cdn/img.jpg"]
+        assert await sender.file_ids.get(("123", "https://cdn/img.jpg")) == "NEW"
@@ -0,0 +1,143 @@
+"""
+Unit tests for the shared token bucket and the Shopee rate limiter
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: refill math, priority reserve, SQLite cross-process state, get_status,
+ordered campaign prefetch
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from afiliadohub.api.utils.shopee_extensions import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    RateLimiter,
+    prefetch_in_order,
+)
+from afiliadohub.api.utils.token_bucket import (
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    _refill_and_take,
+    create_bucket_store,
+)
+
+
+class TestTokenBucket:
+    """Test suite for the bucket stores"""
+
+    def test_refill_is_continuous_and_capped(self):
+        """Half a window refills half the bucket, never above capacity"""
+        granted, level, _ = _refill_and_take(0, 0, 1, 10, 1.0, 0, now=5)
+        assert granted and level == 4
+        _, level, _ = _refill_and_take(9, 0, 0, 10, 1.0, 0, now=100)
+        assert level == 10
+
+    def test_floor_returns_wait_time(self):
+        """Below the priority floor the caller gets the exact wait"""
+        granted, level, wait = _refill_and_take(3, 0, 1, 10, 0.5, 3, now=0)
+        assert not granted
+        assert level == 3
+        assert wait == 2.0
+
+    async def test_sqlite_state_is_shared_between_stores(self, tmp_path):
+        """Two stores on the same file (two processes) see the same bucket"""
+        path = str(tmp_path / "buckets.sqlite3")
+        first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+
+        for _ in range(3):
+            assert (await first.take("k", 1, 5, 0.0001, 0))[0]
+        granted, level, _ = await second.take("k", 1, 5, 0.0001, 0)
+
+        assert granted
+        assert level == pytest.approx(1, abs=0.01)
+        assert not (await first.take("k", 1, 5, 0.0001, 0.5))[0]
+
+    def test_store_from_url(self, tmp_path):
+        """RATE_LIMIT_BACKEND style URLs pick the store"""
+        assert isinstance(create_bucket_store("memory"), MemoryBucketStore)
+        store = create_bucket_store(f"sqlite:///{tmp_path / 'x.db'}")
+        assert isinstance(store, SQLiteBucketStore)
+        with pytest.raises(ValueError):
+            create_bucket_store("ftp://nope")
+
+
+class TestShopeeRateLimiter:
+    """Test suite for the Shopee RateLimiter on top of the bucket"""
+
+    async def test_batch_leaves_reserve_for_interactive(self):
+        """Batch callers stop at the reserve; interactive ones still pass"""
+        store = MemoryBucketStore()
+        limiter = RateLimiter(store=store)
+        # Esvazia até a reserva
+        await store.take(
+            limiter.BUCKET_KEY,
+            limiter.MAX_REQUESTS_PER_HOUR - limiter.INTERACTIVE_RESERVE,
+            limiter.MAX_REQUESTS_PER_HOUR,
+            limiter.rate,
+            0,
+        )
+
+        granted, _, wait = await store.take(
+            limiter.BUCKET_KEY, 1, limiter.MAX_REQUESTS_PER_HOUR, limiter.rate,
+            limiter.INTERACTIVE_RESERVE,
+        )
+        assert not granted and wait > 0
+
+        await limiter.acquire(PRIORITY_INTERACTIVE)
+        status = await limiter.get_status()
+        assert status["used"] == limiter.MAX_REQUESTS_PER_HOUR - limiter.INTERACTIVE_RESERVE + 1
+        assert status["this_process"][PRIORITY_INTERACTIVE] == 1
+        assert status["this_process"][PRIORITY_BATCH] == 0
+
+    async def test_status_counts_other_processes(self, tmp_path):
+        """get_status reports usage made through another limiter/process"""
+        path = f"sqlite:///{tmp_path / 'shopee.db'}"
+        api, cron = (
+            RateLimiter(store=create_bucket_store(path)),
+            RateLimiter(store=create_bucket_store(path)),
+        )
+        for _ in range(7):
+            await cron.acquire(PRIORITY_BATCH)
+
+        status = await api.get_status()
+        assert status["used"] == 7
+        assert status["backend"] == "sqlite"
+        assert status["this_process"][PRIORITY_BATCH] == 0
+
+
+class TestPrefetchInOrder:
+    """Test suite for the concurrent fetch / ordered send helper"""
+
+    async def test_fetches_concurrently_and_yields_in_order(self):
+        """Slow first item does not hold back fetching of the others"""
+        delays = {"a": 0.1, "b": 0.05, "c": 0.01}
+        started = time.monotonic()
+
+        async def fetch(item):
+            await asyncio.sleep(delays[item])
+            return item.upper()
+
+        results = [
+            (item, value, error)
+            async for item, value, error in prefetch_in_order(list(delays), fetch, concurrency=3)
+        ]
+
+        assert results == [("a", "A", None), ("b", "B", None), ("c", "C", None)]
+        assert time.monotonic() - started < 0.15
+
+    async def test_errors_are_yielded_per_item(self):
+        """A failing fetch is reported without aborting the others"""
+
+        async def fetch(item):
+            if item == "bad":
+                raise ValueError("boom")
+            return item
+
+        results = [r async for r in prefetch_in_order(["ok", "bad", "ok2"], fetch)]
+
+        assert results[0] == ("ok", "ok", None)
+        assert isinstance(results[1][2], ValueError)
+        assert results[2] == ("ok2", "ok2", None)
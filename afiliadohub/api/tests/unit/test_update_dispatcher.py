@@ -0,0 +1,81 @@
+"""
+Unit tests for the Telegram webhook update dispatcher
+ITIL Activity: Plan & Improve (Quality Assurance)
+
+Covers: per-chat ordering, cross-chat concurrency, backpressure, inline mode, metrics
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from afiliadohub.api.utils.update_dispatcher import UpdateDispatcher, update_chat_key
+
+
+def _update(chat_id, n):
+    return SimpleNamespace(update_id=n, effective_chat=SimpleNamespace(id=chat_id))
+
+
+class TestUpdateDispatcher:
+    """Test suite for UpdateDispatcher"""
+
+    def test_chat_key_fallbacks(self):
+        """Updates without a chat are keyed by user, then by update_id"""
+        assert update_chat_key(_update(5, 1)) == 5
+        user_only = SimpleNamespace(update_id=2, effective_chat=None, effective_user=SimpleNamespace(id=9))
+        assert update_chat_key(user_only) == "user:9"
+
+    async def test_same_chat_in_order_other_chats_in_parallel(self):
+        """Slow updates in one chat do not block other chats"""
+        log = []
+
+        async def process(update):
+            chat = update.effective_chat.id
+            log.append(("start", chat, update.update_id))
+            await asyncio.sleep(0.05 if chat == 1 else 0)
+            log.append(("end", chat, update.update_id))
+
+        dispatcher = UpdateDispatcher(workers=4)
+        await dispatcher.start(process)
+        for n, chat in enumerate([1, 1, 2, 1], 1):
+            assert await dispatcher.submit(_update(chat, n))
+        await dispatcher.stop()
+
+        chat1 = [entry for entry in log if entry[1] == 1]
+        assert chat1 == [
+            ("start", 1, 1), ("end", 1, 1),
+            ("start", 1, 2), ("end", 1, 2),
+            ("start", 1, 4), ("end", 1, 4),
+        ]
+        # Chat 2 terminou antes do primeiro update do chat 1
+        assert log.index(("end", 2, 3)) < log.index(("end", 1, 1))
+        assert dispatcher.stats()["processed"] == 4
+
+    async def test_rejects_when_full(self):
+        """Submissions beyond max_pending are refused for Telegram to retry"""
+        release = asyncio.Event()
+
+        async def process(update):
+            await release.wait()
+
+        dispatcher = UpdateDispatcher(workers=1, max_pending=1)
+        await dispatcher.start(process)
+        assert await dispatcher.submit(_update(1, 1))
+        await asyncio.sleep(0)  # worker pega o primeiro
+        assert await dispatcher.submit(_update(1, 2))
+        assert not await dispatcher.submit(_update(1, 3))
+        assert dispatcher.stats()["queue_depth"] == 1
+        release.set()
+        await dispatcher.stop()
+        assert dispatcher.stats()["rejected"] == 1
+
+    async def test_inline_without_workers(self):
+        """workers=0 processes inside submit (serverless)"""
+        seen = []
+
+        async def process(update):
+            seen.append(update.update_id)
+
+        dispatcher = UpdateDispatcher(workers=0)
+        await dispatcher.start(process)
+        assert await dispatcher.submit(_update(1, 1))
+        assert seen == [1]
@@ -10,6 +10,8 @@ import json
 from typing import Optional, List, Dict, Any
 import aiohttp
 
+from .http_clients import borrow_http_session
+
 logger = logging.getLogger(__name__)
 
 AWIN_API_BASE = "https://api.awin.com"
@@ -77,7 +79,7 @@ class AwinAffiliateClient:
             payload["parameters"] = {"campaign": campaign}
 
         logger.info(f"[Awin] Gerando link para Anunciante {advertiser_id}")
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.post(url, json=payload, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -105,7 +107,7 @@ class AwinAffiliateClient:
         url = f"{AWIN_API_BASE}/publishers/{self.publisher_id}/linkbuilder/generate-batch"
         payload = {"requests": requests}
         logger.info(f"[Awin] Gerando batch de {len(requests)} links")
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.post(url, json=payload, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -119,7 +121,7 @@ class AwinAffiliateClient:
     async def get_quota(self) -> dict:
         """Verifica a cota de links restante do Publisher."""
         url = f"{AWIN_API_BASE}/publishers/{self.publisher_id}/linkbuilder/quota"
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -155,7 +157,7 @@ class AwinAffiliateClient:
             payload["filters"] = filters
 
         logger.info(f"[Awin] Buscando ofertas (página {page})")
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.post(url, json=payload, headers=self._headers()) as resp:
                 if resp.status >= 300:
                     body = await resp.text()
@@ -182,7 +184,7 @@ class AwinAffiliateClient:
             params["countryCode"] = country_code
 
         logger.info(f"[Awin] Listando programas (relationship={relationship})")
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, params=params, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -192,7 +194,7 @@ class AwinAffiliateClient:
     async def get_program_details(self, advertiser_id: int) -> dict:
         """Detalhes e comissões de um programa específico."""
         url = f"{AWIN_API_BASE}/publishers/{self.publisher_id}/programmecommissions/{advertiser_id}"
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -215,7 +217,7 @@ class AwinAffiliateClient:
         if include_conditions:
             params["includeConditionValues"] = "true"
 
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, params=params, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -246,7 +248,7 @@ class AwinAffiliateClient:
             "dateType": date_type,
         }
         logger.info(f"[Awin] Relatório de performance: {start_date} -> {end_date}")
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, params=params, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -269,7 +271,7 @@ class AwinAffiliateClient:
             "region": region,
             "timezone": timezone,
         }
-        async with aiohttp.ClientSession() as session:
+        async with borrow_http_session() as session:
             async with session.get(url, params=params, headers=self._headers()) as resp:
                 if resp.status != 200:
                     body = await resp.text()
@@ -297,8 +299,10 @@ class AwinAffiliateClient:
         logger.info(f"[Awin] Baixando Feed do Anunciante {advertiser_id} (locale: {locale})")
 
         products = []
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self._headers()) as resp:
+        async with borrow_http_session() as session:
+            # Stream longo: sem timeout total, só entre leituras
+            feed_timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+            async with session.get(url, headers=self._headers(), timeout=feed_timeout) as resp:
                 if resp.status == 404:
                     raise AwinAPIError(
                         f"Feed não encontrado para Anunciante {advertiser_id} locale {locale}. "
@@ -21,6 +21,8 @@ from typing import Optional, List, Dict, Any
 
 import httpx
 
+from .http_clients import borrow_httpx_client
+
 logger = logging.getLogger(__name__)
 
 # ==================== ENDPOINTS (conforme apicj.md) ====================
@@ -59,9 +61,11 @@ class CJAffiliateClient:
         if variables:
             payload["variables"] = variables
 
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+        async with borrow_httpx_client() as client:
             try:
-                resp = await client.post(url, json=payload, headers=self._headers)
+                resp = await client.post(
+                    url, json=payload, headers=self._headers, timeout=TIMEOUT
+                )
                 resp.raise_for_status()
             except httpx.HTTPStatusError as e:
                 body = e.response.text[:500]
@@ -0,0 +1,42 @@
+"""
+Contadores de versão das tabelas usadas pelos relatórios.
+
+Quem grava (importadores, flush do StatsBuffer, registro de comissões)
+chama ``data_versions.bump("products")`` etc. Caches de relatórios põem as
+versões das tabelas de que dependem na chave: depois de uma escrita a chave
+muda e a próxima leitura recalcula, sem precisar saber quais entradas
+apagar (as antigas saem pelo LRU).
+
+Os contadores são do processo; escritas feitas fora dele (worker do
+Telethon, dashboard Streamlit, SQL direto) só aparecem quando o TTL do
+cache vence.
+"""
+
+from typing import Dict, Tuple
+
+DATA_DOMAINS = ("products", "stats", "commissions")
+
+
+class DataVersions:
+    """Um contador monotônico por domínio de dados"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = dict.fromkeys(DATA_DOMAINS, 0)
+
+    def bump(self, *domains: str):
+        """Marca os domínios como alterados"""
+        for domain in domains:
+            if domain not in self._versions:
+                raise ValueError(f"Domínio de dados inválido: {domain}")
+            self._versions[domain] += 1
+
+    def current(self, *domains: str) -> Tuple[int, ...]:
+        """Versões dos domínios pedidos (todos, se nenhum) para compor chaves"""
+        return tuple(self._versions[domain] for domain in domains or DATA_DOMAINS)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._versions)
+
+
+# Instância global
+data_versions = DataVersions()
@@ -1,13 +1,12 @@
 import logging
 import asyncio
-import aiohttp
-import io
 import pandas as pd
 from datetime import datetime
 from typing import Optional, Dict
 
-from ..utils.supabase_client import get_supabase_manager
+from ..utils.supabase_client import _is_missing_column, get_supabase_manager
 from ..handlers.csv_import import CSVImporter
+from ..utils.feed_stream import FeedNotModified, open_feed_stream
 
 logger = logging.getLogger(__name__)
 
@@ -83,17 +82,6 @@ class FeedManager:
                 {"status": "running", "last_run_at": datetime.now().isoformat()}
             ).eq("id", feed_id).execute()
 
-            # Download do arquivo
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url, timeout=1800
-                ) as resp:  # 30 min timeout para arquivos grandes
-                    if resp.status != 200:
-                        raise Exception(f"Erro no download: HTTP {resp.status}")
-
-                    data = await resp.read()
-                    file_content = io.BytesIO(data)
-
             # Identifica nome da store
             store_name = "shopee"  # Default fallback
             if store_id:
@@ -107,18 +95,48 @@ class FeedManager:
                 if store_res.data:
                     store_name = store_res.data["name"].lower()
 
-            # Processa CSV
+            # Download em stream direto para o parser (memória limitada ao chunk).
+            # ETag/Last-Modified do último sucesso tornam o GET condicional.
             importer = CSVImporter()
-            # Feed automatizado geralmente não deve enviar para telegram massivamente (spam)
-            # ou podemos configurar isso no banco. Por padrão FALSE.
-            stats = await importer.process_csv_upload(
-                file_content=file_content, store=store_name, send_to_telegram=False
-            )
+            validators = {
+                "etag": feed.get("etag"),
+                "last_modified": feed.get("last_modified"),
+            }
+            try:
+                async with open_feed_stream(url, validators=validators) as (
+                    file_content,
+                    compression,
+                    validators,
+                ):
+                    # Feed automatizado geralmente não deve enviar para telegram massivamente (spam)
+                    # ou podemos configurar isso no banco. Por padrão FALSE.
+                    stats = await importer.process_csv_upload(
+                        file_content=file_content,
+                        store=store_name,
+                        send_to_telegram=False,
+                        compression=compression,
+                        parse_in_process=True,
+                        incremental=True,
+                    )
+            except FeedNotModified:
+                # 304: nada mudou desde o último download, nada a gravar
+                self.supabase.client.table("product_feeds").update(
+                    {"status": "success", "updated_at": datetime.now().isoformat()}
+                ).eq("id", feed_id).execute()
+                logger.info(f"[FEED] Feed {name} sem alterações (HTTP 304)")
+                return
 
-            # Atualiza status para success
-            self.supabase.client.table("product_feeds").update(
-                {"status": "success", "updated_at": datetime.now().isoformat()}
-            ).eq("id", feed_id).execute()
+            # Atualiza status para success. Validadores só são salvos se todas
+            # as linhas foram parseadas e gravadas; senão o próximo GET
+            # condicional daria 304 e as linhas perdidas ficariam de fora.
+            update = {"status": "success", "updated_at": datetime.now().isoformat()}
+            complete = stats.get("errors", 0) == 0 and stats.get("parse_errors", 0) == 0
+            saved_validators = (
+                {key: value for key, value in validators.items() if value is not None}
+                if complete
+                else {}
+            )
+            self._mark_feed_done(feed_id, update, saved_validators)
 
             logger.info(f"[FEED] Sucesso no feed {name}: {stats}")
 
@@ -133,6 +151,22 @@ class FeedManager:
                 }
             ).eq("id", feed_id).execute()
 
+    def _mark_feed_done(self, feed_id, update: Dict, validators: Dict):
+        """Grava o status final; sem as colunas etag/last_modified grava só o status"""
+        table = self.supabase.client.table("product_feeds")
+        if not validators:
+            table.update(update).eq("id", feed_id).execute()
+            return
+        try:
+            table.update({**update, **validators}).eq("id", feed_id).execute()
+        except Exception as e:
+            if not _is_missing_column(e):
+                raise
+            logger.warning(
+                f"[FEED] Colunas etag/last_modified ausentes (migration v4 PART 2): {e}"
+            )
+            table.update(update).eq("id", feed_id).execute()
+
 
 # Instância global
 feed_manager = FeedManager()
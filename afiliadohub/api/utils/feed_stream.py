@@ -0,0 +1,171 @@
+"""
+Download de feeds em stream direto para o parser de CSV.
+
+O corpo HTTP (aiohttp) é exposto como um arquivo síncrono lido pelo pandas
+em uma thread, descomprimindo gzip sob demanda. A memória fica limitada ao
+tamanho do chunk do parser, não ao tamanho do arquivo.
+"""
+
+import io
+import os
+import gzip
+import asyncio
+import logging
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import aiohttp
+
+from .http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+FEED_READ_TIMEOUT = int(os.getenv("FEED_READ_TIMEOUT", "300"))
+FEED_READ_BUFFER = 1 << 20  # 1 MiB entre o socket e o parser
+FEED_SNIFF_BYTES = 1 << 16
+
+_MAGIC_NUMBERS = {b"\x1f\x8b": "gzip", b"PK\x03\x04": "zip"}
+
+
+class FeedNotModified(Exception):
+    """O servidor respondeu 304: o feed não mudou desde o último download"""
+
+
+def detect_compression(url: str, head: bytes = b"") -> Optional[str]:
+    """Detecta a compressão pelos magic bytes, com fallback para a URL"""
+    for magic, compression in _MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return compression
+
+    lowered = url.lower().split("?", 1)[0]
+    if "compression/gzip" in url.lower() or lowered.endswith(".gz"):
+        return "gzip"
+    if "compression/zip" in url.lower() or lowered.endswith(".zip"):
+        return "zip"
+    return None
+
+
+class AsyncByteStream(io.RawIOBase):
+    """
+    Adapta o corpo de uma resposta aiohttp para leitura síncrona.
+
+    Deve ser lido fora do event loop (ex.: ``run_in_executor``): cada
+    ``read`` agenda ``content.read`` no loop e aguarda o resultado.
+    """
+
+    def __init__(
+        self,
+        content: aiohttp.StreamReader,
+        loop: asyncio.AbstractEventLoop,
+        head: bytes = b"",
+    ):
+        self._content = content
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._head = head
+        self.bytes_read = len(head)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+
+        if threading.get_ident() == self._loop_thread:
+            raise RuntimeError("AsyncByteStream deve ser lido fora do event loop")
+
+        data = asyncio.run_coroutine_threadsafe(
+            self._content.read(len(buffer)), self._loop
+        ).result()
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+async def _spool_to_disk(
+    content: aiohttp.StreamReader, head: bytes, suffix: str
+) -> str:
+    """Grava o corpo em arquivo temporário (formatos que exigem seek, ex.: zip)"""
+    loop = asyncio.get_running_loop()
+    fd, temp_path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        await loop.run_in_executor(None, f.write, head)
+        async for chunk in content.iter_chunked(FEED_SNIFF_BYTES):
+            await loop.run_in_executor(None, f.write, chunk)
+    return temp_path
+
+
+@asynccontextmanager
+async def open_feed_stream(
+    url: str,
+    compression: Optional[str] = "infer",
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    validators: Optional[Dict[str, Optional[str]]] = None,
+) -> AsyncIterator[Tuple[Any, Optional[str], Dict[str, Optional[str]]]]:
+    """
+    Abre um feed remoto como ``(arquivo, compression, validators)`` para
+    ``pd.read_csv``.
+
+    - gzip/sem compressão: stream direto do socket, sem tocar o disco
+    - zip (e outros formatos com seek): spool em arquivo temporário,
+      removido ao sair do contexto
+    - ``validators`` (``etag``/``last_modified`` do último download) viram
+      uma requisição condicional; 304 levanta ``FeedNotModified``. Os
+      validadores da resposta atual são devolvidos para serem salvos.
+    """
+    loop = asyncio.get_running_loop()
+    headers = dict(headers or {})
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    session = session or http_clients.session
+    # Sem timeout total: o ritmo de leitura é ditado pelo parser (backpressure)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=FEED_READ_TIMEOUT)
+
+    temp_path = None
+    try:
+        async with session.get(url, headers=headers, timeout=timeout) as resp:
+            if resp.status == 304:
+                raise FeedNotModified(url)
+            if resp.status != 200:
+                raise Exception(f"Erro no download: HTTP {resp.status}")
+
+            response_validators = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+
+            head = await resp.content.read(FEED_SNIFF_BYTES)
+            if compression == "infer":
+                compression = detect_compression(url, head)
+
+            if compression in (None, "gzip"):
+                raw = AsyncByteStream(resp.content, loop, head)
+                stream = io.BufferedReader(raw, buffer_size=FEED_READ_BUFFER)
+                if compression == "gzip":
+                    stream = gzip.GzipFile(fileobj=stream, mode="rb")
+                logger.info(f"[FeedStream] Stream aberto ({compression or 'csv'}): {url}")
+                yield stream, None, response_validators
+                logger.info(
+                    f"[FeedStream] {raw.bytes_read / (1024 * 1024):.1f} MB recebidos"
+                )
+            else:
+                temp_path = await _spool_to_disk(resp.content, head, f".{compression}")
+                logger.info(f"[FeedStream] Feed {compression} salvo em {temp_path}")
+                yield temp_path, compression, response_validators
+    finally:
+        if temp_path:
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                logger.warning(f"[FeedStream] Erro ao limpar arquivo temporário: {e}")
@@ -0,0 +1,107 @@
+"""
+Projeções nomeadas de colunas para consultas de produtos.
+
+Listagens que só renderizam cards não precisam de descrição, tags,
+search_vector etc. Cada endpoint/método escolhe um conjunto (``card``,
+``detail``, ``export``, ``admin``) ou recebe ``fields=`` do cliente; o
+PostgREST serializa e trafega só essas colunas.
+
+``fields`` aceita o nome de um conjunto ou uma lista de colunas separadas
+por vírgula (validadas contra as colunas conhecidas).
+"""
+
+from typing import Dict, Optional, Tuple
+
+ALL_COLUMNS = "*"
+
+# Card: o que o dashboard, o bot (_format_product_message) e as listas usam
+CARD_FIELDS: Tuple[str, ...] = (
+    "id",
+    "name",
+    "store",
+    "current_price",
+    "original_price",
+    "discount_percentage",
+    "category",
+    "image_url",
+    "affiliate_link",
+    "coupon_code",
+    "rating",
+    "review_count",
+    "commission_rate",
+    "is_active",
+    "created_at",
+)
+
+DETAIL_FIELDS: Tuple[str, ...] = CARD_FIELDS + (
+    "description",
+    "original_link",
+    "coupon_expiry",
+    "tags",
+    "is_featured",
+    "commission_amount",
+    "sales_count",
+    "shop_name",
+    "shop_rating",
+    "stock_available",
+    "updated_at",
+)
+
+EXPORT_FIELDS: Tuple[str, ...] = (
+    "id",
+    "name",
+    "store",
+    "category",
+    "current_price",
+    "original_price",
+    "discount_percentage",
+    "commission_rate",
+    "affiliate_link",
+    "image_url",
+    "coupon_code",
+    "is_active",
+    "created_at",
+    "updated_at",
+)
+
+PRODUCT_FIELD_SETS: Dict[str, Tuple[str, ...]] = {
+    "card": CARD_FIELDS,
+    "detail": DETAIL_FIELDS,
+    "export": EXPORT_FIELDS,
+    "admin": (ALL_COLUMNS,),
+}
+
+# Colunas aceitas em listas avulsas (fields=id,name,...)
+PRODUCT_COLUMNS = frozenset(DETAIL_FIELDS + EXPORT_FIELDS) | {
+    "store_id",
+    "category_id",
+    "last_checked",
+    "shopee_product_id",
+    "shopee_category",
+    "quality_score",
+}
+
+
+def product_select(fields: Optional[str] = None, default: str = "card") -> str:
+    """
+    Converte ``fields`` (nome de conjunto ou lista de colunas) na string do
+    ``select()`` do Supabase. Levanta ValueError para conjunto/coluna
+    desconhecidos.
+    """
+    fields = (fields or default).strip()
+
+    field_set = PRODUCT_FIELD_SETS.get(fields)
+    if field_set is not None:
+        return ",".join(field_set)
+
+    columns = [column.strip() for column in fields.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in PRODUCT_COLUMNS]
+    if not columns or unknown:
+        raise ValueError(
+            f"fields inválido: {', '.join(unknown) or fields!r}. "
+            f"Use {', '.join(PRODUCT_FIELD_SETS)} ou colunas de produto separadas por vírgula"
+        )
+    # id sempre vem junto: stats, links e paginação dependem dele
+    if "id" not in columns:
+        columns.insert(0, "id")
+    return ",".join(dict.fromkeys(columns))
@@ -0,0 +1,200 @@
+"""
+Registro de clientes HTTP compartilhados (processo inteiro).
+
+Um ``aiohttp.ClientSession`` e um ``httpx.AsyncClient`` de longa duração,
+criados no ``lifespan`` do FastAPI e fechados no shutdown. Os clientes de
+redes de afiliados (Awin, CJ, Shopee, Mercado Livre) pegam emprestado daqui
+em vez de abrir uma sessão por chamada: keep-alive, limite de conexões por
+host e cache de DNS passam a valer para todos.
+"""
+
+import os
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+
+
+class HTTPClientRegistry:
+    """
+    Dono dos clientes HTTP compartilhados e das métricas de reuso por host.
+
+    Os clientes ficam presos ao event loop em que foram criados; se o loop
+    mudar (scripts, testes) eles são recriados sob demanda.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._httpx: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "new_connections": 0}
+        )
+        # Streams httpx vivos por host (somem quando a conexão é descartada)
+        self._httpx_streams: Dict[str, "weakref.WeakSet"] = defaultdict(weakref.WeakSet)
+
+    # ==================== CICLO DE VIDA ====================
+
+    async def start(self):
+        """Cria os clientes no loop atual (chamado no lifespan)"""
+        self._ensure_loop()
+        self.session
+        self.httpx_client
+        logger.info(
+            f"[HTTP] Pool compartilhado iniciado (limite={HTTP_POOL_LIMIT}, "
+            f"por host={HTTP_POOL_LIMIT_PER_HOST}, dns_ttl={HTTP_DNS_CACHE_TTL}s)"
+        )
+
+    async def close(self):
+        """Fecha os clientes (chamado no shutdown)"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        if self._httpx and not self._httpx.is_closed:
+            await self._httpx.aclose()
+        self._session = None
+        self._httpx = None
+        self._loop = None
+        logger.info("[HTTP] Pool compartilhado fechado")
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Clientes de outro loop não podem ser reaproveitados
+            self._session = None
+            self._httpx = None
+            self._loop = loop
+
+    # ==================== AIOHTTP ====================
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Sessão aiohttp compartilhada (não feche: pertence ao registro)"""
+        self._ensure_loop()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+                use_dns_cache=True,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_DEFAULT_TIMEOUT),
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+            self._host_stats[ctx.host]["requests"] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self._host_stats[getattr(ctx, "host", "?")]["new_connections"] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        return trace
+
+    # ==================== HTTPX ====================
+
+    @property
+    def httpx_client(self) -> httpx.AsyncClient:
+        """Client httpx compartilhado (não feche: pertence ao registro)"""
+        self._ensure_loop()
+        if self._httpx is None or self._httpx.is_closed:
+            self._httpx = httpx.AsyncClient(
+                timeout=HTTP_DEFAULT_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_LIMIT,
+                    max_keepalive_connections=HTTP_POOL_LIMIT_PER_HOST,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                ),
+                event_hooks={"response": [self._on_httpx_response]},
+            )
+        return self._httpx
+
+    async def _on_httpx_response(self, response: httpx.Response):
+        host = response.request.url.host
+        self._host_stats[host]["requests"] += 1
+        # Mesmo network_stream = mesma conexão TCP reaproveitada
+        stream = response.extensions.get("network_stream")
+        if stream is not None and stream not in self._httpx_streams[host]:
+            self._httpx_streams[host].add(stream)
+            self._host_stats[host]["new_connections"] += 1
+
+    # ==================== MÉTRICAS ====================
+
+    def _aiohttp_open_connections(self) -> Dict[str, int]:
+        """Conexões abertas (em uso + ociosas) por host no connector aiohttp"""
+        open_by_host: Dict[str, int] = defaultdict(int)
+        connector = self._session.connector if self._session else None
+        if connector is None or connector.closed:
+            return open_by_host
+        for key, protocols in getattr(connector, "_acquired_per_host", {}).items():
+            open_by_host[key.host] += len(protocols)
+        for key, idle in getattr(connector, "_conns", {}).items():
+            open_by_host[key.host] += len(idle)
+        return open_by_host
+
+    def stats(self) -> Dict[str, Any]:
+        """Conexões abertas e taxa de reuso por host"""
+        open_aiohttp = self._aiohttp_open_connections()
+        hosts = {}
+        total_requests = total_new = 0
+        for host, counters in self._host_stats.items():
+            requests = counters["requests"]
+            new_connections = counters["new_connections"]
+            total_requests += requests
+            total_new += new_connections
+            hosts[host] = {
+                "requests": requests,
+                "new_connections": new_connections,
+                "open_connections": open_aiohttp.get(host, 0)
+                + len(self._httpx_streams.get(host, ())),
+                "reuse_ratio": round(1 - new_connections / requests, 3)
+                if requests
+                else 0.0,
+            }
+        return {
+            "limit": HTTP_POOL_LIMIT,
+            "limit_per_host": HTTP_POOL_LIMIT_PER_HOST,
+            "requests": total_requests,
+            "new_connections": total_new,
+            "reuse_ratio": round(1 - total_new / total_requests, 3)
+            if total_requests
+            else 0.0,
+            "hosts": hosts,
+        }
+
+
+# Instância global
+http_clients = HTTPClientRegistry()
+
+
+@asynccontextmanager
+async def borrow_http_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """``async with`` compatível com ClientSession(), sem fechar a sessão"""
+    yield http_clients.session
+
+
+@asynccontextmanager
+async def borrow_httpx_client() -> AsyncIterator[httpx.AsyncClient]:
+    """``async with`` compatível com httpx.AsyncClient(), sem fechar o client"""
+    yield http_clients.httpx_client
@@ -0,0 +1,173 @@
+"""
+Pipeline produtor/consumidor para importação de feeds CSV.
+
+Leitura/parse de chunks (thread ou processo separado) alimenta uma fila
+limitada drenada por N workers de upsert concorrentes, sobrepondo CPU de
+parse e I/O de rede com o banco.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil é opcional fora do servidor
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Padrões configuráveis via ambiente
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+IMPORT_QUEUE_SIZE = int(os.getenv("IMPORT_QUEUE_SIZE", "8"))
+IMPORT_PARSE_IN_PROCESS = os.getenv("IMPORT_PARSE_IN_PROCESS", "false").lower() == "true"
+
+_SENTINEL = None
+
+
+def _process_context():
+    """
+    Contexto do processo de parse: nunca ``fork``. O processo da API já tem
+    o pool de threads do Supabase e o event loop rodando, e fork de processo
+    com threads pode travar (Python 3.12+ avisa). Windows só tem spawn.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class ImportPipeline:
+    """
+    Reader/parser -> asyncio.Queue(maxsize=queue_size) -> N workers de escrita.
+
+    - ``parse`` precisa ser uma função de módulo (picklable) quando
+      ``parse_in_process=True``.
+    - A fila limitada dá backpressure: o parser para de ler o arquivo
+      enquanto os workers não liberam espaço, mantendo a memória estável.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, Any]]],
+        batch_size: int = 500,
+        concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        parse_in_process: Optional[bool] = None,
+        on_batch: Optional[
+            Callable[[Dict[str, Any], List[Dict[str, Any]]], Awaitable[None]]
+        ] = None,
+    ):
+        self.write = write
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency or IMPORT_CONCURRENCY)
+        self.queue_size = max(1, queue_size or IMPORT_QUEUE_SIZE)
+        self.parse_in_process = (
+            IMPORT_PARSE_IN_PROCESS if parse_in_process is None else parse_in_process
+        )
+        self.on_batch = on_batch
+        self.stats = {
+            "chunks": 0,
+            "parse_errors": 0,
+            "total": 0,
+            "imported": 0,
+            "skipped": 0,
+            "errors": 0,
+            "queue_high_water": 0,
+            "elapsed_seconds": 0.0,
+            "rss_start_mb": 0.0,
+            "peak_rss_mb": 0.0,
+        }
+        self._process = psutil.Process() if psutil else None
+
+    def _sample_rss(self):
+        """Atualiza o pico de memória residente (RSS) do processo nesta importação"""
+        if self._process is None:
+            return
+        rss_mb = round(self._process.memory_info().rss / (1024 * 1024), 1)
+        self.stats["peak_rss_mb"] = max(self.stats["peak_rss_mb"], rss_mb)
+
+    async def run(self, chunks: Iterable[Any], parse: Callable[..., List[Dict[str, Any]]], *args):
+        """
+        Executa o pipeline até o fim do iterador ``chunks``.
+
+        ``parse(chunk, *args)`` converte um chunk em registros; ``write(batch)``
+        grava um lote e retorna ``{"inserted": int, "errors": int}``
+        (opcionalmente ``"skipped"``: linhas inalteradas não regravadas).
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        process_pool = (
+            ProcessPoolExecutor(max_workers=1, mp_context=_process_context())
+            if self.parse_in_process
+            else None
+        )
+        started = time.perf_counter()
+        self._sample_rss()
+        self.stats["rss_start_mb"] = self.stats["peak_rss_mb"]
+
+        workers = [
+            asyncio.create_task(self._writer(queue, index))
+            for index in range(self.concurrency)
+        ]
+        try:
+            await self._produce(loop, queue, iter(chunks), parse, args, process_pool)
+        finally:
+            for _ in workers:
+                await queue.put(_SENTINEL)
+            await asyncio.gather(*workers, return_exceptions=True)
+            if process_pool:
+                process_pool.shutdown(wait=False, cancel_futures=True)
+            self.stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+        return self.stats
+
+    async def _produce(self, loop, queue, chunks, parse, args, process_pool):
+        """Lê e parseia chunks fora do event loop, enfileirando lotes de escrita"""
+        while True:
+            # read_csv(chunksize=...) faz I/O + parse C: roda em thread
+            chunk = await loop.run_in_executor(None, next, chunks, _SENTINEL)
+            if chunk is _SENTINEL:
+                break
+            self.stats["chunks"] += 1
+            self._sample_rss()
+
+            try:
+                records = await loop.run_in_executor(process_pool, parse, chunk, *args)
+            except Exception as e:
+                logger.error(f"[Pipeline] Erro no parse do chunk {self.stats['chunks']}: {e}")
+                self.stats["parse_errors"] += len(chunk)
+                continue
+            self._sample_rss()
+
+            for start in range(0, len(records), self.batch_size):
+                # Bloqueia quando a fila está cheia (backpressure)
+                await queue.put(records[start : start + self.batch_size])
+                self.stats["queue_high_water"] = max(
+                    self.stats["queue_high_water"], queue.qsize()
+                )
+
+    async def _writer(self, queue: asyncio.Queue, index: int):
+        """Worker de upsert: drena a fila até receber o sentinela"""
+        while True:
+            batch = await queue.get()
+            if batch is _SENTINEL:
+                return
+            self.stats["total"] += len(batch)
+            try:
+                result = await self.write(batch)
+                self.stats["imported"] += result.get("inserted", 0)
+                self.stats["skipped"] += result.get("skipped", 0)
+                self.stats["errors"] += result.get("errors", 0)
+            except Exception as e:
+                logger.error(f"[Pipeline] Worker {index} falhou ao gravar lote: {e}")
+                self.stats["errors"] += len(batch)
+                continue
+
+            if self.on_batch:
+                try:
+                    await self.on_batch(result, batch)
+                except Exception as e:
+                    logger.warning(f"[Pipeline] Callback do lote falhou: {e}")
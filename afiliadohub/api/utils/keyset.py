@@ -0,0 +1,81 @@
+"""
+Paginação por keyset (cursor) em ``(created_at, id)``.
+
+Em vez de ``offset``, cada página pede "linhas depois da última que eu vi":
+
+    created_at < X OR (created_at = X AND id < Y)
+    ORDER BY created_at DESC, id DESC
+
+O custo de qualquer página é o de um index scan a partir do cursor (offset
+alto lê e descarta tudo antes), e inserções concorrentes não duplicam nem
+pulam linhas entre páginas. O cursor é opaco para o cliente: base64 de
+``[created_at, id]`` da última linha entregue.
+"""
+
+import json
+import re
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+KEYSET_COLUMNS = ("created_at", "id")
+
+_ID_RE = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor opaco apontando para depois de ``row``"""
+    payload = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any]:
+    """``(created_at, id)`` do cursor; ValueError se for inválido/adulterado"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # Os valores vão para o filtro do PostgREST: só aceita formatos esperados
+        datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+        if not _ID_RE.match(str(row_id)):
+            raise ValueError(row_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError(f"cursor inválido: {cursor!r}") from e
+    return str(created_at), row_id
+
+
+def keyset_filter(cursor: str) -> str:
+    """Expressão ``or=`` do PostgREST para as linhas depois do cursor"""
+    created_at, row_id = decode_cursor(cursor)
+    return (
+        f'created_at.lt."{created_at}",'
+        f'and(created_at.eq."{created_at}",id.lt."{row_id}")'
+    )
+
+
+def apply_keyset(query, cursor: Optional[str] = None):
+    """Ordena por (created_at, id) DESC e, com cursor, começa depois dele"""
+    if cursor:
+        query = query.or_(keyset_filter(cursor))
+    return query.order("created_at", desc=True).order("id", desc=True)
+
+
+def keyset_columns(columns: str) -> str:
+    """Garante created_at e id na projeção (o cursor é montado com eles)"""
+    if columns.strip() == "*":
+        return columns
+    selected = [column.strip() for column in columns.split(",")]
+    missing = [column for column in KEYSET_COLUMNS if column not in selected]
+    return ",".join(selected + missing)
+
+
+def paginate(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Recebe até ``limit + 1`` linhas (uma a mais indica que há próxima
+    página) e devolve ``(página, next_cursor)``.
+    """
+    rows = rows or []
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
@@ -0,0 +1,342 @@
+"""
+Snapshot colunar em memória de products + product_stats.
+
+Analytics, métricas e rankings liam as mesmas linhas do Supabase como
+listas de dicts a cada request. Aqui uma tarefa periódica (scheduler,
+``PRODUCT_SNAPSHOT_REFRESH_MINUTES``) baixa as duas tabelas por keyset e
+monta um array NumPy somente leitura por coluna:
+
+- numéricas em float64 (NULL vira NaN), contadores em int64
+- ``store``/``category`` com dictionary encoding: códigos int32 + vocabulário
+  (categoria ausente = -1)
+- datas em datetime64[us] (UTC, NaT para NULL)
+- texto só onde a resposta precisa (name, image_url, affiliate_link)
+
+Filtros, top-N e group-by viram operações vetorizadas (máscara booleana,
+argpartition, bincount), em milissegundos. Quem consulta usa
+``product_snapshot.current()``: se o snapshot estiver mais velho que
+``PRODUCT_SNAPSHOT_MAX_AGE`` (ou ainda não existir), recebe None e cai na
+consulta ao vivo.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .stats_buffer import STAT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SNAPSHOT_MAX_AGE = float(os.getenv("PRODUCT_SNAPSHOT_MAX_AGE", "900"))
+PRODUCT_SNAPSHOT_PAGE_SIZE = int(os.getenv("PRODUCT_SNAPSHOT_PAGE_SIZE", "1000"))
+
+FLOAT_COLUMNS = (
+    "current_price",
+    "original_price",
+    "discount_percentage",
+    "commission_rate",
+    "rating",
+    "quality_score",
+)
+COUNTER_COLUMNS = STAT_FIELDS
+DICTIONARY_COLUMNS = ("store", "category")
+TIME_COLUMNS = ("created_at", "last_sent", "stats_updated_at")
+TEXT_COLUMNS = ("name", "image_url", "affiliate_link")
+
+SNAPSHOT_SELECT = (
+    "id, is_active, created_at, "
+    + ", ".join(FLOAT_COLUMNS + DICTIONARY_COLUMNS + TEXT_COLUMNS)
+    + ", product_stats(view_count, click_count, telegram_send_count, last_sent, updated_at)"
+)
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha de products com o embed product_stats achatado"""
+    stats = row.get("product_stats")
+    if isinstance(stats, list):  # PostgREST devolve lista ou objeto
+        stats = stats[0] if stats else None
+    stats = stats or {}
+    flat = {key: value for key, value in row.items() if key != "product_stats"}
+    for field in STAT_FIELDS:
+        flat[field] = stats.get(field)
+    flat["last_sent"] = stats.get("last_sent")
+    flat["stats_updated_at"] = stats.get("updated_at")
+    return flat
+
+
+def _timestamps(values: Sequence[Any]) -> np.ndarray:
+    # ISO8601: o PostgREST omite a fração quando é zero; sem isso o pandas infere
+    # o formato da primeira linha e transforma as demais em NaT
+    parsed = pd.to_datetime(
+        pd.Series(values, dtype=object), utc=True, errors="coerce", format="ISO8601"
+    )
+    return parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[us]")
+
+
+def _as_datetime64(value: datetime) -> np.datetime64:
+    if value.tzinfo is not None:
+        value = pd.Timestamp(value).tz_convert("UTC").tz_localize(None)
+    return np.datetime64(value, "us")
+
+
+def _python(value: Any) -> Any:
+    """Escalar NumPy -> tipo JSON (NaN/NaT -> None)"""
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class ProductSnapshot:
+    """Colunas somente leitura de products + product_stats (uma posição por produto)"""
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        dictionaries: Dict[str, np.ndarray],
+        built_at: Optional[float] = None,
+    ):
+        for array in list(columns.values()) + list(dictionaries.values()):
+            array.flags.writeable = False
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.built_at = time.time() if built_at is None else built_at
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "ProductSnapshot":
+        """Monta o snapshot a partir de linhas já achatadas (ver ``_flatten``)"""
+        rows = list(rows)
+
+        def values(name: str) -> List[Any]:
+            return [row.get(name) for row in rows]
+
+        columns: Dict[str, np.ndarray] = {}
+        ids = np.asarray(values("id"))
+        columns["id"] = ids if ids.dtype.kind in "iu" else ids.astype(object)
+        columns["is_active"] = np.array(
+            [bool(v) for v in values("is_active")], dtype=bool
+        )
+        for name in FLOAT_COLUMNS:
+            columns[name] = pd.to_numeric(
+                pd.Series(values(name), dtype=object), errors="coerce"
+            ).to_numpy(dtype=np.float64)
+        for name in COUNTER_COLUMNS:
+            columns[name] = np.array([v or 0 for v in values(name)], dtype=np.int64)
+        for name in TIME_COLUMNS:
+            columns[name] = _timestamps(values(name))
+        for name in TEXT_COLUMNS:
+            columns[name] = np.array(values(name), dtype=object)
+
+        dictionaries: Dict[str, np.ndarray] = {}
+        for name in DICTIONARY_COLUMNS:
+            raw = values(name)
+            if name == "store":
+                raw = [v or "unknown" for v in raw]
+            codes, uniques = pd.factorize(pd.Series(raw, dtype=object))
+            columns[name] = codes.astype(np.int32)
+            dictionaries[name] = np.asarray(uniques, dtype=object)
+
+        return cls(columns, dictionaries)
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.built_at
+
+    def is_fresh(self, max_age: float = PRODUCT_SNAPSHOT_MAX_AGE) -> bool:
+        return self.age <= max_age
+
+    # ==================== FILTROS ====================
+
+    def code(self, column: str, label: Optional[str]) -> int:
+        """Código de ``label`` no vocabulário da coluna (-1 se não existir)"""
+        matches = np.flatnonzero(self.dictionaries[column] == label)
+        return int(matches[0]) if len(matches) else -1
+
+    def mask(
+        self,
+        active: Optional[bool] = None,
+        store: Optional[str] = None,
+        category: Optional[str] = None,
+        min_discount: Optional[float] = None,
+        created_from: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Máscara booleana com os filtros pedidos (todos em AND)"""
+        mask = np.ones(len(self), dtype=bool)
+        if active is not None:
+            mask &= self.columns["is_active"] == active
+        for column, label in (("store", store), ("category", category)):
+            if label is not None:
+                code = self.code(column, label)
+                # Rótulo fora do vocabulário não casa com nada (nem com -1 = NULL)
+                mask &= (self.columns[column] == code) if code >= 0 else False
+        if min_discount:
+            mask &= np.nan_to_num(self.columns["discount_percentage"]) >= min_discount
+        if created_from is not None:
+            mask &= self.columns["created_at"] >= _as_datetime64(created_from)
+        return mask
+
+    def window(
+        self,
+        column: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Máscara de ``start <= column <= end`` para uma coluna de data (NaT fica fora)"""
+        values = self.columns[column]
+        mask = ~np.isnat(values)
+        if start is not None:
+            mask &= values >= _as_datetime64(start)
+        if end is not None:
+            mask &= values <= _as_datetime64(end)
+        return mask
+
+    # ==================== ORDENAÇÃO / AGRUPAMENTO ====================
+
+    def top(self, column: str, n: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Posições dos ``n`` maiores valores de ``column`` em ordem
+        decrescente (NaN por último; empates na ordem do snapshot)
+        """
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if n <= 0 or not len(positions):
+            return positions[:0]
+        values = self.columns[column][positions].astype(np.float64)
+        values = np.where(np.isnan(values), -np.inf, values)
+        if n < len(positions):
+            keep = np.argpartition(-values, n - 1)[:n]
+            positions, values = positions[keep], values[keep]
+        order = np.lexsort((positions, -values))
+        return positions[order]
+
+    def group_by(
+        self,
+        by: str,
+        sum_columns: Sequence[str] = (),
+        mask: Optional[np.ndarray] = None,
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        ``{rótulo: {"count": n, coluna: soma, ...}}`` por ``by`` (coluna
+        com dictionary encoding). NaN conta como 0 nas somas; linhas sem
+        categoria (-1) ficam de fora.
+        """
+        codes = self.columns[by]
+        keep = codes >= 0 if mask is None else mask & (codes >= 0)
+        codes = codes[keep]
+        size = len(self.dictionaries[by])
+        counts = np.bincount(codes, minlength=size)
+        sums = {
+            column: np.bincount(
+                codes,
+                weights=np.nan_to_num(self.columns[column][keep].astype(np.float64)),
+                minlength=size,
+            )
+            for column in sum_columns
+        }
+        result = {}
+        for code in np.flatnonzero(counts):
+            label = self.dictionaries[by][code]
+            group = {"count": int(counts[code])}
+            for column, totals in sums.items():
+                total = totals[code]
+                group[column] = int(total) if column in COUNTER_COLUMNS else float(total)
+            result[label] = group
+        return result
+
+    # ==================== SAÍDA ====================
+
+    def rows(
+        self, positions: Iterable[int], columns: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Linhas (dicts JSON) das posições pedidas, com store/category decodificados"""
+        columns = columns or list(self.columns)
+        result = []
+        for position in positions:
+            row = {}
+            for column in columns:
+                value = self.columns[column][position]
+                if column in self.dictionaries:
+                    row[column] = self.dictionaries[column][value] if value >= 0 else None
+                else:
+                    row[column] = _python(value)
+            result.append(row)
+        return result
+
+
+class ProductSnapshotStore:
+    """Guarda o snapshot atual e o reconstrói por inteiro a cada refresh"""
+
+    def __init__(
+        self,
+        max_age: float = PRODUCT_SNAPSHOT_MAX_AGE,
+        page_size: int = PRODUCT_SNAPSHOT_PAGE_SIZE,
+    ):
+        self.max_age = max_age
+        self.page_size = page_size
+        self._snapshot: Optional[ProductSnapshot] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"refreshes": 0, "refresh_errors": 0, "build_seconds": 0.0}
+
+    def current(self, max_age: Optional[float] = None) -> Optional[ProductSnapshot]:
+        """Snapshot fresco ou None (quem chama faz a consulta ao vivo)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return snapshot if snapshot.is_fresh(self.max_age if max_age is None else max_age) else None
+
+    async def refresh(self, supabase=None) -> ProductSnapshot:
+        """Baixa products + product_stats por keyset e troca o snapshot"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if supabase is None:
+                from .supabase_client import get_supabase_manager
+
+                supabase = get_supabase_manager()
+
+            started = time.perf_counter()
+            try:
+                rows: List[Dict[str, Any]] = []
+                async for page in supabase.iter_pages(
+                    lambda: supabase.client.table("products").select(SNAPSHOT_SELECT),
+                    page_size=self.page_size,
+                ):
+                    rows.extend(_flatten(row) for row in page)
+                # Conversão para arrays fora do event loop
+                snapshot = await supabase.run_sync(ProductSnapshot.from_rows, rows)
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                logger.error(f"[Snapshot] Erro ao atualizar snapshot de produtos: {e}")
+                raise
+
+            self._snapshot = snapshot
+            self._stats["refreshes"] += 1
+            self._stats["build_seconds"] = round(time.perf_counter() - started, 3)
+            logger.info(
+                f"[Snapshot] {len(snapshot)} produtos em {self._stats['build_seconds']}s"
+            )
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            "products": len(snapshot) if snapshot else 0,
+            "age_seconds": round(snapshot.age, 1) if snapshot else None,
+            "fresh": self.current() is not None,
+        }
+
+
+# Instância global
+product_snapshot = ProductSnapshotStore()
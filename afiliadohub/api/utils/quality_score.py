@@ -0,0 +1,174 @@
+"""
+Scores de produto calculados em lote com NumPy.
+
+- ``quality_scores``: score de qualidade 0-100 (rating, vendas, comissão e
+  desconto), usado para decidir o que importar.
+- ``real_scores``: score anti-manopla do bot, desconto × log(vendas + 1),
+  usado para ranquear ofertas antes de postar.
+
+As funções recebem arrays, listas ou colunas de DataFrame; ``product_columns``
+extrai as colunas de uma lista de produtos no formato da API Shopee (ou já
+mapeados), para quem tem dicts em vez de um DataFrame.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+MAX_QUALITY_SCORE = 100
+
+# Rating proporcional: 5 estrelas = RATING_POINTS
+RATING_POINTS = 30
+
+# (mínimo, pontos), do maior para o menor
+SALES_TIERS = ((1000, 30), (500, 20), (100, 10), (50, 5))
+COMMISSION_TIERS = ((50, 25), (40, 20), (30, 15), (20, 10))
+
+# Descontos moderados são mais confiáveis; acima do teto pode ser manopla
+DISCOUNT_FAIR_RANGE = (10, 50)
+DISCOUNT_FAIR_POINTS = 15
+DISCOUNT_SUSPECT_POINTS = 5
+
+
+def _numeric(values: Any) -> np.ndarray:
+    """float64; None e texto inválido viram NaN"""
+    array = np.asarray(values, dtype=object) if isinstance(values, list) else np.asarray(values)
+    if array.dtype.kind == "O":
+        array = np.where(array == None, np.nan, array)  # noqa: E711
+    try:
+        # Números e textos numéricos ("4.8") convertem direto
+        return array.astype(np.float64)
+    except (TypeError, ValueError):
+        pass
+    return pd.to_numeric(pd.Series(array.ravel(), dtype=object), errors="coerce").to_numpy(
+        np.float64, copy=True
+    )
+
+
+def _tier_points(values: np.ndarray, tiers) -> np.ndarray:
+    thresholds = np.array([minimum for minimum, _ in reversed(tiers)], dtype=np.float64)
+    points = np.array([0] + [p for _, p in reversed(tiers)], dtype=np.int64)
+    return points[np.searchsorted(thresholds, values, side="right")]
+
+
+def commission_percent(values: Any) -> np.ndarray:
+    """
+    commissionRate da API (fração: 0.3 ou "0.3") ou texto "30%" → percentual.
+    Valores inválidos viram 0.
+    """
+    raw = np.asarray(values).ravel()
+    percent = _numeric(raw) * 100
+    if raw.dtype.kind != "O":
+        return np.nan_to_num(percent, nan=0.0)
+    for i in np.flatnonzero(np.isnan(percent)).tolist():
+        value = raw[i]
+        if isinstance(value, str) and value.strip().endswith("%"):
+            try:
+                percent[i] = float(value.strip().rstrip("%"))
+            except ValueError:
+                pass
+    return np.nan_to_num(percent, nan=0.0)
+
+
+def quality_scores(rating: Any, sales: Any, commission_pct: Any, discount_pct: Any) -> np.ndarray:
+    """
+    Score de qualidade (0-100) de cada produto do lote
+
+    Critérios:
+    - Rating (0-30 pts), proporcional às estrelas
+    - Sales volume (0-30 pts) por faixas de SALES_TIERS
+    - Commission rate (0-25 pts) por faixas de COMMISSION_TIERS, em %
+    - Desconto (0-15 pts): 15 entre 10% e 50%, 5 acima disso
+
+    Valores ausentes (None/NaN) não pontuam.
+
+    Returns:
+        Array int64 com um score por produto
+    """
+    rating = np.nan_to_num(_numeric(rating), nan=0.0)
+    sales = np.nan_to_num(_numeric(sales), nan=0.0)
+    commission = np.nan_to_num(_numeric(commission_pct), nan=0.0)
+    discount = np.nan_to_num(_numeric(discount_pct), nan=0.0)
+
+    score = np.floor(np.clip(rating, 0, 5) / 5.0 * RATING_POINTS).astype(np.int64)
+    score += _tier_points(sales, SALES_TIERS)
+    score += _tier_points(commission, COMMISSION_TIERS)
+
+    low, high = DISCOUNT_FAIR_RANGE
+    score += np.where(
+        (discount >= low) & (discount <= high),
+        DISCOUNT_FAIR_POINTS,
+        np.where(discount > high, DISCOUNT_SUSPECT_POINTS, 0),
+    )
+
+    return np.minimum(score, MAX_QUALITY_SCORE)
+
+
+def _field(products: Sequence[Dict[str, Any]], *keys: str) -> np.ndarray:
+    """Primeira chave não nula de cada produto, como float64 (NaN se nenhuma)"""
+    values = _numeric([p.get(keys[0]) for p in products])
+    for key in keys[1:]:
+        missing = np.flatnonzero(np.isnan(values))
+        if not len(missing):
+            break
+        values[missing] = _numeric([products[i].get(key) for i in missing.tolist()])
+    return values
+
+
+def product_columns(products: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Colunas de score a partir de dicts de produto
+
+    Aceita nós da API Shopee (ratingStar, sales, commissionRate,
+    priceDiscountRate/priceMin/priceMax) e produtos já mapeados (rating,
+    sales_count, discount_percentage). O desconto vem de priceDiscountRate,
+    depois discount_percentage e, por último, da faixa priceMin/priceMax.
+    """
+    discount = _field(products, "priceDiscountRate", "discount_percentage")
+    missing = np.flatnonzero(np.isnan(discount))
+    if len(missing):
+        unpriced = [products[i] for i in missing.tolist()]
+        price_min = _field(unpriced, "priceMin")
+        price_max = _field(unpriced, "priceMax")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            discount[missing] = np.where(
+                price_max > price_min, (price_max - price_min) / price_max * 100, 0.0
+            )
+
+    return {
+        "rating": _field(products, "ratingStar", "rating"),
+        "sales": _field(products, "sales", "sold", "sales_count"),
+        "commission_pct": commission_percent([p.get("commissionRate") for p in products]),
+        "discount_pct": discount,
+    }
+
+
+def score_products(products: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """quality_scores de uma lista de dicts de produto"""
+    if not products:
+        return np.zeros(0, dtype=np.int64)
+    return quality_scores(**product_columns(products))
+
+
+def real_scores(discount_pct: Any, sales: Any) -> np.ndarray:
+    """
+    Score anti-manopla: desconto × log(vendas + 1).
+    log(vendas) penaliza produtos com 1-2 vendas que inflacionaram o desconto.
+    """
+    discount = np.nan_to_num(_numeric(discount_pct), nan=0.0)
+    sales = np.clip(np.nan_to_num(_numeric(sales), nan=0.0), 0, None)
+    return discount * np.log(sales + 1)
+
+
+def rank_by_real_score(
+    nodes: Sequence[Dict[str, Any]], limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Nós da API Shopee do maior para o menor real_score (empates na ordem original)"""
+    if not nodes:
+        return []
+    scores = real_scores(
+        [n.get("priceDiscountRate") for n in nodes], [n.get("sales") for n in nodes]
+    )
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [nodes[i] for i in order]
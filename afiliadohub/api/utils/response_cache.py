@@ -0,0 +1,138 @@
+"""
+Cache de respostas em memória com TTL, single-flight e stale-while-revalidate.
+
+- dentro do TTL: devolve o valor em cache (hit)
+- após o TTL e dentro da janela stale: devolve o valor antigo na hora e
+  dispara um refresh em background (stale hit)
+- sem valor: busca na origem; chamadas concorrentes para a mesma chave
+  esperam a mesma busca em vez de repetir a request (coalesced)
+
+Erros da origem não são cacheados. Se a busca líder for cancelada, quem
+estava esperando por ela recebe CancelledError.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LRU com TTL por entrada, single-flight e stale-while-revalidate"""
+
+    def __init__(self, name: str, max_entries: int = 1000):
+        self.name = name
+        self.max_entries = max_entries
+        # key -> (valor, fresco_até, stale_até)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Retorna o valor de ``key`` ou busca com ``fetch()``.
+
+        ``stale_ttl`` (padrão = ``ttl``) é por quanto tempo após expirar o
+        valor antigo ainda pode ser servido enquanto é revalidado.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return value
+            if now < stale_until:
+                self._stats["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    task = asyncio.create_task(
+                        self._refresh(key, fetch, ttl, stale_ttl)
+                    )
+                    self._refreshing.add(task)
+                    task.add_done_callback(self._refreshing.discard)
+                return value
+
+        if key in self._inflight:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self._stats["misses"] += 1
+        return await self._load(key, fetch, ttl, stale_ttl)
+
+    async def _load(self, key, fetch, ttl, stale_ttl) -> Any:
+        """Busca na origem registrando a chamada em voo (single-flight)"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except Exception as e:
+            future.set_exception(e)
+            # Evita "exception never retrieved" quando ninguém mais esperava
+            future.exception()
+            raise
+        else:
+            self._store(key, value, ttl, stale_ttl)
+            future.set_result(value)
+            return value
+        finally:
+            # Líder cancelado (CancelledError não é Exception): libera quem
+            # está esperando em vez de deixar o future pendente para sempre
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _refresh(self, key, fetch, ttl, stale_ttl):
+        try:
+            await self._load(key, fetch, ttl, stale_ttl)
+        except Exception as e:
+            self._stats["refresh_errors"] += 1
+            logger.warning(f"[Cache:{self.name}] Falha ao revalidar {key!r}: {e}")
+
+    def _store(self, key, value, ttl, stale_ttl):
+        now = time.monotonic()
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self._entries[key] = (value, now + ttl, now + ttl + stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Remove uma chave (ou tudo)"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores e hit rate (hits + stale hits + coalesced / total)"""
+        served = (
+            self._stats["hits"] + self._stats["stale_hits"] + self._stats["coalesced"]
+        )
+        total = served + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "hit_rate": round(served / total, 3) if total else 0.0,
+        }
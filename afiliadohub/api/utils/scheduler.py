@@ -2,6 +2,7 @@
 Sistema de agendamento para tarefas periódicas
 """
 
+import os
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -10,6 +11,9 @@ import aiohttp
 
 logger = logging.getLogger(__name__)
 
+ANALYTICS_ROLLUP_REFRESH_MINUTES = int(os.getenv("ANALYTICS_ROLLUP_REFRESH_MINUTES", "5"))
+PRODUCT_SNAPSHOT_REFRESH_MINUTES = int(os.getenv("PRODUCT_SNAPSHOT_REFRESH_MINUTES", "5"))
+
 
 class Scheduler:
     """Agendador de tarefas periódicas"""
@@ -42,6 +46,20 @@ class Scheduler:
         # Backup semanal
         await self.schedule_task("backup", self.create_backup, interval_days=7)
 
+        # Rollups de analytics (só lojas marcadas como sujas pelos triggers)
+        await self.schedule_task(
+            "analytics_rollups",
+            self.refresh_analytics_rollups,
+            interval_minutes=ANALYTICS_ROLLUP_REFRESH_MINUTES,
+        )
+
+        # Snapshot colunar de produtos (analytics/métricas em memória)
+        await self.schedule_task(
+            "product_snapshot",
+            self.refresh_product_snapshot,
+            interval_minutes=PRODUCT_SNAPSHOT_REFRESH_MINUTES,
+        )
+
         # Check daily product feeds (Shopee CSVs)
         await self.schedule_task(
             "product_feeds",
@@ -146,6 +164,30 @@ class Scheduler:
         except Exception as e:
             logger.error(f"[ERRO] Erro na execução da tarefa {task_id}: {e}")
 
+    async def refresh_analytics_rollups(self):
+        """Atualiza os rollups de /api/analytics (RPC refresh_analytics_rollups)"""
+        try:
+            from .supabase_client import get_supabase_manager
+            from ..repositories.analytics_repository import AnalyticsRepository
+
+            repository = AnalyticsRepository(get_supabase_manager().client)
+            result = await repository.refresh_rollups()
+            logger.info(f"[ANALYTICS] Rollups atualizados: {result}")
+
+        except Exception as e:
+            logger.error(f"Erro ao atualizar rollups de analytics: {e}")
+
+    async def refresh_product_snapshot(self):
+        """Reconstrói o snapshot em memória de products + product_stats"""
+        try:
+            from .product_snapshot import product_snapshot
+
+            snapshot = await product_snapshot.refresh()
+            logger.info(f"[ANALYTICS] Snapshot de produtos atualizado: {len(snapshot)} produtos")
+
+        except Exception as e:
+            logger.error(f"Erro ao atualizar snapshot de produtos: {e}")
+
     async def check_prices(self):
         """Verifica e atualiza preços dos produtos"""
         try:
@@ -4,6 +4,8 @@ Implements SHA256 authentication as per Shopee documentation
 """
 
 import os
+import copy
+import asyncio
 import time
 import hashlib
 import json
@@ -14,8 +16,26 @@ from datetime import datetime
 import aiohttp
 from aiohttp import ClientSession, ClientTimeout
 
+from .response_cache import ResponseCache
+from .short_link_store import get_short_link_store, memo_key
+
 logger = logging.getLogger(__name__)
 
+# Cache de productOfferV2 (compartilhado por todos os clientes do processo)
+PRODUCTS_CACHE_ENABLED = os.getenv("SHOPEE_PRODUCTS_CACHE_ENABLED", "true").lower() == "true"
+PRODUCTS_CACHE_DEFAULT_TTL = 300
+# TTL (s) por sort_type: relevância muda rápido, comissão quase não muda
+PRODUCTS_CACHE_TTL_BY_SORT = {
+    1: 300,  # RELEVANCE_DESC
+    2: 900,  # ITEM_SOLD_DESC
+    3: 600,  # PRICE_DESC
+    4: 600,  # PRICE_ASC
+    5: 1800,  # COMMISSION_DESC
+}
+products_cache = ResponseCache(
+    "shopee_products", max_entries=int(os.getenv("SHOPEE_PRODUCTS_CACHE_SIZE", "1000"))
+)
+
 
 class ShopeeAuthError(Exception):
     """Erro de autenticação da API Shopee"""
@@ -135,6 +155,21 @@ class ShopeeAffiliateClient:
         auth_header = f"SHA256 Credential={self.app_id}, Timestamp={timestamp}, Signature={signature}"
         return auth_header
 
+    def _detached_client(self) -> "ShopeeAffiliateClient":
+        """Cliente com as mesmas credenciais e cota do rate limiter, mas sessão própria"""
+        client = ShopeeAffiliateClient(
+            app_id=self.app_id,
+            secret=self.secret,
+            endpoint=self.endpoint,
+            timeout=int(self.timeout.total),
+        )
+        priority = getattr(self, "_rate_limit_priority", None)
+        if priority:
+            from .shopee_extensions import add_rate_limiting
+
+            add_rate_limiting(client, priority=priority)
+        return client
+
     async def graphql_query(
         self,
         query: str,
@@ -227,18 +262,82 @@ class ShopeeAffiliateClient:
     # ==================== QUERIES ESPECÍFICAS ====================
 
     async def generate_short_link(
-        self, origin_url: str, sub_ids: Optional[List[str]] = None
+        self,
+        origin_url: str,
+        sub_ids: Optional[List[str]] = None,
+        use_memo: bool = True,
     ) -> Optional[str]:
         """
         Gera short link de afiliado para um produto
 
+        Links já gerados para o mesmo (app_id, origin_url, sub_ids) vêm do memo
+        local (short_link_store) sem chamar a API.
+
         Args:
             origin_url: URL original do produto Shopee
             sub_ids: Lista de até 5 sub IDs para tracking (opcional)
+            use_memo: False força a mutation na API
 
         Returns:
             Short link gerado ou None se falhar
         """
+        store = get_short_link_store() if use_memo else None
+        key = memo_key(self.app_id, origin_url, sub_ids)
+        if store:
+            cached = await store.get(key)
+            if cached:
+                return cached
+
+        short_link = await self._mutate_short_link(origin_url, sub_ids)
+        if store and short_link:
+            await store.put(key, short_link)
+        return short_link
+
+    async def generate_short_links(
+        self,
+        origin_urls: List[str],
+        sub_ids: Optional[List[str]] = None,
+        concurrency: int = 5,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Gera short links em lote: consulta o memo de uma vez e só chama a
+        API para as URLs ainda não vistas, em paralelo (o rate limiter do
+        cliente continua valendo para cada mutation).
+
+        Returns:
+            Dict origin_url -> short link (None se falhar)
+        """
+        store = get_short_link_store()
+        keys = {url: memo_key(self.app_id, url, sub_ids) for url in origin_urls if url}
+        known = await store.get_many(keys.values())
+        links: Dict[str, Optional[str]] = {
+            url: known.get(key) for url, key in keys.items()
+        }
+        missing = [url for url, link in links.items() if not link]
+
+        if missing:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def generate(url: str) -> Optional[str]:
+                async with semaphore:
+                    return await self._mutate_short_link(url, sub_ids)
+
+            generated = await asyncio.gather(*(generate(url) for url in missing))
+            links.update(zip(missing, generated))
+            await store.put_many(
+                {keys[url]: link for url, link in zip(missing, generated) if link}
+            )
+
+        logger.info(
+            f"[Shopee] Short links: {len(links) - len(missing)} do memo, "
+            f"{len(missing)} gerados"
+        )
+        return links
+
+    async def _mutate_short_link(
+        self, origin_url: str, sub_ids: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """Mutation generateShortLink (sempre chama a API)"""
         # Escapa as aspas na URL
         escaped_url = origin_url.replace('"', '\\"')
 
@@ -389,10 +488,14 @@ class ShopeeAffiliateClient:
         limit: int = 20,
         is_ams_offer: Optional[bool] = None,
         is_key_seller: Optional[bool] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Busca produtos usando productOfferV2
 
+        Respostas ficam em cache por processo (products_cache) com TTL por
+        sort_type, coalescendo buscas idênticas concorrentes.
+
         Args:
             keyword: Palavra-chave para buscar
             shop_id: ID da loja
@@ -408,6 +511,7 @@ class ShopeeAffiliateClient:
             limit: Itens por página (máx 20)
             is_ams_offer: Filtrar ofertas com comissão de vendedor
             is_key_seller: Filtrar vendedores chave
+            use_cache: False força a busca na API
 
         Returns:
             Dict com nodes e pageInfo
@@ -474,8 +578,15 @@ class ShopeeAffiliateClient:
         }}
         """
 
-        try:
-            result = await self.graphql_query(query)
+        async def fetch() -> Dict[str, Any]:
+            if self.session is not None and not self.session.closed:
+                result = await self.graphql_query(query)
+            else:
+                # Revalidação em segundo plano depois do ``async with`` de quem
+                # chamou: usa sessão própria e fecha, em vez de reabrir a deste
+                # cliente e deixá-la aberta
+                async with self._detached_client() as client:
+                    result = await client.graphql_query(query)
 
             if "data" in result and "productOfferV2" in result["data"]:
                 data = result["data"]["productOfferV2"]
@@ -491,6 +602,16 @@ class ShopeeAffiliateClient:
 
             return {"nodes": [], "pageInfo": {}}
 
+        try:
+            if not use_cache or not PRODUCTS_CACHE_ENABLED:
+                return await fetch()
+
+            # Mesma query (keyword/sort/página/filtros) = mesma chave
+            ttl = PRODUCTS_CACHE_TTL_BY_SORT.get(sort_type, PRODUCTS_CACHE_DEFAULT_TTL)
+            result = await products_cache.get_or_fetch(args_str, fetch, ttl=ttl)
+            # Cópia: quem chama pode alterar os nodes sem sujar o cache
+            return copy.deepcopy(result)
+
         except Exception as e:
             logger.error(f"[Shopee] Erro ao buscar produtos: {e}")
             return {"nodes": [], "pageInfo": {}}
@@ -768,7 +889,9 @@ class ShopeeAffiliateClient:
 
 # Função auxiliar para criar cliente
 def create_shopee_client(
-    app_id: Optional[str] = None, secret: Optional[str] = None
+    app_id: Optional[str] = None,
+    secret: Optional[str] = None,
+    priority: Optional[str] = "interactive",
 ) -> ShopeeAffiliateClient:
     """
     Cria cliente Shopee usando variáveis de ambiente ou parâmetros
@@ -776,6 +899,8 @@ def create_shopee_client(
     Args:
         app_id: App ID (usa SHOPEE_APP_ID do .env se não fornecido)
         secret: Secret (usa SHOPEE_APP_SECRET do .env se não fornecido)
+        priority: Classe no rate limiter compartilhado ("interactive" para
+            bot/API, "batch" para imports e campanhas; None desativa)
 
     Returns:
         Cliente configurado
@@ -791,4 +916,10 @@ def create_shopee_client(
             "SHOPEE_APP_ID e SHOPEE_APP_SECRET devem ser configurados no .env"
         )
 
-    return ShopeeAffiliateClient(app_id=app_id, secret=secret, endpoint=endpoint)
+    client = ShopeeAffiliateClient(app_id=app_id, secret=secret, endpoint=endpoint)
+    if priority:
+        # Cota de 2000 req/h dividida entre API, bot e scripts (token bucket)
+        from .shopee_extensions import add_rate_limiting
+
+        add_rate_limiting(client, priority=priority)
+    return client
@@ -3,76 +3,139 @@ Shopee API - Rate Limiting & ScrollId Extensions
 Adiciona funcionalidades avançadas ao cliente Shopee
 """
 
+import os
 import asyncio
 import time
-from typing import Dict, Any, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 
+from .token_bucket import create_bucket_store
+
 logger = logging.getLogger(__name__)
 
 
+# Classes de prioridade: comandos interativos do bot/API passam na frente de lotes
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+
+# Buscas simultâneas por campanha (cada request ainda passa pelo limiter)
+SHOPEE_FETCH_CONCURRENCY = int(os.getenv("SHOPEE_FETCH_CONCURRENCY", "3"))
+
+
 class RateLimiter:
     """
-    Rate limiter para API Shopee (2000 requests/hora)
+    Rate limiter para API Shopee (2000 requests/hora) em token bucket.
+
+    - acquire() é O(1): refill contínuo (2000/h ≈ 0,56 token/s), sem
+      janela fixa nem listas de timestamps
+    - lotes (imports, campanhas) não consomem os últimos
+      ``INTERACTIVE_RESERVE`` tokens, reservados para comandos interativos
+    - o estado fica em um store compartilhado (SQLite/Redis, ver
+      token_bucket.create_bucket_store), então API, bot e scripts de cron
+      dividem a mesma cota
     """
 
     MAX_REQUESTS_PER_HOUR = 2000
     WINDOW_SECONDS = 3600  # 1 hora
+    INTERACTIVE_RESERVE = int(os.getenv("SHOPEE_INTERACTIVE_RESERVE", "200"))
+    BUCKET_KEY = "shopee:graphql"
+
+    def __init__(self, store=None):
+        self.store = store or create_bucket_store()
+        self.rate = self.MAX_REQUESTS_PER_HOUR / self.WINDOW_SECONDS
+        self._local = {
+            PRIORITY_INTERACTIVE: 0,
+            PRIORITY_BATCH: 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+        }
 
-    def __init__(self):
-        self._requests: List[float] = []
-        self._lock = asyncio.Lock()
-
-    async def acquire(self) -> None:
+    async def acquire(self, priority: str = PRIORITY_INTERACTIVE) -> None:
         """
         Aguarda até que seja seguro fazer uma request
         Bloqueia automaticamente se limite atingido
         """
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.WINDOW_SECONDS
-
-            # Remove requests antigas
-            self._requests = [ts for ts in self._requests if ts > cutoff]
-
-            # Se atingiu limite, aguarda
-            if len(self._requests) >= self.MAX_REQUESTS_PER_HOUR:
-                oldest = self._requests[0]
-                wait_time = self.WINDOW_SECONDS - (now - oldest)
-
-                if wait_time > 0:
-                    logger.warning(
-                        f"⚠️ Rate limit atingido! " f"Aguardando {wait_time:.0f}s..."
-                    )
-                    await asyncio.sleep(wait_time + 1)
-                    self._requests.clear()
-
-            # Registra request
-            self._requests.append(time.time())
-
-    def get_status(self) -> Dict[str, Any]:
-        """Retorna status do rate limit"""
-        now = time.time()
-        cutoff = now - self.WINDOW_SECONDS
-
-        valid = [ts for ts in self._requests if ts > cutoff]
-        used = len(valid)
+        floor = self.INTERACTIVE_RESERVE if priority == PRIORITY_BATCH else 0
+        while True:
+            granted, _, wait = await self.store.take(
+                self.BUCKET_KEY, 1, self.MAX_REQUESTS_PER_HOUR, self.rate, floor
+            )
+            if granted:
+                self._local[priority] = self._local.get(priority, 0) + 1
+                return
+
+            # Espera só o necessário para o próximo token (não a janela inteira)
+            self._local["throttled"] += 1
+            self._local["wait_seconds"] += wait
+            if wait > 5:
+                logger.warning(
+                    f"⚠️ Rate limit atingido ({priority})! Aguardando {wait:.0f}s..."
+                )
+            await asyncio.sleep(wait)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Retorna status do rate limit (uso real somado de todos os processos)"""
+        level = await self.store.level(
+            self.BUCKET_KEY, self.MAX_REQUESTS_PER_HOUR, self.rate
+        )
+        used = int(round(self.MAX_REQUESTS_PER_HOUR - level))
         remaining = self.MAX_REQUESTS_PER_HOUR - used
 
-        reset_in = 0
-        if valid:
-            oldest = min(valid)
-            reset_in = max(0, self.WINDOW_SECONDS - (now - oldest))
-
         return {
             "used": used,
             "remaining": remaining,
             "total": self.MAX_REQUESTS_PER_HOUR,
-            "reset_in_seconds": int(reset_in),
+            "reset_in_seconds": int(used / self.rate),
             "percentage_used": (used / self.MAX_REQUESTS_PER_HOUR) * 100,
+            "interactive_reserve": self.INTERACTIVE_RESERVE,
+            "backend": self.store.name,
+            "this_process": dict(self._local),
         }
 
 
+_shared_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limiter único por processo (o estado do bucket fica no store)"""
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        _shared_rate_limiter = RateLimiter()
+    return _shared_rate_limiter
+
+
+async def prefetch_in_order(
+    items: List[Any],
+    fetch: Callable[[Any], Awaitable[Any]],
+    concurrency: int = SHOPEE_FETCH_CONCURRENCY,
+) -> AsyncIterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Dispara ``fetch(item)`` para todos os itens (no máximo ``concurrency``
+    ao mesmo tempo) e entrega ``(item, resultado, erro)`` na ordem original
+    assim que cada um fica pronto.
+
+    Separa a busca (limitada pela cota da Shopee) do envio (ritmo do
+    Telegram): o primeiro item é enviado enquanto os demais ainda buscam.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(item):
+        async with semaphore:
+            return await fetch(item)
+
+    tasks = [asyncio.create_task(bounded(item)) for item in items]
+    try:
+        for item, task in zip(items, tasks):
+            try:
+                yield item, await task, None
+            except Exception as e:
+                yield item, None, e
+    finally:
+        # Consumidor saiu antes do fim: não deixa buscas órfãs
+        for task in tasks:
+            task.cancel()
+
+
 class ScrollIdPaginator:
     """
     Paginador usando scrollId (válido por 30 segundos)
@@ -190,25 +253,26 @@ async def get_all_conversions(
 
 
 # Integração no cliente
-def add_rate_limiting(client):
+def add_rate_limiting(client, priority: str = PRIORITY_INTERACTIVE):
     """
     Adiciona rate limiting a um ShopeeAffiliateClient existente
 
     Usage:
         client = create_shopee_client()
-        add_rate_limiting(client)
+        add_rate_limiting(client, priority=PRIORITY_BATCH)
     """
     if not hasattr(client, "_rate_limiter"):
-        client._rate_limiter = RateLimiter()
+        client._rate_limiter = get_rate_limiter()
+        client._rate_limit_priority = priority
 
         # Wrap graphql_query original
         original_query = client.graphql_query
 
         async def rate_limited_query(query, variables=None, operation_name=None):
-            await client._rate_limiter.acquire()
+            await client._rate_limiter.acquire(client._rate_limit_priority)
             return await original_query(query, variables, operation_name)
 
         client.graphql_query = rate_limited_query
-        client.get_rate_limit_status = lambda: client._rate_limiter.get_status()
+        client.get_rate_limit_status = client._rate_limiter.get_status
 
-        logger.info("[OK] Rate limiting ativado (2000 req/h)")
+        logger.debug(f"[OK] Rate limiting ativado (2000 req/h, {priority})")
@@ -8,18 +8,23 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
-from ..api.utils.shopee_client import create_shopee_client, ShopeeAffiliateClient
-from ..api.utils.supabase_client import get_supabase_manager, SupabaseManager
+from .data_versions import data_versions
+from .quality_score import score_products
+from .shopee_client import create_shopee_client, ShopeeAffiliateClient
+from .supabase_client import get_supabase_manager, SupabaseManager
 
 logger = logging.getLogger(__name__)
 
+# Produtos por upsert no modo em lote (1 upsert + 1 insert em product_stats)
+DEFAULT_UPSERT_BATCH_SIZE = 500
+
 
 class ShopeeProductImporter:
     """
     Importador de produtos da Shopee para Supabase
 
     Features:
-    - Importação em lote
+    - Importação em lote (upsert por página, sem SELECT por produto)
     - Atualização de produtos existentes
     - Detecção de mudanças de preço
     - Tracking de comissões
@@ -38,7 +43,7 @@ class ShopeeProductImporter:
             shopee_client: Cliente Shopee (cria novo se não fornecido)
             supabase_manager: Manager Supabase (cria novo se não fornecido)
         """
-        self.shopee = shopee_client or create_shopee_client()
+        self.shopee = shopee_client or create_shopee_client(priority="batch")
         self.supabase = supabase_manager or get_supabase_manager()
 
         logger.info("[ShopeeImporter] Importer inicializado")
@@ -99,8 +104,23 @@ class ShopeeProductImporter:
 
         return product_data
 
+    @staticmethod
+    def _set_quality_scores(
+        products_data: List[Dict[str, Any]], shopee_products: List[Dict[str, Any]]
+    ):
+        """Preenche quality_score dos produtos mapeados com um único cálculo em lote"""
+        scores = score_products(
+            [{**raw, **mapped} for raw, mapped in zip(shopee_products, products_data)]
+        )
+        for product_data, score in zip(products_data, scores.tolist()):
+            product_data["quality_score"] = score
+
     async def import_all_products(
-        self, limit: int = 100, min_commission: float = 0.0
+        self,
+        limit: int = 100,
+        min_commission: float = 0.0,
+        batched: bool = True,
+        batch_size: int = DEFAULT_UPSERT_BATCH_SIZE,
     ) -> Dict[str, Any]:
         """
         Importa todos os produtos disponíveis da Shopee
@@ -108,12 +128,15 @@ class ShopeeProductImporter:
         Args:
             limit: Número máximo de produtos a importar
             min_commission: Comissão mínima em % para filtrar
+            batched: Usa upsert em lote por página (False = produto a produto)
+            batch_size: Produtos por upsert no modo em lote
 
         Returns:
             Dict com estatísticas da importação
         """
         logger.info(
-            f"[ShopeeImporter] Iniciando importação (limit={limit}, min_commission={min_commission}%)"
+            f"[ShopeeImporter] Iniciando importação (limit={limit}, min_commission={min_commission}%, "
+            f"batched={batched})"
         )
 
         stats = {
@@ -137,36 +160,16 @@ class ShopeeProductImporter:
                 f"[ShopeeImporter] {len(shopee_products)} produtos recebidos da API"
             )
 
-            # Importa cada produto
-            for shopee_product in shopee_products:
-                try:
-                    product_data = self._map_shopee_to_product(shopee_product)
-
-                    # Verifica se produto já existe
-                    existing = await self._find_existing_product(
-                        shopee_product.get("productId")
-                    )
-
-                    if existing:
-                        # Atualiza produto existente
-                        await self._update_product(existing["id"], product_data)
-                        stats["updated"] += 1
-                        logger.debug(
-                            f"[ShopeeImporter] Produto {existing['id']} atualizado"
-                        )
-                    else:
-                        # Insere novo produto
-                        result = await self.supabase.insert_product(product_data)
-                        stats["imported"] += 1
-                        logger.debug(
-                            f"[ShopeeImporter] Produto {result['id']} importado"
-                        )
-
-                except Exception as e:
-                    stats["errors"] += 1
-                    error_msg = f"Erro ao processar produto {shopee_product.get('productId')}: {e}"
-                    stats["error_messages"].append(error_msg)
-                    logger.error(f"[ShopeeImporter] {error_msg}")
+            if batched:
+                for i in range(0, len(shopee_products), batch_size):
+                    page = shopee_products[i : i + batch_size]
+                    page_stats = await self._import_page(page)
+                    for key in ("imported", "updated", "errors"):
+                        stats[key] += page_stats[key]
+                    stats["error_messages"].extend(page_stats["error_messages"])
+            else:
+                for shopee_product in shopee_products:
+                    await self._import_one(shopee_product, stats)
 
             # Loga resultado no Supabase
             await self._log_sync_result("import_all", stats)
@@ -190,6 +193,140 @@ class ShopeeProductImporter:
 
         return stats
 
+    async def _import_page(
+        self, shopee_products: List[Dict[str, Any]], featured: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Importa uma página inteira com poucos round-trips:
+        1 SELECT de ids existentes, 1 upsert em products e 1 insert em product_stats.
+
+        Se o upsert em lote falhar (ex.: affiliate_link duplicado de outra origem),
+        cai para o caminho produto a produto apenas nesta página.
+        """
+        stats = {"imported": 0, "updated": 0, "errors": 0, "error_messages": []}
+
+        # Mapeia e deduplica por shopee_product_id (ON CONFLICT não aceita repetidos)
+        by_id: Dict[Any, Dict[str, Any]] = {}
+        raw_by_id: Dict[Any, Dict[str, Any]] = {}
+        for shopee_product in shopee_products:
+            try:
+                product_data = self._map_shopee_to_product(shopee_product)
+                if featured:
+                    product_data["is_featured"] = True
+                if product_data.get("shopee_product_id") is None:
+                    raise ValueError("productId ausente")
+                by_id[product_data["shopee_product_id"]] = product_data
+                raw_by_id[product_data["shopee_product_id"]] = shopee_product
+            except Exception as e:
+                stats["errors"] += 1
+                stats["error_messages"].append(
+                    f"Erro ao mapear produto {shopee_product.get('productId')}: {e}"
+                )
+
+        if not by_id:
+            return stats
+
+        self._set_quality_scores(list(by_id.values()), list(raw_by_id.values()))
+
+        try:
+            upserted, new_ids = await self._upsert_products(list(by_id.values()))
+            stats["imported"] += len(new_ids)
+            stats["updated"] += len(upserted) - len(new_ids)
+            logger.debug(
+                f"[ShopeeImporter] Página: {len(new_ids)} novos, "
+                f"{len(upserted) - len(new_ids)} atualizados"
+            )
+        except Exception as e:
+            logger.warning(
+                f"[ShopeeImporter] Upsert em lote falhou ({e}); "
+                f"reprocessando {len(by_id)} produtos individualmente"
+            )
+            for shopee_product in raw_by_id.values():
+                await self._import_one(shopee_product, stats, featured=featured)
+
+        return stats
+
+    async def _upsert_products(self, products_data: List[Dict[str, Any]]):
+        """
+        Upsert em lote por shopee_product_id.
+
+        Returns:
+            (linhas retornadas pelo upsert, ids dos produtos que não existiam)
+        """
+        shopee_ids = [p["shopee_product_id"] for p in products_data]
+        now = datetime.now().isoformat()
+        for product in products_data:
+            product["updated_at"] = now
+            product["last_checked"] = now
+
+        existing = await self.supabase.execute(
+            self.supabase.client.table("products")
+            .select("shopee_product_id")
+            .in_("shopee_product_id", shopee_ids)
+        )
+        existing_ids = {row["shopee_product_id"] for row in existing.data or []}
+
+        response = await self.supabase.execute(
+            self.supabase.client.table("products").upsert(
+                products_data, on_conflict="shopee_product_id"
+            )
+        )
+        rows = response.data or []
+        new_ids = [
+            row["id"] for row in rows if row.get("shopee_product_id") not in existing_ids
+        ]
+
+        if new_ids:
+            # ignore_duplicates: outra importação concorrente pode ter criado o stats
+            await self.supabase.execute(
+                self.supabase.client.table("product_stats").upsert(
+                    [{"product_id": pid, "created_at": now} for pid in new_ids],
+                    on_conflict="product_id",
+                    ignore_duplicates=True,
+                )
+            )
+            data_versions.bump("stats")
+
+        data_versions.bump("products")
+        return rows, new_ids
+
+    async def _import_one(
+        self,
+        shopee_product: Dict[str, Any],
+        stats: Dict[str, Any],
+        featured: bool = False,
+    ):
+        """Caminho produto a produto (SELECT + UPDATE/INSERT)"""
+        try:
+            product_data = self._map_shopee_to_product(shopee_product)
+            if featured:
+                product_data["is_featured"] = True
+            self._set_quality_scores([product_data], [shopee_product])
+
+            # Verifica se produto já existe
+            existing = await self._find_existing_product(
+                shopee_product.get("productId")
+            )
+
+            if existing:
+                # Atualiza produto existente
+                await self._update_product(existing["id"], product_data)
+                stats["updated"] += 1
+                logger.debug(f"[ShopeeImporter] Produto {existing['id']} atualizado")
+            else:
+                # Insere novo produto
+                result = await self.supabase.insert_product(product_data)
+                stats["imported"] += 1
+                logger.debug(f"[ShopeeImporter] Produto {result['id']} importado")
+
+        except Exception as e:
+            stats["errors"] += 1
+            error_msg = (
+                f"Erro ao processar produto {shopee_product.get('productId')}: {e}"
+            )
+            stats["error_messages"].append(error_msg)
+            logger.error(f"[ShopeeImporter] {error_msg}")
+
     async def update_existing_products(self, hours_old: int = 24) -> Dict[str, Any]:
         """
         Atualiza produtos existentes que estão desatualizados
@@ -281,33 +418,18 @@ class ShopeeProductImporter:
 
             logger.info(f"[ShopeeImporter] {len(offers)} ofertas encontradas")
 
-            # Importa produtos de cada oferta
+            # Importa produtos de cada oferta (uma página por oferta)
             for offer in offers:
                 products = offer.get("products", [])
-
                 for product in products:
                     # Adiciona taxa de comissão da oferta
                     product["commissionRate"] = offer.get("commissionRate", 0)
 
-                    try:
-                        product_data = self._map_shopee_to_product(product)
-
-                        # Marca como featured (produto em oferta de marca)
-                        product_data["is_featured"] = True
-
-                        existing = await self._find_existing_product(
-                            product.get("productId")
-                        )
-
-                        if existing:
-                            await self._update_product(existing["id"], product_data)
-                        else:
-                            await self.supabase.insert_product(product_data)
-                            stats["imported"] += 1
-
-                    except Exception as e:
-                        stats["errors"] += 1
-                        stats["error_messages"].append(f"Erro: {e}")
+                # Marca como featured (produto em oferta de marca)
+                page_stats = await self._import_page(products, featured=True)
+                stats["imported"] += page_stats["imported"]
+                stats["errors"] += page_stats["errors"]
+                stats["error_messages"].extend(page_stats["error_messages"])
 
             await self._log_sync_result("brand_offers", stats)
 
@@ -328,12 +450,11 @@ class ShopeeProductImporter:
     ) -> Optional[Dict[str, Any]]:
         """Busca produto existente por shopee_product_id"""
         try:
-            response = (
+            response = await self.supabase.execute(
                 self.supabase.client.table("products")
                 .select("*")
                 .eq("shopee_product_id", shopee_product_id)
                 .limit(1)
-                .execute()
             )
 
             return response.data[0] if response.data else None
@@ -345,9 +466,12 @@ class ShopeeProductImporter:
         new_data["updated_at"] = datetime.now().isoformat()
         new_data["last_checked"] = datetime.now().isoformat()
 
-        self.supabase.client.table("products").update(new_data).eq(
-            "id", product_id
-        ).execute()
+        await self.supabase.execute(
+            self.supabase.client.table("products")
+            .update(new_data)
+            .eq("id", product_id)
+        )
+        data_versions.bump("products")
 
     async def _log_sync_result(self, sync_type: str, stats: Dict[str, Any]):
         """Loga resultado da sincronização no Supabase"""
@@ -4,6 +4,8 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 
+from .http_clients import borrow_http_session, http_clients
+
 logger = logging.getLogger(__name__)
 
 class ShopeePublicAPI:
@@ -21,8 +23,8 @@ class ShopeePublicAPI:
 
     async def __aenter__(self):
         if not self.session:
-            self.session = aiohttp.ClientSession()
-            self._own_session = True
+            # Sessão compartilhada do processo: não é fechada no __aexit__
+            self.session = http_clients.session
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -42,7 +44,7 @@ class ShopeePublicAPI:
             }
 
             if not self.session:
-                async with aiohttp.ClientSession() as session:
+                async with borrow_http_session() as session:
                     async with session.get(url, params=params, headers=headers) as response:
                         logger.info(f"[Shopee Public API] Details Response: {response.status}")
                         if response.status == 200:
@@ -99,7 +101,7 @@ class ShopeePublicAPI:
             }
 
             if not self.session:
-                async with aiohttp.ClientSession() as session:
+                async with borrow_http_session() as session:
                     async with session.get(url, params=params, headers=headers) as response:
                         logger.info(f"[Shopee Public API] Reviews Response: {response.status}")
                         if response.status == 200:
@@ -0,0 +1,177 @@
+"""
+Memo persistente de short links da Shopee.
+
+``(app_id, origin_url, sub_ids) -> shortLink`` fica em uma tabela SQLite local com
+um LRU em memória na frente. O mesmo link gerado pelo bot, pela API e pelos
+scripts de campanha deixa de custar uma mutation (e cota) a cada envio.
+O app_id entra na chave: o short link carrega a conta de afiliado que o
+gerou, então trocar SHOPEE_APP_ID não pode reaproveitar links da conta antiga.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHORT_LINK_STORE = os.getenv(
+    "SHORT_LINK_STORE",
+    os.path.join(tempfile.gettempdir(), "afiliadohub_short_links.sqlite3"),
+)
+SHORT_LINK_TTL_DAYS = int(os.getenv("SHORT_LINK_TTL_DAYS", "30"))
+SHORT_LINK_LRU_SIZE = int(os.getenv("SHORT_LINK_LRU_SIZE", "5000"))
+
+# (app_id, origin_url, sub_ids normalizados)
+MemoKey = Tuple[str, str, str]
+
+
+def memo_key(
+    app_id: str, origin_url: str, sub_ids: Optional[List[str]] = None
+) -> MemoKey:
+    """Chave do memo: a Shopee usa no máximo 5 sub IDs, na ordem dada"""
+    return str(app_id or ""), origin_url.strip(), ",".join(sub_ids[:5]) if sub_ids else ""
+
+
+class ShortLinkStore:
+    """SQLite (compartilhado entre processos do host) + LRU em memória"""
+
+    def __init__(
+        self,
+        path: str = SHORT_LINK_STORE,
+        ttl_days: int = SHORT_LINK_TTL_DAYS,
+        lru_size: int = SHORT_LINK_LRU_SIZE,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[MemoKey, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0}
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(
+                path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(short_links)")
+            }
+            if columns and "app_id" not in columns:
+                # Memo antigo sem app_id: não dá para saber de qual conta é
+                logger.info("[ShortLinks] Memo sem app_id descartado")
+                self._conn.execute("DROP TABLE short_links")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS short_links ("
+                "app_id TEXT NOT NULL, origin_url TEXT NOT NULL, sub_ids TEXT NOT NULL, "
+                "short_link TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (app_id, origin_url, sub_ids))"
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"[ShortLinks] SQLite indisponível ({e}), memo só em memória")
+            self._conn = None
+
+    # ==================== LRU ====================
+
+    def _remember(self, key: MemoKey, short_link: str, created_at: float):
+        self._lru[key] = (short_link, created_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    # ==================== SQLITE ====================
+
+    def _get_many_sync(self, keys: List[MemoKey]) -> Dict[MemoKey, Tuple[str, float]]:
+        if self._conn is None or not keys:
+            return {}
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT short_link, created_at FROM short_links "
+                    "WHERE app_id = ? AND origin_url = ? AND sub_ids = ?",
+                    key,
+                ).fetchone()
+                if row:
+                    found[key] = row
+        return found
+
+    def _put_many_sync(self, rows: List[Tuple[str, str, str, str, float]]):
+        if self._conn is None or not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO short_links "
+                "(app_id, origin_url, sub_ids, short_link, created_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(app_id, origin_url, sub_ids) DO UPDATE SET "
+                "short_link = excluded.short_link, created_at = excluded.created_at",
+                rows,
+            )
+
+    # ==================== API ====================
+
+    async def get_many(self, keys: Iterable[MemoKey]) -> Dict[MemoKey, str]:
+        """Short links já conhecidos (e dentro do TTL) para as chaves dadas"""
+        now = time.time()
+        found: Dict[MemoKey, str] = {}
+        pending: List[MemoKey] = []
+
+        for key in dict.fromkeys(keys):
+            cached = self._lru.get(key)
+            if cached and now - cached[1] < self.ttl_seconds:
+                self._lru.move_to_end(key)
+                found[key] = cached[0]
+                self._stats["memory_hits"] += 1
+            else:
+                pending.append(key)
+
+        if pending:
+            rows = await asyncio.to_thread(self._get_many_sync, pending)
+            for key in pending:
+                row = rows.get(key)
+                if row and now - row[1] < self.ttl_seconds:
+                    self._remember(key, row[0], row[1])
+                    found[key] = row[0]
+                    self._stats["disk_hits"] += 1
+                else:
+                    self._stats["misses"] += 1
+
+        return found
+
+    async def get(self, key: MemoKey) -> Optional[str]:
+        return (await self.get_many([key])).get(key)
+
+    async def put_many(self, links: Dict[MemoKey, str]):
+        """Grava short links recém-gerados (memória + disco)"""
+        now = time.time()
+        rows = []
+        for key, short_link in links.items():
+            if not short_link:
+                continue
+            self._remember(key, short_link, now)
+            rows.append((*key, short_link, now))
+        if rows:
+            self._stats["stored"] += len(rows)
+            await asyncio.to_thread(self._put_many_sync, rows)
+
+    async def put(self, key: MemoKey, short_link: str):
+        await self.put_many({key: short_link})
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "memory_size": len(self._lru)}
+
+
+_short_link_store: Optional[ShortLinkStore] = None
+
+
+def get_short_link_store() -> ShortLinkStore:
+    """Store único por processo"""
+    global _short_link_store
+    if _short_link_store is None:
+        _short_link_store = ShortLinkStore()
+    return _short_link_store
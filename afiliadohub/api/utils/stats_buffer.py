@@ -0,0 +1,140 @@
+"""
+Buffer em processo para contadores de produto (views, cliques, envios).
+
+Cada ``add`` só soma em memória; um flush periódico grava tudo de uma vez
+com um upsert em lote no servidor (``count = count + excluded.count``).
+Produto quente recebendo 100 envios entre dois flushes vira 1 linha no
+lote, não 100 escritas. Se o flush falhar, os incrementos voltam para o
+buffer e seguem no próximo (pelo menos uma vez: um erro depois do commit
+faz o lote ser contado de novo).
+
+Processos fora da API (workers e scripts) precisam chamar
+``SupabaseManager.flush_product_stats()`` ao fim de cada lote e antes de
+sair; só o lifespan da API faz isso sozinho.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "10"))
+STATS_FLUSH_MAX_PRODUCTS = int(os.getenv("STATS_FLUSH_MAX_PRODUCTS", "500"))
+
+STAT_FIELDS = ("view_count", "click_count", "telegram_send_count")
+
+
+class StatsFlushError(Exception):
+    """Flush parcial: ``rows`` traz só os incrementos que não foram gravados"""
+
+    def __init__(self, message: str, rows: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.rows = rows
+
+
+class StatsBuffer:
+    """Agrega incrementos por produto e grava em lote"""
+
+    def __init__(
+        self,
+        flush: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        interval: float = STATS_FLUSH_INTERVAL,
+        max_products: int = STATS_FLUSH_MAX_PRODUCTS,
+    ):
+        self._flush = flush
+        self.interval = interval
+        self.max_products = max_products
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._immediate: Set[asyncio.Task] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = {"increments": 0, "flushes": 0, "rows_written": 0, "flush_errors": 0}
+
+    def add(self, product_id: Any, stat_type: str, increment: int = 1):
+        """Soma o incremento em memória e agenda o flush"""
+        if stat_type not in STAT_FIELDS:
+            raise ValueError(f"Estatística inválida: {stat_type}")
+
+        row = self._pending.get(product_id)
+        if row is None:
+            row = self._pending[product_id] = {
+                "product_id": product_id,
+                **{field: 0 for field in STAT_FIELDS},
+                "last_sent": None,
+            }
+        row[stat_type] += increment
+        if stat_type == "telegram_send_count":
+            row["last_sent"] = datetime.utcnow().isoformat()
+        self._stats["increments"] += 1
+
+        self._schedule(immediate=len(self._pending) >= self.max_products)
+
+    def _schedule(self, immediate: bool = False):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # fora de um loop: fica para o próximo flush explícito
+        if immediate:
+            task = asyncio.create_task(self.flush())
+            self._immediate.add(task)
+            task.add_done_callback(self._immediate.discard)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Vive só enquanto há incrementos pendentes"""
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Grava o que estiver pendente; retorna quantas linhas foram enviadas"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._pending:
+                return 0
+            rows, self._pending = list(self._pending.values()), {}
+            try:
+                await self._flush(rows)
+            except StatsFlushError as e:
+                # O que já foi gravado não volta (senão contaria em dobro)
+                self._stats["flush_errors"] += 1
+                written = len(rows) - len(e.rows)
+                logger.error(
+                    f"[Stats] Flush parcial ({len(e.rows)} de {len(rows)} produtos pendentes): {e}"
+                )
+                self._restore(e.rows)
+                self._stats["rows_written"] += written
+                return written
+            except Exception as e:
+                self._stats["flush_errors"] += 1
+                logger.error(f"[Stats] Erro no flush ({len(rows)} produtos): {e}")
+                self._restore(rows)
+                return 0
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(rows)
+            return len(rows)
+
+    def _restore(self, rows: List[Dict[str, Any]]):
+        """Devolve ao buffer os incrementos de um flush que falhou"""
+        for row in rows:
+            current = self._pending.get(row["product_id"])
+            if current is None:
+                self._pending[row["product_id"]] = row
+                continue
+            for field in STAT_FIELDS:
+                current[field] += row[field]
+            current["last_sent"] = current["last_sent"] or row["last_sent"]
+
+    async def stop(self) -> int:
+        """Flush final (shutdown)"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        return await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending_products": len(self._pending)}
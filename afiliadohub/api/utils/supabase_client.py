@@ -1,17 +1,78 @@
 import os
+import json
+import time
+import base64
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import importlib.util
 
+import httpx
 from supabase import create_client, Client
 
+from .data_versions import data_versions
+from .field_sets import product_select
+from .keyset import apply_keyset, decode_cursor, keyset_columns, paginate
+from .stats_buffer import STAT_FIELDS, StatsBuffer, StatsFlushError
+
+try:
+    from supabase.lib.client_options import SyncClientOptions
+except ImportError:  # supabase < 2.10 não expõe httpx_client
+    SyncClientOptions = None
+
 logger = logging.getLogger(__name__)
 
+# Tamanho do pool de threads/conexões usado para tirar o I/O do event loop
+DB_POOL_SIZE = int(os.getenv("SUPABASE_DB_POOL_SIZE", "16"))
+DB_TIMEOUT = float(os.getenv("SUPABASE_DB_TIMEOUT", "30"))
+
+# Cache de clients autenticados (RLS): máximo de tokens e margem antes do exp do JWT
+AUTH_CLIENT_CACHE_SIZE = int(os.getenv("SUPABASE_AUTH_CLIENT_CACHE_SIZE", "128"))
+AUTH_CLIENT_EXP_LEEWAY = 30  # segundos
+AUTH_CLIENT_DEFAULT_TTL = 300  # quando o token não tem "exp"
+
+# PostgREST: função/coluna não encontrada no schema (migration ainda não aplicada)
+MISSING_RPC_CODE = "PGRST202"
+MISSING_COLUMN_CODE = "PGRST204"
+
+
+def _jwt_expiry(token: str) -> Optional[float]:
+    """Lê o claim ``exp`` do JWT (sem validar assinatura — só para expirar o cache)"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+def _is_missing_rpc(error: Exception) -> bool:
+    """True só quando a RPC não existe; timeouts e violações de constraint não contam"""
+    return getattr(error, "code", None) == MISSING_RPC_CODE or MISSING_RPC_CODE in str(error)
+
+
+def _is_missing_column(error: Exception) -> bool:
+    """True só quando o payload usa uma coluna que o schema ainda não tem"""
+    return getattr(error, "code", None) == MISSING_COLUMN_CODE or MISSING_COLUMN_CODE in str(
+        error
+    )
+
 
 class SupabaseManager:
     _instance = None
     _client = None
+    _http_client = None
+    _http2_available = False
+    _executor = None
+    _auth_clients = None
+    _auth_lock = threading.Lock()
+    _auth_stats = None
+    _stats_buffer = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -27,30 +88,156 @@ class SupabaseManager:
         if not url or not key:
             raise ValueError("SUPABASE_URL e SUPABASE_KEY devem ser configurados")
 
+        if self._auth_clients is None:
+            self._auth_clients = OrderedDict()
+            self._auth_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
         try:
-            self._client = create_client(url, key)
-            logger.info("[Supabase] Cliente inicializado")
+            options = self._build_client_options()
+            if options is not None:
+                self._client = create_client(url, key, options)
+            else:
+                self._client = create_client(url, key)
+            logger.info(
+                f"[Supabase] Cliente inicializado (pool={DB_POOL_SIZE}, "
+                f"http2_available={self._http2_available})"
+            )
         except Exception as e:
             logger.error(f"[Supabase] Erro ao inicializar cliente: {e}")
             raise
 
+    def _build_client_options(self):
+        """Cria opções com um pool HTTP/2 compartilhado (quando suportado)"""
+        if SyncClientOptions is None or "httpx_client" not in getattr(
+            SyncClientOptions, "__dataclass_fields__", {}
+        ):
+            return None
+
+        if self._http_client is None:
+            limits = httpx.Limits(
+                max_connections=DB_POOL_SIZE,
+                max_keepalive_connections=DB_POOL_SIZE,
+                keepalive_expiry=60.0,
+            )
+            # Sem o pacote h2 o httpx fica em HTTP/1.1. Com ele, HTTP/2 só é
+            # usado se o servidor negociar (ALPN); aqui registramos a disponibilidade.
+            self._http2_available = importlib.util.find_spec("h2") is not None
+            self._http_client = httpx.Client(
+                http2=self._http2_available,
+                limits=limits,
+                timeout=DB_TIMEOUT,
+                follow_redirects=True,
+            )
+        return SyncClientOptions(httpx_client=self._http_client)
+
     @property
     def client(self) -> Client:
         if self._client is None:
             self._initialize()
         return self._client
 
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool limitado de threads onde as chamadas síncronas do PostgREST rodam"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=DB_POOL_SIZE, thread_name_prefix="supabase-db"
+            )
+        return self._executor
+
+    async def execute(self, query):
+        """
+        Executa um query builder do Supabase fora do event loop.
+
+        Uso: ``response = await manager.execute(client.table("x").select("*"))``
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, query.execute)
+
+    async def run_sync(self, func, *args):
+        """Executa qualquer função bloqueante no pool do banco"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        """Libera o pool de threads e as conexões HTTP (chamado no shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+            self._http2_available = False
+            self._client = None
+        with self._auth_lock:
+            if self._auth_clients:
+                self._auth_clients.clear()
+
     def get_authenticated_client(self, token: str) -> Client:
-        """Retorna um cliente Supabase autenticado com o token do usuário (para RLS)"""
+        """
+        Retorna um cliente Supabase autenticado com o token do usuário (para RLS).
+
+        Os clients ficam em um cache LRU por token, expiram junto com o ``exp``
+        do JWT e compartilham o mesmo pool HTTP do client principal.
+
+        Raises:
+            ValueError: sem token (o client principal ignora RLS; use ``client``
+                explicitamente quando for essa a intenção)
+        """
+        if not token:
+            raise ValueError("Token do usuário é obrigatório para o client autenticado")
+
+        now = time.time()
+        with self._auth_lock:
+            entry = self._auth_clients.get(token)
+            if entry is not None:
+                client, expires_at = entry
+                if expires_at > now:
+                    self._auth_clients.move_to_end(token)
+                    self._auth_stats["hits"] += 1
+                    return client
+                del self._auth_clients[token]
+                self._auth_stats["expired"] += 1
+            self._auth_stats["misses"] += 1
+
         url = os.getenv("SUPABASE_URL")
         key = os.getenv("SUPABASE_KEY")
 
-        # Cria novo client
-        client = create_client(url, key)
+        # Cria novo client (opções novas por token: headers não podem vazar entre usuários)
+        options = self._build_client_options()
+        client = create_client(url, key, options) if options else create_client(url, key)
         # Define o token de autorização apenas para o PostgREST (operações de banco de dados)
         client.postgrest.auth(token)
+
+        exp = _jwt_expiry(token)
+        expires_at = (
+            exp - AUTH_CLIENT_EXP_LEEWAY if exp else now + AUTH_CLIENT_DEFAULT_TTL
+        )
+        with self._auth_lock:
+            self._auth_clients[token] = (client, expires_at)
+            self._auth_clients.move_to_end(token)
+            while len(self._auth_clients) > AUTH_CLIENT_CACHE_SIZE:
+                self._auth_clients.popitem(last=False)
+                self._auth_stats["evictions"] += 1
         return client
 
+    def pool_stats(self) -> Dict[str, Any]:
+        """Métricas de reuso de conexões (pool de threads + cache de clients RLS)"""
+        with self._auth_lock:
+            stats = dict(self._auth_stats or {})
+            size = len(self._auth_clients or {})
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "http2_available": self._http2_available,
+            "auth_clients": {
+                **stats,
+                "size": size,
+                "max_size": AUTH_CLIENT_CACHE_SIZE,
+                "hit_ratio": round(stats.get("hits", 0) / lookups, 3) if lookups else 0.0,
+            },
+        }
+
     # ==================== MÉTODOS PARA PRODUTOS ====================
 
     async def insert_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -69,12 +256,17 @@ class SupabaseManager:
             product_data["last_checked"] = now
 
             # Insere no banco
-            response = self.client.table("products").insert(product_data).execute()
+            response = await self.execute(
+                self.client.table("products").insert(product_data)
+            )
 
             if response.data:
                 # Cria registro de estatísticas
                 stats_data = {"product_id": response.data[0]["id"], "created_at": now}
-                self.client.table("product_stats").insert(stats_data).execute()
+                await self.execute(
+                    self.client.table("product_stats").insert(stats_data)
+                )
+                data_versions.bump("products", "stats")
 
                 return response.data[0]
             else:
@@ -115,10 +307,9 @@ class SupabaseManager:
                     product["last_checked"] = now
 
                 # Upsert (insere ou atualiza se existir)
-                response = (
+                response = await self.execute(
                     target_client.table("products")
                     .upsert(batch, on_conflict="affiliate_link")
-                    .execute()
                 )
 
                 results["inserted"] += len(response.data)
@@ -128,68 +319,197 @@ class SupabaseManager:
                 results["error_messages"].append(str(e))
                 logger.error(f"[Supabase] Erro no batch {i//batch_size + 1}: {e}")
 
+        if results["inserted"]:
+            data_versions.bump("products")
         return results
 
+    async def upsert_changed_products(
+        self,
+        products: List[Dict[str, Any]],
+        token: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upsert incremental: só grava produtos novos ou cujo ``content_hash``
+        mudou (RPC upsert_changed_products). Só quando a RPC não existe
+        (PGRST202) cai no upsert completo, sem content_hash; outros erros sobem.
+        """
+        target_client = self.get_authenticated_client(token) if token else self.client
+
+        now = datetime.now().isoformat()
+        for product in products:
+            product["created_at"] = now
+            product["updated_at"] = now
+            product["last_checked"] = now
+
+        try:
+            response = await self.execute(
+                target_client.rpc("upsert_changed_products", {"p_products": products})
+            )
+        except Exception as e:
+            if not _is_missing_rpc(e):
+                raise
+            logger.warning(
+                f"[Supabase] upsert_changed_products indisponível, usando upsert completo: {e}"
+            )
+            # Sem a RPC a coluna content_hash (PART 2) também pode não existir
+            legacy = [
+                {k: v for k, v in product.items() if k != "content_hash"}
+                for product in products
+            ]
+            return await self.bulk_insert_products(
+                legacy, batch_size=len(legacy) or 1, token=token
+            )
+
+        written = int(response.data or 0)
+        if written:
+            data_versions.bump("products")
+        return {
+            "total": len(products),
+            "inserted": written,
+            "skipped": len(products) - written,
+            "errors": 0,
+        }
+
+    def _products_query(self, filters: Optional[Dict[str, Any]], columns: str):
+        """Query de produtos com os filtros de get_products (sem ordem/limite)"""
+        query = self.client.table("products").select(columns)
+
+        if filters:
+            store = filters.get("store")
+            category = filters.get("category")
+            min_price = filters.get("min_price")
+            max_price = filters.get("max_price")
+            min_discount = filters.get("min_discount")
+
+            if store:
+                query = query.eq("store", store)
+            if category:
+                query = query.eq("category", category)
+            if min_price:
+                query = query.gte("current_price", min_price)
+            if max_price:
+                query = query.lte("current_price", max_price)
+            if min_discount:
+                query = query.gte("discount_percentage", min_discount)
+
+            # Apenas produtos ativos
+            query = query.eq("is_active", True)
+
+        return query
+
     async def get_products(
         self,
         filters: Optional[Dict[str, Any]] = None,
         limit: int = 100,
         offset: int = 0,
+        fields: str = "card",
     ) -> List[Dict[str, Any]]:
-        """Busca produtos com filtros"""
+        """Busca produtos com filtros (``fields``: ver utils.field_sets)"""
+        columns = product_select(fields)
         try:
-            query = self.client.table("products").select("*")
-
-            # Aplica filtros
+            query = self._products_query(filters, columns)
             if filters:
-                store = filters.get("store")
-                category = filters.get("category")
-                min_price = filters.get("min_price")
-                max_price = filters.get("max_price")
-                min_discount = filters.get("min_discount")
+                limit = filters.get("limit") or limit
 
-                if store:
-                    query = query.eq("store", store)
-                if category:
-                    query = query.eq("category", category)
-                if min_price:
-                    query = query.gte("current_price", min_price)
-                if max_price:
-                    query = query.lte("current_price", max_price)
-                if min_discount:
-                    query = query.gte("discount_percentage", min_discount)
-
-                # Apenas produtos ativos
-                query = query.eq("is_active", True)
+            # Ordena (created_at, id) e limita
+            query = apply_keyset(query).limit(limit).offset(offset)
 
-            # Ordena e limita
-            query = query.order("created_at", desc=True).limit(limit).offset(offset)
-
-            response = query.execute()
+            response = await self.execute(query)
             return response.data
 
         except Exception as e:
             logger.error(f"[Supabase] Erro ao buscar produtos: {e}")
             return []
 
+    async def get_products_page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: str = "card",
+    ) -> Dict[str, Any]:
+        """
+        Página de get_products por keyset: ``{"data", "next_cursor"}``.
+        ``next_cursor`` é None na última página; cursor inválido levanta
+        ValueError.
+        """
+        columns = keyset_columns(product_select(fields))
+        if cursor:
+            decode_cursor(cursor)
+        response = await self.execute(
+            apply_keyset(self._products_query(filters, columns), cursor).limit(limit + 1)
+        )
+        data, next_cursor = paginate(response.data, limit)
+        return {"data": data, "next_cursor": next_cursor}
+
+    async def iter_pages(self, build_query, page_size: int = 1000):
+        """
+        Percorre uma query inteira por keyset, ``page_size`` linhas por vez.
+
+        ``build_query()`` devolve a query já filtrada (nova a cada página:
+        os builders do PostgREST são mutáveis) e precisa selecionar
+        created_at e id.
+        """
+        cursor = None
+        while True:
+            response = await self.execute(
+                apply_keyset(build_query(), cursor).limit(page_size + 1)
+            )
+            page, cursor = paginate(response.data, page_size)
+            if page:
+                yield page
+            if not cursor:
+                return
+
     async def get_random_product(
         self, store: Optional[str] = None, min_discount: int = 0
     ) -> Optional[Dict[str, Any]]:
-        """Busca um produto aleatório"""
+        """
+        Busca um produto aleatório.
+
+        Usa a RPC get_random_product_fast (chave aleatória indexada, sem
+        ORDER BY random()). Sem a RPC, sorteia um offset sobre a contagem.
+        """
+        try:
+            response = await self.execute(
+                self.client.rpc(
+                    "get_random_product_fast",
+                    {"p_store": store, "p_min_discount": min_discount},
+                )
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.warning(
+                f"[Supabase] RPC get_random_product_fast indisponível, sorteando por offset: {e}"
+            )
+            return await self._random_product_by_offset(store, min_discount)
+
+    async def _random_product_by_offset(
+        self, store: Optional[str], min_discount: int
+    ) -> Optional[Dict[str, Any]]:
+        """Sorteio antigo: conta os candidatos e busca um offset aleatório"""
         try:
-            # Usa função do PostgreSQL para aleatoriedade
-            query = """
-            SELECT * FROM products 
-            WHERE is_active = TRUE 
-            AND (%(store)s IS NULL OR store = %(store)s)
-            AND (%(min_discount)s = 0 OR discount_percentage >= %(min_discount)s)
-            ORDER BY RANDOM()
-            LIMIT 1
-            """
-
-            params = {"store": store, "min_discount": min_discount}
-
-            response = self.client.rpc("get_random_product", params).execute()
+            import random
+
+            def build(columns: str, **kwargs):
+                query = (
+                    self.client.table("products")
+                    .select(columns, **kwargs)
+                    .eq("is_active", True)
+                )
+                if store:
+                    query = query.eq("store", store)
+                if min_discount > 0:
+                    query = query.gte("discount_percentage", min_discount)
+                return query
+
+            counted = await self.execute(build("id", count="exact").limit(1))
+            total = counted.count or 0
+            if total == 0:
+                return None
+
+            offset = random.randrange(total)
+            response = await self.execute(build("*").range(offset, offset))
             return response.data[0] if response.data else None
 
         except Exception as e:
@@ -204,13 +524,15 @@ class SupabaseManager:
                 "last_checked": datetime.now().isoformat(),
             }
 
-            response = (
+            response = await self.execute(
                 self.client.table("products")
                 .update(update_data)
                 .eq("id", product_id)
-                .execute()
             )
-            return len(response.data) > 0
+            if not response.data:
+                return False
+            data_versions.bump("products")
+            return True
 
         except Exception as e:
             logger.error(f"[Supabase] Erro ao atualizar preço: {e}")
@@ -218,68 +540,28 @@ class SupabaseManager:
 
     # ==================== MÉTODOS PARA ESTATÍSTICAS ====================
 
+    @property
+    def stats_buffer(self) -> StatsBuffer:
+        """Buffer de contadores (flush em lote via RPC increment_product_stats_bulk)"""
+        if self._stats_buffer is None:
+            SupabaseManager._stats_buffer = StatsBuffer(self.bulk_increment_product_stats)
+        return self._stats_buffer
+
     async def increment_product_stats(
         self, product_id: int, stat_type: str = "click_count", increment: int = 1
     ) -> bool:
-        """Incrementa estatísticas de um produto"""
+        """
+        Incrementa estatísticas de um produto.
+
+        O incremento fica no buffer em memória e é gravado no próximo flush
+        (``STATS_FLUSH_INTERVAL``), junto com os demais, sem SELECT antes.
+        """
         try:
             if not product_id or int(product_id) <= 0:
                 logger.debug(f"[Supabase] Stat ignore: product_id <= 0 ({product_id})")
                 return False
-                
-            # CRÍTICO: Se for telegram_send_count, atualiza last_sent PRIMEIRO
-            if stat_type == "telegram_send_count":
-                from datetime import datetime
-
-                # UPSERT: Cria ou atualiza registro em product_stats
-                # Primeiro tenta buscar registro existente
-                existing = (
-                    self.client.table("product_stats")
-                    .select("*")
-                    .eq("product_id", int(product_id))
-                    .execute()
-                )
-
-                now = datetime.utcnow().isoformat()
-
-                if existing.data:
-                    # Atualiza registro existente
-                    current_count = existing.data[0].get("telegram_send_count", 0)
-                    self.client.table("product_stats").update(
-                        {
-                            "last_sent": now,
-                            "telegram_send_count": current_count + increment,
-                        }
-                    ).eq("product_id", int(product_id)).execute()
-                    logger.info(
-                        f"[Supabase] Produto {product_id} - last_sent atualizado para {now}"
-                    )
-                else:
-                    # Cria novo registro
-                    self.client.table("product_stats").insert(
-                        {
-                            "product_id": int(product_id),
-                            "last_sent": now,
-                            "telegram_send_count": increment,
-                            "click_count": 0,
-                        }
-                    ).execute()
-                    logger.info(
-                        f"[Supabase] Produto {product_id} - registro criado com last_sent {now}"
-                    )
-
-                return True
-
-            # Para outros stat_types, usa RPC normal
-            response = self.client.rpc(
-                "increment_stat",
-                {
-                    "p_product_id": int(product_id),
-                    "p_field": stat_type,
-                    "p_increment": increment,
-                },
-            ).execute()
 
+            self.stats_buffer.add(int(product_id), stat_type, increment)
             return True
         except Exception as e:
             logger.error(
@@ -287,6 +569,75 @@ class SupabaseManager:
             )
             return False
 
+    async def flush_product_stats(self) -> int:
+        """Grava já os contadores pendentes (shutdown / fim de scripts)"""
+        if self._stats_buffer is None:
+            return 0
+        return await self._stats_buffer.stop()
+
+    async def bulk_increment_product_stats(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Soma contadores de vários produtos em uma chamada (RPC
+        increment_product_stats_bulk, ``count = count + excluded.count``).
+
+        Só quando a RPC não existe (PGRST202) cai no increment_stat por
+        produto/campo; qualquer outro erro sobe para o StatsBuffer, que
+        devolve os incrementos ao buffer e reenvia no próximo flush. Um
+        timeout depois do commit no servidor é reenviado assim e conta em
+        dobro: preferimos isso a perder envios e o last_sent usado na
+        seleção do Telegram.
+
+        Raises:
+            StatsFlushError: no fallback, com os incrementos não gravados
+        """
+        try:
+            response = await self.execute(
+                self.client.rpc("increment_product_stats_bulk", {"p_stats": rows})
+            )
+            data_versions.bump("stats")
+            return int(response.data or 0)
+        except Exception as e:
+            if not _is_missing_rpc(e):
+                raise
+            logger.warning(
+                f"[Supabase] increment_product_stats_bulk indisponível, usando increment_stat: {e}"
+            )
+
+        written = 0
+        failed: List[Dict[str, Any]] = []
+        last_error: Optional[Exception] = None
+        for row in rows:
+            # Campos já gravados saem da linha: só o restante volta ao buffer
+            remaining = dict(row)
+            try:
+                for field in STAT_FIELDS:
+                    if row[field]:
+                        await self.execute(
+                            self.client.rpc(
+                                "increment_stat",
+                                {
+                                    "p_product_id": row["product_id"],
+                                    "p_field": field,
+                                    "p_increment": row[field],
+                                },
+                            )
+                        )
+                        remaining[field] = 0
+                written += 1
+            except Exception as e:
+                last_error = e
+                failed.append(remaining)
+                logger.error(
+                    f"[Supabase] Erro ao gravar stats do produto {row['product_id']}: {e}"
+                )
+        if written:
+            data_versions.bump("stats")
+        if failed:
+            raise StatsFlushError(
+                f"{len(failed)} produtos sem stats gravados: {last_error}", failed
+            )
+        return written
+
     async def get_daily_stats(self, date: datetime) -> Dict[str, Any]:
         """Busca estatísticas do dia"""
         try:
@@ -294,9 +645,9 @@ class SupabaseManager:
             date_str = date.strftime("%Y-%m-%d")
 
             # Busca estatísticas usando a função do banco
-            response = self.client.rpc(
-                "get_daily_stats", {"p_date": date_str}
-            ).execute()
+            response = await self.execute(
+                self.client.rpc("get_daily_stats", {"p_date": date_str})
+            )
 
             if response.data:
                 return response.data[0]
@@ -319,14 +670,16 @@ class SupabaseManager:
         try:
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
 
-            response = (
+            response = await self.execute(
                 self.client.table("products")
                 .delete()
                 .lt("updated_at", cutoff_date)
                 .eq("is_active", False)
-                .execute()
             )
 
+            deleted_count = len(response.data or [])
+            if deleted_count:
+                data_versions.bump("products")
             logger.info(f"[Supabase] {deleted_count} produtos antigos removidos")
             return deleted_count
 
@@ -337,34 +690,34 @@ class SupabaseManager:
     async def get_system_summary(self) -> Dict[str, Any]:
         """Retorna resumo do sistema otimizado"""
         try:
-            # 1. Busca total de produtos ativos
-            total_response = (
-                self.client.table("products")
-                .select("count", count="exact")
-                .eq("is_active", True)
-                .execute()
+            # As 4 consultas são independentes: executa em paralelo no pool
+            (
+                total_response,
+                discount_response,
+                telegram_response,
+                stores_response,
+            ) = await asyncio.gather(
+                # 1. Busca total de produtos ativos
+                self.execute(
+                    self.client.table("products")
+                    .select("count", count="exact")
+                    .eq("is_active", True)
+                ),
+                # 2. Busca produtos com desconto
+                self.execute(
+                    self.client.table("products")
+                    .select("count", count="exact")
+                    .gt("discount_percentage", 0)
+                    .eq("is_active", True)
+                ),
+                # 3. Busca envios Telegram (Soma de telegram_send_count em product_stats)
+                self.execute(self.client.rpc("get_total_telegram_sends")),
+                # 4. Busca distribuição por loja (Usa RPC se possível para ser rápido)
+                self.execute(self.client.rpc("get_store_distribution")),
             )
             total_active = total_response.count if total_response.count is not None else 0
-
-            # 2. Busca produtos com desconto
-            discount_response = (
-                self.client.table("products")
-                .select("count", count="exact")
-                .gt("discount_percentage", 0)
-                .eq("is_active", True)
-                .execute()
-            )
             discount_count = discount_response.count if discount_response.count is not None else 0
-
-            # 3. Busca envios Telegram (Soma de telegram_send_count em product_stats)
-            telegram_response = (
-                self.client.rpc("get_total_telegram_sends")
-                .execute()
-            )
             telegram_sends = telegram_response.data if telegram_response.data else 0
-
-            # 4. Busca distribuição por loja (Usa RPC se possível para ser rápido)
-            stores_response = self.client.rpc("get_store_distribution").execute()
             store_counts = {item['store']: item['count'] for item in stores_response.data} if stores_response.data else {}
 
             return {
@@ -391,12 +744,11 @@ class SupabaseManager:
     async def get_active_stores(self) -> List[Dict[str, Any]]:
         """Retorna todas as lojas ativas do banco de dados"""
         try:
-            response = (
+            response = await self.execute(
                 self.client.table("stores")
                 .select("*")
                 .eq("is_active", True)
                 .order("name")
-                .execute()
             )
 
             return response.data if response.data else []
@@ -408,13 +760,12 @@ class SupabaseManager:
     async def get_store_by_name(self, store_name: str) -> Optional[Dict[str, Any]]:
         """Busca uma loja específica por nome"""
         try:
-            response = (
+            response = await self.execute(
                 self.client.table("stores")
                 .select("*")
                 .eq("name", store_name.lower())
                 .eq("is_active", True)
                 .limit(1)
-                .execute()
             )
 
             return response.data[0] if response.data else None
@@ -431,11 +782,10 @@ class SupabaseManager:
                 return []
 
             # Busca contagem de todos os produtos agrupados por store em uma única query
-            all_counts_response = (
+            all_counts_response = await self.execute(
                 self.client.table("products")
                 .select("store")
                 .eq("is_active", True)
-                .execute()
             )
 
             # Conta em Python (evita N+1 queries ao banco)
@@ -460,9 +810,12 @@ class SupabaseManager:
     ) -> Optional[Dict[str, Any]]:
         """Busca preferências de um usuário"""
         try:
-            response = self.client.rpc(
-                "get_user_preference_summary", {"p_telegram_user_id": telegram_user_id}
-            ).execute()
+            response = await self.execute(
+                self.client.rpc(
+                    "get_user_preference_summary",
+                    {"p_telegram_user_id": telegram_user_id},
+                )
+            )
 
             if response.data:
                 return response.data
@@ -496,7 +849,7 @@ class SupabaseManager:
                 "p_notification_enabled": notification_enabled,
             }
 
-            response = self.client.rpc("upsert_user_preference", params).execute()
+            await self.execute(self.client.rpc("upsert_user_preference", params))
             return True
 
         except Exception as e:
@@ -508,10 +861,12 @@ class SupabaseManager:
     ) -> List[Dict[str, Any]]:
         """Retorna produtos recomendados baseados nas preferências do usuário"""
         try:
-            response = self.client.rpc(
-                "get_recommended_products",
-                {"p_telegram_user_id": telegram_user_id, "p_limit": limit},
-            ).execute()
+            response = await self.execute(
+                self.client.rpc(
+                    "get_recommended_products",
+                    {"p_telegram_user_id": telegram_user_id, "p_limit": limit},
+                )
+            )
 
             return response.data if response.data else []
 
@@ -530,11 +885,13 @@ class SupabaseManager:
         max_price: Optional[float] = None,
         min_discount: Optional[int] = None,
         limit: int = 10,
+        fields: str = "card",
     ) -> List[Dict[str, Any]]:
         """Busca produtos usando full-text search"""
+        columns = product_select(fields)
         try:
             # Usa a busca vetorial se disponível, senão usa ILIKE
-            query = self.client.table("products").select("*")
+            query = self.client.table("products").select(columns)
 
             # Busca por nome ou descrição
             query = query.or_(
@@ -558,7 +915,7 @@ class SupabaseManager:
             # Ordena por relevância (desconto primeiro)
             query = query.order("discount_percentage", desc=True).limit(limit)
 
-            response = query.execute()
+            response = await self.execute(query)
             return response.data if response.data else []
 
         except Exception as e:
@@ -566,13 +923,18 @@ class SupabaseManager:
             return []
 
     async def get_top_deals(
-        self, limit: int = 10, min_discount: int = 20, store: Optional[str] = None
+        self,
+        limit: int = 10,
+        min_discount: int = 20,
+        store: Optional[str] = None,
+        fields: str = "card",
     ) -> List[Dict[str, Any]]:
         """Retorna os melhores deals (maior desconto)"""
+        columns = product_select(fields)
         try:
             query = (
                 self.client.table("products")
-                .select("*")
+                .select(columns)
                 .eq("is_active", True)
                 .gte("discount_percentage", min_discount)
             )
@@ -586,7 +948,7 @@ class SupabaseManager:
                 .limit(limit)
             )
 
-            response = query.execute()
+            response = await self.execute(query)
             return response.data if response.data else []
 
         except Exception as e:
@@ -606,7 +968,7 @@ class SupabaseManager:
             if store:
                 query = query.eq("store", store)
 
-            response = query.execute()
+            response = await self.execute(query)
 
             # Extrai categorias únicas
             categories = list(
@@ -623,9 +985,43 @@ class SupabaseManager:
     async def get_products_for_telegram(
         self, limit: int = 5, min_discount: int = 0
     ) -> List[Dict[str, Any]]:
-        """Busca produtos para enviar no Telegram, priorizando os que nunca foram enviados ou foram enviados há mais tempo"""
+        """
+        Busca produtos para enviar no Telegram, priorizando os que nunca foram
+        enviados ou foram enviados há mais tempo.
+
+        A seleção (last_sent NULLS FIRST, desconto DESC) roda no banco via RPC
+        get_products_for_telegram e só ``limit`` linhas trafegam. Só quando a
+        RPC não existe (PGRST202) cai na seleção em Python sobre 200
+        candidatos; outros erros (timeout, etc.) são logados e retornam [].
+        """
+        try:
+            response = await self.execute(
+                self.client.rpc(
+                    "get_products_for_telegram",
+                    {"p_limit": limit, "p_min_discount": min_discount},
+                )
+            )
+            selected = response.data or []
+            logger.info(f"[Supabase] Selecionados {len(selected)} produtos para Telegram")
+            return selected
+        except Exception as e:
+            if not _is_missing_rpc(e):
+                logger.error(f"[Supabase] Erro na RPC get_products_for_telegram: {e}")
+                return []
+            logger.warning(
+                f"[Supabase] RPC get_products_for_telegram indisponível, selecionando em Python: {e}"
+            )
+            return await self._select_products_for_telegram(limit, min_discount)
+
+    async def _select_products_for_telegram(
+        self, limit: int, min_discount: int
+    ) -> List[Dict[str, Any]]:
+        """Seleção antiga (client-side), usada enquanto a migration não foi aplicada"""
         try:
-            from datetime import datetime
+            from datetime import datetime, timezone
+
+            # Aware, para comparar com o last_sent do banco (timestamptz)
+            never_sent = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
             # Usa query builder do Supabase
             response = (
@@ -639,7 +1035,7 @@ class SupabaseManager:
                 response = response.gte("discount_percentage", min_discount)
 
             # Busca produtos suficientes para garantir variedade
-            response = response.limit(200).execute()
+            response = await self.execute(response.limit(200))
 
             if not response.data:
                 logger.warning("[Supabase] Nenhum produto encontrado para Telegram")
@@ -656,11 +1052,11 @@ class SupabaseManager:
                             stats[0]["last_sent"].replace("Z", "+00:00")
                         )
                     except:
-                        p["last_sent_dt"] = datetime(1970, 1, 1)
+                        p["last_sent_dt"] = never_sent
                     p["send_count"] = stats[0].get("telegram_send_count", 0)
                 else:
                     # Produto nunca enviado = prioridade máxima
-                    p["last_sent_dt"] = datetime(1970, 1, 1)
+                    p["last_sent_dt"] = never_sent
                     p["send_count"] = 0
 
             # Ordenar: nunca enviados primeiro (1970), depois por data mais antiga, depois por maior desconto
@@ -691,14 +1087,13 @@ class SupabaseManager:
             logger.error(f"[Supabase] Erro ao buscar produtos para Telegram: {e}")
             # Fallback: retorna produtos recentes com imagem
             try:
-                response = (
+                response = await self.execute(
                     self.client.table("products")
                     .select("*")
                     .eq("is_active", True)
                     .not_.is_("image_url", "null")
                     .order("created_at", desc=True)
                     .limit(limit)
-                    .execute()
                 )
                 return response.data if response.data else []
             except Exception:
@@ -712,3 +1107,9 @@ def get_supabase() -> Client:
 
 def get_supabase_manager() -> SupabaseManager:
     return SupabaseManager()
+
+
+def close_supabase_manager() -> None:
+    """Fecha pool/conexões do singleton, se já tiver sido criado (shutdown da API)"""
+    if SupabaseManager._instance is not None:
+        SupabaseManager._instance.close()
@@ -0,0 +1,300 @@
+"""
+Fila de envio do Telegram com ritmo global e por chat.
+
+Todo ``send_message``/``send_photo`` do bot e dos scripts passa por aqui:
+
+- limite global (~30 msg/s por bot) e por chat (~1 msg/s em privado,
+  ~20 msg/min em grupos/canais) em token buckets, no lugar dos
+  ``asyncio.sleep`` fixos espalhados pelo código
+- mensagens para o mesmo chat saem em ordem (uma fila FIFO por chat)
+- ``RetryAfter`` (429) espera o tempo pedido pelo Telegram; falhas de rede
+  são repetidas com backoff exponencial + jitter, exceto ``TimedOut``: a
+  mensagem pode já ter sido entregue e repetir postaria duas vezes
+- fotos por URL viram ``file_id`` depois do primeiro envio (FileIdCache):
+  reenvios e espelhamentos não fazem o Telegram baixar a imagem de novo
+"""
+
+import os
+import random
+import sqlite3
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from .token_bucket import create_bucket_store
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_GLOBAL_PER_SECOND = float(os.getenv("TELEGRAM_GLOBAL_PER_SECOND", "30"))
+TELEGRAM_GROUP_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_PER_MINUTE", "20"))
+TELEGRAM_GROUP_BURST = float(os.getenv("TELEGRAM_GROUP_BURST", "3"))
+TELEGRAM_PRIVATE_PER_SECOND = float(os.getenv("TELEGRAM_PRIVATE_PER_SECOND", "1"))
+TELEGRAM_SEND_MAX_RETRIES = int(os.getenv("TELEGRAM_SEND_MAX_RETRIES", "3"))
+# memory (padrão) ou o mesmo formato de RATE_LIMIT_BACKEND para dividir o
+# ritmo com outros processos do host
+TELEGRAM_RATE_LIMIT_BACKEND = os.getenv("TELEGRAM_RATE_LIMIT_BACKEND", "memory")
+TELEGRAM_FILE_ID_STORE = os.getenv(
+    "TELEGRAM_FILE_ID_STORE",
+    os.path.join(tempfile.gettempdir(), "afiliadohub_telegram_file_ids.sqlite3"),
+)
+TELEGRAM_FILE_ID_LRU_SIZE = int(os.getenv("TELEGRAM_FILE_ID_LRU_SIZE", "5000"))
+
+
+def _is_group(chat_id: Union[int, str]) -> bool:
+    """Grupos/canais têm id negativo (ou @username de canal)"""
+    chat = str(chat_id)
+    return chat.startswith("-") or chat.startswith("@")
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class FileIdCache:
+    """
+    ``(bot, image_url) -> file_id`` em SQLite (persistente, compartilhado
+    entre processos do host) com LRU em memória na frente.
+
+    file_id só vale para o bot que fez o upload, por isso a chave inclui o
+    id do bot (prefixo do token).
+    """
+
+    def __init__(
+        self, path: str = TELEGRAM_FILE_ID_STORE, lru_size: int = TELEGRAM_FILE_ID_LRU_SIZE
+    ):
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(
+                path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS telegram_file_ids ("
+                "bot_id TEXT NOT NULL, url TEXT NOT NULL, file_id TEXT NOT NULL, "
+                "PRIMARY KEY (bot_id, url))"
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"[TelegramSender] SQLite indisponível ({e}), file_ids só em memória")
+            self._conn = None
+
+    def _remember(self, key: Tuple[str, str], file_id: str):
+        self._lru[key] = file_id
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _get_sync(self, key: Tuple[str, str]) -> Optional[str]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_id FROM telegram_file_ids WHERE bot_id = ? AND url = ?", key
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_sync(self, key: Tuple[str, str], file_id: Optional[str]):
+        if self._conn is None:
+            return
+        with self._lock:
+            if file_id is None:
+                self._conn.execute(
+                    "DELETE FROM telegram_file_ids WHERE bot_id = ? AND url = ?", key
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO telegram_file_ids (bot_id, url, file_id) VALUES (?, ?, ?) "
+                    "ON CONFLICT(bot_id, url) DO UPDATE SET file_id = excluded.file_id",
+                    (*key, file_id),
+                )
+
+    async def get(self, key: Tuple[str, str]) -> Optional[str]:
+        file_id = self._lru.get(key)
+        if file_id:
+            self._lru.move_to_end(key)
+            return file_id
+        file_id = await asyncio.to_thread(self._get_sync, key)
+        if file_id:
+            self._remember(key, file_id)
+        return file_id
+
+    async def put(self, key: Tuple[str, str], file_id: str):
+        self._remember(key, file_id)
+        await asyncio.to_thread(self._set_sync, key, file_id)
+
+    async def forget(self, key: Tuple[str, str]):
+        self._lru.pop(key, None)
+        await asyncio.to_thread(self._set_sync, key, None)
+
+
+class TelegramSender:
+    """Ritmo (token buckets) + fila por chat + retry dos envios do bot"""
+
+    GLOBAL_KEY = "telegram:global"
+
+    def __init__(
+        self,
+        store=None,
+        max_retries: int = TELEGRAM_SEND_MAX_RETRIES,
+        file_ids: Optional[FileIdCache] = None,
+    ):
+        self.store = store or create_bucket_store(TELEGRAM_RATE_LIMIT_BACKEND)
+        self.max_retries = max_retries
+        self.file_ids = file_ids or FileIdCache()
+        # Lock por chat + quantos envios o usam; sai do dict quando ninguém usa
+        self._chat_locks: Dict[str, asyncio.Lock] = {}
+        self._chat_users: Dict[str, int] = {}
+        self._stats = {
+            "sent": 0,
+            "failed": 0,
+            "retry_after": 0,
+            "retries": 0,
+            "wait_seconds": 0.0,
+            "file_id_hits": 0,
+            "file_id_misses": 0,
+        }
+
+    async def _take(self, key: str, capacity: float, rate: float):
+        """Bloqueia até haver 1 token no bucket ``key``"""
+        while True:
+            granted, _, wait = await self.store.take(key, 1, capacity, rate, 0)
+            if granted:
+                return
+            self._stats["wait_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    async def _pace(self, chat_id: Union[int, str]):
+        if _is_group(chat_id):
+            await self._take(
+                f"telegram:chat:{chat_id}",
+                TELEGRAM_GROUP_BURST,
+                TELEGRAM_GROUP_PER_MINUTE / 60,
+            )
+        else:
+            await self._take(
+                f"telegram:chat:{chat_id}", 1, TELEGRAM_PRIVATE_PER_SECOND
+            )
+        await self._take(
+            self.GLOBAL_KEY, TELEGRAM_GLOBAL_PER_SECOND, TELEGRAM_GLOBAL_PER_SECOND
+        )
+
+    async def call(
+        self,
+        chat_id: Union[int, str],
+        method: Callable[..., Awaitable[Any]],
+        **kwargs,
+    ) -> Any:
+        """
+        Executa ``method(chat_id=chat_id, **kwargs)`` respeitando o ritmo do
+        chat e do bot. Erros definitivos (BadRequest, Forbidden), ``TimedOut``
+        e esgotamento de tentativas são repassados a quem chamou.
+        """
+        key = str(chat_id)
+        lock = self._chat_locks.get(key)
+        if lock is None:
+            lock = self._chat_locks[key] = asyncio.Lock()
+        self._chat_users[key] = self._chat_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._call_paced(chat_id, method, **kwargs)
+        finally:
+            self._chat_users[key] -= 1
+            if not self._chat_users[key]:
+                del self._chat_users[key]
+                del self._chat_locks[key]
+
+    async def _call_paced(self, chat_id, method, **kwargs) -> Any:
+        """Envio com ritmo e retry (chamado com o lock do chat)"""
+        attempt = 0
+        while True:
+            await self._pace(chat_id)
+            try:
+                result = await method(chat_id=chat_id, **kwargs)
+                self._stats["sent"] += 1
+                return result
+            except RetryAfter as e:
+                # 429: o Telegram diz quanto esperar; não conta como tentativa
+                delay = _retry_after_seconds(e) + random.uniform(0, 1)
+                self._stats["retry_after"] += 1
+                self._stats["wait_seconds"] += delay
+                logger.warning(
+                    f"[TelegramSender] 429 no chat {chat_id}, aguardando {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            except (BadRequest, Forbidden):
+                self._stats["failed"] += 1
+                raise
+            except TimedOut:
+                # Subclasse de NetworkError, mas send_* não é idempotente
+                self._stats["failed"] += 1
+                raise
+            except NetworkError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._stats["failed"] += 1
+                    raise
+                delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                self._stats["retries"] += 1
+                logger.warning(
+                    f"[TelegramSender] Falha de rede no chat {chat_id} "
+                    f"({e}), tentativa {attempt}/{self.max_retries} em {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def send_message(self, bot, chat_id: Union[int, str], **kwargs) -> Any:
+        return await self.call(chat_id, bot.send_message, **kwargs)
+
+    async def send_photo(self, bot, chat_id: Union[int, str], photo=None, **kwargs) -> Any:
+        """
+        ``send_photo`` que troca URLs já enviadas pelo ``file_id`` salvo.
+        Se o file_id for recusado (BadRequest), esquece e reenvia pela URL.
+        """
+        if not isinstance(photo, str) or not photo.startswith(("http://", "https://")):
+            return await self.call(chat_id, bot.send_photo, photo=photo, **kwargs)
+
+        key = (str(bot.token).split(":", 1)[0], photo)
+        file_id = await self.file_ids.get(key)
+        if file_id:
+            try:
+                message = await self.call(chat_id, bot.send_photo, photo=file_id, **kwargs)
+                self._stats["file_id_hits"] += 1
+                return message
+            except BadRequest as e:
+                logger.warning(f"[TelegramSender] file_id recusado ({e}), reenviando pela URL")
+                await self.file_ids.forget(key)
+
+        self._stats["file_id_misses"] += 1
+        message = await self.call(chat_id, bot.send_photo, photo=photo, **kwargs)
+        sizes = getattr(message, "photo", None)
+        if sizes:
+            # Maior resolução é a última; o Telegram reaproveita as demais
+            await self.file_ids.put(key, sizes[-1].file_id)
+        return message
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "wait_seconds": round(self._stats["wait_seconds"], 2),
+            "backend": getattr(self.store, "name", type(self.store).__name__),
+        }
+
+
+_telegram_sender: Optional[TelegramSender] = None
+
+
+def get_telegram_sender() -> TelegramSender:
+    """Fila única por processo"""
+    global _telegram_sender
+    if _telegram_sender is None:
+        _telegram_sender = TelegramSender()
+    return _telegram_sender
@@ -0,0 +1,205 @@
+"""
+Token bucket com estado compartilhado plugável.
+
+O estado do bucket (nível + último refill) fica em um store que pode ser:
+- memória: só o processo atual
+- SQLite: todos os processos do mesmo host (API, bot, scripts de cron)
+- Redis (ou compatível): processos em hosts diferentes
+
+Cada ``take`` é O(1) e atômico no store: recalcula o refill desde a última
+atualização, consome se houver tokens acima do piso da prioridade e, se não
+houver, devolve quanto tempo esperar.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (concedido, nível após a operação, segundos até haver tokens)
+TakeResult = Tuple[bool, float, float]
+
+
+def _refill_and_take(
+    level: float,
+    updated_at: float,
+    tokens: float,
+    capacity: float,
+    rate: float,
+    floor: float,
+    now: float,
+) -> TakeResult:
+    """Matemática do bucket, compartilhada pelos stores locais"""
+    level = min(capacity, level + max(0.0, now - updated_at) * rate)
+    if level - tokens >= floor:
+        return True, level - tokens, 0.0
+    return False, level, (floor + tokens - level) / rate
+
+
+class MemoryBucketStore:
+    """Estado em memória (por processo)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key, tokens, capacity, rate, floor) -> TakeResult:
+        now = time.time()
+        with self._lock:
+            level, updated_at = self._buckets.get(key, (capacity, now))
+            granted, level, wait = _refill_and_take(
+                level, updated_at, tokens, capacity, rate, floor, now
+            )
+            self._buckets[key] = (level, now)
+        return granted, level, wait
+
+    async def level(self, key, capacity, rate) -> float:
+        now = time.time()
+        level, updated_at = self._buckets.get(key, (capacity, now))
+        return min(capacity, level + (now - updated_at) * rate)
+
+
+class SQLiteBucketStore:
+    """
+    Estado em arquivo SQLite: coordena todos os processos do host.
+    ``BEGIN IMMEDIATE`` serializa leitura+escrita entre processos.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "key TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _take_sync(self, key, tokens, capacity, rate, floor) -> TakeResult:
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = cursor.execute(
+                    "SELECT level, updated_at FROM token_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                level, updated_at = row if row else (capacity, now)
+                granted, level, wait = _refill_and_take(
+                    level, updated_at, tokens, capacity, rate, floor, now
+                )
+                cursor.execute(
+                    "INSERT INTO token_buckets (key, level, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET level = excluded.level, "
+                    "updated_at = excluded.updated_at",
+                    (key, level, now),
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return granted, level, wait
+
+    def _level_sync(self, key, capacity, rate) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT level, updated_at FROM token_buckets WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return capacity
+        level, updated_at = row
+        return min(capacity, level + max(0.0, time.time() - updated_at) * rate)
+
+    async def take(self, key, tokens, capacity, rate, floor) -> TakeResult:
+        return await asyncio.to_thread(
+            self._take_sync, key, tokens, capacity, rate, floor
+        )
+
+    async def level(self, key, capacity, rate) -> float:
+        return await asyncio.to_thread(self._level_sync, key, capacity, rate)
+
+
+class RedisBucketStore:
+    """Estado em Redis (ou servidor compatível), atômico via script Lua"""
+
+    name = "redis"
+
+    _TAKE_SCRIPT = """
+    local capacity = tonumber(ARGV[2])
+    local rate = tonumber(ARGV[3])
+    local now = tonumber(ARGV[5])
+    local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * rate)
+    local tokens = tonumber(ARGV[1])
+    local floor = tonumber(ARGV[4])
+    local granted = 0
+    local wait = 0
+    if level - tokens >= floor then
+        level = level - tokens
+        granted = 1
+    else
+        wait = (floor + tokens - level) / rate
+    end
+    redis.call('HSET', KEYS[1], 'level', level, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) * 2)
+    return {granted, tostring(level), tostring(wait)}
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "Backend Redis requer o pacote 'redis' (pip install redis)"
+            ) from e
+        self._redis = redis_asyncio.from_url(url)
+        self._script = self._redis.register_script(self._TAKE_SCRIPT)
+
+    async def take(self, key, tokens, capacity, rate, floor) -> TakeResult:
+        granted, level, wait = await self._script(
+            keys=[key], args=[tokens, capacity, rate, floor, time.time()]
+        )
+        return bool(granted), float(level), float(wait)
+
+    async def level(self, key, capacity, rate) -> float:
+        level, ts = await self._redis.hmget(key, "level", "ts")
+        if level is None:
+            return capacity
+        return min(capacity, float(level) + max(0.0, time.time() - float(ts)) * rate)
+
+
+def create_bucket_store(url: str = None):
+    """
+    Cria o store a partir de uma URL:
+    ``memory``, ``sqlite`` (arquivo padrão em /tmp), ``sqlite:///caminho.db``
+    ou ``redis://host:6379/0``.
+    """
+    url = url or os.getenv("RATE_LIMIT_BACKEND", "sqlite")
+    if url == "memory":
+        return MemoryBucketStore()
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisBucketStore(url)
+    if url == "sqlite" or url.startswith("sqlite://"):
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else os.path.join(
+            tempfile.gettempdir(), "afiliadohub_rate_limits.sqlite3"
+        )
+        try:
+            return SQLiteBucketStore(path)
+        except sqlite3.Error as e:
+            logger.warning(f"[RateLimit] SQLite indisponível ({e}), usando memória")
+            return MemoryBucketStore()
+    raise ValueError(f"RATE_LIMIT_BACKEND inválido: {url}")
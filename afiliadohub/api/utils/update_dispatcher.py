@@ -0,0 +1,174 @@
+"""
+Fila de updates do webhook do Telegram com pool de workers.
+
+O webhook só enfileira o update e responde na hora; ``N`` workers chamam
+``process_update`` em background. Updates do mesmo chat são processados em
+ordem (um chat fica com no máximo um worker por vez) e chats diferentes
+rodam em paralelo.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 0 = processa inline no webhook (ambientes serverless sem tarefas em background)
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+TELEGRAM_UPDATE_MAX_PENDING = int(os.getenv("TELEGRAM_UPDATE_MAX_PENDING", "1000"))
+_TIMING_WINDOW = 500
+
+
+def update_chat_key(update: Any) -> Hashable:
+    """Chave de ordenação: chat do update (ou usuário, ou o próprio update)"""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return f"user:{user.id}"
+    return f"update:{getattr(update, 'update_id', id(update))}"
+
+
+class UpdateDispatcher:
+    """Filas por chat + pool de workers de tamanho fixo"""
+
+    def __init__(
+        self,
+        workers: int = TELEGRAM_UPDATE_WORKERS,
+        max_pending: int = TELEGRAM_UPDATE_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._process: Optional[Callable[[Any], Awaitable[Any]]] = None
+        self._lanes: Dict[Hashable, Deque[tuple]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending = 0
+        self._active = 0
+        self._processing_times: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self._wait_times: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self._stats = {"processed": 0, "failed": 0, "rejected": 0, "high_water": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # ==================== CICLO DE VIDA ====================
+
+    async def start(self, process: Callable[[Any], Awaitable[Any]]):
+        """Inicia os workers (chamado no lifespan, depois do bot)"""
+        self._process = process
+        if self.workers <= 0 or self.running:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"telegram-update-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            f"[Updates] {self.workers} workers iniciados (máx. {self.max_pending} pendentes)"
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        """Espera a fila esvaziar (até ``timeout``) e encerra os workers"""
+        if not self.running:
+            return
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._active) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(f"[Updates] Encerrando com {self._pending} update(s) pendente(s)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._lanes.clear()
+        self._pending = 0
+
+    # ==================== ENFILEIRAMENTO ====================
+
+    async def submit(self, update: Any) -> bool:
+        """
+        Enfileira o update. Sem workers, processa inline. Retorna False se
+        a fila estiver cheia (o webhook responde erro e o Telegram reenvia).
+        """
+        if not self.running:
+            await self._run(update, time.monotonic())
+            return True
+
+        if self._pending >= self.max_pending:
+            self._stats["rejected"] += 1
+            return False
+
+        key = update_chat_key(update)
+        lane = self._lanes.get(key)
+        if lane is None:
+            # Chat ocioso: a fila do chat entra na fila de prontos
+            lane = self._lanes[key] = deque()
+            self._ready.put_nowait(key)
+        lane.append((update, time.monotonic()))
+        self._pending += 1
+        self._stats["high_water"] = max(self._stats["high_water"], self._pending)
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            update, enqueued_at = lane.popleft()
+            self._pending -= 1
+            self._active += 1
+            try:
+                await self._run(update, enqueued_at)
+            finally:
+                self._active -= 1
+                if lane:
+                    # Próximo update do mesmo chat volta para o fim da fila
+                    self._ready.put_nowait(key)
+                else:
+                    del self._lanes[key]
+
+    async def _run(self, update: Any, enqueued_at: float):
+        started = time.monotonic()
+        self._wait_times.append(started - enqueued_at)
+        try:
+            await self._process(update)
+            self._stats["processed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.error(f"[Updates] Erro ao processar update: {e}", exc_info=True)
+        finally:
+            self._processing_times.append(time.monotonic() - started)
+
+    # ==================== MÉTRICAS ====================
+
+    @staticmethod
+    def _summary(samples: Deque[float]) -> Dict[str, float]:
+        if not samples:
+            return {"avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila e tempos (últimos updates)"""
+        return {
+            **self._stats,
+            "workers": self.workers if self.running else 0,
+            "queue_depth": self._pending,
+            "active": self._active,
+            "chats": len(self._lanes),
+            "processing_time": self._summary(self._processing_times),
+            "queue_wait": self._summary(self._wait_times),
+        }
+
+
+# Instância global
+update_dispatcher = UpdateDispatcher()
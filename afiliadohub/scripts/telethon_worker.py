@@ -14,7 +14,7 @@ except ImportError:
     print("❌ Telethon não detectado. Execute: pip install telethon")
     sys.exit(1)
 
-from afiliadohub.api.utils.supabase_client import get_supabase_manager
+from afiliadohub.api.utils.supabase_client import _is_missing_rpc, get_supabase_manager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("TelethonGhostWorker")
@@ -48,8 +48,21 @@ def buscar_produtos_frescos(supabase, limit=5):
     Busca produtos do Supabase que NUNCA foram enviados para o Telegram.
     (telegram_send_count == 0 ou ausente).
     """
-    # 1. Pega os produtos ativos mais recentes e com algum desconto
     logger.info("🔍 Minerando Supabase por produtos virgens...")
+    # Seleção no banco: só as `limit` linhas necessárias trafegam
+    try:
+        res = supabase.client.rpc(
+            "get_products_for_telegram",
+            {"p_limit": limit, "p_min_discount": 1, "p_only_unsent": True, "p_require_image": False},
+        ).execute()
+        return res.data or []
+    except Exception as e:
+        if not _is_missing_rpc(e):
+            logger.error(f"❌ Erro na RPC get_products_for_telegram: {e}")
+            return []
+        logger.warning(f"RPC get_products_for_telegram indisponível, filtrando localmente: {e}")
+
+    # 1. Pega os produtos ativos mais recentes e com algum desconto
     res = supabase.client.table("products").select("id, name, affiliate_link, current_price, discount_percentage").eq("is_active", True).gt("discount_percentage", 0).order("created_at", desc=True).limit(80).execute()
     
     if not res.data:
@@ -143,52 +156,61 @@ async def daemon_telegram_worker():
 
     blocos_hoje = 0
 
-    while True:
-        # Busca produtos que ainda não foram postados
-        tamanho_lote = random.randint(1, MAX_MSGS_POR_LOTE)
-        lote_produtos = buscar_produtos_frescos(supabase, limit=tamanho_lote)
+    try:
+        while True:
+            # Busca produtos que ainda não foram postados
+            tamanho_lote = random.randint(1, MAX_MSGS_POR_LOTE)
+            lote_produtos = buscar_produtos_frescos(supabase, limit=tamanho_lote)
         
-        if not lote_produtos:
-            logger.info("📭 Nenhum produto novo com desconto e `is_active=True` detectado no BD.")
-            pausa = 600  # Dorme 10 minutos se n tiver nada
-        else:
-            # Embaralha ordem dos chats
-            chats_ativos = TARGET_CHATS.copy()
-            random.shuffle(chats_ativos)
-
-            sucesso_no_lote = False
-
-            for chat in chats_ativos:
-                for prod in lote_produtos:
-                    msg = montar_mensagem(prod)
-                    logger.info(f"[{time.strftime('%H:%M:%S')}] Tentando via Userbot -> {chat} (Prod ID: {prod['id']})")
-                    enviado, status = await enviar_como_humano(client, chat, msg)
+            if not lote_produtos:
+                logger.info("📭 Nenhum produto novo com desconto e `is_active=True` detectado no BD.")
+                pausa = 600  # Dorme 10 minutos se n tiver nada
+            else:
+                # Embaralha ordem dos chats
+                chats_ativos = TARGET_CHATS.copy()
+                random.shuffle(chats_ativos)
+
+                sucesso_no_lote = False
+
+                for chat in chats_ativos:
+                    for prod in lote_produtos:
+                        msg = montar_mensagem(prod)
+                        logger.info(f"[{time.strftime('%H:%M:%S')}] Tentando via Userbot -> {chat} (Prod ID: {prod['id']})")
+                        enviado, status = await enviar_como_humano(client, chat, msg)
                     
-                    if status == "restricted":
-                        logger.warning(f"  ⏭️ Chat {chat} restrito, removendo da lista...")
-                        if chat in TARGET_CHATS:
-                            TARGET_CHATS.remove(chat)
-                        continue
+                        if status == "restricted":
+                            logger.warning(f"  ⏭️ Chat {chat} restrito, removendo da lista...")
+                            if chat in TARGET_CHATS:
+                                TARGET_CHATS.remove(chat)
+                            continue
                     
-                    if enviado:
-                        sucesso_no_lote = True
-                        await supabase.increment_product_stats(prod['id'], "telegram_send_count")
+                        if enviado:
+                            sucesso_no_lote = True
+                            await supabase.increment_product_stats(prod['id'], "telegram_send_count")
                         
-                        pausa_curta = random.uniform(25.0, 72.0)
-                        logger.info(f"   [Jitter] Dormindo {pausa_curta:.1f}s.")
-                        await asyncio.sleep(pausa_curta)
+                            pausa_curta = random.uniform(25.0, 72.0)
+                            logger.info(f"   [Jitter] Dormindo {pausa_curta:.1f}s.")
+                            await asyncio.sleep(pausa_curta)
 
-            blocos_hoje += 1
+                # Grava telegram_send_count/last_sent já: a próxima busca precisa
+                # enxergar o que acabou de ser enviado
+                await supabase.flush_product_stats()
 
-            if blocos_hoje >= BLOCOS_POR_DIA_LIMIT:
-                logger.info("Zzz... Sistema parando para não bater limite diário seguro de Spams Telegram (12-24h sleep).")
-                await asyncio.sleep(86400 / 2) # Dorme 12h
-                blocos_hoje = 0
+                blocos_hoje += 1
+
+                if blocos_hoje >= BLOCOS_POR_DIA_LIMIT:
+                    logger.info("Zzz... Sistema parando para não bater limite diário seguro de Spams Telegram (12-24h sleep).")
+                    await asyncio.sleep(86400 / 2) # Dorme 12h
+                    blocos_hoje = 0
             
-            pausa = random.randint(1800, 3300) # Entre 30 a 55 mins
+                pausa = random.randint(1800, 3300) # Entre 30 a 55 mins
+
+            logger.info(f"[{time.strftime('%H:%M:%S')}] Ghost protocol repousando por ({pausa/60:.1f} minutos)...")
+            await asyncio.sleep(pausa)
+    finally:
+        # Incrementos em buffer se perderiam na saída do processo
+        await supabase.flush_product_stats()
 
-        logger.info(f"[{time.strftime('%H:%M:%S')}] Ghost protocol repousando por ({pausa/60:.1f} minutos)...")
-        await asyncio.sleep(pausa)
 
 if __name__ == '__main__':
     if sys.platform == "win32":
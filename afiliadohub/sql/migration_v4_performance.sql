@@ -0,0 +1,673 @@
+-- ================================================
+-- MIGRATION v4 — Performance (importadores, bot e analytics)
+-- ================================================
+
+-- Run each section in order via Supabase MCP or SQL Editor
+
+-- === PART 1: Upsert em lote da Shopee (ShopeeProductImporter._upsert_products) ===
+
+-- ON CONFLICT (shopee_product_id) exige índice único não-parcial.
+-- NULLs continuam permitidos (produtos de outras lojas).
+-- Antes de aplicar, confira duplicados:
+--   SELECT shopee_product_id, COUNT(*) FROM public.products
+--   WHERE shopee_product_id IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1;
+DROP INDEX IF EXISTS public.idx_products_shopee_id;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_products_shopee_product_id
+  ON public.products(shopee_product_id);
+
+-- === PART 2: Refresh incremental de feeds (FeedManager / CSVImporter) ===
+
+-- Validadores HTTP do último download (requisição condicional -> 304)
+ALTER TABLE public.product_feeds ADD COLUMN IF NOT EXISTS etag TEXT;
+ALTER TABLE public.product_feeds ADD COLUMN IF NOT EXISTS last_modified TEXT;
+
+-- Hash (64 bits) do conteúdo importado de cada linha do feed
+ALTER TABLE public.products ADD COLUMN IF NOT EXISTS content_hash BIGINT;
+
+-- Upsert que só grava linhas novas ou com hash diferente.
+-- Linhas inalteradas não geram nova versão da tupla (nem WAL/trigger).
+-- Retorna quantas linhas foram inseridas/atualizadas.
+CREATE OR REPLACE FUNCTION public.upsert_changed_products(p_products JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+SET search_path = public, pg_catalog
+AS $$
+DECLARE
+    v_written INT;
+BEGIN
+    INSERT INTO public.products (
+        name, store, current_price, affiliate_link, image_url, category,
+        discount_percentage, is_active, content_hash,
+        created_at, updated_at, last_checked
+    )
+    SELECT
+        name, store, current_price, affiliate_link, image_url, category,
+        discount_percentage, is_active, content_hash,
+        created_at, updated_at, last_checked
+    FROM jsonb_populate_recordset(NULL::public.products, p_products)
+    ON CONFLICT (affiliate_link) DO UPDATE SET
+        name = EXCLUDED.name,
+        store = EXCLUDED.store,
+        current_price = EXCLUDED.current_price,
+        image_url = EXCLUDED.image_url,
+        category = EXCLUDED.category,
+        discount_percentage = EXCLUDED.discount_percentage,
+        is_active = EXCLUDED.is_active,
+        content_hash = EXCLUDED.content_hash,
+        updated_at = EXCLUDED.updated_at,
+        last_checked = EXCLUDED.last_checked
+    WHERE public.products.content_hash IS DISTINCT FROM EXCLUDED.content_hash;
+
+    GET DIAGNOSTICS v_written = ROW_COUNT;
+    RETURN v_written;
+END;
+$$;
+
+
+-- === PART 3: Contadores de produto em lote (SupabaseManager.stats_buffer) ===
+-- Recebe [{product_id, view_count, click_count, telegram_send_count, last_sent}]
+-- já agregados por produto e soma no servidor, sem SELECT antes do UPDATE.
+--
+-- updated_at marca a última escrita dos contadores: é a janela de datas do
+-- snapshot (stats_updated_at) e do fallback de cliques do overview. As duas
+-- funções de incremento o atualizam; linhas antigas herdam last_sent.
+ALTER TABLE public.product_stats ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+UPDATE public.product_stats SET updated_at = last_sent
+  WHERE updated_at IS NULL AND last_sent IS NOT NULL;
+ALTER TABLE public.product_stats ALTER COLUMN updated_at SET DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_product_stats_updated_at
+  ON public.product_stats (updated_at);
+
+CREATE OR REPLACE FUNCTION increment_product_stats_bulk(p_stats JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_written INT;
+BEGIN
+    INSERT INTO public.product_stats (
+        product_id, view_count, click_count, telegram_send_count, last_sent, updated_at
+    )
+    SELECT
+        product_id,
+        COALESCE(view_count, 0),
+        COALESCE(click_count, 0),
+        COALESCE(telegram_send_count, 0),
+        last_sent,
+        NOW()
+    FROM jsonb_populate_recordset(NULL::public.product_stats, p_stats)
+    ON CONFLICT (product_id) DO UPDATE SET
+        view_count = public.product_stats.view_count + EXCLUDED.view_count,
+        click_count = public.product_stats.click_count + EXCLUDED.click_count,
+        telegram_send_count = public.product_stats.telegram_send_count + EXCLUDED.telegram_send_count,
+        last_sent = COALESCE(EXCLUDED.last_sent, public.product_stats.last_sent),
+        updated_at = NOW();
+
+    GET DIAGNOSTICS v_written = ROW_COUNT;
+    RETURN v_written;
+END;
+$$;
+
+-- increment_stat (migration_v2) é o fallback por linha do flush: mesma
+-- semântica, agora também marcando updated_at.
+CREATE OR REPLACE FUNCTION increment_stat(p_product_id UUID, p_field TEXT, p_increment INT DEFAULT 1)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.product_stats (product_id, view_count, click_count, telegram_send_count, last_sent, updated_at)
+    VALUES (p_product_id,
+            CASE WHEN p_field = 'view_count' THEN p_increment ELSE 0 END,
+            CASE WHEN p_field = 'click_count' THEN p_increment ELSE 0 END,
+            CASE WHEN p_field = 'telegram_send_count' THEN p_increment ELSE 0 END,
+            NOW(),
+            NOW())
+    ON CONFLICT (product_id) DO UPDATE SET
+        view_count = public.product_stats.view_count + CASE WHEN p_field = 'view_count' THEN p_increment ELSE 0 END,
+        click_count = public.product_stats.click_count + CASE WHEN p_field = 'click_count' THEN p_increment ELSE 0 END,
+        telegram_send_count = public.product_stats.telegram_send_count + CASE WHEN p_field = 'telegram_send_count' THEN p_increment ELSE 0 END,
+        last_sent = CASE WHEN p_field = 'telegram_send_count' THEN NOW() ELSE public.product_stats.last_sent END,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- === PART 4: Seleção de produtos para o Telegram (get_products_for_telegram, telethon_worker) ===
+-- Próximos N produtos ativos menos recentemente enviados, direto no banco:
+-- nunca enviados primeiro, depois last_sent mais antigo, depois maior desconto.
+-- Cada linha = colunas de products + last_sent + send_count.
+--
+-- Um único SELECT com LEFT JOIN ordenado por s.last_sent não usa índice (a
+-- chave de ordenação vem da tabela do join): junta e ordena todos os
+-- candidatos. Por isso a função faz duas buscas, cada uma servida por um índice:
+--   1. nunca enviados: idx_products_telegram_active em ordem de desconto +
+--      anti-join pela PK de product_stats, para no p_limit-ésimo produto;
+--   2. já enviados: idx_product_stats_last_sent em ordem (mesmo ASC NULLS
+--      FIRST do índice) + PK de products, idem.
+-- PG 16, 200k produtos, p_limit=5 (EXPLAIN ANALYZE / tempo da chamada):
+--   85% já enviados: ~250 ms (seq scan + hash join + sort) -> ~1 ms
+--   100% enviados: a busca 1 percorre todos os candidatos sem achar
+--   nenhum (~230 ms, mesma ordem do SELECT antigo); a busca 2 leva 0,2 ms.
+-- plan_cache_mode: o plano genérico do plpgsql não conhece p_limit e volta
+-- para o hash join.
+DROP INDEX IF EXISTS public.idx_products_telegram_candidates;
+CREATE INDEX IF NOT EXISTS idx_products_telegram_active
+  ON public.products (discount_percentage DESC NULLS LAST)
+  WHERE is_active = TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_product_stats_last_sent
+  ON public.product_stats (last_sent ASC NULLS FIRST);
+
+CREATE OR REPLACE FUNCTION get_products_for_telegram(
+    p_limit INT DEFAULT 5,
+    p_min_discount NUMERIC DEFAULT 0,
+    p_only_unsent BOOLEAN DEFAULT FALSE,
+    p_require_image BOOLEAN DEFAULT TRUE
+)
+RETURNS SETOF JSONB
+LANGUAGE plpgsql
+STABLE
+SET plan_cache_mode = force_custom_plan
+AS $$
+DECLARE
+    v_found INT;
+BEGIN
+    RETURN QUERY
+    SELECT to_jsonb(p) || jsonb_build_object(
+        'last_sent', NULL,
+        'send_count', COALESCE(
+            (SELECT s.telegram_send_count FROM public.product_stats s WHERE s.product_id = p.id), 0
+        )
+    )
+    FROM public.products p
+    WHERE p.is_active = TRUE
+      AND (NOT p_require_image OR p.image_url IS NOT NULL)
+      AND COALESCE(p.discount_percentage, 0) >= p_min_discount
+      AND NOT EXISTS (
+          SELECT 1 FROM public.product_stats s
+          WHERE s.product_id = p.id
+            AND (s.last_sent IS NOT NULL OR (p_only_unsent AND s.telegram_send_count > 0))
+      )
+    ORDER BY p.discount_percentage DESC NULLS LAST
+    LIMIT p_limit;
+
+    GET DIAGNOSTICS v_found = ROW_COUNT;
+    IF v_found >= p_limit THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT to_jsonb(p) || jsonb_build_object(
+        'last_sent', s.last_sent,
+        'send_count', COALESCE(s.telegram_send_count, 0)
+    )
+    FROM public.product_stats s
+    JOIN public.products p ON p.id = s.product_id
+    WHERE s.last_sent IS NOT NULL
+      AND (NOT p_only_unsent OR COALESCE(s.telegram_send_count, 0) = 0)
+      AND p.is_active = TRUE
+      AND (NOT p_require_image OR p.image_url IS NOT NULL)
+      AND COALESCE(p.discount_percentage, 0) >= p_min_discount
+    ORDER BY s.last_sent ASC NULLS FIRST, p.discount_percentage DESC NULLS LAST
+    LIMIT p_limit - v_found;
+END;
+$$;
+
+
+-- === PART 5: Produto aleatório sem ORDER BY random() (get_random_product, /aleatorio) ===
+-- Cada produto ganha uma chave aleatória fixa e indexada. Sortear = gerar r
+-- e pegar a primeira chave >= r (dando a volta para a menor se não houver):
+-- um index scan curto em vez de ordenar a tabela inteira.
+-- TABLESAMPLE não serve aqui: amostra páginas antes do WHERE, então com
+-- filtro de loja/desconto volta vazio com frequência e favorece páginas
+-- com mais produtos.
+-- Obs.: DEFAULT volátil reescreve a tabela ao aplicar (uma vez).
+ALTER TABLE public.products
+  ADD COLUMN IF NOT EXISTS random_key DOUBLE PRECISION NOT NULL DEFAULT random();
+
+CREATE INDEX IF NOT EXISTS idx_products_random_key
+  ON public.products (random_key)
+  WHERE is_active = TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_products_store_random_key
+  ON public.products (store, random_key)
+  WHERE is_active = TRUE;
+
+CREATE OR REPLACE FUNCTION get_random_product_fast(
+    p_store TEXT DEFAULT NULL,
+    p_min_discount NUMERIC DEFAULT 0
+)
+RETURNS SETOF public.products
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+    r DOUBLE PRECISION := random();
+BEGIN
+    RETURN QUERY
+    SELECT p.* FROM public.products p
+    WHERE p.is_active = TRUE
+      AND (p_store IS NULL OR p.store = p_store)
+      AND COALESCE(p.discount_percentage, 0) >= p_min_discount
+      AND p.random_key >= r
+    ORDER BY p.random_key
+    LIMIT 1;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT p.* FROM public.products p
+        WHERE p.is_active = TRUE
+          AND (p_store IS NULL OR p.store = p_store)
+          AND COALESCE(p.discount_percentage, 0) >= p_min_discount
+          AND p.random_key < r
+        ORDER BY p.random_key
+        LIMIT 1;
+    END IF;
+END;
+$$;
+
+
+-- === PART 6: Rollups de analytics (AnalyticsRepository, /api/analytics/*) ===
+-- Os endpoints de analytics leem linhas pré-agregadas em vez de varrer
+-- products/product_stats a cada request:
+--   analytics_store_rollup   totais por loja (1 linha por loja)
+--   analytics_daily_rollup   cliques/envios/views por dia
+--   analytics_top_products   top 100 por cliques, envios e quality_score
+--
+-- Manutenção incremental:
+--   - triggers por statement (transition tables) em product_stats somam os
+--     deltas do statement no dia corrente e marcam as lojas afetadas como
+--     sujas; em products, marcam lojas que ganharam/perderam produtos
+--     ativos. Um flush do StatsBuffer = 1 upsert no dia, não 1 por produto.
+--   - refresh_analytics_rollups() recalcula só as lojas sujas e, se algo
+--     mudou, atualiza a view de top-N (CONCURRENTLY, leituras não bloqueiam).
+-- Agendamento: tarefa analytics_rollups do Scheduler, POST
+-- /api/maintenance/analytics_rollups (cron) ou, com pg_cron:
+--   SELECT cron.schedule('analytics-rollups', '*/5 * * * *',
+--                        'SELECT refresh_analytics_rollups()');
+-- Obs.: o rollup diário começa vazio (product_stats não guarda histórico).
+-- O dia da migration é semeado abaixo e marca o início da cobertura: o
+-- overview só soma o rollup para períodos que começam depois dele; antes
+-- disso usa os contadores acumulados de product_stats.
+ALTER TABLE public.products ADD COLUMN IF NOT EXISTS quality_score INTEGER DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS public.analytics_store_rollup (
+    store TEXT PRIMARY KEY,
+    product_count BIGINT NOT NULL DEFAULT 0,
+    total_clicks BIGINT NOT NULL DEFAULT 0,
+    total_telegram_sends BIGINT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    quality_score_sum BIGINT NOT NULL DEFAULT 0,
+    quality_scored_count BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.analytics_daily_rollup (
+    day DATE PRIMARY KEY,
+    clicks BIGINT NOT NULL DEFAULT 0,
+    telegram_sends BIGINT NOT NULL DEFAULT 0,
+    views BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS public.analytics_rollup_dirty (
+    store TEXT PRIMARY KEY,
+    marked_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.analytics_top_products AS
+WITH ranked AS (
+    SELECT
+        p.id, p.name, p.store, p.image_url, p.affiliate_link,
+        p.current_price, p.discount_percentage, p.created_at,
+        COALESCE(p.quality_score, 0) AS quality_score,
+        COALESCE(s.click_count, 0) AS click_count,
+        COALESCE(s.telegram_send_count, 0) AS telegram_send_count,
+        row_number() OVER (ORDER BY COALESCE(s.click_count, 0) DESC, p.id) AS clicks_rank,
+        row_number() OVER (ORDER BY COALESCE(s.telegram_send_count, 0) DESC, p.id) AS telegram_sends_rank,
+        row_number() OVER (ORDER BY COALESCE(p.quality_score, 0) DESC, p.id) AS quality_score_rank
+    FROM public.products p
+    LEFT JOIN public.product_stats s ON s.product_id = p.id
+    WHERE p.is_active = TRUE
+)
+SELECT * FROM ranked
+WHERE clicks_rank <= 100 OR telegram_sends_rank <= 100 OR quality_score_rank <= 100;
+
+-- Obrigatório para REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_top_products_id
+  ON public.analytics_top_products (id);
+
+-- Deltas de product_stats: soma no dia corrente + marca lojas sujas
+CREATE OR REPLACE FUNCTION analytics_track_stats_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.analytics_daily_rollup (day, clicks, telegram_sends, views)
+    SELECT CURRENT_DATE,
+           COALESCE(SUM(n.click_count), 0),
+           COALESCE(SUM(n.telegram_send_count), 0),
+           COALESCE(SUM(n.view_count), 0)
+    FROM new_rows n
+    ON CONFLICT (day) DO UPDATE SET
+        clicks = public.analytics_daily_rollup.clicks + EXCLUDED.clicks,
+        telegram_sends = public.analytics_daily_rollup.telegram_sends + EXCLUDED.telegram_sends,
+        views = public.analytics_daily_rollup.views + EXCLUDED.views;
+
+    INSERT INTO public.analytics_rollup_dirty (store)
+    SELECT DISTINCT COALESCE(p.store, 'unknown')
+    FROM new_rows n JOIN public.products p ON p.id = n.product_id
+    ON CONFLICT (store) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_track_stats_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.analytics_daily_rollup (day, clicks, telegram_sends, views)
+    SELECT CURRENT_DATE,
+           COALESCE(SUM(COALESCE(n.click_count, 0) - COALESCE(o.click_count, 0)), 0),
+           COALESCE(SUM(COALESCE(n.telegram_send_count, 0) - COALESCE(o.telegram_send_count, 0)), 0),
+           COALESCE(SUM(COALESCE(n.view_count, 0) - COALESCE(o.view_count, 0)), 0)
+    FROM new_rows n JOIN old_rows o ON o.product_id = n.product_id
+    ON CONFLICT (day) DO UPDATE SET
+        clicks = public.analytics_daily_rollup.clicks + EXCLUDED.clicks,
+        telegram_sends = public.analytics_daily_rollup.telegram_sends + EXCLUDED.telegram_sends,
+        views = public.analytics_daily_rollup.views + EXCLUDED.views;
+
+    INSERT INTO public.analytics_rollup_dirty (store)
+    SELECT DISTINCT COALESCE(p.store, 'unknown')
+    FROM new_rows n JOIN public.products p ON p.id = n.product_id
+    ON CONFLICT (store) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+-- products: só importa quem entra/sai de uma loja ou muda is_active/quality
+-- (updates de preço do importador não sujam nada)
+CREATE OR REPLACE FUNCTION analytics_track_products()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.analytics_rollup_dirty (store)
+        SELECT DISTINCT COALESCE(store, 'unknown') FROM new_rows
+        ON CONFLICT (store) DO NOTHING;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.analytics_rollup_dirty (store)
+        SELECT DISTINCT COALESCE(store, 'unknown') FROM old_rows
+        ON CONFLICT (store) DO NOTHING;
+    ELSE
+        INSERT INTO public.analytics_rollup_dirty (store)
+        SELECT DISTINCT COALESCE(s.store, 'unknown')
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        CROSS JOIN LATERAL (VALUES (n.store), (o.store)) AS s(store)
+        WHERE n.store IS DISTINCT FROM o.store
+           OR n.is_active IS DISTINCT FROM o.is_active
+           OR n.quality_score IS DISTINCT FROM o.quality_score
+        ON CONFLICT (store) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_analytics_stats_insert ON public.product_stats;
+CREATE TRIGGER trg_analytics_stats_insert
+    AFTER INSERT ON public.product_stats
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_track_stats_insert();
+
+DROP TRIGGER IF EXISTS trg_analytics_stats_update ON public.product_stats;
+CREATE TRIGGER trg_analytics_stats_update
+    AFTER UPDATE ON public.product_stats
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_track_stats_update();
+
+DROP TRIGGER IF EXISTS trg_analytics_products_insert ON public.products;
+CREATE TRIGGER trg_analytics_products_insert
+    AFTER INSERT ON public.products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_track_products();
+
+DROP TRIGGER IF EXISTS trg_analytics_products_update ON public.products;
+CREATE TRIGGER trg_analytics_products_update
+    AFTER UPDATE ON public.products
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_track_products();
+
+DROP TRIGGER IF EXISTS trg_analytics_products_delete ON public.products;
+CREATE TRIGGER trg_analytics_products_delete
+    AFTER DELETE ON public.products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_track_products();
+
+-- Recalcula só as lojas sujas (usa idx_products_store_random_key, PART 5)
+CREATE OR REPLACE FUNCTION refresh_analytics_rollups(p_refresh_top BOOLEAN DEFAULT TRUE)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_stores TEXT[];
+    v_upserted INT := 0;
+    v_removed INT := 0;
+BEGIN
+    WITH claimed AS (
+        DELETE FROM public.analytics_rollup_dirty RETURNING store
+    )
+    SELECT array_agg(store) INTO v_stores FROM claimed;
+
+    IF v_stores IS NULL THEN
+        RETURN jsonb_build_object('stores', 0, 'removed', 0, 'top_refreshed', FALSE);
+    END IF;
+
+    INSERT INTO public.analytics_store_rollup (
+        store, product_count, total_clicks, total_telegram_sends, total_views,
+        quality_score_sum, quality_scored_count, refreshed_at
+    )
+    SELECT
+        COALESCE(p.store, 'unknown'),
+        COUNT(*),
+        COALESCE(SUM(s.click_count), 0),
+        COALESCE(SUM(s.telegram_send_count), 0),
+        COALESCE(SUM(s.view_count), 0),
+        COALESCE(SUM(p.quality_score), 0),
+        COUNT(p.quality_score),
+        NOW()
+    FROM public.products p
+    LEFT JOIN public.product_stats s ON s.product_id = p.id
+    WHERE p.is_active = TRUE
+      AND (p.store = ANY (v_stores) OR (p.store IS NULL AND 'unknown' = ANY (v_stores)))
+    GROUP BY 1
+    ON CONFLICT (store) DO UPDATE SET
+        product_count = EXCLUDED.product_count,
+        total_clicks = EXCLUDED.total_clicks,
+        total_telegram_sends = EXCLUDED.total_telegram_sends,
+        total_views = EXCLUDED.total_views,
+        quality_score_sum = EXCLUDED.quality_score_sum,
+        quality_scored_count = EXCLUDED.quality_scored_count,
+        refreshed_at = EXCLUDED.refreshed_at;
+    GET DIAGNOSTICS v_upserted = ROW_COUNT;
+
+    -- Loja suja que não foi regravada agora (NOW() = início da transação)
+    -- ficou sem produtos ativos
+    DELETE FROM public.analytics_store_rollup
+    WHERE store = ANY (v_stores) AND refreshed_at < NOW();
+    GET DIAGNOSTICS v_removed = ROW_COUNT;
+
+    IF p_refresh_top THEN
+        REFRESH MATERIALIZED VIEW CONCURRENTLY public.analytics_top_products;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'stores', v_upserted, 'removed', v_removed, 'top_refreshed', p_refresh_top
+    );
+END;
+$$;
+
+-- Início da cobertura do rollup diário
+INSERT INTO public.analytics_daily_rollup (day) VALUES (CURRENT_DATE)
+ON CONFLICT (day) DO NOTHING;
+
+-- Carga inicial: todas as lojas começam sujas
+INSERT INTO public.analytics_rollup_dirty (store)
+SELECT DISTINCT COALESCE(store, 'unknown') FROM public.products
+ON CONFLICT (store) DO NOTHING;
+SELECT refresh_analytics_rollups(FALSE);
+
+-- === PART 7: Relatórios agregados no banco (AdvancedAnalytics: funil e relatório de performance) ===
+-- O funil e o relatório de performance baixavam product_stats inteiro e
+-- todas as comissões do período para juntar em Python/pandas. Aqui o join
+-- e os GROUP BY rodam no Postgres e só as linhas de resumo voltam:
+--   analytics_sales_funnel        1 linha por loja (added/viewed/clicked/sold)
+--   analytics_performance_report  resumo, top/piores N, por loja e por
+--                                 categoria em um único JSONB
+-- Comissões entram já somadas por produto (sales), limitadas à janela.
+CREATE INDEX IF NOT EXISTS idx_commissions_calculated_at
+  ON public.commissions (calculated_at);
+
+CREATE OR REPLACE FUNCTION analytics_sales_funnel(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ DEFAULT NOW()
+)
+RETURNS TABLE (
+    store TEXT,
+    added BIGINT,
+    viewed BIGINT,
+    clicked BIGINT,
+    sold BIGINT,
+    sales_amount NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH sales AS (
+        SELECT c.product_id, SUM(c.sale_amount) AS amount
+        FROM public.commissions c
+        WHERE c.calculated_at >= p_start AND c.calculated_at <= p_end
+        GROUP BY c.product_id
+    )
+    SELECT
+        COALESCE(p.store, 'unknown') AS store,
+        COUNT(*) AS added,
+        COUNT(*) FILTER (WHERE COALESCE(s.view_count, 0) > 0) AS viewed,
+        COUNT(*) FILTER (WHERE COALESCE(s.click_count, 0) > 0) AS clicked,
+        COUNT(sa.product_id) AS sold,
+        COALESCE(SUM(sa.amount), 0) AS sales_amount
+    FROM public.products p
+    LEFT JOIN public.product_stats s ON s.product_id = p.id
+    LEFT JOIN sales sa ON sa.product_id = p.id
+    WHERE p.created_at >= p_start AND p.created_at <= p_end
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_performance_report(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_top INT DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH sales AS (
+        SELECT
+            c.product_id,
+            SUM(c.sale_amount) AS sale_amount,
+            SUM(c.commission_amount) AS commission_amount,
+            COUNT(*) AS sales_count
+        FROM public.commissions c
+        WHERE c.calculated_at >= p_start AND c.calculated_at <= p_end
+        GROUP BY c.product_id
+    ),
+    base AS MATERIALIZED (
+        SELECT
+            p.id, p.name, COALESCE(p.store, 'unknown') AS store, p.category,
+            p.current_price, p.discount_percentage, p.is_active,
+            COALESCE(s.view_count, 0) AS view_count,
+            COALESCE(s.click_count, 0) AS click_count,
+            COALESCE(s.telegram_send_count, 0) AS telegram_send_count,
+            COALESCE(sa.sale_amount, 0) AS sale_amount,
+            COALESCE(sa.commission_amount, 0) AS commission_amount,
+            COALESCE(sa.sales_count, 0) AS sales_count
+        FROM public.products p
+        LEFT JOIN public.product_stats s ON s.product_id = p.id
+        LEFT JOIN sales sa ON sa.product_id = p.id
+        WHERE p.created_at >= p_start AND p.created_at <= p_end
+    )
+    SELECT jsonb_build_object(
+        'summary', (
+            SELECT jsonb_build_object(
+                'total_products', COUNT(*),
+                'active_products', COUNT(*) FILTER (WHERE is_active),
+                'avg_price', COALESCE(AVG(current_price), 0),
+                'avg_discount', COALESCE(AVG(discount_percentage), 0),
+                'total_views', COALESCE(SUM(view_count), 0),
+                'total_clicks', COALESCE(SUM(click_count), 0),
+                'total_sales', COALESCE(SUM(sales_count), 0),
+                'total_revenue', COALESCE(SUM(sale_amount), 0),
+                'total_commission', COALESCE(SUM(commission_amount), 0),
+                'total_telegram_sends', COALESCE(SUM(telegram_send_count), 0)
+            )
+            FROM base
+        ),
+        'top_performers', (
+            SELECT COALESCE(jsonb_agg(t ORDER BY t.performance_score DESC, t.id), '[]'::jsonb)
+            FROM (
+                SELECT id, name, store, current_price, click_count,
+                       telegram_send_count, sale_amount,
+                       click_count * 0.3 + telegram_send_count * 0.2 + sale_amount * 0.5
+                           AS performance_score
+                FROM base
+                ORDER BY performance_score DESC, id
+                LIMIT p_top
+            ) t
+        ),
+        'worst_performers', (
+            SELECT COALESCE(jsonb_agg(w ORDER BY w.engagement_score, w.id), '[]'::jsonb)
+            FROM (
+                SELECT id, name, store, current_price, view_count, click_count,
+                       view_count + click_count + telegram_send_count AS engagement_score
+                FROM base
+                ORDER BY engagement_score, id
+                LIMIT p_top
+            ) w
+        ),
+        'store_analysis', (
+            SELECT COALESCE(jsonb_object_agg(st.store, to_jsonb(st) - 'store'), '{}'::jsonb)
+            FROM (
+                SELECT
+                    store,
+                    COUNT(*) AS product_count,
+                    AVG(current_price) AS avg_price,
+                    SUM(view_count) AS total_views,
+                    SUM(click_count) AS total_clicks,
+                    SUM(sales_count) AS total_sales,
+                    SUM(sale_amount) AS total_revenue,
+                    CASE WHEN SUM(view_count) > 0
+                         THEN SUM(click_count)::NUMERIC / SUM(view_count) * 100
+                         ELSE 0 END AS click_through_rate
+                FROM base
+                GROUP BY store
+            ) st
+        ),
+        'category_analysis', (
+            SELECT COALESCE(jsonb_object_agg(ca.category, to_jsonb(ca) - 'category'), '{}'::jsonb)
+            FROM (
+                SELECT
+                    category,
+                    COUNT(*) AS product_count,
+                    AVG(current_price) AS avg_price,
+                    SUM(view_count) AS total_views,
+                    SUM(click_count) AS total_clicks,
+                    AVG(discount_percentage) AS avg_discount
+                FROM base
+                WHERE category IS NOT NULL
+                GROUP BY category
+            ) ca
+        )
+    );
+$$;
@@ -0,0 +1,392 @@
+"""
+Benchmark: funil de vendas e relatório de performance (AdvancedAnalytics)
+ITIL Activity: Continual Improvement
+
+Popula products / product_stats / commissions sintéticos (100k e 1M produtos
+por padrão) em um SQLite temporário e roda os métodos reais do
+AdvancedAnalytics com um client falso, nos dois caminhos:
+  - python: sem as RPCs; baixa produtos do período, product_stats inteiro e
+            as comissões e agrega em Python/pandas (caminho antigo, hoje
+            fallback)
+  - sql:    RPCs analytics_sales_funnel / analytics_performance_report
+            (migration v4 PART 7); o banco agrega e só as linhas de resumo
+            voltam
+
+Cada resposta passa por json.dumps/json.loads, como o PostgREST, e o payload
+é somado. Latência = melhor de --repeat execuções; memória = pico do
+tracemalloc em uma execução separada (o cache do SQLite fica fora da conta).
+O SQLite é stand-in do Postgres: as consultas do modo sql são as da
+migration traduzidas (tabela temporária no lugar do CTE MATERIALIZED).
+
+Uso:
+    python scripts/benchmarks/bench_analytics_reports.py --rows 100000 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "afiliadohub"))
+
+# O import do pacote de handlers instancia o SupabaseManager (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from afiliadohub.api.handlers.advanced_analytics import AdvancedAnalytics  # noqa: E402
+import api.utils.supabase_client as supabase_client  # noqa: E402
+
+STORES = ["shopee", "mercadolivre", "amazon", "magalu", "aliexpress"]
+CATEGORIES = ["Moda", "Casa", "Eletrônicos", "Beleza", "Esporte", None]
+HISTORY_DAYS = 90
+WINDOW_DAYS = 30
+WINDOW_GUARD = 6 * 3600
+FAR_FUTURE = "9999-12-31T00:00:00"
+
+SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    store TEXT,
+    category TEXT,
+    current_price REAL,
+    discount_percentage INTEGER,
+    is_active INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE product_stats (
+    product_id INTEGER PRIMARY KEY,
+    view_count INTEGER,
+    click_count INTEGER,
+    telegram_send_count INTEGER,
+    last_sent TEXT
+);
+CREATE TABLE commissions (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    sale_amount REAL,
+    commission_amount REAL,
+    calculated_at TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX idx_products_created ON products (created_at);
+CREATE INDEX idx_commissions_product_id ON commissions (product_id);
+CREATE INDEX idx_commissions_calculated_at ON commissions (calculated_at);
+ANALYZE;
+"""
+
+# --- Tradução para SQLite das RPCs da migration v4 PART 7 ---
+
+SALES_CTE = """
+sales AS (
+    SELECT product_id, SUM(sale_amount) AS sale_amount,
+           SUM(commission_amount) AS commission_amount, COUNT(*) AS sales_count
+    FROM commissions
+    WHERE calculated_at >= :start AND calculated_at <= :end
+    GROUP BY product_id
+)
+"""
+
+FUNNEL_SQL = f"""
+WITH {SALES_CTE}
+SELECT
+    COALESCE(p.store, 'unknown') AS store,
+    COUNT(*) AS added,
+    SUM(COALESCE(s.view_count, 0) > 0) AS viewed,
+    SUM(COALESCE(s.click_count, 0) > 0) AS clicked,
+    COUNT(sa.product_id) AS sold,
+    COALESCE(SUM(sa.sale_amount), 0) AS sales_amount
+FROM products p
+LEFT JOIN product_stats s ON s.product_id = p.id
+LEFT JOIN sales sa ON sa.product_id = p.id
+WHERE p.created_at >= :start AND p.created_at <= :end
+GROUP BY 1
+ORDER BY 1
+"""
+
+REPORT_BASE_SQL = f"""
+CREATE TEMP TABLE base AS
+WITH {SALES_CTE}
+SELECT
+    p.id, p.name, COALESCE(p.store, 'unknown') AS store, p.category,
+    p.current_price, p.discount_percentage, p.is_active,
+    COALESCE(s.view_count, 0) AS view_count,
+    COALESCE(s.click_count, 0) AS click_count,
+    COALESCE(s.telegram_send_count, 0) AS telegram_send_count,
+    COALESCE(sa.sale_amount, 0) AS sale_amount,
+    COALESCE(sa.commission_amount, 0) AS commission_amount,
+    COALESCE(sa.sales_count, 0) AS sales_count
+FROM products p
+LEFT JOIN product_stats s ON s.product_id = p.id
+LEFT JOIN sales sa ON sa.product_id = p.id
+WHERE p.created_at >= :start AND p.created_at <= :end
+"""
+
+REPORT_SUMMARY_SQL = """
+SELECT COUNT(*) AS total_products,
+       COALESCE(SUM(is_active), 0) AS active_products,
+       COALESCE(AVG(current_price), 0) AS avg_price,
+       COALESCE(AVG(discount_percentage), 0) AS avg_discount,
+       COALESCE(SUM(view_count), 0) AS total_views,
+       COALESCE(SUM(click_count), 0) AS total_clicks,
+       COALESCE(SUM(sales_count), 0) AS total_sales,
+       COALESCE(SUM(sale_amount), 0) AS total_revenue,
+       COALESCE(SUM(commission_amount), 0) AS total_commission,
+       COALESCE(SUM(telegram_send_count), 0) AS total_telegram_sends
+FROM base
+"""
+
+REPORT_TOP_SQL = """
+SELECT id, name, store, current_price, click_count, telegram_send_count, sale_amount,
+       click_count * 0.3 + telegram_send_count * 0.2 + sale_amount * 0.5 AS performance_score
+FROM base ORDER BY performance_score DESC, id LIMIT :top
+"""
+
+REPORT_WORST_SQL = """
+SELECT id, name, store, current_price, view_count, click_count,
+       view_count + click_count + telegram_send_count AS engagement_score
+FROM base ORDER BY engagement_score, id LIMIT :top
+"""
+
+REPORT_STORE_SQL = """
+SELECT store, COUNT(*) AS product_count, AVG(current_price) AS avg_price,
+       SUM(view_count) AS total_views, SUM(click_count) AS total_clicks,
+       SUM(sales_count) AS total_sales, SUM(sale_amount) AS total_revenue,
+       CASE WHEN SUM(view_count) > 0
+            THEN SUM(click_count) * 100.0 / SUM(view_count) ELSE 0 END AS click_through_rate
+FROM base GROUP BY store
+"""
+
+REPORT_CATEGORY_SQL = """
+SELECT category, COUNT(*) AS product_count, AVG(current_price) AS avg_price,
+       SUM(view_count) AS total_views, SUM(click_count) AS total_clicks,
+       AVG(discount_percentage) AS avg_discount
+FROM base WHERE category IS NOT NULL GROUP BY category
+"""
+
+
+def build_database(path: str, rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+
+    def moment() -> str:
+        seconds = rng.randrange(HISTORY_DAYS * 86400)
+        # Nada perto do início da janela: os dois modos rodam em instantes
+        # diferentes e precisam ver os mesmos produtos
+        if abs(seconds - WINDOW_DAYS * 86400) < WINDOW_GUARD:
+            seconds += 2 * WINDOW_GUARD
+        return (now - timedelta(seconds=seconds)).isoformat()
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                i,
+                f"Produto {i}",
+                STORES[i % len(STORES)],
+                rng.choice(CATEGORIES),
+                round(rng.uniform(5, 2000), 2),
+                rng.choice([0, 5, 10, 20, 30, 50]),
+                int(rng.random() > 0.1),
+                moment(),
+            )
+            for i in range(rows)
+        ),
+    )
+    # product_stats cobre ~80% dos produtos (e não tem filtro de período)
+    conn.executemany(
+        "INSERT INTO product_stats VALUES (?, ?, ?, ?, ?)",
+        (
+            (i, rng.randrange(200), rng.randrange(20), rng.randrange(5), moment())
+            for i in range(rows)
+            if rng.random() < 0.8
+        ),
+    )
+    # ~3% dos produtos vendem (1 a 3 comissões cada)
+    sales = []
+    for product_id in range(rows):
+        if rng.random() < 0.03:
+            for _ in range(rng.randint(1, 3)):
+                amount = round(rng.uniform(20, 1500), 2)
+                sales.append((product_id, amount, round(amount * 0.07, 2), moment()))
+    conn.executemany(
+        "INSERT INTO commissions (product_id, sale_amount, commission_amount, calculated_at) "
+        "VALUES (?, ?, ?, ?)",
+        sales,
+    )
+    conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+
+
+class FakeResponse:
+    def __init__(self, payload, counter: dict):
+        body = json.dumps(payload, default=str)
+        counter["bytes"] += len(body)
+        self.data = json.loads(body)
+
+
+class FakeQuery:
+    """select/gte/lte/execute do supabase-py sobre o SQLite"""
+
+    def __init__(self, conn, table: str, counter: dict):
+        self.conn, self.table, self.counter = conn, table, counter
+        self.columns, self.where, self.params = "*", [], []
+
+    def select(self, columns: str):
+        self.columns = columns
+        return self
+
+    def gte(self, column: str, value):
+        self.where.append(f"{column} >= ?")
+        self.params.append(value)
+        return self
+
+    def lte(self, column: str, value):
+        self.where.append(f"{column} <= ?")
+        self.params.append(value)
+        return self
+
+    def execute(self):
+        sql = f"SELECT {self.columns} FROM {self.table}"
+        if self.where:
+            sql += " WHERE " + " AND ".join(self.where)
+        cur = self.conn.execute(sql, self.params)
+        names = [d[0] for d in cur.description]
+        rows = [dict(zip(names, row)) for row in cur]
+        return FakeResponse(rows, self.counter)
+
+
+class FakeRpc:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class FakeClient:
+    def __init__(self, conn, mode: str, counter: dict):
+        self.conn, self.mode, self.counter = conn, mode, counter
+
+    def table(self, name: str):
+        return FakeQuery(self.conn, name, self.counter)
+
+    def rpc(self, name: str, params: dict):
+        if name == "get_daily_trends":
+            return FakeRpc(lambda: FakeResponse([{"date": "-"}], self.counter))
+        if self.mode == "python":
+            raise Exception(f"function {name} does not exist")
+        if name == "analytics_sales_funnel":
+            return FakeRpc(lambda: self._funnel(params))
+        return FakeRpc(lambda: self._report(params))
+
+    def _rows(self, sql: str, params: dict):
+        cur = self.conn.execute(sql, params)
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur]
+
+    def _funnel(self, params: dict):
+        window = {"start": params["p_start"], "end": params.get("p_end", FAR_FUTURE)}
+        return FakeResponse(self._rows(FUNNEL_SQL, window), self.counter)
+
+    def _report(self, params: dict):
+        self.conn.execute(REPORT_BASE_SQL, {"start": params["p_start"], "end": params["p_end"]})
+        try:
+            top = {"top": params["p_top"]}
+            stores = self._rows(REPORT_STORE_SQL, {})
+            categories = self._rows(REPORT_CATEGORY_SQL, {})
+            payload = {
+                "summary": self._rows(REPORT_SUMMARY_SQL, {})[0],
+                "top_performers": self._rows(REPORT_TOP_SQL, top),
+                "worst_performers": self._rows(REPORT_WORST_SQL, top),
+                "store_analysis": {row.pop("store"): row for row in stores},
+                "category_analysis": {row.pop("category"): row for row in categories},
+            }
+        finally:
+            self.conn.execute("DROP TABLE temp.base")
+        return FakeResponse(payload, self.counter)
+
+
+class FakeManager:
+    def __init__(self, client):
+        self.client = client
+
+
+async def run_reports(analytics: AdvancedAnalytics) -> dict:
+    # Mede o cálculo, não o cache de relatórios
+    analytics.cache.invalidate()
+    end = datetime.now()
+    start = end - timedelta(days=WINDOW_DAYS)
+    funnel = await analytics.get_sales_funnel_analysis(WINDOW_DAYS)
+    report = await analytics.generate_performance_report(start.isoformat(), end.isoformat())
+    assert "error" not in funnel and "error" not in report, (funnel, report)
+    return {"funnel": funnel, "report": report}
+
+
+def measure(path: str, mode: str, repeat: int) -> dict:
+    conn = sqlite3.connect(path)
+    counter = {"bytes": 0}
+    supabase_client.get_supabase_manager = lambda: FakeManager(FakeClient(conn, mode, counter))
+    analytics = AdvancedAnalytics()
+
+    timings = []
+    for _ in range(repeat):
+        counter["bytes"] = 0
+        started = time.perf_counter()
+        result = asyncio.run(run_reports(analytics))
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    asyncio.run(run_reports(analytics))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+
+    return {
+        "seconds": min(timings),
+        "peak_mb": peak / 1e6,
+        "payload_mb": counter["bytes"] / 1e6,
+        "products_added": result["funnel"]["funnel"]["products_added"],
+        "total_sales": result["funnel"]["funnel"]["total_sales"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'produtos':>10}{'modo':>8}{'latência s':>12}{'pico MB':>10}{'payload MB':>12}{'no período':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"analytics_{rows}.db")
+            build_database(path, rows)
+            results = {mode: measure(path, mode, args.repeat) for mode in ("python", "sql")}
+            # Os dois caminhos precisam fechar o mesmo funil
+            assert results["python"]["products_added"] == results["sql"]["products_added"]
+            assert round(results["python"]["total_sales"], 2) == round(results["sql"]["total_sales"], 2)
+            for mode, result in results.items():
+                print(
+                    f"{rows:>10,}{mode:>8}{result['seconds']:>12.2f}{result['peak_mb']:>10.1f}"
+                    f"{result['payload_mb']:>12.2f}{result['products_added']:>12,}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: parsing de feeds CSV (linhas/s) no CSVImporter
+ITIL Activity: Continual Improvement
+
+Gera um feed sintético estilo Awin (preço BR "R$ 1.234,56", desconto "15%")
+e mede quantas linhas por segundo viram registros da tabela products:
+  - iterrows: caminho antigo, linha a linha (dict lowercase + busca de aliases)
+  - vectorized: _parse_chunk com aliases resolvidos uma vez por arquivo
+
+O caminho antigo é medido em uma amostra (--legacy-rows) porque é lento demais
+para 1M linhas; o número de linhas/s é comparável.
+
+Uso:
+    python scripts/benchmarks/bench_csv_parse.py --rows 1000000
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "afiliadohub"))
+
+# O import do pacote de handlers instancia o SupabaseManager (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from afiliadohub.api.handlers.csv_import import (  # noqa: E402
+    CSV_COLUMN_ALIASES,
+    CSV_PARSE_CHUNK_SIZE,
+    CSVImporter,
+    _is_known_column,
+    resolve_csv_columns,
+)
+
+
+def make_feed(rows: int, seed: int = 42) -> bytes:
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(5, 5000, rows)
+    df = pd.DataFrame(
+        {
+            "aw_product_id": np.arange(rows),
+            "product_name": [f"Produto {i}" for i in range(rows)],
+            "merchant_name": rng.choice(["Loja A", "Loja B", "Loja C"], rows),
+            "search_price": [
+                "R$ " + f"{p:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                for p in prices
+            ],
+            "awin_deep_link": [f"https://www.awin1.com/pclick.php?p={i}" for i in range(rows)],
+            "merchant_image_url": [f"https://img.example.com/{i}.jpg" for i in range(rows)],
+            "merchant_category": rng.choice(["Moda", "Casa", "Eletrônicos"], rows),
+            "savings_percent": [f"{d}%" for d in rng.integers(0, 80, rows)],
+            "description": ["Descrição longa do produto " * 4] * rows,
+        }
+    )
+    return df.to_csv(index=False).encode()
+
+
+def _legacy_parse_row(row, default_store: str):
+    """Réplica do parse antigo por linha (referência de comparação)"""
+    row_dict = {str(k).lower().strip(): v for k, v in row.to_dict().items()}
+
+    def first(field, default=None):
+        return next(
+            (row_dict[k] for k in CSV_COLUMN_ALIASES[field] if k in row_dict and pd.notna(row_dict[k])),
+            default,
+        )
+
+    name, link = first("name"), first("link")
+    if not name or not link:
+        return None
+    price_raw = first("price", 0)
+    try:
+        if isinstance(price_raw, str):
+            price = float(price_raw.replace("R$", "").replace(" ", "").replace(".", "").replace(",", "."))
+        else:
+            price = float(price_raw)
+    except Exception:
+        price = 0.0
+    discount_raw = first("discount", 0)
+    try:
+        discount = int(float(discount_raw.replace("%", "").strip())) if isinstance(discount_raw, str) else int(discount_raw)
+    except Exception:
+        discount = 0
+    image_url = first("image")
+    return {
+        "name": str(name)[:255],
+        "store": first("store", default_store).lower().strip(),
+        "current_price": price,
+        "affiliate_link": str(link),
+        "image_url": str(image_url) if image_url else None,
+        "category": str(first("category", "Geral"))[:100],
+        "discount_percentage": discount,
+        "is_active": True,
+    }
+
+
+def bench_vectorized(feed: bytes, chunk_size: int) -> tuple:
+    importer = CSVImporter.__new__(CSVImporter)  # sem conexão com o banco
+    start = time.perf_counter()
+    total, columns = 0, None
+    reader = pd.read_csv(io.BytesIO(feed), chunksize=chunk_size, usecols=_is_known_column)
+    for df in reader:
+        if columns is None:
+            columns = resolve_csv_columns(df.columns)
+        total += len(importer._parse_chunk(df, "awin", columns))
+    return total, time.perf_counter() - start
+
+
+def bench_iterrows(feed: bytes, chunk_size: int) -> tuple:
+    start = time.perf_counter()
+    total = 0
+    for df in pd.read_csv(io.BytesIO(feed), chunksize=chunk_size):
+        for _, row in df.iterrows():
+            if _legacy_parse_row(row, "awin"):
+                total += 1
+    return total, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=5_000)
+    parser.add_argument("--chunk-size", type=int, default=CSV_PARSE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print(f"Gerando feed sintético com {args.rows:,} linhas...")
+    feed = make_feed(args.rows)
+    print(f"Feed: {len(feed) / 1024 / 1024:.1f} MB")
+
+    rows, elapsed = bench_vectorized(feed, args.chunk_size)
+    print(f"vectorized: {rows:,} linhas em {elapsed:.2f}s -> {rows / elapsed:,.0f} linhas/s")
+
+    legacy_feed = make_feed(args.legacy_rows)
+    rows, elapsed = bench_iterrows(legacy_feed, 500)  # chunk antigo
+    print(f"iterrows:   {rows:,} linhas em {elapsed:.2f}s -> {rows / elapsed:,.0f} linhas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: pico de memória (RSS) ao importar um feed remoto
+ITIL Activity: Continual Improvement
+
+Serve um feed gzip sintético via HTTP local e importa com um client falso:
+  - buffered: resp.read() inteiro em BytesIO (caminho antigo do FeedManager)
+  - stream:   open_feed_stream -> pd.read_csv em chunks (memória ~ chunk_size)
+
+Cada modo roda em um subprocesso novo e reporta o ``peak_rss_mb`` do próprio
+import (ru_maxrss não serve: no Linux o pico do pai sobrevive ao fork/exec).
+
+Uso:
+    python scripts/benchmarks/bench_feed_memory.py --rows 1000000
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "afiliadohub"))
+
+# O import do pacote de handlers instancia o SupabaseManager (sem rede)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+
+def make_feed(rows: int, seed: int = 42) -> bytes:
+    # Descrição aleatória: comprime pouco, como feeds reais
+    rng = random.Random(seed)
+    lines = ["product_name,merchant_name,search_price,awin_deep_link,description"]
+    lines += [
+        f'Produto {i},Loja A,"R$ {i % 5000},99",https://www.awin1.com/p?p={i},'
+        + f"{rng.getrandbits(512):0128x}"
+        for i in range(rows)
+    ]
+    return gzip.compress("\n".join(lines).encode(), compresslevel=1)
+
+
+class FakeSupabase:
+    async def bulk_insert_products(self, products, batch_size=500, token=None):
+        await asyncio.sleep(0.001)
+        return {"inserted": len(products), "errors": 0}
+
+
+async def run_import(mode: str, url: str) -> dict:
+    import aiohttp
+
+    from afiliadohub.api.handlers.csv_import import CSVImporter
+    from afiliadohub.api.utils.feed_stream import open_feed_stream
+
+    importer = CSVImporter.__new__(CSVImporter)
+    importer.supabase = FakeSupabase()
+    importer.token = None
+    importer.error_count = 0
+    importer.import_stats = {"total": 0, "imported": 0, "updated": 0, "skipped": 0, "errors": 0}
+
+    if mode == "buffered":
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                file_content = io.BytesIO(await resp.read())
+        return await importer.process_csv_upload(file_content, "awin", compression="gzip")
+
+    from afiliadohub.api.utils.http_clients import http_clients
+
+    try:
+        async with open_feed_stream(url) as (file_content, compression, _):
+            return await importer.process_csv_upload(
+                file_content, "awin", compression=compression
+            )
+    finally:
+        await http_clients.close()
+
+
+async def serve_and_measure(rows: int):
+    from aiohttp import web
+
+    body = make_feed(rows)
+
+    async def handler(request):
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/feed.csv.gz", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/feed.csv.gz"
+
+    print(f"Feed: {rows} linhas, {len(body) / 1e6:.1f} MB gzip")
+    try:
+        for mode in ("buffered", "stream"):
+            # Subprocesso: roda o import e imprime "segundos pico_mb"
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, __file__, "--child", mode, url,
+                stdout=subprocess.PIPE,
+            )
+            out, _ = await proc.communicate()
+            seconds, peak_mb = out.decode().split()[-2:]
+            print(f"{mode:>9}: {float(seconds):6.2f}s  pico RSS {float(peak_mb):7.1f} MB")
+    finally:
+        await runner.cleanup()
+
+
+def child(mode: str, url: str):
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    started = time.perf_counter()
+    stats = asyncio.run(run_import(mode, url))
+    assert stats["imported"] > 0
+    print(f"{time.perf_counter() - started:.3f} {stats['peak_rss_mb']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+    else:
+        asyncio.run(serve_and_measure(args.rows))
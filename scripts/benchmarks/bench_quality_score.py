@@ -0,0 +1,114 @@
+"""
+Benchmark: score de qualidade de um feed inteiro
+ITIL Activity: Continual Improvement
+
+Gera nós sintéticos no formato productOfferV2 e mede o tempo para pontuar
+o feed:
+  - legacy: if/elif produto a produto (cópia do calculate_quality_score antigo)
+  - dicts: score_products sobre a lista de nós (extração + NumPy)
+  - columns: quality_scores sobre colunas já numéricas (DataFrame)
+
+Uso:
+    python scripts/benchmarks/bench_quality_score.py --rows 500000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "afiliadohub"))
+
+from afiliadohub.api.utils.quality_score import (  # noqa: E402
+    product_columns,
+    quality_scores,
+    score_products,
+)
+
+
+def make_nodes(rows: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "ratingStar": f"{rating:.1f}",
+            "sales": int(sales),
+            "commissionRate": f"{commission:.2f}",
+            "priceDiscountRate": int(discount),
+        }
+        for rating, sales, commission, discount in zip(
+            rng.uniform(0, 5, rows),
+            rng.integers(0, 5000, rows),
+            rng.uniform(0, 0.7, rows),
+            rng.integers(0, 90, rows),
+        )
+    ]
+
+
+def legacy_score(product) -> int:
+    score = 0
+    rating = float(product.get("ratingStar", 0))
+    if rating > 0:
+        score += int((rating / 5.0) * 30)
+    sales = int(product.get("sales", 0))
+    if sales >= 1000:
+        score += 30
+    elif sales >= 500:
+        score += 20
+    elif sales >= 100:
+        score += 10
+    elif sales >= 50:
+        score += 5
+    commission = float(product.get("commissionRate", 0)) * 100
+    if commission >= 50:
+        score += 25
+    elif commission >= 40:
+        score += 20
+    elif commission >= 30:
+        score += 15
+    elif commission >= 20:
+        score += 10
+    discount = float(product.get("priceDiscountRate", 0))
+    if 10 <= discount <= 50:
+        score += 15
+    elif discount > 50:
+        score += 5
+    return min(score, 100)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    nodes = make_nodes(args.rows)
+    frame = pd.DataFrame(product_columns(nodes))
+
+    legacy, legacy_s = timed(lambda: np.array([legacy_score(n) for n in nodes]))
+    batch, dicts_s = timed(score_products, nodes)
+    columns, columns_s = timed(
+        quality_scores,
+        frame["rating"],
+        frame["sales"],
+        frame["commission_pct"],
+        frame["discount_pct"],
+    )
+
+    assert np.array_equal(legacy, batch) and np.array_equal(batch, columns)
+
+    print(f"{args.rows:,} produtos")
+    for label, seconds in (("legacy", legacy_s), ("dicts", dicts_s), ("columns", columns_s)):
+        print(f"  {label:<8} {seconds:7.3f}s  {args.rows / seconds:12,.0f} produtos/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Benchmark: sorteio de produto aleatório em uma tabela grande
+ITIL Activity: Continual Improvement
+
+Popula uma tabela ``products`` sintética (1M linhas por padrão) e compara:
+  - order_by_random: ORDER BY random() LIMIT 1 (RPC get_random_product antiga)
+  - random_key:      primeira random_key >= r no índice parcial, com volta
+                     (RPC get_random_product_fast, migration v4 PART 5)
+  - tablesample:     TABLESAMPLE SYSTEM + filtros (só Postgres; mostra a taxa
+                     de sorteios vazios quando há filtro)
+
+Com ``--dsn`` (ou BENCH_PG_DSN) usa um Postgres local descartável via
+psycopg; sem isso, roda no SQLite em memória como stand-in (mesmos índices
+e consultas, sem TABLESAMPLE).
+
+Uso:
+    python scripts/benchmarks/bench_random_product.py --rows 1000000
+    python scripts/benchmarks/bench_random_product.py --dsn postgresql://localhost/bench
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+STORES = ["shopee", "mercadolivre", "amazon", "magalu", "aliexpress"]
+
+PG_SCHEMA = """
+DROP TABLE IF EXISTS bench_products;
+CREATE TABLE bench_products (
+    id BIGSERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    store TEXT NOT NULL,
+    discount_percentage INT,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    random_key DOUBLE PRECISION NOT NULL DEFAULT random()
+);
+"""
+
+PG_INDEXES = """
+CREATE INDEX ON bench_products (random_key) WHERE is_active = TRUE;
+CREATE INDEX ON bench_products (store, random_key) WHERE is_active = TRUE;
+ANALYZE bench_products;
+"""
+
+SQLITE_SCHEMA = """
+CREATE TABLE bench_products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    store TEXT NOT NULL,
+    discount_percentage INT,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    random_key REAL NOT NULL
+);
+"""
+
+SQLITE_INDEXES = """
+CREATE INDEX idx_random_key ON bench_products (random_key) WHERE is_active = 1;
+CREATE INDEX idx_store_random_key ON bench_products (store, random_key) WHERE is_active = 1;
+ANALYZE;
+"""
+
+
+def synthetic_rows(rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(rows):
+        yield (
+            f"Produto {i}",
+            STORES[i % len(STORES)],
+            rng.choice([0, 0, 5, 10, 15, 20, 30, 40, 50, 70]),
+            rng.random() > 0.1,
+            rng.random(),
+        )
+
+
+class Backend:
+    """Conexão + SQL de cada estratégia no dialeto do banco"""
+
+    def __init__(self, dsn: str = None):
+        self.dsn = dsn
+        if dsn:
+            import psycopg
+
+            self.name = "postgres"
+            self.conn = psycopg.connect(dsn, autocommit=True)
+            self.param, self.true = "%s", "= TRUE"
+        else:
+            self.name = "sqlite"
+            self.conn = sqlite3.connect(":memory:")
+            self.param, self.true = "?", "= 1"
+
+    def load(self, rows: int):
+        cur = self.conn.cursor()
+        if self.dsn:
+            cur.execute(PG_SCHEMA)
+            with cur.copy(
+                "COPY bench_products (name, store, discount_percentage, is_active, random_key) FROM STDIN"
+            ) as copy:
+                for row in synthetic_rows(rows):
+                    copy.write_row(row)
+            cur.execute(PG_INDEXES)
+        else:
+            cur.executescript(SQLITE_SCHEMA)
+            cur.executemany(
+                "INSERT INTO bench_products (name, store, discount_percentage, is_active, random_key) "
+                "VALUES (?, ?, ?, ?, ?)",
+                synthetic_rows(rows),
+            )
+            cur.executescript(SQLITE_INDEXES)
+            self.conn.commit()
+
+    def _where(self) -> str:
+        """Mesmos filtros das RPCs (loja opcional, desconto mínimo)"""
+        p = self.param
+        return (
+            f"is_active {self.true} AND (CAST({p} AS TEXT) IS NULL OR store = {p}) "
+            f"AND COALESCE(discount_percentage, 0) >= {p}"
+        )
+
+    def order_by_random(self, store, min_discount):
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT id FROM bench_products WHERE {self._where()} "
+            "ORDER BY random() LIMIT 1",
+            (store, store, min_discount),
+        )
+        return cur.fetchone()
+
+    def random_key(self, store, min_discount):
+        cur = self.conn.cursor()
+        r = random.random()
+        base = f"SELECT id FROM bench_products WHERE {self._where()} AND random_key"
+        cur.execute(
+            f"{base} >= {self.param} ORDER BY random_key LIMIT 1",
+            (store, store, min_discount, r),
+        )
+        row = cur.fetchone()
+        if row is None:
+            cur.execute(
+                f"{base} < {self.param} ORDER BY random_key LIMIT 1",
+                (store, store, min_discount, r),
+            )
+            row = cur.fetchone()
+        return row
+
+    def tablesample(self, store, min_discount):
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT id FROM bench_products TABLESAMPLE SYSTEM (0.01) "
+            f"WHERE {self._where()} LIMIT 1",
+            (store, store, min_discount),
+        )
+        return cur.fetchone()
+
+
+def measure(fn, draws: int, store, min_discount) -> dict:
+    timings, empty, seen = [], 0, set()
+    for _ in range(draws):
+        started = time.perf_counter()
+        row = fn(store, min_discount)
+        timings.append(time.perf_counter() - started)
+        if row is None:
+            empty += 1
+        else:
+            seen.add(row[0])
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+        "empty": empty,
+        "distinct": len(seen),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--draws", type=int, default=50)
+    parser.add_argument("--dsn", default=os.getenv("BENCH_PG_DSN"))
+    args = parser.parse_args()
+
+    backend = Backend(args.dsn)
+    print(f"Populando {args.rows:,} produtos ({backend.name})...")
+    started = time.perf_counter()
+    backend.load(args.rows)
+    print(f"  carga: {time.perf_counter() - started:.1f}s\n")
+
+    strategies = [("order_by_random", backend.order_by_random), ("random_key", backend.random_key)]
+    if args.dsn:
+        strategies.append(("tablesample", backend.tablesample))
+
+    cases = [("sem filtro", None, 0), ("loja", "shopee", 0), ("loja + desconto >= 50", "shopee", 50)]
+    print(f"{'cenário':<24}{'estratégia':<18}{'p50 ms':>10}{'p99 ms':>10}{'vazios':>8}{'distintos':>11}")
+    for label, store, min_discount in cases:
+        for name, fn in strategies:
+            result = measure(fn, args.draws, store, min_discount)
+            print(
+                f"{label:<24}{name:<18}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['empty']:>8}{result['distinct']:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
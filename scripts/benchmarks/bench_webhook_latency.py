@@ -0,0 +1,132 @@
+"""
+Benchmark: latência do webhook Telegram durante uma importação concorrente
+ITIL Activity: Continual Improvement
+
+Simula o PostgREST com um client falso cujo ``execute()`` bloqueia por
+``--db-latency`` ms (como o client síncrono do supabase-py faz de verdade)
+e mede o p50/p99 de um "webhook" que roda a cada 10ms enquanto um import
+de ``--products`` produtos é gravado em lotes.
+
+Compara dois modos:
+  - blocking: execute() chamado direto no event loop (comportamento antigo)
+  - offload:  SupabaseManager.execute() (pool de threads limitado)
+
+Uso:
+    python scripts/benchmarks/bench_webhook_latency.py --products 20000
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "afiliadohub"))
+
+from api.utils.supabase_client import SupabaseManager
+
+
+class _FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+
+class _FakeQuery:
+    """Query builder mínimo: qualquer método encadeado devolve o próprio objeto"""
+
+    def __init__(self, latency_s: float, rows: int = 1):
+        self.latency_s = latency_s
+        self.rows = rows
+
+    def __getattr__(self, _name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.latency_s)  # round-trip HTTP bloqueante
+        return _FakeResponse([{"id": i} for i in range(self.rows)])
+
+
+class _FakeClient:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def table(self, _name):
+        return _FakeQuery(self.latency_s)
+
+    def rpc(self, _name, _params=None):
+        return _FakeQuery(self.latency_s)
+
+
+def _make_manager(latency_s: float) -> SupabaseManager:
+    manager = object.__new__(SupabaseManager)
+    manager._client = _FakeClient(latency_s)
+    manager._executor = None
+    manager._http_client = None
+    return manager
+
+
+async def _import_job(manager: SupabaseManager, products: int, batch: int, offload: bool):
+    for _ in range(0, products, batch):
+        query = manager.client.table("products").upsert([], on_conflict="affiliate_link")
+        if offload:
+            await manager.execute(query)
+        else:
+            query.execute()
+        await asyncio.sleep(0)
+
+
+async def _webhook_probe(manager: SupabaseManager, stop: asyncio.Event, samples: list):
+    """Simula o processamento de um update: 1 leitura no banco + resposta"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await manager.execute(manager.client.table("products").select("*"))
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def run(mode: str, products: int, batch: int, latency_ms: float) -> dict:
+    manager = _make_manager(latency_ms / 1000)
+    samples: list = []
+    stop = asyncio.Event()
+
+    probe = asyncio.create_task(_webhook_probe(manager, stop, samples))
+    start = time.perf_counter()
+    await _import_job(manager, products, batch, offload=(mode == "offload"))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    manager.close()
+
+    samples.sort()
+    p99_index = max(0, min(len(samples) - 1, math.ceil(len(samples) * 0.99) - 1))
+    return {
+        "mode": mode,
+        "import_s": round(elapsed, 2),
+        "webhooks": len(samples),
+        "p50_ms": round(statistics.median(samples), 1) if samples else None,
+        "p99_ms": round(samples[p99_index], 1) if samples else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--db-latency", type=float, default=80.0, help="ms por round-trip")
+    args = parser.parse_args()
+
+    print(f"{'modo':<10} {'import(s)':>10} {'webhooks':>9} {'p50(ms)':>9} {'p99(ms)':>9}")
+    for mode in ("blocking", "offload"):
+        r = asyncio.run(run(mode, args.products, args.batch, args.db_latency))
+        print(
+            f"{r['mode']:<10} {r['import_s']:>10} {r['webhooks']:>9} "
+            f"{r['p50_ms']:>9} {r['p99_ms']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
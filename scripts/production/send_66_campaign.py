@@ -19,7 +19,6 @@ Anti-manopla: exige desconto ≥ 15%, vendas ≥ 10, rating ≥ 4.3
 
 import os
 import sys
-import math
 import html as html_module
 import asyncio
 from datetime import datetime, timezone
@@ -33,6 +32,9 @@ load_dotenv(os.path.join(ROOT_DIR, ".env"))
 
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 
+from afiliadohub.api.utils.quality_score import rank_by_real_score
+from afiliadohub.api.utils.telegram_sender import get_telegram_sender
+
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID", "-1002499912192")
 
@@ -127,13 +129,6 @@ SLOTS = {
 }
 
 
-def real_score(node: dict) -> float:
-    """Score anti-manopla: desconto × log(vendas). Penaliza inflação falsa."""
-    d = float(node.get("priceDiscountRate", 0))
-    s = int(node.get("sales") or 0)
-    return d * math.log(s + 1)
-
-
 def format_66_message(node: dict, sub_id: str) -> str:
     """Formata mensagem temática 6.6 com urgência e prova social."""
     name = html_module.escape(node.get("productName", "Produto Shopee")[:80])
@@ -206,7 +201,7 @@ async def fetch_66_products(keyword: str, sub_id: str, topic: str = "geral", lim
         "geral":      "oferta shopee",
     }
 
-    client = create_shopee_client()
+    client = create_shopee_client(priority="batch")
 
     async with client:
         # Camada 1: key sellers + AMS + filtros premium
@@ -247,15 +242,20 @@ async def fetch_66_products(keyword: str, sub_id: str, topic: str = "geral", lim
             filtered = sorted(fb_nodes, key=lambda n: float(n.get("ratingStar") or 0), reverse=True)[:3]
 
         # Gera short links rastreáveis para o top 2
-        top = sorted(filtered, key=real_score, reverse=True)[:2]
-        for node in top:
-            offer_url = node.get("offerLink") or node.get("productLink")
-            if offer_url and not node.get("shortLink"):
-                short = await client.generate_short_link(offer_url, sub_ids=[sub_id, "sale66"])
-                if short:
-                    node["shortLink"] = short
+        # Score anti-manopla: desconto × log(vendas + 1)
+        top = rank_by_real_score(filtered, limit=2)
+        # Memo local evita nova mutation para ofertas já vistas
+        pending = [n for n in top if not n.get("shortLink")]
+        links = await client.generate_short_links(
+            [n.get("offerLink") or n.get("productLink") for n in pending],
+            sub_ids=[sub_id, "sale66"],
+        )
+        for node in pending:
+            short = links.get(node.get("offerLink") or node.get("productLink"))
+            if short:
+                node["shortLink"] = short
 
-    return sorted(top, key=real_score, reverse=True)
+    return top
 
 
 def detect_current_slot() -> str:
@@ -297,8 +297,10 @@ async def send_66_slot(slot_name: str):
         thread_id = get_thread_id(category=slot["topic"])
         print(f"  Thread ID: {thread_id or 'não configurado (geral)'}")
 
+    # Ritmo do canal (20 msg/min), 429 e retries ficam a cargo da fila de envio
+    sender = get_telegram_sender()
+
     intro_kwargs = dict(
-        chat_id=TELEGRAM_CHANNEL_ID,
         text=slot["intro"],
         parse_mode="HTML",
         **( {"message_thread_id": thread_id} if thread_id else {} ),
@@ -308,7 +310,7 @@ async def send_66_slot(slot_name: str):
     if slot_name == "midnight":
         try:
             from afiliadohub.api.utils.shopee_client import create_shopee_client
-            client = create_shopee_client()
+            client = create_shopee_client(priority="batch")
             async with client:
                 coupon_link = await client.generate_short_link("https://shopee.com.br/m/cupons-shopee", sub_ids=["cupons66"])
             if coupon_link:
@@ -318,19 +320,21 @@ async def send_66_slot(slot_name: str):
         except Exception as e:
             print(f"  [AVISO] Erro ao gerar link de cupons: {e}")
     try:
-        await bot.send_message(**intro_kwargs)
-        await asyncio.sleep(2)
+        await sender.send_message(bot, TELEGRAM_CHANNEL_ID, **intro_kwargs)
     except Exception as e:
         print(f"  [AVISO] Erro ao enviar intro: {e}")
 
-    # Busca e envia produtos para cada keyword do slot
+    # Busca as keywords do slot em paralelo; o envio segue na ordem do slot,
+    # começando assim que a primeira keyword estiver pronta
+    from afiliadohub.api.utils.shopee_extensions import prefetch_in_order
+
+    print(f"\n  🔍 Buscando {len(slot['keywords'])} keyword(s) em paralelo...")
     sent = 0
-    for keyword in slot["keywords"]:
-        print(f"\n  🔍 Buscando '{keyword}'...")
-        try:
-            nodes = await fetch_66_products(keyword, slot["sub_id"])
-        except Exception as e:
-            print(f"  [ERRO] Falha na API Shopee para '{keyword}': {e}")
+    async for keyword, nodes, error in prefetch_in_order(
+        slot["keywords"], lambda kw: fetch_66_products(kw, slot["sub_id"])
+    ):
+        if error:
+            print(f"  [ERRO] Falha na API Shopee para '{keyword}': {error}")
             continue
 
         if not nodes:
@@ -350,13 +354,11 @@ async def send_66_slot(slot_name: str):
             ])
 
             send_kwargs = dict(
-                chat_id=TELEGRAM_CHANNEL_ID,
                 parse_mode="HTML",
                 reply_markup=keyboard,
                 **( {"message_thread_id": thread_id} if thread_id else {} ),
             )
             send_kwargs_general = dict(
-                chat_id=TELEGRAM_CHANNEL_ID,
                 parse_mode="HTML",
                 reply_markup=keyboard,
             )
@@ -364,42 +366,36 @@ async def send_66_slot(slot_name: str):
             async def _send_product(kw: dict, label: str) -> bool:
                 if image_url:
                     try:
-                        await bot.send_photo(photo=image_url, caption=caption, **kw)
+                        await sender.send_photo(bot, TELEGRAM_CHANNEL_ID, photo=image_url, caption=caption, **kw)
                         print(f"  ✅ [{sent+1}] {label} FOTO: {name}...")
                         return True
                     except Exception:
                         pass
-                await bot.send_message(text=caption, disable_web_page_preview=True, **kw)
+                await sender.send_message(bot, TELEGRAM_CHANNEL_ID, text=caption, disable_web_page_preview=True, **kw)
                 print(f"  ✅ [{sent+1}] {label} TEXTO: {name}...")
                 return True
 
             try:
                 await _send_product(send_kwargs, "")
                 sent += 1
-                await asyncio.sleep(5)
             except Exception as e:
                 if thread_id and "thread" in str(e).lower():
                     print(f"  ⚠️ Thread {thread_id} inválido, enviando ao General...")
                     try:
                         await _send_product(send_kwargs_general, "[General]")
                         sent += 1
-                        await asyncio.sleep(5)
                     except Exception as e2:
                         print(f"  ❌ Erro mesmo no General: {e2}")
                 else:
                     print(f"  ❌ Erro ao enviar produto: {e}")
 
-
-        # Pausa entre keywords
-        if len(slot["keywords"]) > 1:
-            await asyncio.sleep(8)
-
     print(f"\n✅ Slot '{slot_name}' concluído! {sent} produto(s) enviados.")
 
     if sent == 0:
         print("[AVISO] Nenhum produto foi enviado. Verifique a API Shopee.")
-        await bot.send_message(
-            chat_id=TELEGRAM_CHANNEL_ID,
+        await sender.send_message(
+            bot,
+            TELEGRAM_CHANNEL_ID,
             text=(
                 "⚠️ <b>Shopee 6.6</b> — Garimpando as melhores ofertas...\n"
                 "🔄 Acompanhe o grupo para não perder nada!"
@@ -9,7 +9,6 @@ Anti-manopla: exige vendas reais + rating alto, não só % de desconto.
 
 import os
 import sys
-import math
 import html as html_module
 import asyncio
 from datetime import datetime, timezone
@@ -23,6 +22,9 @@ load_dotenv(os.path.join(ROOT_DIR, ".env"))
 
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 
+from afiliadohub.api.utils.quality_score import rank_by_real_score
+from afiliadohub.api.utils.telegram_sender import get_telegram_sender
+
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID", "-1002499912192")
 
@@ -100,16 +102,6 @@ def is_morning_slot() -> bool:
     return datetime.now(timezone.utc).hour < 14
 
 
-def real_discount_score(node: dict) -> float:
-    """
-    Score anti-manopla: penaliza produtos com poucas vendas.
-    score = desconto × log(vendas + 1)
-    """
-    discount = float(node.get("priceDiscountRate", 0))
-    sales = int(node.get("sales") or 0)
-    return discount * math.log(sales + 1)
-
-
 def format_message(node: dict, keyword: str) -> str:
     """Formata mensagem AIDA com HTML para o canal (alta conversão)."""
     # Campos corretos da productOfferV2 API
@@ -186,7 +178,7 @@ async def fetch_live_products(keyword: str) -> list:
     # Import correto: create_shopee_client está em utils.shopee_client
     from afiliadohub.api.utils.shopee_client import create_shopee_client
 
-    client = create_shopee_client()
+    client = create_shopee_client(priority="batch")
     candidates = []
 
     async with client:
@@ -226,16 +218,17 @@ async def fetch_live_products(keyword: str) -> list:
             ] or nodes2[:5]
 
         # Gera shortLinks para os top 3 antes de fechar a sessão
-        top_candidates = sorted(candidates, key=real_discount_score, reverse=True)[:3]
-        for node in top_candidates:
-            offer_url = node.get("offerLink") or node.get("productLink")
-            if offer_url and not node.get("shortLink"):
-                short = await client.generate_short_link(offer_url)
-                if short:
-                    node["shortLink"] = short
-
-    # Ordena pelo score anti-manopla (desconto × log(vendas))
-    top_candidates.sort(key=real_discount_score, reverse=True)
+        # Score anti-manopla: desconto × log(vendas + 1)
+        top_candidates = rank_by_real_score(candidates, limit=3)
+        pending = [n for n in top_candidates if not n.get("shortLink")]
+        links = await client.generate_short_links(
+            [n.get("offerLink") or n.get("productLink") for n in pending]
+        )
+        for node in pending:
+            short = links.get(node.get("offerLink") or node.get("productLink"))
+            if short:
+                node["shortLink"] = short
+
     return top_candidates
 
 
@@ -264,8 +257,9 @@ async def send_daily_promotions():
         print(f"[ERRO] Falha ao buscar produtos da Shopee: {e}", flush=True)
         import traceback
         traceback.print_exc()
-        await bot.send_message(
-            chat_id=TELEGRAM_CHANNEL_ID,
+        await get_telegram_sender().send_message(
+            bot,
+            TELEGRAM_CHANNEL_ID,
             text=(
                 f"⚠️ <b>Erro temporário na Shopee API.</b>\n"
                 f"Código: <code>{type(e).__name__}</code>\n"
@@ -305,31 +299,33 @@ async def send_daily_promotions():
             print(f"  [{idx}/{len(nodes)}] Tópico detectado: {topic_label} | Keyword: '{keyword}'")
 
         send_kwargs = dict(
-            chat_id=TELEGRAM_CHANNEL_ID,
             parse_mode="HTML",
             reply_markup=keyboard,
             **({"message_thread_id": thread_id} if thread_id else {}),
         )
+        sender = get_telegram_sender()
 
         try:
+            # Ritmo do canal (20 msg/min) e 429 ficam a cargo da fila de envio
             if image_url:
-                await bot.send_photo(
+                await sender.send_photo(
+                    bot,
+                    TELEGRAM_CHANNEL_ID,
                     photo=image_url,
                     caption=caption,
                     **send_kwargs,
                 )
                 print(f"  [{idx}/{len(nodes)}] ✅ FOTO enviada: {name}...")
             else:
-                await bot.send_message(
+                await sender.send_message(
+                    bot,
+                    TELEGRAM_CHANNEL_ID,
                     text=caption,
                     disable_web_page_preview=False,
                     **send_kwargs,
                 )
                 print(f"  [{idx}/{len(nodes)}] ✅ TEXTO enviado: {name}...")
 
-            if idx < len(nodes):
-                await asyncio.sleep(4)  # Pausa entre produtos
-
         except Exception as e:
             print(f"  [{idx}/{len(nodes)}] ❌ Erro ao enviar: {e}")
 
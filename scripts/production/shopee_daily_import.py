@@ -26,6 +26,8 @@ load_dotenv()
 from api.utils.shopee_client import create_shopee_client
 from api.utils.shopee_extensions import add_rate_limiting
 from api.utils.supabase_client import get_supabase_manager
+from api.utils.quality_score import commission_percent, score_products
+from api.utils.telegram_sender import get_telegram_sender
 import logging
 
 logging.basicConfig(
@@ -41,56 +43,6 @@ IMPORT_LIMIT = 50  # Limite de produtos por execução
 MIN_QUALITY_SCORE = 60  # Score mínimo de qualidade (0-100) para importar
 
 
-def calculate_quality_score(product: Dict[str, Any], commission_rate: float) -> int:
-    """
-    Calcula score de qualidade de um produto (0-100)
-    
-    Critérios:
-    - Rating (0-30 pts)
-    - Sales volume (0-30 pts)
-    - Commission rate (0-25 pts)
-    - Price stability/discount (0-15 pts)
-    """
-    score = 0
-    
-    # Rating (0-30 pontos)
-    rating = float(product.get('ratingStar', 0))
-    if rating > 0:
-        score += int((rating / 5.0) * 30)
-    
-    # Sales volume (0-30 pontos)
-    sales = int(product.get('sales', 0))
-    if sales >= 1000:
-        score += 30
-    elif sales >= 500:
-        score += 20
-    elif sales >= 100:
-        score += 10
-    elif sales >= 50:
-        score += 5
-    
-    # Commission (0-25 pontos)
-    if commission_rate >= 50:
-        score += 25
-    elif commission_rate >= 40:
-        score += 20
-    elif commission_rate >= 30:
-        score += 15
-    
-    # Price stability (0-15 pontos)
-    price_min = float(product.get('priceMin', 0))
-    price_max = float(product.get('priceMax', 0))
-    
-    if price_max > price_min:
-        discount = ((price_max - price_min) / price_max) * 100
-        if 10 <= discount <= 50:
-            score += 15
-        elif discount > 50:
-            score += 5
-    
-    return min(score, 100)
-
-
 async def import_top_products() -> Dict[str, Any]:
     """Importa produtos com alta comissão"""
     logger.info("="*60)
@@ -110,7 +62,7 @@ async def import_top_products() -> Dict[str, Any]:
     
     try:
         # Conecta ao Shopee com rate limiting
-        client = create_shopee_client()
+        client = create_shopee_client(priority="batch")
         add_rate_limiting(client)  # Protege contra bloqueio (2000 req/h)
         
         supabase = get_supabase_manager()
@@ -145,17 +97,19 @@ async def import_top_products() -> Dict[str, Any]:
             
             logger.info(f"Store ID Shopee: {store_id}")
             
-            for product in products:
+            # Comissão (%) e score de qualidade (0-100) da página inteira de uma vez
+            commission_rates = commission_percent([p.get('commissionRate', 0) for p in products])
+            quality_scores = score_products(products)
+            
+            for product, commission_rate, quality_score in zip(products, commission_rates, quality_scores):
                 try:
-                    commission_rate = float(product.get('commissionRate', 0)) * 100
+                    commission_rate = float(commission_rate)
+                    quality_score = int(quality_score)
                     
                     # Filtra por comissão mínima
                     if commission_rate < MIN_COMMISSION:
                         continue
                     
-                    # NOVO: Calcula score de qualidade (0-100)
-                    quality_score = calculate_quality_score(product, commission_rate)
-                    
                     # NOVO: Filtra por qualidade mínima
                     if quality_score < MIN_QUALITY_SCORE:
                         stats['filtered_low_quality'] += 1
@@ -234,8 +188,7 @@ async def import_top_products() -> Dict[str, Any]:
         try:
             import json
             
-            # Executa com service_role_key para garantir escrita
-            service_client = supabase.get_authenticated_client(None) # Opcional usar client puro
+            # Executa com o client principal (service_role_key) para garantir escrita
             supabase.client.rpc('log_shopee_sync', {
                 'p_sync_type': 'daily',
                 'p_products_imported': stats['imported'],
@@ -310,16 +263,15 @@ async def notify_high_commission_products():
                 """
                 
                 try:
-                    await bot.send_message(
-                        chat_id=channel_id,
+                    await get_telegram_sender().send_message(
+                        bot,
+                        channel_id,
                         text=message,
                         parse_mode='Markdown',
                         disable_web_page_preview=False
                     )
                     logger.info(f"Notificação enviada: {product['name'][:30]}...")
                     
-                    await asyncio.sleep(2)
-                    
                 except Exception as e:
                     logger.error(f"Erro ao enviar notificação: {e}")
         
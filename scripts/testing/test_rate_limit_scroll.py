@@ -37,7 +37,7 @@ async def test_rate_limiting():
     
     async with client:
         print("\n1. Status inicial do rate limit:")
-        status = client.get_rate_limit_status()
+        status = await client.get_rate_limit_status()
         print(f"   Usadas: {status['used']}/{status['total']}")
         print(f"   Restantes: {status['remaining']}")
         print(f"   % Usado: {status['percentage_used']:.1f}%")
@@ -46,14 +46,14 @@ async def test_rate_limiting():
         for i in range(5):
             try:
                 await client.get_shopee_offers(limit=1)
-                status = client.get_rate_limit_status()
+                status = await client.get_rate_limit_status()
                 print(f"   Request {i+1}/5 - Usadas: {status['used']}, "
                       f"Restantes: {status['remaining']}")
             except Exception as e:
                 print(f"   Erro: {e}")
         
         print("\n3. Status após 5 requests:")
-        status = client.get_rate_limit_status()
+        status = await client.get_rate_limit_status()
         print(f"   ✓ Usadas: {status['used']}")
         print(f"   ✓ Restantes: {status['remaining']}")
         print(f"   ✓ Reset em: {status['reset_in_seconds']}s")
@@ -128,7 +128,7 @@ async def test_rate_limit_protection():
         start = datetime.now()
         
         for i in range(10):
-            status = client.get_rate_limit_status()
+            status = await client.get_rate_limit_status()
             print(f"\n   Request {i+1}/10")
             print(f"      Antes: {status['used']} usadas, "
                   f"{status['remaining']} restantes")
@@ -145,7 +145,7 @@ async def test_rate_limit_protection():
         print(f"   ✓ 10 requests em {elapsed:.1f}s")
         print(f"   ✓ Rate limit respeitado automaticamente")
         
-        final_status = client.get_rate_limit_status()
+        final_status = await client.get_rate_limit_status()
         print(f"\n3. Status final:")
         print(f"   Usadas: {final_status['used']}/{final_status['total']}")
         print(f"   Restantes: {final_status['remaining']}")
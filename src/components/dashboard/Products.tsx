@@ -9,7 +9,7 @@ import { api } from "../../services/api";
 import { toast } from "sonner";
 
 export const Products = () => {
-    const { products, loading, createProduct, updateProduct, deleteProduct } = useProducts();
+    const { products, loading, loadingMore, hasMore, loadMore, createProduct, updateProduct, deleteProduct } = useProducts();
     const [searchTerm, setSearchTerm] = useState('');
     const [storeFilter, setStoreFilter] = useState('');
     const [categoryFilter, setCategoryFilter] = useState('');
@@ -268,6 +268,17 @@ export const Products = () => {
                                 </tbody>
                             </table>
                         )}
+                        {!loading && hasMore && (
+                            <div className="p-4 border-t border-slate-200 dark:border-slate-800 text-center">
+                                <button
+                                    onClick={loadMore}
+                                    disabled={loadingMore}
+                                    className="px-4 py-2 bg-indigo-50 dark:bg-indigo-900/20 text-indigo-600 dark:text-indigo-400 rounded-lg text-sm font-medium hover:bg-indigo-100 dark:hover:bg-indigo-900/40 disabled:opacity-50"
+                                >
+                                    {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
             </div>
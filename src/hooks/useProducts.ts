@@ -36,23 +36,31 @@ export interface ProductFilters {
 export const useProducts = (initialFilters: ProductFilters = {}) => {
     const [products, setProducts] = useState<Product[]>([]);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [filters, setFilters] = useState<ProductFilters>(initialFilters);
 
+    const buildParams = useCallback((cursor?: string | null) => {
+        const params = new URLSearchParams();
+        if (filters.store) params.append('store', filters.store);
+        if (filters.category) params.append('category', filters.category);
+        if (filters.search) params.append('search', filters.search);
+        if (filters.is_active !== undefined) params.append('is_active', String(filters.is_active));
+        // Keyset pagination: the API returns next_cursor for the following page
+        if (cursor) params.append('cursor', cursor);
+        return params;
+    }, [filters]);
+
     const fetchProducts = useCallback(async () => {
         setLoading(true);
         try {
-            const params = new URLSearchParams();
-            if (filters.store) params.append('store', filters.store);
-            if (filters.category) params.append('category', filters.category);
-            if (filters.search) params.append('search', filters.search);
-            if (filters.is_active !== undefined) params.append('is_active', String(filters.is_active));
-
-            const response = await api.get<any>(`/products?${params.toString()}`);
+            const response = await api.get<any>(`/products?${buildParams().toString()}`);
 
             if (response) {
                 // Support both Direct Array (legacy) and Object response (modern)
                 const data = Array.isArray(response) ? response : (response.data || []);
                 setProducts(data);
+                setNextCursor(Array.isArray(response) ? null : (response.next_cursor || null));
             }
         } catch (error) {
             console.error('Failed to fetch products:', error);
@@ -60,7 +68,24 @@ export const useProducts = (initialFilters: ProductFilters = {}) => {
         } finally {
             setLoading(false);
         }
-    }, [filters]);
+    }, [buildParams]);
+
+    const loadMore = useCallback(async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const response = await api.get<any>(`/products?${buildParams(nextCursor).toString()}`);
+            if (response && !Array.isArray(response)) {
+                setProducts(prev => [...prev, ...(response.data || [])]);
+                setNextCursor(response.next_cursor || null);
+            }
+        } catch (error) {
+            console.error('Failed to fetch more products:', error);
+            toast.error('Erro ao carregar mais produtos');
+        } finally {
+            setLoadingMore(false);
+        }
+    }, [buildParams, nextCursor, loadingMore]);
 
     const createProduct = async (productData: Partial<Product>) => {
         try {
@@ -127,6 +152,9 @@ export const useProducts = (initialFilters: ProductFilters = {}) => {
     return {
         products,
         loading,
+        loadingMore,
+        hasMore: nextCursor !== null,
+        loadMore,
         filters,
         setFilters,
         createProduct,